@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import time
+import argparse
+
+from pyhide import Obfuscator
+from pyhide import ResultCache
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+# snippet template obfuscated for each tenant
+TEMPLATE = '''
+import json
+
+TENANT = {tenant!r}
+
+def handler (event):
+  payload = json.loads(event['body'])
+  total = sum(item['price'] * item['quantity'] for item in payload['items'])
+  if total > 100:
+    total = total * 0.9
+  return {{'tenant' : TENANT, 'total' : round(total, 2), 'count' : len(payload['items'])}}
+
+class Router (object):
+
+  def __init__ (self):
+    self.routes = {{'/orders' : handler}}
+
+  def dispatch (self, path, event):
+    return self.routes[path](event)
+'''
+
+
+def parse_args ():
+
+  description = 'Latency of the repeated obfuscations with the result cache'
+
+  parser = argparse.ArgumentParser(description=description)
+  parser.add_argument(
+    '--tenants', '-n',
+    dest='tenants',
+    required=False,
+    action='store',
+    type=int,
+    default=20,
+    help='Number of distinct snippets',
+  )
+  parser.add_argument(
+    '--repeat', '-r',
+    dest='repeat',
+    required=False,
+    action='store',
+    type=int,
+    default=10,
+    help='Number of obfuscations of each snippet',
+  )
+  parser.add_argument(
+    '--max-bytes', '-m',
+    dest='max_bytes',
+    required=False,
+    action='store',
+    type=int,
+    default=64 * 1024 * 1024,
+    help='Size of the cache in bytes',
+  )
+
+  args = parser.parse_args()
+
+  return args
+
+
+def _time_calls (obfuscator : Obfuscator, codes : list) -> float:
+  # mean time of an obfuscation in seconds
+  tic = time.perf_counter()
+  for code in codes:
+    obfuscator(code)
+  return (time.perf_counter() - tic) / len(codes)
+
+
+def main ():
+
+  args = parse_args()
+
+  codes = [TEMPLATE.format(tenant=f'tenant-{i}') for i in range(args.tenants)]
+  cache = ResultCache(max_bytes=args.max_bytes)
+
+  rows = [
+    ('no cache', _time_calls(Obfuscator(), codes * args.repeat)),
+    ('cold', _time_calls(Obfuscator(cache=cache), codes)),
+    ('hit', _time_calls(Obfuscator(cache=cache), codes * args.repeat)),
+    # other options reuse the parsed trees (the values are
+    # collected at the first reuse)
+    ('options', _time_calls(Obfuscator(cache=cache, encode_string=False), codes)),
+    ('options 2', _time_calls(Obfuscator(cache=cache, encode_number=False), codes)),
+  ]
+
+  print(f'{"calls":>10} {"time [us]":>12}')
+  for name, elapsed in rows:
+    print(f'{name:>10} {elapsed * 1e6:>12.1f}')
+
+  print(', '.join(f'{k}={v}' for k, v in cache.stats().items()))
+
+
+if __name__ == '__main__':
+
+  main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import glob
+import time
+import argparse
+
+from pyhide import Obfuscator
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+
+def parse_args ():
+
+  description = 'Accuracy and speedup of the size estimate with respect to the obfuscation'
+
+  parser = argparse.ArgumentParser(description=description)
+  parser.add_argument(
+    '--input', '-i',
+    dest='inputs',
+    required=False,
+    action='store',
+    nargs='+',
+    type=str,
+    default=sorted(glob.glob(os.path.join(os.path.dirname(__file__), '..', 'pyhide', '*.py'))),
+    help='Python files to obfuscate (default: the pyhide sources)',
+  )
+  parser.add_argument(
+    '--repeat', '-r',
+    dest='repeat',
+    required=False,
+    action='store',
+    type=int,
+    default=3,
+    help='Number of repetitions of the timings',
+  )
+
+  args = parser.parse_args()
+
+  return args
+
+
+def _time_call (func : object, code : str, repeat : int) -> tuple:
+  # result and best time in seconds
+  best = float('inf')
+  for _ in range(repeat):
+    tic = time.perf_counter()
+    result = func(code)
+    best = min(best, time.perf_counter() - tic)
+  return result, best
+
+
+def main ():
+
+  args = parse_args()
+
+  obfuscator = Obfuscator()
+  totals = [0, 0, 0., 0.]
+
+  print(f'{"file":>20} {"estimate [B]":>13} {"size [B]":>10} {"error":>7} '
+        f'{"estimate [ms]":>14} {"obfuscation [ms]":>17} {"speedup":>8}')
+
+  for filename in args.inputs:
+
+    with open(filename, 'r', encoding='utf-8') as fp:
+      code = fp.read()
+
+    try:
+      obf_code, obf_time = _time_call(obfuscator, code, args.repeat)
+    except (SyntaxError, ValueError, RecursionError) as err:
+      print(f'{os.path.basename(filename):>20} skipped ({err})')
+      continue
+
+    estimate, estimate_time = _time_call(obfuscator.estimate, code, args.repeat)
+
+    totals[0] += estimate['size']
+    totals[1] += len(obf_code)
+    totals[2] += estimate_time
+    totals[3] += obf_time
+
+    print(f'{os.path.basename(filename):>20} {estimate["size"]:>13} {len(obf_code):>10} '
+          f'{estimate["size"] / len(obf_code) - 1.:>+7.1%} {estimate_time * 1e3:>14.2f} '
+          f'{obf_time * 1e3:>17.2f} {obf_time / estimate_time:>7.1f}x')
+
+  size, obf_size, estimate_time, obf_time = totals
+  print(f'{"total":>20} {size:>13} {obf_size:>10} {size / max(obf_size, 1) - 1.:>+7.1%} '
+        f'{estimate_time * 1e3:>14.2f} {obf_time * 1e3:>17.2f} {obf_time / max(estimate_time, 1e-9):>7.1f}x')
+
+
+if __name__ == '__main__':
+
+  main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import time
+import argparse
+
+from pyhide import Obfuscator
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+
+def generate_module (n_functions : int) -> str:
+  '''
+  Generate a synthetic module with the given number
+  of top-level functions, whose numbers overlap with
+  the character codes of their strings.
+
+  Parameters
+  ----------
+    n_functions : int
+      Number of functions to generate
+
+  Returns
+  -------
+    code : str
+      Source code of the module
+  '''
+
+  code = ['import math', '']
+
+  for i in range(n_functions):
+    code.append(f'''def func_{i} (x, y):
+  z = x * {48 + i % 75} + y / 3.5
+  name = 'value_{i}'
+  return math.sqrt(abs(z)) + len(name)
+''')
+
+  return '\n'.join(code)
+
+def get_import_time (code : str, repeat : int) -> float:
+  '''
+  Get the best execution time of the module body,
+  i.e. its import time without the compilation.
+
+  Parameters
+  ----------
+    code : str
+      Source code of the module
+
+    repeat : int
+      Number of repetitions
+
+  Returns
+  -------
+    elapsed : float
+      Best execution time in seconds
+  '''
+
+  compiled = compile(code, '<obfuscated>', 'exec')
+  best = float('inf')
+
+  for _ in range(repeat):
+    tic = time.perf_counter()
+    exec(compiled, {'__name__' : '__obfuscated__'})
+    best = min(best, time.perf_counter() - tic)
+
+  return best
+
+def parse_args ():
+
+  description = 'Lines, bytes and import time saved by the header pruning'
+
+  parser = argparse.ArgumentParser(description=description)
+  parser.add_argument(
+    '--input', '-i',
+    dest='inptfile',
+    required=False,
+    action='store',
+    default=None,
+    help='Input code to obfuscate (default a generated module)',
+  )
+  parser.add_argument(
+    '--functions', '-n',
+    dest='n_functions',
+    required=False,
+    action='store',
+    type=int,
+    default=200,
+    help='Number of functions of the generated module',
+  )
+  parser.add_argument(
+    '--repeat', '-r',
+    dest='repeat',
+    required=False,
+    action='store',
+    type=int,
+    default=20,
+    help='Number of repetitions of the import timing',
+  )
+
+  args = parser.parse_args()
+
+  return args
+
+
+def main ():
+
+  args = parse_args()
+
+  if args.inptfile is not None:
+    with open(args.inptfile, 'r', encoding='utf-8') as fp:
+      code = fp.read()
+  else:
+    code = generate_module(n_functions=args.n_functions)
+
+  print(f'module: {len(code.splitlines())} lines')
+  print(f'{"prune":>6} {"lines":>8} {"bytes":>10} {"import [ms]":>12}')
+
+  results = {}
+
+  for prune_header in (False, True):
+    obf = Obfuscator(prune_header=prune_header)
+    obf_code = obf(code=code)
+
+    elapsed = get_import_time(code=obf_code, repeat=args.repeat)
+    results[prune_header] = (len(obf_code.splitlines()), len(obf_code), elapsed)
+
+    print(f'{str(prune_header):>6} {results[prune_header][0]:>8} {results[prune_header][1]:>10} {elapsed * 1e3:>12.3f}')
+
+  report = obf.header_report
+  print(f'removed: {report["dead"]}, merged: {report["merged"]}, '
+        f'saved lines: {report["lines"]}, saved bytes: {report["bytes"]}, '
+        f'import time: {(results[True][2] / results[False][2] - 1.) * 100:+.1f}%'
+  )
+
+
+if __name__ == '__main__':
+
+  main()
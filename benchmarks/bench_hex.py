@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import time
+import argparse
+
+from pyhide._encoder import encodeHex
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+# alphabets of the generated literals
+ALPHABETS = {
+  'ascii' : 'abcdefghijklmnopqrstuvwxyz0123456789 {}[]":,\n',
+  'latin-1' : 'abcdefàèéìòù°§£ ',
+  'unicode' : 'abcαβγδ€—😀 ',
+}
+
+
+def encode_chars (text : str) -> str:
+  '''
+  Reference encoding of the string, one char at a time.
+
+  Parameters
+  ----------
+    text : str
+      String to encode
+
+  Returns
+  -------
+    obf_text : str
+      Escaped string
+  '''
+  return ''.join(f'\\x{ord(c):02x}' for c in text)
+
+def get_throughput (func : object, text : str, repeat : int) -> float:
+  '''
+  Get the best throughput of the encoding function.
+
+  Parameters
+  ----------
+    func : function
+      Encoding function
+
+    text : str
+      String to encode
+
+    repeat : int
+      Number of repetitions
+
+  Returns
+  -------
+    throughput : float
+      Encoded MB (of utf-8 source) per second
+  '''
+
+  best = float('inf')
+
+  for _ in range(repeat):
+    tic = time.perf_counter()
+    func(text)
+    best = min(best, time.perf_counter() - tic)
+
+  return len(text.encode('utf-8')) / best / 1e6
+
+def parse_args ():
+
+  description = 'Throughput of the bulk hex encoding of the strings'
+
+  parser = argparse.ArgumentParser(description=description)
+  parser.add_argument(
+    '--sizes', '-s',
+    dest='sizes',
+    required=False,
+    action='store',
+    nargs='+',
+    type=int,
+    default=[1_000, 100_000, 1_000_000],
+    help='Number of chars of the generated literals',
+  )
+  parser.add_argument(
+    '--repeat', '-r',
+    dest='repeat',
+    required=False,
+    action='store',
+    type=int,
+    default=5,
+    help='Number of repetitions of the timing',
+  )
+
+  args = parser.parse_args()
+
+  return args
+
+
+def main ():
+
+  args = parse_args()
+
+  print(f'{"alphabet":>8} {"chars":>10} {"per-char [MB/s]":>16} {"bulk [MB/s]":>12} {"speedup":>8}')
+
+  for name, alphabet in ALPHABETS.items():
+    for size in args.sizes:
+      text = (alphabet * (size // len(alphabet) + 1))[:size]
+
+      # NOTE: the per-char encoding is wrong for the code
+      # points above 0xff, so it is only timed
+      reference = get_throughput(func=encode_chars, text=text, repeat=args.repeat)
+      bulk = get_throughput(func=encodeHex, text=text, repeat=args.repeat)
+
+      print(f'{name:>8} {size:>10} {reference:>16.1f} {bulk:>12.1f} {bulk / reference:>7.1f}x')
+
+
+if __name__ == '__main__':
+
+  main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import time
+import argparse
+import tracemalloc
+
+from pyhide import Obfuscator
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+# template of the functions of the generated module, with
+# the operators, builtins and strings shared by the encoders
+FUNCTION = '''
+def func_{i} (x, y):
+  z = x * {i} + y - x // 3 + abs(y) % 7
+  name = str(len('value')) + 'item {i}'
+  return max(z, min(x, y)) + len(name) + sum([x, y, {i}])
+'''
+
+
+def get_memory (code : str, repeat : int) -> tuple:
+  '''
+  Get the best times of the obfuscation and of its
+  encoding passes, and the peak memory of the obfuscation
+  of the code.
+
+  Parameters
+  ----------
+    code : str
+      Code to obfuscate
+
+    repeat : int
+      Number of repetitions of the timing
+
+  Returns
+  -------
+    elapsed : float
+      Best time of the obfuscation in seconds
+
+    encoding : float
+      Best time of the encoding passes in seconds
+
+    peak : float
+      Peak of the traced memory in MB
+  '''
+
+  best = encoding = float('inf')
+
+  for _ in range(repeat):
+    obfuscator = Obfuscator()
+    tic = time.perf_counter()
+    obfuscator(code)
+    best = min(best, time.perf_counter() - tic)
+    encoding = min(encoding, sum(obfuscator.timings.values()))
+
+  # NOTE: the tracing slows down the run, so the
+  # peak memory is measured in a separate run
+  tracemalloc.start()
+  Obfuscator()(code)
+  _, peak = tracemalloc.get_traced_memory()
+  tracemalloc.stop()
+
+  return best, encoding, peak / 1e6
+
+def parse_args ():
+
+  description = 'Time and peak memory of the obfuscation of large modules'
+
+  parser = argparse.ArgumentParser(description=description)
+  parser.add_argument(
+    '--functions', '-f',
+    dest='functions',
+    required=False,
+    action='store',
+    nargs='+',
+    type=int,
+    default=[100, 200, 400],
+    help='Number of functions of the generated modules',
+  )
+  parser.add_argument(
+    '--repeat', '-r',
+    dest='repeat',
+    required=False,
+    action='store',
+    type=int,
+    default=3,
+    help='Number of repetitions of the timing',
+  )
+
+  args = parser.parse_args()
+
+  return args
+
+
+def main ():
+
+  args = parse_args()
+
+  print(f'{"functions":>9} {"time [s]":>9} {"passes [s]":>11} {"peak [MB]":>10}')
+
+  for functions in args.functions:
+    code = ''.join(FUNCTION.format(i=i) for i in range(functions))
+    elapsed, encoding, peak = get_memory(code=code, repeat=args.repeat)
+
+    print(f'{functions:>9} {elapsed:>9.3f} {encoding:>11.3f} {peak:>10.1f}')
+
+
+if __name__ == '__main__':
+
+  main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import re
+import sys
+import argparse
+import tempfile
+import subprocess
+
+from pyhide import Obfuscator
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+# template of the functions of the generated module
+FUNCTION = '''
+def func_{i} (x):
+  return x * {number} + len('function {i} of the generated module')
+'''
+
+# regex of the import time of a module (cumulative, in us)
+IMPORTTIME_REGEX = re.compile(r'import time:\s+\d+ \|\s+(\d+) \|\s+(\S+)')
+
+
+def get_import_time (dirname : str, module : str, repeat : int) -> float:
+  '''
+  Get the best import time of the module, with its
+  bytecode already cached.
+
+  Parameters
+  ----------
+    dirname : str
+      Directory of the module
+
+    module : str
+      Name of the module
+
+    repeat : int
+      Number of repetitions
+
+  Returns
+  -------
+    elapsed : float
+      Import time in ms
+  '''
+
+  best = float('inf')
+  env = {k : v for k, v in os.environ.items() if k != 'PYTHONDONTWRITEBYTECODE'}
+
+  # NOTE: the first import writes the cached bytecode
+  for _ in range(repeat + 1):
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+      cwd=dirname, env=env, capture_output=True, text=True, check=True
+    ).stderr
+
+    for cumulative, name in IMPORTTIME_REGEX.findall(stderr):
+      if name == module:
+        best = min(best, int(cumulative) * 1e-3)
+
+  return best
+
+def parse_args ():
+
+  description = 'Import time of the obfuscated modules with the eager and lazy headers'
+
+  parser = argparse.ArgumentParser(description=description)
+  parser.add_argument(
+    '--functions', '-f',
+    dest='functions',
+    required=False,
+    action='store',
+    nargs='+',
+    type=int,
+    default=[10, 100, 500],
+    help='Number of functions of the generated modules',
+  )
+  parser.add_argument(
+    '--repeat', '-r',
+    dest='repeat',
+    required=False,
+    action='store',
+    type=int,
+    default=5,
+    help='Number of repetitions of the timing',
+  )
+
+  args = parser.parse_args()
+
+  return args
+
+
+def main ():
+
+  args = parse_args()
+
+  print(f'{"functions":>9} {"original [ms]":>13} {"eager [ms]":>11} {"lazy [ms]":>10} {"speedup":>8}')
+
+  for functions in args.functions:
+    code = ''.join(FUNCTION.format(i=i, number=123_457 + 7_919 * i) for i in range(functions))
+    times = {}
+
+    with tempfile.TemporaryDirectory() as dirname:
+      for name, obfuscator in (('original', None),
+                               ('eager', Obfuscator()),
+                               ('lazy', Obfuscator(lazy_header=True))):
+        with open(os.path.join(dirname, f'mod_{name}.py'), 'w', encoding='utf-8') as fp:
+          fp.write(code if obfuscator is None else obfuscator(code))
+
+        times[name] = get_import_time(dirname=dirname, module=f'mod_{name}', repeat=args.repeat)
+
+    print(f'{functions:>9} {times["original"]:>13.2f} {times["eager"]:>11.2f} {times["lazy"]:>10.2f} '
+          f'{times["eager"] / times["lazy"]:>7.1f}x')
+
+
+if __name__ == '__main__':
+
+  main()
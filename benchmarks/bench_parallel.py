@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import time
+import argparse
+
+from pyhide import Obfuscator
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+
+def generate_module (n_functions : int) -> str:
+  '''
+  Generate a synthetic module with the given number
+  of top-level functions.
+
+  Parameters
+  ----------
+    n_functions : int
+      Number of functions to generate
+
+  Returns
+  -------
+    code : str
+      Source code of the module
+  '''
+
+  code = ['import math', '']
+
+  for i in range(n_functions):
+    code.append(f'''def func_{i} (x, y):
+  z = x * {i} + y / 3.5
+  name = 'value_{i}'
+  return math.sqrt(abs(z)) + len(name)
+''')
+
+  return '\n'.join(code)
+
+def parse_args ():
+
+  description = 'Scaling of the parallel obfuscation with the number of processes'
+
+  parser = argparse.ArgumentParser(description=description)
+  parser.add_argument(
+    '--functions', '-n',
+    dest='n_functions',
+    required=False,
+    action='store',
+    type=int,
+    default=500,
+    help='Number of functions of the generated module',
+  )
+  parser.add_argument(
+    '--max-jobs', '-j',
+    dest='max_jobs',
+    required=False,
+    action='store',
+    type=int,
+    default=os.cpu_count(),
+    help='Maximum number of processes to test',
+  )
+
+  args = parser.parse_args()
+
+  return args
+
+
+def main ():
+
+  args = parse_args()
+
+  code = generate_module(n_functions=args.n_functions)
+  print(f'module: {args.n_functions} functions, {len(code.splitlines())} lines')
+  print(f'{"jobs":>6} {"time [s]":>10} {"speedup":>8}')
+
+  serial = None
+
+  for n_jobs in range(1, args.max_jobs + 1):
+    obf = Obfuscator(n_jobs=n_jobs)
+
+    tic = time.perf_counter()
+    obf(code=code)
+    elapsed = time.perf_counter() - tic
+
+    serial = serial or elapsed
+    print(f'{n_jobs:>6} {elapsed:>10.3f} {serial / elapsed:>8.2f}')
+
+
+if __name__ == '__main__':
+
+  main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import glob
+import time
+import argparse
+
+from pyhide import Obfuscator
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+# obfuscations of the benchmark
+CONFIGS = {
+  'global' : {'local_aliases' : False},
+  'local' : {'local_aliases' : True},
+}
+
+
+def parse_args ():
+
+  description = 'Size and compile time of the obfuscated code with the local aliases'
+
+  parser = argparse.ArgumentParser(description=description)
+  parser.add_argument(
+    '--input', '-i',
+    dest='inputs',
+    required=False,
+    action='store',
+    nargs='+',
+    type=str,
+    default=sorted(glob.glob(os.path.join(os.path.dirname(__file__), '..', 'pyhide', '*.py'))),
+    help='Python files to obfuscate (default: the pyhide sources)',
+  )
+  parser.add_argument(
+    '--repeat', '-r',
+    dest='repeat',
+    required=False,
+    action='store',
+    type=int,
+    default=5,
+    help='Number of repetitions of the compile timing',
+  )
+
+  args = parser.parse_args()
+
+  return args
+
+
+def _time_compile (code : str, repeat : int) -> float:
+  # best compile time in seconds
+  best = float('inf')
+  for _ in range(repeat):
+    tic = time.perf_counter()
+    compile(code, '<obfuscated>', 'exec')
+    best = min(best, time.perf_counter() - tic)
+  return best
+
+
+def main ():
+
+  args = parse_args()
+
+  totals = {name : [0, 0.] for name in CONFIGS}
+
+  print(f'{"file":>20} {"config":>8} {"size [B]":>10} {"compile [ms]":>13}')
+
+  for filename in args.inputs:
+
+    with open(filename, 'r', encoding='utf-8') as fp:
+      code = fp.read()
+
+    try:
+      obf_codes = {name : Obfuscator(**params)(code) for name, params in CONFIGS.items()}
+      for obf_code in obf_codes.values():
+        compile(obf_code, '<obfuscated>', 'exec')
+    except (SyntaxError, ValueError) as err:
+      print(f'{os.path.basename(filename):>20} skipped ({err})')
+      continue
+
+    for name, obf_code in obf_codes.items():
+      elapsed = _time_compile(obf_code, args.repeat)
+
+      totals[name][0] += len(obf_code)
+      totals[name][1] += elapsed
+
+      print(f'{os.path.basename(filename):>20} {name:>8} {len(obf_code):>10} {elapsed * 1e3:>13.2f}')
+
+  size, elapsed = totals['global']
+  for name, (total_size, total_elapsed) in totals.items():
+    print(f'{"total":>20} {name:>8} {total_size:>10} {total_elapsed * 1e3:>13.2f} '
+          f'({total_size / size - 1.:+.1%} size, {total_elapsed / elapsed - 1.:+.1%} compile)')
+
+
+if __name__ == '__main__':
+
+  main()
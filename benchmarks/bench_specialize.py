@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import dis
+import sys
+import time
+import argparse
+
+from pyhide import Obfuscator
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+# hot loop of the benchmark, with operators, builtins,
+# package attributes and strings
+CODE = '''
+import math
+
+def bench (n):
+  total = 0
+  for i in range(n):
+    total = total + i * 3 % 7 - abs(i) // 2 + len('abc') + math.gcd(i, 6)
+  return total
+
+BENCH = bench
+'''
+
+# obfuscations of the benchmark
+# NOTE: the variables are not renamed to get the function
+CONFIGS = {
+  'original' : None,
+  'full' : {'rename_variable' : False},
+  'specialize' : {'rename_variable' : False, 'specialize' : True},
+}
+
+
+def get_specialized (func : object) -> tuple:
+  '''
+  Count the instructions of a (warmed up) function which
+  are quickened by the adaptive interpreter.
+
+  Parameters
+  ----------
+    func : function
+      Function to inspect
+
+  Returns
+  -------
+    specialized : int
+      Number of specialized instructions (None before python 3.11)
+
+    total : int
+      Number of instructions
+  '''
+
+  if sys.version_info < (3, 11):
+    return None, len(list(dis.get_instructions(func)))
+
+  # the specialized instructions are not in the opcode map
+  instructions = list(dis.get_instructions(func, adaptive=True))
+  specialized = sum(instr.opname not in dis.opmap for instr in instructions)
+
+  return specialized, len(instructions)
+
+def parse_args ():
+
+  description = 'Hot-loop slowdown and specialization of the obfuscated code'
+
+  parser = argparse.ArgumentParser(description=description)
+  parser.add_argument(
+    '--loops', '-n',
+    dest='loops',
+    required=False,
+    action='store',
+    type=int,
+    default=100_000,
+    help='Number of iterations of the hot loop',
+  )
+  parser.add_argument(
+    '--repeat', '-r',
+    dest='repeat',
+    required=False,
+    action='store',
+    type=int,
+    default=5,
+    help='Number of repetitions of the timing',
+  )
+
+  args = parser.parse_args()
+
+  return args
+
+
+def main ():
+
+  args = parse_args()
+
+  print(f'python {sys.version.split()[0]}')
+  print(f'{"config":>10} {"time [ms]":>10} {"slowdown":>9} {"specialized":>12}')
+
+  reference = None
+
+  for name, params in CONFIGS.items():
+    code = CODE if params is None else Obfuscator(**params)(CODE)
+    namespace = {}
+    exec(code, namespace)
+    bench = namespace['BENCH']
+
+    best = float('inf')
+    for _ in range(args.repeat):
+      tic = time.perf_counter()
+      bench(args.loops)
+      best = min(best, time.perf_counter() - tic)
+
+    reference = reference or best
+    specialized, total = get_specialized(bench)
+    quickened = '-' if specialized is None else f'{specialized}/{total}'
+
+    print(f'{name:>10} {best * 1e3:>10.2f} {best / reference:>8.2f}x {quickened:>12}')
+
+
+if __name__ == '__main__':
+
+  main()
@@ -3,6 +3,11 @@
 
 from .__version__ import __version__
 from .obfuscator import Obfuscator
+from .obfuscator import obfuscate_builds
+from .obfuscator import aobfuscate
+from ._cache import ResultCache
+from ._pragma import keep
+from ._passes import Pass
 
 __author__  = ['Nico Curti']
 __email__ = ['nico.curti2@unibo.it']
@@ -10,4 +15,9 @@ __email__ = ['nico.curti2@unibo.it']
 __all__ = [
   '__version__',
   'Obfuscator',
+  'obfuscate_builds',
+  'aobfuscate',
+  'ResultCache',
+  'keep',
+  'Pass',
 ]
@@ -3,10 +3,30 @@
 
 import os
 import sys
+import time
 import argparse
 
 from pyhide import __version__
 from pyhide import Obfuscator
+from pyhide import obfuscate_builds
+from pyhide._profile import load_profile
+from pyhide._profile import format_profile_report
+from pyhide._cost import format_budget_report
+from pyhide._encoder import format_header_report
+from pyhide._estimate import iter_source_files
+from pyhide._estimate import format_estimate_report
+from pyhide._archive import ARCHIVE_EXTENSIONS
+from pyhide._harness import check_files
+from pyhide._harness import format_check_report
+from pyhide._importtime import bench_import
+from pyhide._importtime import format_import_report
+from pyhide._archive import obfuscate_archive
+from pyhide._metrics import get_file_metrics
+from pyhide._metrics import dump_metrics
+from pyhide._symbolicate import SymbolMap
+from pyhide._symbolicate import is_pstats_file
+from pyhide._symbolicate import symbolicate_pstats
+from pyhide._symbolicate import symbolicate_stream
 
 __author__ = ['Nico Curti']
 __email__ = ['nico.curti2@unibo.it']
@@ -45,7 +65,7 @@ def parse_args ():
     dest='inptfile',
     required=True,
     action='store',
-    help='Input python file to obfuscate'
+    help='Input python file (or wheel/zip archive) to obfuscate'
   )
 
   # output file -o
@@ -138,16 +158,613 @@ def parse_args ():
     help='Enable/Disable the string encoding with integers to reduce the code length',
   )
 
+  # runtime profile -P
+  parser.add_argument(
+    '--profile', '-P',
+    dest='profile',
+    required=False,
+    action='store',
+    default=None,
+    help=('Runtime profile of the code (cProfile/pstats dump or line-count file) '
+      'used to downgrade the encoding of the hot functions'
+    ),
+  )
+
+  # hot threshold -t
+  parser.add_argument(
+    '--hot-threshold', '-t',
+    dest='hot_threshold',
+    required=False,
+    action='store',
+    type=float,
+    default=0.05,
+    help='Minimum share of runtime (in [0, 1]) of a hot function',
+  )
+
+  # hot mode -m
+  parser.add_argument(
+    '--hot-mode', '-m',
+    dest='hot_mode',
+    required=False,
+    action='store',
+    choices=['cheap', 'rename'],
+    default='cheap',
+    help='Encoding applied to the hot functions: cheaper encodings or renaming only',
+  )
+
+  parser.add_argument(
+    '--jobs', '-j',
+    dest='n_jobs',
+    required=False,
+    action='store',
+    type=int,
+    default=1,
+    help='Number of processes used to obfuscate the top-level statements (-1 for all the cpus)',
+  )
+
+  parser.add_argument(
+    '--symbol-map', '-S',
+    dest='symbol_map',
+    required=False,
+    action='store',
+    default=None,
+    help='Output symbol map of the aliases, used by the "pyhide symbolicate" command',
+  )
+
+  parser.add_argument(
+    '--preserve-lines', '-L',
+    dest='preserve_lines',
+    required=False,
+    action='store_true',
+    default=False,
+    help='Keep the statements at their original line numbers (the header is packed in a single line)',
+  )
+
+  # size budget -G
+  parser.add_argument(
+    '--max-size-growth', '-G',
+    dest='max_size_growth',
+    required=False,
+    action='store',
+    type=parse_budget,
+    default=None,
+    help='Maximum ratio between the obfuscated and the original code sizes (e.g. 5x)',
+  )
+
+  # runtime budget -D
+  parser.add_argument(
+    '--max-slowdown', '-D',
+    dest='max_slowdown',
+    required=False,
+    action='store',
+    type=parse_budget,
+    default=None,
+    help='Maximum predicted slowdown of the obfuscated code (e.g. 1.3x)',
+  )
+
+  # blob threshold -Z
+  parser.add_argument(
+    '--blob-threshold', '-Z',
+    dest='blob_threshold',
+    required=False,
+    action='store',
+    type=int,
+    default=None,
+    help='Minimum length of the string and bytes literals encoded as compressed blobs',
+  )
+
+  # lazy header -H
+  parser.add_argument(
+    '--lazy-header', '-H',
+    dest='lazy_header',
+    required=False,
+    action='store_true',
+    default=False,
+    help='Evaluate the header variables used only by the functions at their first call',
+  )
+
+  # specialization-friendly encodings -A
+  parser.add_argument(
+    '--specialize', '-A',
+    dest='specialize',
+    required=False,
+    action='store_true',
+    default=False,
+    help='Use only the encodings specialized by the adaptive interpreter (python 3.11+)',
+  )
+
+  # result cache -C
+  parser.add_argument(
+    '--cache-size', '-C',
+    dest='cache_size',
+    required=False,
+    action='store',
+    type=int,
+    default=None,
+    help='Size in MB of the in-memory cache of the results (e.g. for the duplicated archive members)',
+  )
+
+  # global aliases of the local variables -g
+  parser.add_argument(
+    '--global-aliases', '-g',
+    dest='local_aliases',
+    required=False,
+    action='store_false',
+    default=True,
+    help='Give unique aliases also to the local variables, instead of reusing them along the functions',
+  )
+
+  # metrics -J
+  parser.add_argument(
+    '--metrics-json', '-J',
+    dest='metrics',
+    required=False,
+    action='store',
+    type=str,
+    default=None,
+    help=('Write the metrics of each obfuscated file (sizes, nodes, aliases, header, header pruning, phase times, '
+      'peak memory and cache status) as json lines, followed by a summary record'
+    ),
+  )
+
+  # header report -R
+  parser.add_argument(
+    '--header-report', '-R',
+    dest='header_report',
+    required=False,
+    action='store_true',
+    default=False,
+    help='Print the number of header variables and the lines and bytes saved by the header pruning of each file',
+  )
+
+  # streaming -T
+  parser.add_argument(
+    '--stream', '-T',
+    dest='stream',
+    required=False,
+    action='store_true',
+    default=False,
+    help='Obfuscate the input file one top-level statement at a time to bound the memory usage',
+  )
+
+  # estimate -E
+  parser.add_argument(
+    '--estimate', '-E',
+    dest='estimate',
+    required=False,
+    action='store_true',
+    default=False,
+    help=('Print the estimated size of the obfuscated code without emitting it '
+      '(the input could be also a directory, estimated file by file)'
+    ),
+  )
+
+  # builds -B
+  parser.add_argument(
+    '--build', '-B',
+    dest='builds',
+    required=False,
+    action='append',
+    default=None,
+    metavar='NAME=FLAGS',
+    help=('Obfuscate the code with several option sets at once: the build name and its short '
+      'encoding flags (e.g. -B light=xfc -B full=xfcpnsk). Each build is written as <output>_<name>.py'
+    ),
+  )
+
   args = parser.parse_args()
 
   return args
 
+# lookup table of the short flags of the build options
+BUILD_FLAGS = {
+  'x' : 'rename_variable',
+  'f' : 'rename_function',
+  'c' : 'rename_class',
+  'p' : 'encode_pkg',
+  'n' : 'encode_number',
+  's' : 'encode_string',
+  'k' : 'encode_operator',
+  'b' : 'reduce_code_length',
+}
+
+def parse_build (build : str) -> tuple:
+  '''
+  Parse the build option given as NAME=FLAGS, where
+  the flags are the short encoding options.
+
+  Parameters
+  ----------
+    build : str
+      Build option
+
+  Returns
+  -------
+    name : str
+      Name of the build
+
+    params : dict
+      Encoding parameters of the build
+  '''
+
+  name, _, flags = build.partition('=')
+
+  if not name.isidentifier() or any(flag not in BUILD_FLAGS for flag in flags):
+    raise ValueError(('Invalid build option. '
+      f'The build must be given as NAME=FLAGS with flags in {"".join(BUILD_FLAGS)}. '
+      f'Given: {build}'
+    ))
+
+  params = {param : flag in flags for flag, param in BUILD_FLAGS.items()}
+
+  return name, params
+
+def parse_budget (budget : str) -> float:
+  '''
+  Parse a budget of the obfuscation given as a ratio,
+  with an optional 'x' suffix (e.g. 5x or 1.3).
+
+  Parameters
+  ----------
+    budget : str
+      Budget option
+
+  Returns
+  -------
+    ratio : float
+      Value of the budget
+  '''
+
+  try:
+    ratio = float(budget[:-1] if budget.lower().endswith('x') else budget)
+  except ValueError:
+    ratio = None
+
+  if ratio is None or ratio <= 0:
+    raise argparse.ArgumentTypeError(('Invalid budget. '
+      'The budget must be a positive ratio, optionally followed by x (e.g. 5x). '
+      f'Given: {budget}'
+    ))
+
+  return ratio
+
+def parse_symbolicate_args (argv : list):
+
+  description = ('pyhide symbolicate - '
+    'Restore the original names in the profiles and tracebacks of obfuscated codes'
+  )
+
+  parser = argparse.ArgumentParser(
+    prog='pyhide symbolicate',
+    argument_default=None,
+    add_help=True,
+    prefix_chars='-',
+    allow_abbrev=True,
+    exit_on_error=True,
+    description=description,
+    epilog=f'pyHide Python package v{__version__}'
+  )
+
+  # symbol map file -S
+  parser.add_argument(
+    '--symbol-map', '-S',
+    dest='symbol_map',
+    required=True,
+    action='store',
+    help='Symbol map dumped by the obfuscation',
+  )
+
+  # input file -i
+  parser.add_argument(
+    '--input', '-i',
+    dest='inptfile',
+    required=False,
+    action='store',
+    default='-',
+    help='Input pstats dump, collapsed stacks or traceback text (- for stdin)'
+  )
+
+  # output file -o
+  parser.add_argument(
+    '--output', '-o',
+    dest='outfile',
+    required=False,
+    action='store',
+    default='-',
+    help='Output file (- for stdout)'
+  )
+
+  args = parser.parse_args(argv)
+
+  return args
+
+def symbolicate (argv : list):
+
+  # get the cmd parameters
+  args = parse_symbolicate_args(argv)
+
+  with SymbolMap(args.symbol_map) as symbols:
+
+    # the pstats dumps are binary files
+    if args.inptfile != '-' and is_pstats_file(args.inptfile):
+      if args.outfile == '-':
+        raise ValueError(('Invalid output file. '
+          'The symbolicated pstats dump must be written to a file. '
+          f'Given: {args.outfile}'
+        ))
+
+      symbolicate_pstats(
+        inptfile=args.inptfile,
+        outfile=args.outfile,
+        symbols=symbols
+      )
+
+    # the text files are processed as streams
+    else:
+      inpt = sys.stdin if args.inptfile == '-' else open(args.inptfile, 'r', encoding='utf-8', errors='surrogateescape')
+      out = sys.stdout if args.outfile == '-' else open(args.outfile, 'w', encoding='utf-8', errors='surrogateescape')
+
+      try:
+        symbolicate_stream(inpt=inpt, out=out, symbols=symbols)
+      finally:
+        if inpt is not sys.stdin:
+          inpt.close()
+        if out is not sys.stdout:
+          out.close()
+
+  # exit success
+  exit(0)
+
+def parse_check_args (argv : list):
+
+  description = ('pyhide check - '
+    'Compare the behaviour and the timing of the original and obfuscated codes'
+  )
+
+  parser = argparse.ArgumentParser(
+    prog='pyhide check',
+    argument_default=None,
+    add_help=True,
+    prefix_chars='-',
+    allow_abbrev=True,
+    exit_on_error=True,
+    description=description,
+    epilog=f'pyHide Python package v{__version__}'
+  )
+
+  # input file or directory -i
+  parser.add_argument(
+    '--input', '-i',
+    dest='inptfile',
+    required=True,
+    action='store',
+    help='Python script, pytest suite or directory of them'
+  )
+
+  # encoding flags -F
+  parser.add_argument(
+    '--flags', '-F',
+    dest='flags',
+    required=False,
+    action='store',
+    default='xfcpnsk',
+    help=f'Short encoding flags of the obfuscation, in {"".join(BUILD_FLAGS)}'
+  )
+
+  # result variable -R
+  parser.add_argument(
+    '--result', '-R',
+    dest='result',
+    required=False,
+    action='store',
+    default=None,
+    help='Global variable of the scripts compared as return value'
+  )
+
+  # slowdown threshold -D
+  parser.add_argument(
+    '--max-slowdown', '-D',
+    dest='max_slowdown',
+    required=False,
+    action='store',
+    type=parse_budget,
+    default=None,
+    help='Flag the files whose obfuscated run is slower than the given ratio (e.g. 2x)'
+  )
+
+  # number of runs -r
+  parser.add_argument(
+    '--repeat', '-r',
+    dest='repeat',
+    required=False,
+    action='store',
+    type=int,
+    default=1,
+    help='Number of runs of each version, whose best time is kept'
+  )
+
+  # timeout -t
+  parser.add_argument(
+    '--timeout', '-t',
+    dest='timeout',
+    required=False,
+    action='store',
+    type=float,
+    default=60.,
+    help='Timeout of each run in seconds'
+  )
+
+  # number of jobs -j
+  parser.add_argument(
+    '--jobs', '-j',
+    dest='n_jobs',
+    required=False,
+    action='store',
+    type=int,
+    default=1,
+    help='Number of files checked in parallel (-1 for all the cores)'
+  )
+
+  # cache file -C
+  parser.add_argument(
+    '--cache', '-C',
+    dest='cache',
+    required=False,
+    action='store',
+    default='.pyhide-check.json',
+    help='Cache of the results, so the unchanged files are skipped (- to disable it)'
+  )
+
+  args = parser.parse_args(argv)
+
+  return args
+
+def check (argv : list):
+
+  # get the cmd parameters
+  args = parse_check_args(argv)
+
+  _, encoding = parse_build(f'check={args.flags}')
+
+  records = check_files(
+    path=args.inptfile,
+    obfuscator=Obfuscator(**encoding),
+    result=args.result,
+    max_slowdown=args.max_slowdown,
+    repeat=args.repeat,
+    timeout=args.timeout,
+    cache=None if args.cache == '-' else args.cache,
+    n_jobs=args.n_jobs,
+  )
+
+  print(format_check_report(records=records),
+    end='\n', file=sys.stdout, flush=True
+  )
+
+  # exit failure if any file is flagged
+  exit(0 if all(record['status'] == 'ok' for record in records) else 1)
+
+def parse_bench_import_args (argv : list):
+
+  description = ('pyhide bench-import - '
+    'Measure the import time of the original and obfuscated modules'
+  )
+
+  parser = argparse.ArgumentParser(
+    prog='pyhide bench-import',
+    argument_default=None,
+    add_help=True,
+    prefix_chars='-',
+    allow_abbrev=True,
+    exit_on_error=True,
+    description=description,
+    epilog=f'pyHide Python package v{__version__}'
+  )
+
+  # input file or directory -i
+  parser.add_argument(
+    '--input', '-i',
+    dest='inptfile',
+    required=True,
+    action='store',
+    help='Python module or directory of modules'
+  )
+
+  # encoding flags -F
+  parser.add_argument(
+    '--flags', '-F',
+    dest='flags',
+    required=False,
+    action='store',
+    default='xfcpnsk',
+    help=f'Short encoding flags of the obfuscation, in {"".join(BUILD_FLAGS)}'
+  )
+
+  # number of header entries -N
+  parser.add_argument(
+    '--top', '-N',
+    dest='top',
+    required=False,
+    action='store',
+    type=int,
+    default=10,
+    help='Number of the most expensive header entries in the report'
+  )
+
+  # number of runs -r
+  parser.add_argument(
+    '--repeat', '-r',
+    dest='repeat',
+    required=False,
+    action='store',
+    type=int,
+    default=3,
+    help='Number of runs of each timing, whose best time is kept'
+  )
+
+  # timeout -t
+  parser.add_argument(
+    '--timeout', '-t',
+    dest='timeout',
+    required=False,
+    action='store',
+    type=float,
+    default=60.,
+    help='Timeout of each run in seconds'
+  )
+
+  args = parser.parse_args(argv)
+
+  return args
+
+def bench_import_cmd (argv : list):
+
+  # get the cmd parameters
+  args = parse_bench_import_args(argv)
+
+  _, encoding = parse_build(f'bench={args.flags}')
+
+  records = bench_import(
+    path=args.inptfile,
+    obfuscator=Obfuscator(**encoding),
+    top=args.top,
+    repeat=args.repeat,
+    timeout=args.timeout,
+  )
+
+  print(format_import_report(records=records),
+    end='\n', file=sys.stdout, flush=True
+  )
+
+  # exit failure if any module could not be timed
+  failed = [record for record in records
+    if record['error'] is not None or
+       any(times['error'] is not None for times in (record['original'], record['obfuscated']))
+  ]
+  exit(1 if failed else 0)
+
 
 def main ():
 
+  # the symbolicate command has its own parameters
+  if len(sys.argv) > 1 and sys.argv[1] == 'symbolicate':
+    symbolicate(sys.argv[2:])
+
+  # the check command has its own parameters
+  if len(sys.argv) > 1 and sys.argv[1] == 'check':
+    check(sys.argv[2:])
+
+  # the bench-import command has its own parameters
+  if len(sys.argv) > 1 and sys.argv[1] == 'bench-import':
+    bench_import_cmd(sys.argv[2:])
+
   # get the cmd parameters
   args = parse_args()
 
+  tic = time.perf_counter()
+  # metrics records of the obfuscated files
+  records = []
+
   # results if version is required
   if args.version:
     # print it to stdout
@@ -159,9 +776,10 @@ def main ():
 
   # check the correctness of the input file extension
   name, ext = os.path.splitext(args.inptfile)
-  if ext != '.py':
+  if ext != '.py' and ext not in ARCHIVE_EXTENSIONS and \
+     not (args.estimate and os.path.isdir(args.inptfile)):
     raise ValueError(('Invalid extension file in provided input code. '
-      'The code obfuscator works only for .py files. '
+      'The code obfuscator works only for .py files or wheel/zip archives. '
       f'Given: {args.inptfile}'
     ))
 
@@ -170,29 +788,207 @@ def main ():
   if args.outfile is None:
     args.outfile = f'{name}_obf{ext}'
 
-  # create the obfuscator object
-  obf = Obfuscator(
-    rename_variable=args.rename_variable,
-    rename_function=args.rename_function,
-    rename_class=args.rename_class,
-    encode_pkg=args.encode_pkg,
-    encode_number=args.encode_number,
-    encode_string=args.encode_string,
-    encode_operator=args.encode_operator,
-    reduce_code_length=args.reduce_code_length
-  )
+  # common parameters of the obfuscation
+  params = {
+    'profile' : args.profile,
+    'profile_filename' : args.inptfile,
+    'hot_threshold' : args.hot_threshold,
+    'hot_mode' : args.hot_mode,
+    'n_jobs' : args.n_jobs,
+    'preserve_lines' : args.preserve_lines,
+    'max_size_growth' : args.max_size_growth,
+    'max_slowdown' : args.max_slowdown,
+    'blob_threshold' : args.blob_threshold,
+    'lazy_header' : args.lazy_header,
+    'specialize' : args.specialize,
+    'cache' : args.cache_size << 20 if args.cache_size is not None else None,
+    'local_aliases' : args.local_aliases,
+  }
+
+  # encoding parameters of the obfuscation
+  encoding = {
+    'rename_variable' : args.rename_variable,
+    'rename_function' : args.rename_function,
+    'rename_class' : args.rename_class,
+    'encode_pkg' : args.encode_pkg,
+    'encode_number' : args.encode_number,
+    'encode_string' : args.encode_string,
+    'encode_operator' : args.encode_operator,
+    'reduce_code_length' : args.reduce_code_length,
+  }
+
+  # the estimate runs only the collection phase of each
+  # file, without writing any output
+  if args.estimate:
+    if ext in ARCHIVE_EXTENSIONS or args.builds or args.metrics is not None:
+      raise ValueError(('Invalid estimate option. '
+        'The estimate is supported only for python files and directories without builds and metrics. '
+        f'Given: {args.inptfile}'
+      ))
+
+    obf = Obfuscator(**encoding, **params)
+    estimates = {}
+
+    for filename in iter_source_files(path=args.inptfile):
+      with open(filename, 'r', encoding='utf-8') as fp:
+        estimates[filename] = obf.estimate(code=fp.read())
+
+    print(format_estimate_report(estimates=estimates),
+      end='\n', file=sys.stdout, flush=True
+    )
+
+    # exit success
+    exit(0)
+
+  # the archives are streamed member by member
+  if ext in ARCHIVE_EXTENSIONS:
+    if args.builds:
+      raise ValueError(('Invalid build option. '
+        'The builds are not supported for the archives. '
+        f'Given: {args.inptfile}'
+      ))
+
+    obfuscate_archive(
+      inptfile=args.inptfile,
+      outfile=args.outfile,
+      obfuscator=Obfuscator(**encoding, **params),
+      callback=lambda name, data, obf_data, metrics, elapsed : records.append(get_file_metrics(
+        filename=name, input_bytes=len(data), output_bytes=len(obf_data), metrics=metrics, elapsed=elapsed
+      )),
+    )
+
+    # dump the metrics of the archive members
+    if args.metrics is not None:
+      dump_metrics(filename=args.metrics, records=records, elapsed=time.perf_counter() - tic, version=__version__)
+
+    # exit success
+    exit(0)
+
+  # the large files are streamed statement by statement
+  if args.stream:
+    if args.builds:
+      raise ValueError(('Invalid build option. '
+        'The builds are not supported by the streaming obfuscation. '
+        f'Given: {args.builds}'
+      ))
+
+    obf = Obfuscator(
+      **encoding,
+      symbol_map=args.symbol_map,
+      **params,
+    )
+    obf.obfuscate_stream(inptfile=args.inptfile, outfile=args.outfile)
+
+    # dump the metrics of the file
+    if args.metrics is not None:
+      records.append(get_file_metrics(
+        filename=args.inptfile,
+        input_bytes=os.path.getsize(args.inptfile),
+        output_bytes=os.path.getsize(args.outfile),
+        metrics=obf.metrics,
+        elapsed=time.perf_counter() - tic
+      ))
+      dump_metrics(filename=args.metrics, records=records, elapsed=time.perf_counter() - tic, version=__version__)
+
+    # print the report of the downgraded functions
+    if args.profile is not None:
+      print(format_profile_report(report=obf.report, threshold=args.hot_threshold),
+        end='\n', file=sys.stdout, flush=True
+      )
+
+    # print the lines and bytes saved by the header pruning
+    if args.header_report:
+      print(format_header_report(report=obf.header_report),
+        end='\n', file=sys.stdout, flush=True
+      )
+
+    # exit success
+    exit(0)
 
   # parse the input file
   with open(args.inptfile, 'r', encoding='utf-8') as fp:
     code = fp.read()
 
-  # call the obfuscator and get the encrypted version of the
-  # code according to the provided parameters
-  obf_code = obf(code)
+  if args.builds:
+    # each build has its own output file and symbol map
+    out_name, out_ext = os.path.splitext(args.outfile)
+    builds = {}
+    outfiles = {}
+
+    # load the runtime profile once for all the builds
+    if args.profile is not None:
+      params['profile'] = load_profile(filename=args.profile)
+
+    for build in args.builds:
+      build, encoding = parse_build(build)
+      symbol_map = None
+
+      if args.symbol_map is not None:
+        map_name, map_ext = os.path.splitext(args.symbol_map)
+        symbol_map = f'{map_name}_{build}{map_ext}'
+
+      builds[build] = Obfuscator(**encoding, **params, symbol_map=symbol_map)
+      outfiles[build] = f'{out_name}_{build}{out_ext}'
+
+    # parse the code once and obfuscate it for each build
+    obf_codes = obfuscate_builds(code=code, builds=builds)
+
+  else:
+    # create the obfuscator object
+    obf = Obfuscator(
+      **encoding,
+      symbol_map=args.symbol_map,
+      **params,
+    )
 
-  # dump the resulting code to the output file
-  with open(args.outfile, 'w', encoding='utf-8') as fp:
-    fp.write(obf_code)
+    # call the obfuscator and get the encrypted version of the
+    # code according to the provided parameters
+    builds = {None : obf}
+    outfiles = {None : args.outfile}
+    obf_codes = {None : obf(code)}
+
+  for build, obf in builds.items():
+
+    # dump the resulting code to the output file
+    with open(outfiles[build], 'w', encoding='utf-8') as fp:
+      fp.write(obf_codes[build])
+
+    # the builds share the parsing of the code,
+    # so each of them is timed by its phases
+    if args.metrics is not None:
+      records.append(get_file_metrics(
+        filename=args.inptfile,
+        input_bytes=len(code.encode('utf-8')),
+        output_bytes=len(obf_codes[build].encode('utf-8')),
+        metrics=obf.metrics,
+        elapsed=sum(obf.metrics['phases'].values()),
+        build=build
+      ))
+
+    if build is not None and (args.profile is not None or obf.plan or args.header_report):
+      print(f'Build {build}:', end='\n', file=sys.stdout, flush=True)
+
+    # print the report of the downgraded functions
+    if args.profile is not None:
+      print(format_profile_report(report=obf.report, threshold=args.hot_threshold),
+        end='\n', file=sys.stdout, flush=True
+      )
+
+    # print the levels chosen by the budget optimizer
+    if obf.plan:
+      print(format_budget_report(plan=obf.plan),
+        end='\n', file=sys.stdout, flush=True
+      )
+
+    # print the lines and bytes saved by the header pruning
+    if args.header_report:
+      print(format_header_report(report=obf.header_report),
+        end='\n', file=sys.stdout, flush=True
+      )
+
+  # dump the metrics of the file (or of its builds)
+  if args.metrics is not None:
+    dump_metrics(filename=args.metrics, records=records, elapsed=time.perf_counter() - tic, version=__version__)
 
   # exit success
   exit(0)
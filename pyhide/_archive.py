@@ -0,0 +1,366 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import io
+import os
+import csv
+import copy
+import time
+import base64
+import shutil
+import struct
+import hashlib
+import zipfile
+import tokenize
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+# extensions of the archives supported by the obfuscator
+ARCHIVE_EXTENSIONS = ('.whl', '.zip')
+
+# signatures of the wheel RECORD, which are
+# invalidated by the obfuscation
+RECORD_SIGNATURES = ('RECORD.jws', 'RECORD.p7s')
+
+# size of the chunks of the raw copies
+CHUNK_SIZE = 1 << 20
+
+# obfuscator of the worker processes,
+# set once by the initializer
+_WORKER_STATE = {}
+
+
+def _init_member_worker (obfuscator : object) -> None:
+  '''
+  Initialize the worker process of the archive
+  obfuscation with the obfuscator of the parent.
+
+  Parameters
+  ----------
+    obfuscator : Obfuscator
+      Obfuscator object
+  '''
+  _WORKER_STATE['obfuscator'] = obfuscator
+
+def _obfuscate_member (data : bytes) -> tuple:
+  '''
+  Obfuscate the source code of an archive member.
+
+  Parameters
+  ----------
+    data : bytes
+      Source code of the member
+
+  Returns
+  -------
+    obf_data : bytes
+      Obfuscated code of the member, encoded as utf-8
+
+    metrics : dict
+      Metrics of the obfuscation
+
+    elapsed : float
+      Elapsed time of the obfuscation in seconds
+  '''
+  tic = time.perf_counter()
+
+  # the encoding is given by the coding cookie (if any),
+  # while the obfuscated code has no comments
+  encoding, _ = tokenize.detect_encoding(io.BytesIO(data).readline)
+  code = data.decode(encoding)
+
+  obfuscator = _WORKER_STATE['obfuscator']
+  obf_code = obfuscator(code)
+
+  return obf_code.encode('utf-8'), obfuscator.metrics, time.perf_counter() - tic
+
+def get_record_hash (data : bytes) -> str:
+  '''
+  Get the hash of a file in the format of the
+  wheel RECORD.
+
+  Parameters
+  ----------
+    data : bytes
+      Content of the file
+
+  Returns
+  -------
+    digest : str
+      Url-safe base64 sha256 digest without padding
+  '''
+  digest = hashlib.sha256(data).digest()
+  digest = base64.urlsafe_b64encode(digest).rstrip(b'=').decode('ascii')
+  return f'sha256={digest}'
+
+def _copy_raw (zin : zipfile.ZipFile,
+               zout : zipfile.ZipFile,
+               info : zipfile.ZipInfo
+              ) -> bool:
+  '''
+  Copy the compressed bytes of an archive member
+  without decompressing them.
+
+  Parameters
+  ----------
+    zin : zipfile.ZipFile
+      Input archive
+
+    zout : zipfile.ZipFile
+      Output archive
+
+    info : zipfile.ZipInfo
+      Member to copy
+
+  Returns
+  -------
+    check : bool
+      True if the member was copied, False if the raw copy
+      is not supported (e.g. encrypted or zip64 members)
+  '''
+
+  if (info.flag_bits & 0x1 or
+      info.file_size >= zipfile.ZIP64_LIMIT or
+      info.compress_size >= zipfile.ZIP64_LIMIT or
+      not zin.fp.seekable() or
+      not zout.fp.seekable()):
+    return False
+
+  # NOTE: the zipfile module does not provide a public api
+  # for the raw copy, so the local header is written by hand
+  # and the member is registered in the output directory
+
+  # skip the local header of the input member
+  zin.fp.seek(info.header_offset)
+  fheader = struct.unpack(zipfile.structFileHeader, zin.fp.read(zipfile.sizeFileHeader))
+  zin.fp.seek(fheader[zipfile._FH_FILENAME_LENGTH] + fheader[zipfile._FH_EXTRA_FIELD_LENGTH], io.SEEK_CUR)
+
+  zinfo = copy.copy(info)
+  # the sizes are written in the local header,
+  # so the data descriptor is not required
+  zinfo.flag_bits &= ~0x08
+  zinfo.header_offset = zout.start_dir
+
+  zout.fp.seek(zout.start_dir)
+  zout.fp.write(zinfo.FileHeader(zip64=False))
+
+  size = info.compress_size
+  while size > 0:
+    chunk = zin.fp.read(min(size, CHUNK_SIZE))
+    zout.fp.write(chunk)
+    size -= len(chunk)
+
+  zout.filelist.append(zinfo)
+  zout.NameToInfo[zinfo.filename] = zinfo
+  zout.start_dir = zout.fp.tell()
+  zout._didModify = True
+
+  return True
+
+def _copy_member (zin : zipfile.ZipFile,
+                  zout : zipfile.ZipFile,
+                  info : zipfile.ZipInfo
+                 ) -> None:
+  '''
+  Copy an archive member, using its raw compressed
+  bytes if possible.
+
+  Parameters
+  ----------
+    zin : zipfile.ZipFile
+      Input archive
+
+    zout : zipfile.ZipFile
+      Output archive
+
+    info : zipfile.ZipInfo
+      Member to copy
+  '''
+
+  if _copy_raw(zin=zin, zout=zout, info=info):
+    return
+
+  # stream the decompressed bytes into the new member
+  zinfo = copy.copy(info)
+  zinfo.flag_bits &= ~0x08
+
+  with zin.open(info) as src, zout.open(zinfo, 'w', force_zip64=info.file_size >= zipfile.ZIP64_LIMIT) as dst:
+    shutil.copyfileobj(src, dst, CHUNK_SIZE)
+
+def _rewrite_record (record : bytes, hashes : dict) -> bytes:
+  '''
+  Update the hashes and the sizes of the obfuscated
+  files in the wheel RECORD.
+
+  Parameters
+  ----------
+    record : bytes
+      Content of the RECORD file
+
+    hashes : dict
+      Lookup table of the (hash, size) of the obfuscated files
+
+  Returns
+  -------
+    record : bytes
+      Updated RECORD
+  '''
+
+  rows = csv.reader(io.StringIO(record.decode('utf-8')))
+  out = io.StringIO()
+  writer = csv.writer(out, lineterminator='\n')
+
+  for row in rows:
+    if not row:
+      continue
+
+    path = row[0]
+
+    # the signatures are removed from the archive
+    if path.endswith(RECORD_SIGNATURES):
+      continue
+
+    if path in hashes:
+      digest, size = hashes[path]
+      row = [path, digest, str(size)]
+
+    writer.writerow(row)
+
+  return out.getvalue().encode('utf-8')
+
+def obfuscate_archive (inptfile : str,
+                       outfile : str,
+                       obfuscator : object,
+                       callback : object = None,
+                      ) -> list:
+  '''
+  Obfuscate the python files of a wheel (or zip) archive.
+
+  The members are streamed from the input archive to the
+  output one without extracting them: the python files are
+  obfuscated (in a pool of obfuscator.n_jobs processes) while
+  the other members are copied using their raw compressed
+  bytes. The order of the members is preserved, except for
+  the wheel RECORD which is written at the end with the
+  updated hashes (and without its signatures).
+
+  Parameters
+  ----------
+    inptfile : str
+      Path of the input archive
+
+    outfile : str
+      Path of the output archive
+
+    obfuscator : Obfuscator
+      Obfuscator object
+
+    callback : function (default=None)
+      Function called for each obfuscated member (in the
+      member order) with its name, its source code, its
+      obfuscated code, the metrics of the obfuscation and
+      its elapsed time
+
+  Returns
+  -------
+    names : list
+      List of the obfuscated members
+  '''
+
+  # the members are the parallel units, so each of
+  # them is obfuscated serially
+  # NOTE: the symbol map of each member would overwrite
+  # the previous one, so it is disabled
+  worker = copy.copy(obfuscator)
+  worker.n_jobs = 1
+  worker.symbol_map = None
+
+  n_jobs = os.cpu_count() if obfuscator.n_jobs == -1 else obfuscator.n_jobs
+  executor = None
+
+  if n_jobs > 1:
+    executor = ProcessPoolExecutor(
+      max_workers=n_jobs,
+      initializer=_init_member_worker,
+      initargs=(worker, ),
+    )
+  else:
+    _init_member_worker(worker)
+
+  # members in flight, written in the input order
+  pending = deque()
+  # bound of the members in flight, so the memory
+  # does not grow with the archive size
+  window = 2 * n_jobs
+
+  hashes = {}
+  names = []
+  records = []
+
+  def write (info, job):
+    # the job is the future of the obfuscation (with the source
+    # code), or the source code if there is not a pool of processes
+    if job is None:
+      _copy_member(zin=zin, zout=zout, info=info)
+      return
+
+    data, job = job
+
+    try:
+      obf_data, metrics, elapsed = job.result() if executor is not None else _obfuscate_member(data)
+    except Exception as err:
+      raise ValueError(('Unable to obfuscate the archive member. '
+        f'Given: {info.filename}'
+      )) from err
+
+    zinfo = copy.copy(info)
+    zinfo.flag_bits &= ~0x08
+    zout.writestr(zinfo, obf_data)
+
+    hashes[info.filename] = (get_record_hash(obf_data), len(obf_data))
+    names.append(info.filename)
+
+    if callback is not None:
+      callback(info.filename, data, obf_data, metrics, elapsed)
+
+  try:
+    with zipfile.ZipFile(inptfile, 'r') as zin, zipfile.ZipFile(outfile, 'w') as zout:
+
+      for info in zin.infolist():
+
+        # the RECORD is written at the end
+        if info.filename.endswith('.dist-info/RECORD'):
+          records.append(info)
+          continue
+
+        if info.filename.endswith(RECORD_SIGNATURES):
+          continue
+
+        job = None
+
+        if info.filename.endswith('.py') and not info.is_dir():
+          data = zin.read(info)
+          job = (data, executor.submit(_obfuscate_member, data) if executor is not None else None)
+
+        pending.append((info, job))
+
+        while len(pending) > window:
+          write(*pending.popleft())
+
+      while pending:
+        write(*pending.popleft())
+
+      for info in records:
+        record = _rewrite_record(record=zin.read(info), hashes=hashes)
+        zinfo = copy.copy(info)
+        zinfo.flag_bits &= ~0x08
+        zout.writestr(zinfo, record)
+
+  finally:
+    if executor is not None:
+      executor.shutdown(wait=True, cancel_futures=True)
+
+  return names
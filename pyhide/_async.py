@@ -0,0 +1,213 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+
+def _obfuscate_code (obfuscator : object, code : str) -> tuple:
+  '''
+  Run the code obfuscation in a worker process.
+
+  Parameters
+  ----------
+    obfuscator : Obfuscator
+      Obfuscator object
+
+    code : str
+      Code to obfuscate
+
+  Returns
+  -------
+    obf_code : str
+      Obfuscated code
+
+    report : list
+      List of the records of the downgraded hot functions
+
+    timings : dict
+      Lookup table of the elapsed time of each pass
+
+    metrics : dict
+      Metrics of the obfuscation
+  '''
+  obf_code = obfuscator(code=code)
+  return obf_code, obfuscator.report, obfuscator.timings, obfuscator.metrics
+
+def _read_file (filename : str) -> str:
+  '''
+  Read the code of a file.
+  '''
+  with open(filename, 'r', encoding='utf-8') as fp:
+    return fp.read()
+
+def _write_file (filename : str, code : str) -> None:
+  '''
+  Write the code in a file.
+  '''
+  with open(filename, 'w', encoding='utf-8') as fp:
+    fp.write(code)
+
+async def gather_or_cancel (*aws) -> list:
+  '''
+  Run the awaitables concurrently and collect their results.
+
+  Differently from the asyncio.gather function, if one of
+  them fails (or the gathering is cancelled) all the other
+  ones are cancelled before raising the error.
+
+  Parameters
+  ----------
+    *aws : list
+      List of awaitables
+
+  Returns
+  -------
+    results : list
+      List of the results, in the same order of the awaitables
+  '''
+
+  tasks = [asyncio.ensure_future(aw) for aw in aws]
+
+  try:
+    return await asyncio.gather(*tasks)
+
+  except BaseException:
+    for task in tasks:
+      task.cancel()
+    # wait the cancellation of the pending tasks
+    await asyncio.gather(*tasks, return_exceptions=True)
+    raise
+
+
+class AsyncPool (object):
+  '''
+  Bounded pool of processes for the asynchronous obfuscation.
+
+  At most max_workers jobs are submitted to the pool at the
+  same time, while the other ones wait on a semaphore, so
+  the pending jobs do not pile up in the pool queue. If a
+  running job is cancelled the pool is terminated, since
+  its worker could not be stopped otherwise, and the other
+  running jobs are resubmitted to a new pool.
+
+  The pool is created at the first submission and it is
+  not shared by the copies of the object (e.g. the ones
+  pickled for the worker processes).
+
+  Parameters
+  ----------
+    max_workers : int
+      Maximum number of concurrent jobs
+  '''
+
+  def __init__ (self, max_workers : int):
+    self.max_workers = max_workers
+    self._executor = None
+    self._semaphore = None
+    self._loop = None
+
+  def _get_semaphore (self) -> asyncio.Semaphore:
+    '''
+    Get the semaphore of the running event loop.
+    '''
+    loop = asyncio.get_running_loop()
+
+    # NOTE: the semaphore could be used only by the
+    # event loop in which it is created
+    if loop is not self._loop:
+      self._loop = loop
+      self._semaphore = asyncio.Semaphore(self.max_workers)
+
+    return self._semaphore
+
+  def _get_executor (self) -> ProcessPoolExecutor:
+    '''
+    Get the pool of processes, creating it if required.
+    '''
+    if self._executor is None:
+      self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+    return self._executor
+
+  async def submit (self, func : object, *args) -> object:
+    '''
+    Run the function in a worker process.
+
+    Parameters
+    ----------
+      func : object
+        Picklable function to run
+
+      *args : list
+        Picklable arguments of the function
+
+    Returns
+    -------
+      result : object
+        Result of the function
+    '''
+
+    async with self._get_semaphore():
+
+      while True:
+
+        executor = self._get_executor()
+        future = executor.submit(func, *args)
+
+        try:
+          return await asyncio.wrap_future(future)
+
+        except asyncio.CancelledError:
+          # the pending jobs are cancelled by the wrapper,
+          # while the running ones require the termination
+          # of their worker
+          if not future.cancelled():
+            self.terminate()
+          raise
+
+        except BrokenProcessPool:
+          # the pool is broken by itself (e.g. a worker was
+          # killed by the os), so the error is propagated
+          if executor is self._executor:
+            self._executor = None
+            raise
+          # the pool was terminated by the cancellation of
+          # another job, so the job is resubmitted
+
+  def terminate (self) -> None:
+    '''
+    Terminate the worker processes without waiting
+    the end of their jobs.
+    '''
+
+    executor, self._executor = self._executor, None
+
+    if executor is None:
+      return
+
+    # NOTE: the executor does not provide a public
+    # access to its processes
+    processes = list(getattr(executor, '_processes', {}).values())
+    executor.shutdown(wait=False, cancel_futures=True)
+
+    for process in processes:
+      process.terminate()
+
+  def close (self) -> None:
+    '''
+    Shutdown the pool, waiting the end of the running jobs.
+    '''
+    executor, self._executor = self._executor, None
+
+    if executor is not None:
+      executor.shutdown(wait=True)
+
+  def __getstate__ (self) -> dict:
+    return {'max_workers' : self.max_workers}
+
+  def __setstate__ (self, state : dict) -> None:
+    self.__init__(**state)
@@ -0,0 +1,208 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import sys
+import hashlib
+import threading
+from collections import OrderedDict
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+# approximate memory of an analysis (code tree, pragmas and
+# collected values) per char of the source code, measured
+# with tracemalloc on the modules of the package (29-43)
+ANALYSIS_SIZE_RATIO = 40
+
+
+def get_source_digest (code : str) -> str:
+  '''
+  Get the cache key of a source code.
+
+  Parameters
+  ----------
+    code : str
+      Source code
+
+  Returns
+  -------
+    digest : str
+      Hex digest of the code
+  '''
+  return hashlib.sha256(code.encode('utf-8', 'surrogatepass')).hexdigest()
+
+def get_result_size (result : dict) -> int:
+  '''
+  Get the memory of a cached result, given by its
+  obfuscated code and its symbol map.
+
+  Parameters
+  ----------
+    result : dict
+      Cached result of an obfuscation
+
+  Returns
+  -------
+    size : int
+      Size of the result in bytes
+  '''
+  return sys.getsizeof(result['code']) + sys.getsizeof(result['symbol_map'] or '')
+
+
+class ResultCache (object):
+  '''
+  In-process LRU cache of the obfuscation results.
+
+  The entries are the obfuscated codes, keyed by the hash of
+  the source and by the options of the obfuscator, and the
+  analyses of the sources (code tree and collected values),
+  keyed only by the hash of the source, so a code obfuscated
+  with other options skips the parsing and the collection.
+  The least recently used entries are evicted when their
+  total size exceeds the given cap. The access is guarded
+  by a lock, so the same cache could be shared by several
+  obfuscators (e.g. one for each thread).
+
+  Parameters
+  ----------
+    max_bytes : int
+      Maximum size of the cached entries in bytes
+
+  Examples
+  --------
+  >>> import pyhide
+  >>>
+  >>> cache = pyhide.ResultCache(max_bytes=64 * 1024 * 1024)
+  >>> obfuscator = pyhide.Obfuscator(cache=cache)
+  >>> obf_code = obfuscator('print("Hello world!")')
+  >>> obf_code = obfuscator('print("Hello world!")')
+  >>> cache.stats()['hits']
+    1
+
+  Notes
+  -----
+  .. note::
+    The concurrent misses of the same key are not merged,
+    so they are all computed and the last one is kept.
+  '''
+
+  def __init__ (self, max_bytes : int):
+
+    if max_bytes < 1:
+      raise ValueError(('Invalid cache size. '
+        'The maximum size of the cache must be a positive number of bytes. '
+        f'Given: {max_bytes}'
+      ))
+
+    self.max_bytes = max_bytes
+
+    self._lock = threading.Lock()
+    # entries in order of use, as (value, size)
+    self._entries = OrderedDict()
+    self._size = 0
+
+    self._hits = {'result' : 0, 'analysis' : 0}
+    self._misses = {'result' : 0, 'analysis' : 0}
+    self._evictions = 0
+
+  def get (self, key : tuple) -> object:
+    '''
+    Get a cached entry, marking it as the most recently used.
+
+    Parameters
+    ----------
+      key : tuple
+        Key of the entry, whose first item is its kind
+        ('result' or 'analysis')
+
+    Returns
+    -------
+      value : object
+        Cached value (None if it is not cached)
+    '''
+    with self._lock:
+      entry = self._entries.get(key)
+
+      if entry is None:
+        self._misses[key[0]] += 1
+        return None
+
+      self._entries.move_to_end(key)
+      self._hits[key[0]] += 1
+
+      return entry[0]
+
+  def put (self, key : tuple, value : object, size : int) -> None:
+    '''
+    Store an entry, evicting the least recently used ones
+    until the cache fits its size.
+
+    Parameters
+    ----------
+      key : tuple
+        Key of the entry, whose first item is its kind
+        ('result' or 'analysis')
+
+      value : object
+        Value to cache
+
+      size : int
+        Size of the value in bytes; the values larger than
+        the cache are not stored
+    '''
+    if size > self.max_bytes:
+      return
+
+    with self._lock:
+      old = self._entries.pop(key, None)
+      if old is not None:
+        self._size -= old[1]
+
+      self._entries[key] = (value, size)
+      self._size += size
+
+      while self._size > self.max_bytes:
+        _, (_, evicted) = self._entries.popitem(last=False)
+        self._size -= evicted
+        self._evictions += 1
+
+  def clear (self) -> None:
+    '''
+    Remove all the entries, keeping the counters.
+    '''
+    with self._lock:
+      self._entries.clear()
+      self._size = 0
+
+  def stats (self) -> dict:
+    '''
+    Get the counters of the cache.
+
+    Returns
+    -------
+      stats : dict
+        Hits and misses of the results and of the analyses,
+        number of evictions, number of entries and their size
+    '''
+    with self._lock:
+      return {
+        'hits' : self._hits['result'],
+        'misses' : self._misses['result'],
+        'analysis_hits' : self._hits['analysis'],
+        'analysis_misses' : self._misses['analysis'],
+        'evictions' : self._evictions,
+        'entries' : len(self._entries),
+        'size' : self._size,
+        'max_bytes' : self.max_bytes,
+      }
+
+  def __len__ (self) -> int:
+    return len(self._entries)
+
+  def __getstate__ (self) -> dict:
+    # NOTE: the copies sent to the worker processes are
+    # empty, since the entries could not be shared
+    return {'max_bytes' : self.max_bytes}
+
+  def __setstate__ (self, state : dict) -> None:
+    self.__init__(**state)
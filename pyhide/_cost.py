@@ -0,0 +1,711 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import ast
+import time
+import heapq
+
+from ._encoder import ALIAS_REGEX
+from ._pragma import PRAGMA_KINDS
+from ._profile import LEVEL_OFF
+from ._profile import LEVEL_CHEAP
+from ._profile import LEVEL_FULL
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+# names of the encoding levels
+LEVEL_NAMES = {
+  LEVEL_OFF : 'off',
+  LEVEL_CHEAP : 'cheap',
+  LEVEL_FULL : 'full',
+}
+
+# encoding levels which could be chosen by the optimizer for
+# each transformation, from the strongest to the weakest one.
+# NOTE: the numbers have the same encoding at the cheap and
+# full levels, the operators have only the full encoding and
+# the package and builtin lookups could not be disabled since
+# the imports are removed and the names are replaced
+LEVEL_OPTIONS = {
+  'string' : (LEVEL_FULL, LEVEL_CHEAP, LEVEL_OFF),
+  'number' : (LEVEL_FULL, LEVEL_OFF),
+  'operator' : (LEVEL_FULL, LEVEL_OFF),
+  'pkg' : (LEVEL_FULL, LEVEL_CHEAP),
+  'builtin' : (LEVEL_FULL, LEVEL_CHEAP),
+}
+
+# obfuscation strength of each transformation for the
+# (off, cheap, full) levels, used to rank the downgrades.
+# NOTE: these are relative weights, i.e. how much an encoded
+# node hides the original code with respect to the others
+ENCODING_STRENGTH = {
+  'string' : (0., 1., 3.),
+  'number' : (0., 2., 2.),
+  'operator' : (0., 0., 2.),
+  'pkg' : (0., 1., 2.),
+  'builtin' : (0., 1., 2.),
+}
+
+# statements of the microbenchmark of each transformation,
+# as (preamble, statement). The string pattern is given for
+# two lengths to get the per-char cost
+COST_PATTERNS = {
+  'string' : ('', "y = 'abcdefgh'"),
+  'string_long' : ('', "y = 'abcdefghijklmnop'"),
+  'number' : ('', 'y = 100'),
+  'operator' : ('', 'y = x + x'),
+  'pkg' : ('import math\n', 'y = math.pi'),
+  'builtin' : ('', 'y = abs(x)'),
+}
+
+# encoding parameter of each transformation
+COST_PARAMS = {
+  'string' : 'encode_string',
+  'number' : 'encode_number',
+  'operator' : 'encode_operator',
+  'pkg' : 'encode_pkg',
+  'builtin' : 'rename_function',
+}
+
+# template of the microbenchmark, in which the pattern is
+# evaluated in a loop to hide the function call overhead
+COST_TEMPLATE = '''{preamble}{pragma}
+def bench (x, n):
+  for _ in range(n):
+    {statement}
+  return y
+
+BENCH = bench
+'''
+
+# cache of the calibrated cost models by encoding
+# parameters, computed once per process
+_COST_MODEL = {}
+
+
+def _run_pattern (preamble : str,
+                  statement : str,
+                  params : dict,
+                  pragma : str,
+                  n_loops : int,
+                  repeat : int,
+                 ) -> tuple:
+  '''
+  Obfuscate and time a microbenchmark pattern.
+
+  Parameters
+  ----------
+    preamble : str
+      Code required by the pattern (e.g. the imports)
+
+    statement : str
+      Statement evaluated in the loop
+
+    params : dict
+      Encoding parameters of the obfuscator
+
+    pragma : str
+      Pragma of the benchmark function (empty for the
+      full encoding)
+
+    n_loops : int
+      Number of evaluations of the statement in each run
+
+    repeat : int
+      Number of timed runs
+
+  Returns
+  -------
+    elapsed : float
+      Best time of a single evaluation in seconds
+
+    sizes : tuple
+      Size of the body and of the header of the obfuscated
+      code without the aliases, and their number of aliases
+  '''
+  # NOTE: the import is local to avoid a circular import
+  from .obfuscator import Obfuscator
+
+  code = COST_TEMPLATE.format(
+    preamble=preamble,
+    pragma=pragma,
+    statement=statement
+  )
+
+  obf_code = Obfuscator(
+    rename_variable=False,
+    rename_class=False,
+    **{param : params.get(param, False) for param in COST_PARAMS.values()}
+  )(code=code)
+
+  namespace = {}
+  exec(obf_code, namespace)
+  bench = namespace['BENCH']
+
+  elapsed = float('inf')
+
+  for _ in range(repeat):
+    tic = time.perf_counter()
+    bench(1, n_loops)
+    elapsed = min(elapsed, time.perf_counter() - tic)
+
+  # the header is given by the lines before the function
+  start = obf_code.index('def ')
+  sizes = ()
+
+  for code in (obf_code[start:], obf_code[:start]):
+    # the size of the aliases depends on the size of the
+    # symbol table, so they are counted apart
+    aliases = ALIAS_REGEX.findall(code)
+    sizes += (len(code) - sum(len(alias) for alias in aliases), len(aliases))
+
+  return elapsed / n_loops, sizes
+
+def calibrate_costs (params : dict, n_loops : int = 200, repeat : int = 5) -> dict:
+  '''
+  Calibrate the cost model of the transformations with
+  a microbenchmark of each emitted pattern.
+
+  Each pattern is obfuscated with the given parameters at
+  each encoding level of its transformation, while the other
+  ones are disabled by a pragma, so the emitted code is the
+  same of the obfuscated module. Its evaluation time and
+  emitted size are compared with the native ones.
+
+  Parameters
+  ----------
+    params : dict
+      Encoding parameters of the obfuscator
+
+    n_loops : int (default=200)
+      Number of evaluations of each pattern in a run
+
+    repeat : int (default=5)
+      Number of timed runs of each pattern
+
+  Returns
+  -------
+    model : dict
+      Lookup table of the cost of each transformation. For
+      each level it stores the runtime overhead (in units of
+      a native statement), the size overheads in bytes and the
+      number of aliases of the body and of the header. The
+      strings have also the per-char overheads
+  '''
+
+  # the unit of the runtime overhead is the evaluation
+  # of a native assignment
+  unit, _ = _run_pattern('', 'y = x', {}, '', n_loops, repeat)
+  unit = max(unit, 1e-9)
+
+  # the renaming of the benchmark function is
+  # removed from the sizes of the patterns
+  _, wrapper_sizes = _run_pattern('', 'y = x', params, '\n# pyhide: off', n_loops, 1)
+  _, native_wrapper_sizes = _run_pattern('', 'y = x', {}, '', n_loops, 1)
+  wrapper_sizes = tuple(a - b for a, b in zip(wrapper_sizes, native_wrapper_sizes))
+
+  measures = {}
+
+  for name, (preamble, statement) in COST_PATTERNS.items():
+    kind = name.split('_')[0]
+
+    native, native_sizes = _run_pattern(preamble, statement, {}, '', n_loops, repeat)
+    measures[name] = {}
+
+    # the other transformations are disabled in the pattern
+    directives = [f'no-{key}-encode' for key, other in PRAGMA_KINDS.items() if other != kind]
+
+    for level in (LEVEL_CHEAP, LEVEL_FULL):
+      # NOTE: the pragma comment is removed by the obfuscation
+      pragma = '\n# pyhide: ' + ', '.join(directives + (['cheap'] if level == LEVEL_CHEAP else []))
+      elapsed, sizes = _run_pattern(preamble, statement, dict(params, **{COST_PARAMS[kind] : True}),
+                                    pragma, n_loops, repeat)
+
+      measures[name][level] = (max(elapsed - native, 0.) / unit, ) + \
+        tuple(a - b - c for a, b, c in zip(sizes, native_sizes, wrapper_sizes))
+
+  model = {}
+
+  for kind in LEVEL_OPTIONS:
+    model[kind] = {LEVEL_OFF : (0., ) * 5}
+    model[kind].update(measures[kind])
+
+  # get the per-char costs of the strings from the two lengths,
+  # and remove them from the cost of the string node
+  n_short = len(COST_PATTERNS['string'][1]) - len("y = ''")
+  n_chars = len(COST_PATTERNS['string_long'][1]) - len(COST_PATTERNS['string'][1])
+  model['string_char'] = {LEVEL_OFF : (0., ) * 5}
+
+  for level in (LEVEL_CHEAP, LEVEL_FULL):
+    per_char = tuple((b - a) / n_chars
+      for a, b in zip(measures['string'][level], measures['string_long'][level])
+    )
+    model['string_char'][level] = per_char
+    model['string'][level] = tuple(max(a - n_short * b, 0.)
+      for a, b in zip(measures['string'][level], per_char)
+    )
+
+  return model
+
+def get_cost_model (params : dict) -> dict:
+  '''
+  Get the calibrated cost model of the given encoding
+  parameters, running the calibration at the first call.
+
+  Parameters
+  ----------
+    params : dict
+      Encoding parameters of the obfuscator
+
+  Returns
+  -------
+    model : dict
+      Lookup table of the cost of each transformation
+      (see calibrate_costs)
+  '''
+  key = tuple(sorted(params.items()))
+
+  if key not in _COST_MODEL:
+    _COST_MODEL[key] = calibrate_costs(params=params)
+
+  return _COST_MODEL[key]
+
+def get_optimization_units (root : ast.Module) -> list:
+  '''
+  Get the statements which could be encoded with their
+  own levels, i.e. the top-level statements and the
+  statements in the class bodies (e.g. the methods).
+
+  Parameters
+  ----------
+    root : ast.Module
+      Code tree to obfuscate
+
+  Returns
+  -------
+    units : list
+      List of the statement nodes
+  '''
+  units = []
+  todo = list(reversed(root.body))
+
+  while todo:
+    node = todo.pop()
+
+    # the class is not a unit, otherwise its levels
+    # would be applied also to its methods
+    if isinstance(node, ast.ClassDef):
+      todo.extend(reversed(node.body))
+    else:
+      units.append(node)
+
+  return units
+
+def count_unit_nodes (node : ast.stmt,
+                      table : dict,
+                      context : dict,
+                      matched : set = None,
+                      lookups : dict = None,
+                     ) -> tuple:
+  '''
+  Count the nodes of a unit handled by each transformation.
+
+  Parameters
+  ----------
+    node : ast.stmt
+      Statement of the unit
+
+    table : dict
+      Lookup table of the passes of each node type
+
+    context : dict
+      Metadata of the obfuscation required by the passes
+
+    matched : set (default=None)
+      Set filled with the ids of the identifier nodes
+      replaced by the transformations (None to skip it)
+
+    lookups : dict (default=None)
+      Lookup table filled with the unique package attributes
+      and builtin functions replaced by the transformations
+      (None to skip it)
+
+  Returns
+  -------
+    n_nodes : int
+      Number of evaluated nodes of the unit
+
+    counts : dict
+      Lookup table of the number of nodes of each
+      transformation (and of the chars of the strings)
+  '''
+  n_nodes = 0
+  counts = {}
+
+  for child in ast.walk(node):
+    # the contexts and the operators are not evaluated
+    # by themselves, so they have no runtime cost
+    n_nodes += isinstance(child, (ast.expr, ast.stmt))
+
+    for obf_pass in table.get(child.__class__, ()):
+
+      if not obf_pass.match(child, context):
+        continue
+
+      if obf_pass.tracked and obf_pass.kind in LEVEL_OPTIONS:
+        # the package and the function names are replaced by
+        # the lookups, so their identifiers are not renamed
+        if obf_pass.kind == 'pkg':
+          key = (child.value.id, child.attr)
+          replaced = (id(child), id(child.value))
+        elif obf_pass.kind == 'builtin':
+          key = child.func.id
+          replaced = (id(child.func), )
+        else:
+          key, replaced = None, ()
+
+        if matched is not None:
+          matched.update(replaced)
+        if lookups is not None and key is not None:
+          lookups.setdefault(obf_pass.kind, set()).add(key)
+
+        counts[obf_pass.kind] = counts.get(obf_pass.kind, 0) + 1
+
+        if obf_pass.kind == 'string':
+          counts['string_char'] = counts.get('string_char', 0) + len(child.value)
+
+      break
+
+  return n_nodes, counts
+
+def get_rename_growth (root : ast.Module, lut : object, matched : set = ()) -> int:
+  '''
+  Get the size growth given by the renaming of
+  the identifiers.
+
+  Parameters
+  ----------
+    root : ast.Module
+      Code tree to obfuscate
+
+    lut : SymbolTable
+      Symbol table of the aliases
+
+    matched : set (default=())
+      Ids of the identifier nodes replaced by the
+      transformations
+
+  Returns
+  -------
+    growth : int
+      Number of bytes added by the aliases
+  '''
+  lengths = {symbol.key : len(symbol.alias) - len(symbol.key)
+    for symbol in lut
+      if symbol.kind == 'name'
+  }
+
+  growth = 0
+
+  for node in ast.walk(root):
+
+    # the replaced identifiers are costed by their transformation
+    if id(node) in matched:
+      continue
+
+    if isinstance(node, ast.Name):
+      name = node.id
+    elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+      name = node.name
+    elif isinstance(node, ast.arg):
+      name = node.arg
+    elif isinstance(node, ast.Attribute):
+      name = node.attr
+    else:
+      continue
+
+    growth += lengths.get(name, 0)
+
+  return growth
+
+def _get_unit_cost (counts : dict,
+                    levels : dict,
+                    model : dict,
+                    alias_sizes : dict,
+                    shares : dict
+                   ) -> tuple:
+  '''
+  Get the size and runtime overheads of a unit.
+
+  Parameters
+  ----------
+    counts : dict
+      Number of nodes of each transformation
+
+    levels : dict
+      Encoding levels of the unit
+
+    model : dict
+      Cost model of the transformations
+
+    alias_sizes : dict
+      Mean size of the aliases used by each transformation
+
+    shares : dict
+      Ratio between the unique values and the nodes of each
+      transformation, since each unique value has a single
+      header variable
+
+  Returns
+  -------
+    size : float
+      Size overhead in bytes
+
+    runtime : float
+      Runtime overhead in units of native statements
+  '''
+  size = 0.
+  runtime = 0.
+
+  for kind, level in levels.items():
+    # the per-char costs follow the string levels
+    for key in ((kind, 'string_char') if kind == 'string' else (kind, )):
+      overhead, body_bytes, body_aliases, header_bytes, header_aliases = model[key][level]
+      alias_size = alias_sizes[key]
+      header = (header_bytes + header_aliases * alias_size) * shares.get(key, 1.)
+      size += counts.get(key, 0) * (body_bytes + body_aliases * alias_size + header)
+      runtime += counts.get(key, 0) * overhead
+
+  return size, runtime
+
+def optimize_levels (units : list,
+                     levels : dict,
+                     model : dict,
+                     source_size : int,
+                     fixed_size : float,
+                     alias_sizes : dict,
+                     shares : dict,
+                     max_size_growth : float = None,
+                     max_slowdown : float = None,
+                    ) -> tuple:
+  '''
+  Choose the encoding levels of each unit which give the
+  strongest obfuscation within the size and runtime budgets.
+
+  The levels start from the ones of the module, and the
+  downgrade with the best ratio between the reduction of
+  the exceeded budgets and the loss of strength is applied
+  until the budgets are satisfied.
+
+  The runtime overhead assumes the same evaluation frequency
+  for all the nodes, so the predicted slowdown is given by the
+  mean overhead per node.
+
+  Parameters
+  ----------
+    units : list
+      List of the units as (name, lineno, n_nodes, counts)
+
+    levels : dict
+      Encoding levels of the module
+
+    model : dict
+      Cost model of the transformations (see calibrate_costs)
+
+    source_size : int
+      Size of the original code in bytes
+
+    fixed_size : float
+      Size of the obfuscated code without the encodings
+      controlled by the levels (e.g. with the renaming)
+
+    alias_sizes : dict
+      Mean size of the aliases used by each transformation
+
+    shares : dict
+      Ratio between the unique values and the nodes of each
+      transformation
+
+    max_size_growth : float (default=None)
+      Maximum ratio between the obfuscated and the original
+      code sizes (None for no limit)
+
+    max_slowdown : float (default=None)
+      Maximum predicted ratio between the obfuscated and the
+      original runtimes (None for no limit)
+
+  Returns
+  -------
+    caps : dict
+      Lookup table of the maximum encoding levels by line
+      number of the downgraded units
+
+    plan : dict
+      Report of the optimization, with the predicted size
+      growth and slowdown before and after the downgrades
+      and the list of the chosen downgrades
+  '''
+
+  n_nodes = max(sum(unit[2] for unit in units), 1)
+  source_size = max(source_size, 1)
+
+  unit_levels = [dict(levels) for _ in units]
+  costs = [_get_unit_cost(unit[3], unit_levels[i], model, alias_sizes, shares)
+    for i, unit in enumerate(units)
+  ]
+
+  size = fixed_size + sum(cost[0] for cost in costs)
+  runtime = sum(cost[1] for cost in costs)
+
+  def get_state ():
+    return size / source_size, 1. + runtime / n_nodes
+
+  def get_exceeded ():
+    growth, slowdown = get_state()
+    return (max_size_growth is not None and growth > max_size_growth,
+            max_slowdown is not None and slowdown > max_slowdown)
+
+  def get_step (i, kind):
+    # get the next weaker level of the kind in the unit
+    options = LEVEL_OPTIONS[kind]
+    level = unit_levels[i][kind]
+    if level not in options or options.index(level) + 1 == len(options):
+      return None
+    new_level = options[options.index(level) + 1]
+
+    counts = units[i][3]
+    if not counts.get(kind, 0):
+      return None
+
+    # cost saved by the downgrade
+    old = _get_unit_cost(counts, {kind : level}, model, alias_sizes, shares)
+    new = _get_unit_cost(counts, {kind : new_level}, model, alias_sizes, shares)
+    loss = counts[kind] * (ENCODING_STRENGTH[kind][level] - ENCODING_STRENGTH[kind][new_level])
+
+    return new_level, old[0] - new[0], old[1] - new[1], loss
+
+  def get_score (step, exceeded):
+    # gain on the exceeded budgets per unit of strength lost
+    _, size_gain, runtime_gain, loss = step
+    gain = 0.
+    if exceeded[0]:
+      gain += size_gain / (source_size * max_size_growth)
+    if exceeded[1]:
+      gain += runtime_gain / (n_nodes * max_slowdown)
+    return gain / max(loss, 1e-9)
+
+  initial = get_state()
+  steps = []
+
+  exceeded = get_exceeded()
+
+  while any(exceeded):
+
+    # rank the candidate downgrades for the exceeded budgets. If
+    # no downgrade reduces both of them (e.g. the cheap lookups are
+    # faster but longer), each budget is tried alone
+    for target in (exceeded, (exceeded[0], False), (False, exceeded[1])):
+      heap = []
+      for i in range(len(units)):
+        for kind in LEVEL_OPTIONS:
+          step = get_step(i, kind)
+          if step is not None and get_score(step, target) > 0.:
+            heapq.heappush(heap, (-get_score(step, target), i, kind))
+      if heap:
+        break
+
+    if not heap:
+      break
+
+    # apply the downgrades until the exceeded budgets change
+    # NOTE: the score of a unit changes only after its own downgrade
+    while heap and get_exceeded() == exceeded:
+      _, i, kind = heapq.heappop(heap)
+      step = get_step(i, kind)
+
+      if step is None:
+        continue
+
+      new_level, size_gain, runtime_gain, _ = step
+      steps.append({
+        'name' : units[i][0],
+        'lineno' : units[i][1],
+        'kind' : kind,
+        'from' : unit_levels[i][kind],
+        'to' : new_level,
+        'size' : size_gain,
+        'slowdown' : runtime_gain / n_nodes,
+      })
+      unit_levels[i][kind] = new_level
+      size -= size_gain
+      runtime -= runtime_gain
+
+      # push the next downgrade of the same unit
+      step = get_step(i, kind)
+      if step is not None and get_score(step, target) > 0.:
+        heapq.heappush(heap, (-get_score(step, target), i, kind))
+
+    exceeded = get_exceeded()
+
+  caps = {}
+  for unit, unit_level in zip(units, unit_levels):
+    downgraded = {k : v for k, v in unit_level.items() if v < levels[k]}
+    if downgraded:
+      caps.setdefault(unit[1], {}).update(downgraded)
+
+  plan = {
+    'max_size_growth' : max_size_growth,
+    'max_slowdown' : max_slowdown,
+    'initial' : initial,
+    'final' : get_state(),
+    'satisfied' : not any(get_exceeded()),
+    'steps' : steps,
+  }
+
+  return caps, plan
+
+def format_budget_report (plan : dict) -> str:
+  '''
+  Format the report of the budget optimization as a
+  human readable table.
+
+  Parameters
+  ----------
+    plan : dict
+      Report of the optimization as given by the
+      Obfuscator object
+
+  Returns
+  -------
+    text : str
+      Formatted report
+  '''
+
+  def budget (value):
+    return '-' if value is None else f'{value:.2f}x'
+
+  (growth, slowdown), (final_growth, final_slowdown) = plan['initial'], plan['final']
+
+  lines = [
+    (f'pyhide budget report (max size growth: {budget(plan["max_size_growth"])}, '
+     f'max slowdown: {budget(plan["max_slowdown"])})'),
+    f'  {"unit":<30} {"line":>6} {"kind":>9}  {"level":<14} {"size":>10} {"slowdown":>9}',
+  ]
+
+  for step in plan['steps']:
+    level = f'{LEVEL_NAMES[step["from"]]} -> {LEVEL_NAMES[step["to"]]}'
+    lines.append(
+      f'  {step["name"]:<30} {step["lineno"]:>6} {step["kind"]:>9}  {level:<14} '
+      f'{-step["size"]:>+10.0f} {-step["slowdown"]:>+9.3f}'
+    )
+
+  lines.append(
+    f'predicted size growth: {growth:.2f}x -> {final_growth:.2f}x, '
+    f'predicted slowdown: {slowdown:.2f}x -> {final_slowdown:.2f}x'
+  )
+
+  if not plan['satisfied']:
+    lines.append('the budgets could not be satisfied by the encoding levels (e.g. the renaming alone exceeds them)')
+
+  return '\n'.join(lines)
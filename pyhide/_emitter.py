@@ -0,0 +1,888 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import ast
+import copy
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+# maximum number of nested nodes unparsed in a single
+# recursive call of the standard unparser.
+# NOTE: each nesting level takes a few python frames, so
+# this value must be well below the recursion limit
+MAX_UNPARSE_DEPTH = 50
+
+# separator of the placeholders of the unparsed pieces.
+# NOTE: python source code could not contain null bytes,
+# so it could not be confused with the unparsed code
+PLACEHOLDER = '\x00'
+
+# name of the place of the header in the line-preserving
+# code, if the first line is a compound statement
+HEADER_MARKER = 'PYHIDE_HEADER'
+
+
+def fix_missing_locations (root : ast.AST) -> ast.AST:
+  '''
+  Iterative version of the ast.fix_missing_locations
+  function, which does not fail on deeply nested trees.
+
+  The nodes without line and column numbers take the
+  ones of their parent node (starting from 1 and 0).
+
+  Parameters
+  ----------
+    root : ast.AST
+      Ast node to fix
+
+  Returns
+  -------
+    root : ast.AST
+      The same (fixed) node
+  '''
+
+  todo = [(root, 1, 0, 1, 0)]
+
+  while todo:
+
+    node, lineno, col_offset, end_lineno, end_col_offset = todo.pop()
+
+    if 'lineno' in node._attributes:
+      if not hasattr(node, 'lineno'):
+        node.lineno = lineno
+      else:
+        lineno = node.lineno
+
+    if 'end_lineno' in node._attributes:
+      if getattr(node, 'end_lineno', None) is None:
+        node.end_lineno = end_lineno
+      else:
+        end_lineno = node.end_lineno
+
+    if 'col_offset' in node._attributes:
+      if not hasattr(node, 'col_offset'):
+        node.col_offset = col_offset
+      else:
+        col_offset = node.col_offset
+
+    if 'end_col_offset' in node._attributes:
+      if getattr(node, 'end_col_offset', None) is None:
+        node.end_col_offset = end_col_offset
+      else:
+        end_col_offset = node.end_col_offset
+
+    todo.extend((child, lineno, col_offset, end_lineno, end_col_offset)
+      for child in ast.iter_child_nodes(node)
+    )
+
+  return root
+
+def clone_tree (root : ast.AST) -> ast.AST:
+  '''
+  Iterative copy of the code tree, faster than the
+  copy.deepcopy function.
+
+  Only the nodes are copied, while their values (e.g. the
+  identifiers and the constants) are shared, since they
+  are immutable. The expression contexts (Load, Store and
+  Del) are shared too, as in the trees given by ast.parse.
+
+  Parameters
+  ----------
+    root : ast.AST
+      Ast node to copy
+
+  Returns
+  -------
+    clone : ast.AST
+      Copy of the node
+  '''
+
+  def new (node):
+    # the contexts are shared singletons
+    if isinstance(node, ast.expr_context):
+      return node
+    clone = node.__class__.__new__(node.__class__)
+    todo.append((node, clone))
+    return clone
+
+  todo = []
+  root_clone = new(root)
+
+  while todo:
+
+    node, clone = todo.pop()
+    fields = dict(node.__dict__)
+
+    for key, value in fields.items():
+      if isinstance(value, ast.AST):
+        fields[key] = new(value)
+      elif isinstance(value, list):
+        fields[key] = [new(v) if isinstance(v, ast.AST) else v for v in value]
+
+    clone.__dict__.update(fields)
+
+  return root_clone
+
+class _NodeRef (int):
+  '''
+  Index of a node in the flat table of a dumped tree.
+  '''
+  __slots__ = ()
+
+def dump_tree (root : ast.AST) -> list:
+  '''
+  Iterative conversion of the code tree in a flat table of
+  nodes, which could be pickled also for deeply nested trees
+  (the pickle module recurses along the nested objects).
+
+  Parameters
+  ----------
+    root : ast.AST
+      Ast node to dump
+
+  Returns
+  -------
+    table : list
+      List of (class, fields) of the nodes, where the children
+      are given by their index in the table. The first entry
+      is the root node.
+  '''
+
+  def ref (node):
+    # the contexts are shared singletons
+    if isinstance(node, ast.expr_context):
+      return node
+    todo.append(node)
+    return _NodeRef(len(todo) - 1)
+
+  todo = [root]
+  table = []
+
+  while len(table) < len(todo):
+
+    node = todo[len(table)]
+    fields = dict(node.__dict__)
+
+    for key, value in fields.items():
+      if isinstance(value, ast.AST):
+        fields[key] = ref(value)
+      elif isinstance(value, list):
+        fields[key] = [ref(v) if isinstance(v, ast.AST) else v for v in value]
+
+    table.append((node.__class__, fields))
+
+  return table
+
+def load_tree (table : list) -> ast.AST:
+  '''
+  Rebuild the code tree dumped by the dump_tree function.
+
+  Parameters
+  ----------
+    table : list
+      List of (class, fields) of the nodes
+
+  Returns
+  -------
+    root : ast.AST
+      Root node of the tree
+  '''
+
+  def get (value):
+    return nodes[value] if isinstance(value, _NodeRef) else value
+
+  nodes = [cls.__new__(cls) for cls, _ in table]
+
+  for node, (_, fields) in zip(nodes, table):
+    for key, value in fields.items():
+      if isinstance(value, list):
+        fields[key] = [get(v) for v in value]
+      else:
+        fields[key] = get(value)
+
+    node.__dict__.update(fields)
+
+  return nodes[0]
+
+def _get_height (root : ast.AST) -> int:
+  '''
+  Get the maximum nesting depth of the nodes below
+  the given one.
+
+  Parameters
+  ----------
+    root : ast.AST
+      Ast node on which start the search
+
+  Returns
+  -------
+    height : int
+      Number of nested levels of the subtree
+  '''
+
+  height = 0
+  todo = [(root, 0)]
+
+  while todo:
+    node, depth = todo.pop()
+    height = max(height, depth)
+    todo.extend((child, depth + 1) for child in ast.iter_child_nodes(node))
+
+  return height
+
+def _get_format_template (node : ast.JoinedStr, args : list, spec : bool = False) -> str:
+  '''
+  Get the template of the str.format call equivalent to
+  the f-string, appending its expressions to the args.
+
+  Parameters
+  ----------
+    node : ast.JoinedStr
+      F-string node (or format spec of a value)
+
+    args : list
+      List of the positional arguments of the call
+
+    spec : bool (default=False)
+      True if the node is a format spec, whose text could
+      not contain braces
+
+  Returns
+  -------
+    template : str
+      Template of the str.format call
+  '''
+
+  template = []
+
+  for value in node.values:
+
+    if isinstance(value, ast.FormattedValue):
+      args.append(value.value)
+      conversion = '' if value.conversion == -1 else f'!{chr(value.conversion)}'
+      format_spec = '' if value.format_spec is None else \
+        ':' + _get_format_template(value.format_spec, args=args, spec=True)
+      template.append(f'{{{conversion}{format_spec}}}')
+
+    elif getattr(value, 'field', None) is not None:
+      # the encoded chars are written as fields of their
+      # header variable (see encrypt_fstring_constant)
+      args.append(ast.Name(id=value.field, ctx=ast.Load()))
+      template.append('{}')
+
+    elif spec:
+      template.append(value.value)
+
+    else:
+      template.append(value.value.replace('{', '{{').replace('}', '}}'))
+
+  return ''.join(template)
+
+def get_format_call (node : ast.JoinedStr) -> ast.Call:
+  '''
+  Get the str.format call equivalent to the f-string,
+  whose expressions are arguments of the call, so they
+  could be unparsed as the other expressions.
+
+  The expressions and the format specs are evaluated in
+  the same order, and each value is formatted with the
+  same conversion and spec of the f-string.
+
+  Parameters
+  ----------
+    node : ast.JoinedStr
+      F-string node
+
+  Returns
+  -------
+    call : ast.Call
+      Call node of the template format
+  '''
+
+  args = []
+  template = _get_format_template(node, args=args)
+
+  return ast.Call(
+    func=ast.Attribute(value=ast.Constant(value=template), attr='format', ctx=ast.Load()),
+    args=args,
+    keywords=[]
+  )
+
+def get_cut_nodes (root : ast.AST,
+                   max_depth : int = MAX_UNPARSE_DEPTH
+                  ) -> tuple:
+  '''
+  Get the expression nodes which split the code tree
+  in pieces with a bounded nesting depth.
+
+  The expressions inside the f-strings are unparsed as part
+  of the string, so they are never cut, while the f-strings
+  deeper than the default depth are unparsed as str.format
+  calls (see get_format_call), whose arguments are cut as
+  the other expressions.
+
+  Parameters
+  ----------
+    root : ast.AST
+      Ast node on which start the search
+
+    max_depth : int (default=MAX_UNPARSE_DEPTH)
+      Maximum nesting depth of each piece
+
+  Returns
+  -------
+    cut : set
+      Set of the ids of the nodes to cut
+
+    fstrings : set
+      Set of the ids of the f-strings to unparse
+      as str.format calls
+  '''
+
+  cut = set()
+  fstrings = set()
+  # the f-strings which fit the standard unparser are kept
+  max_height = max(max_depth, MAX_UNPARSE_DEPTH)
+
+  # walk along the tree keeping track of the distance
+  # from the last cut and of the f-string scopes
+  todo = [(root, 0, False)]
+
+  while todo:
+
+    node, depth, fstring = todo.pop()
+
+    # NOTE: the formatted values are replaced by their
+    # expressions in the str.format calls
+    if isinstance(node, ast.expr) and not isinstance(node, ast.FormattedValue) \
+        and not fstring and depth >= max_depth:
+      cut.add(id(node))
+      depth = 0
+
+    if isinstance(node, ast.JoinedStr) and not fstring:
+      if _get_height(node) > max_height:
+        fstrings.add(id(node))
+      else:
+        fstring = True
+
+    todo.extend((child, depth + 1, fstring)
+      for child in ast.iter_child_nodes(node)
+    )
+
+  return cut, fstrings
+
+
+class _ChunkedUnparser (ast._Unparser):
+  '''
+  Standard unparser which writes a placeholder in place
+  of the cut nodes, storing them as pieces to unparse
+  with their required operator precedence.
+  '''
+
+  def __init__ (self, cut : set = None, fstrings : set = None, **kwargs):
+    super().__init__(**kwargs)
+    self._cut = cut or set()
+    self._fstrings = fstrings or set()
+    self._pieces = []
+    self._root = None
+
+  def visit_JoinedStr (self, node):
+
+    if id(node) in self._fstrings:
+      self.traverse(get_format_call(node))
+    else:
+      super().visit_JoinedStr(node)
+
+  def traverse (self, node):
+
+    if not isinstance(node, list) and node is not self._root and id(node) in self._cut:
+      # store the node with the precedence set by its parent
+      # so the piece is parenthesized only if required
+      self._pieces.append((node, self.get_precedence(node)))
+      self.write(f'{PLACEHOLDER}{len(self._pieces)}{PLACEHOLDER}')
+
+    else:
+      super().traverse(node)
+
+def unparse (root : ast.AST,
+             max_depth : int = MAX_UNPARSE_DEPTH
+            ) -> str:
+  '''
+  Iterative version of the ast.unparse function, which
+  does not fail on deeply nested trees.
+
+  The tree is split in pieces with a bounded depth, which
+  are unparsed one at a time using the standard unparser
+  and then joined back using an explicit stack.
+
+  Parameters
+  ----------
+    root : ast.AST
+      Ast node to unparse
+
+    max_depth : int (default=MAX_UNPARSE_DEPTH)
+      Maximum nesting depth of each piece
+
+  Returns
+  -------
+    code : str
+      Unparsed code
+  '''
+
+  cut, fstrings = get_cut_nodes(root=root, max_depth=max_depth)
+
+  unparser = _ChunkedUnparser(cut=cut, fstrings=fstrings)
+  unparser._root = root
+  texts = [unparser.visit(root)]
+
+  # the unparsing of a piece could add new pieces
+  # NOTE: the text of the i-th piece is at position i
+  while len(texts) <= len(unparser._pieces):
+    node, precedence = unparser._pieces[len(texts) - 1]
+    unparser._root = node
+    unparser.set_precedence(precedence, node)
+    texts.append(unparser.visit(node))
+
+  if len(texts) == 1:
+    return texts[0]
+
+  # replace the placeholders with the text of the pieces
+  # NOTE: the odd parts of the splitted texts are
+  # the indexes of the pieces
+  code = []
+  todo = [(texts[0].split(PLACEHOLDER), 0)]
+
+  while todo:
+
+    parts, i = todo.pop()
+
+    if i == len(parts):
+      continue
+
+    todo.append((parts, i + 1))
+
+    if i % 2:
+      todo.append((texts[int(parts[i])].split(PLACEHOLDER), 0))
+    else:
+      code.append(parts[i])
+
+  return ''.join(code)
+
+def _is_compound (node : ast.stmt) -> bool:
+  '''
+  Check if the statement is a compound one, i.e. if
+  it has a body of statements.
+
+  Parameters
+  ----------
+    node : ast.stmt
+      Statement node
+
+  Returns
+  -------
+    check : bool
+      True if it is a compound statement
+  '''
+  return hasattr(node, 'body') or hasattr(node, 'cases')
+
+def _get_first_line (node : ast.stmt) -> int:
+  '''
+  Get the first line of the statement, including
+  its decorators.
+
+  Parameters
+  ----------
+    node : ast.stmt
+      Statement node
+
+  Returns
+  -------
+    lineno : int
+      First line of the statement
+  '''
+  decorators = getattr(node, 'decorator_list', [])
+  return min([d.lineno for d in decorators] + [node.lineno])
+
+def _get_clauses (node : ast.stmt) -> list:
+  '''
+  Split a compound statement in its clauses, i.e. the
+  head text, the head line, the body and the indentation
+  level (relative to the statement) of each clause.
+
+  The head of each clause is given by the unparsing of a
+  copy of the node without the inner statements. The line
+  of the else and finally clauses is not stored in the
+  code tree, so it is set to None. The cases of a match
+  statement are clauses nested in the match head.
+
+  Parameters
+  ----------
+    node : ast.stmt
+      Compound statement node
+
+  Returns
+  -------
+    clauses : list
+      List of the (head, lineno, body, level) clauses
+  '''
+
+  def head (node):
+    node = copy.copy(node)
+    for field in ('body', 'orelse', 'handlers', 'finalbody', 'cases', 'decorator_list'):
+      if hasattr(node, field):
+        setattr(node, field, [])
+    return unparse(node).strip()
+
+  clauses = [(f'@{unparse(d)}', d.lineno, None, 0)
+    for d in getattr(node, 'decorator_list', [])
+  ]
+
+  # the match head has no body, but the cases
+  if isinstance(node, getattr(ast, 'Match', ())):
+    clauses.append((head(node), node.lineno, None, 0))
+    clauses.extend((head(case), case.pattern.lineno, case.body, 1)
+      for case in node.cases
+    )
+    return clauses
+
+  clauses.append((head(node), node.lineno, node.body, 0))
+
+  if isinstance(node, ast.If):
+    # collapse the nested ifs into elif clauses
+    while len(node.orelse) == 1 and isinstance(node.orelse[0], ast.If):
+      node = node.orelse[0]
+      clauses.append((f'el{head(node)}', node.lineno, node.body, 0))
+
+  elif isinstance(node, (ast.Try, getattr(ast, 'TryStar', ast.Try))):
+    clauses.extend((head(handler), handler.lineno, handler.body, 0)
+      for handler in node.handlers
+    )
+
+  if getattr(node, 'orelse', None):
+    clauses.append(('else:', None, node.orelse, 0))
+
+  if getattr(node, 'finalbody', None):
+    clauses.append(('finally:', None, node.finalbody, 0))
+
+  return clauses
+
+def unparse_lines (nodes : list) -> tuple:
+  '''
+  Unparse the statements keeping their original line
+  numbers, so the line numbers of the tracebacks and of
+  the line profilers match the original code.
+
+  The statements are placed at their original line, the
+  simple statements on the same line are joined by
+  semicolons and the missing lines are left empty. If a
+  statement could not be placed at its line (e.g. the body
+  of a single-line compound statement which is not made of
+  simple statements) it is moved to the next free line.
+
+  Parameters
+  ----------
+    nodes : list
+      List of statements to unparse
+
+  Returns
+  -------
+    lines : list
+      List of the code lines, starting from the first line
+
+    simple : dict
+      Lookup table of the lines given only by simple
+      statements, associated to their indentation level
+  '''
+
+  lines = []
+  simple = {}
+
+  def write (text : str, lineno : int, indent : int, joinable : bool):
+    # join the simple statements of the same line and block
+    if joinable and lineno == len(lines) and simple.get(len(lines)) == indent:
+      lines[-1] += f'; {text}'
+      return
+
+    # pad the missing lines (or move to the next free line)
+    lines.extend([''] * (max(lineno, len(lines) + 1) - len(lines) - 1))
+    lines.append('    ' * indent + text)
+
+    if joinable:
+      simple[len(lines)] = indent
+    # NOTE: the docstrings could be written on more lines
+    for line in lines.pop().split('\n'):
+      lines.append(line)
+
+  # stack of the statements to write, with their indentation
+  # level, or of the clause heads, with their line and body
+  todo = [(node, 0) for node in reversed(nodes)]
+
+  while todo:
+
+    item = todo.pop()
+
+    # write the head of a clause
+    if isinstance(item[0], str):
+      text, lineno, body, indent = item
+
+      # write the decorators (and the match heads)
+      if body is None:
+        write(text, lineno, indent, False)
+        continue
+
+      body = [node for node in body if isinstance(node, ast.stmt)]
+
+      # the else and finally clauses are placed just before
+      # their body (or on the same line if there is no room)
+      if lineno is None:
+        lineno = _get_first_line(body[0]) if body else len(lines) + 1
+        lineno = lineno - 1 if lineno - 1 > len(lines) else lineno
+
+      # the empty bodies (e.g. made only by removed imports)
+      # are replaced by a pass statement
+      if not body:
+        write(f'{text} pass', lineno, indent, False)
+
+      # the single-line clauses are kept on the same line
+      elif all(node.lineno == node.end_lineno == lineno and
+               not _is_compound(node)
+               for node in body):
+        write(f'{text} ' + '; '.join(unparse(node) for node in body), lineno, indent, False)
+
+      else:
+        write(text, lineno, indent, False)
+        todo.extend((node, indent + 1) for node in reversed(body))
+
+      continue
+
+    node, indent = item
+
+    # skip the removed statements
+    if not isinstance(node, ast.stmt):
+      continue
+
+    # compound statements
+    if _is_compound(node):
+      clauses = _get_clauses(node)
+      todo.extend((text, lineno, body, indent + level)
+        for text, lineno, body, level in reversed(clauses)
+      )
+
+    # simple statements
+    else:
+      write(unparse(node), node.lineno, indent, True)
+
+  return lines, simple
+
+def _mark_expression (node : ast.expr) -> ast.expr:
+  # evaluate the header marker before the expression,
+  # keeping its value
+  mark = ast.Subscript(
+    value=ast.Tuple(elts=[ast.Name(id=HEADER_MARKER, ctx=ast.Load()), node], ctx=ast.Load()),
+    slice=ast.Constant(value=-1),
+    ctx=ast.Load()
+  )
+  return fix_missing_locations(ast.copy_location(mark, node))
+
+def _is_inert (node : ast.stmt) -> bool:
+  '''
+  Check if the statement is a function definition which
+  does not evaluate any expression (i.e. without decorators,
+  defaults and annotations), so the header could be placed
+  after it.
+
+  Parameters
+  ----------
+    node : ast.stmt
+      Statement node
+
+  Returns
+  -------
+    check : bool
+      True if it is an inert function definition
+  '''
+  if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) or node.decorator_list:
+    return False
+
+  args = node.args
+  arguments = args.posonlyargs + args.args + [args.vararg] + args.kwonlyargs + [args.kwarg]
+
+  return not args.defaults and all(v is None for v in args.kw_defaults) and \
+    node.returns is None and all(arg.annotation is None for arg in arguments if arg is not None)
+
+def mark_header (nodes : list) -> bool:
+  '''
+  Mark the place of the header in the first statement of
+  the line-preserving code, if it is a compound one.
+
+  The header could not be joined to a compound statement,
+  so the marker is placed in the first expression evaluated
+  by the statement (e.g. its first decorator, the class
+  bases, the function defaults or the clause condition)
+  keeping its value. The functions which do not evaluate
+  any expression are skipped, since their body runs only
+  after the header. The marker is replaced by the header
+  assignments in the pack_header function.
+
+  Parameters
+  ----------
+    nodes : list
+      List of the top-level statements
+
+  Returns
+  -------
+    marked : bool
+      True if the marker was placed
+  '''
+
+  if not nodes or not _is_compound(nodes[0]) or _get_first_line(nodes[0]) != 1:
+    return False
+
+  body, i = nodes, 0
+
+  while i < len(body):
+
+    node = body[i]
+
+    if not isinstance(node, ast.stmt):
+      i += 1
+
+    elif getattr(node, 'decorator_list', None):
+      node.decorator_list[0] = _mark_expression(node.decorator_list[0])
+      return True
+
+    elif isinstance(node, ast.ClassDef):
+      # the marker is unpacked as an empty tuple of bases
+      bases = ast.copy_location(ast.Tuple(elts=[], ctx=ast.Load()), node)
+      mark = ast.Starred(value=_mark_expression(bases), ctx=ast.Load())
+      node.bases.insert(0, ast.copy_location(mark, node))
+      return True
+
+    elif _is_inert(node):
+      i += 1
+
+    elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+      args = node.args
+      # the defaults are evaluated before the annotations
+      fields = [(args.defaults, j) for j in range(len(args.defaults))]
+      fields += [(args.kw_defaults, j) for j, v in enumerate(args.kw_defaults) if v is not None]
+      fields += [(arg, 'annotation')
+        for arg in args.posonlyargs + args.args + [args.vararg] + args.kwonlyargs + [args.kwarg]
+          if arg is not None and arg.annotation is not None
+      ]
+      fields += [(node, 'returns')] if node.returns is not None else []
+
+      owner, key = fields[0]
+      if isinstance(owner, list):
+        owner[key] = _mark_expression(owner[key])
+      else:
+        setattr(owner, key, _mark_expression(getattr(owner, key)))
+      return True
+
+    elif isinstance(node, (ast.If, ast.While)):
+      node.test = _mark_expression(node.test)
+      return True
+
+    elif isinstance(node, ast.For):
+      node.iter = _mark_expression(node.iter)
+      return True
+
+    elif isinstance(node, ast.With):
+      node.items[0].context_expr = _mark_expression(node.items[0].context_expr)
+      return True
+
+    elif isinstance(node, getattr(ast, 'Match', ())):
+      node.subject = _mark_expression(node.subject)
+      return True
+
+    # the try body runs in the same scope
+    elif isinstance(node, (ast.Try, getattr(ast, 'TryStar', ast.Try))):
+      body, i = node.body, 0
+
+    # the marker is joined to the simple statements
+    elif not _is_compound(node):
+      mark = ast.Expr(value=ast.Tuple(elts=[ast.Name(id=HEADER_MARKER, ctx=ast.Load())], ctx=ast.Load()))
+      mark = ast.copy_location(mark, node)
+      mark.end_lineno = mark.lineno
+      body.insert(i, fix_missing_locations(mark))
+      return True
+
+    else:
+      return False
+
+  return False
+
+def _get_header_expression (header : str) -> str:
+  # write the header assignments as assignment expressions
+  items = []
+  for node in ast.parse(header).body:
+    value = node.value
+    for target in reversed(node.targets):
+      value = ast.NamedExpr(target=target, value=value)
+    items.append(value)
+  return ', '.join(unparse(item) for item in items)
+
+def pack_header (lines : list,
+                 simple : dict,
+                 header : str,
+                 after : int = 0
+                ) -> str:
+  '''
+  Add the header variables, packed in a single line,
+  to the line-preserving code.
+
+  The header is placed on its line if it is empty, otherwise
+  it is joined to the simple statements of the line. If the
+  line starts with a compound statement, the header replaces
+  the marker placed by the mark_header function, and only if
+  it is missing a new line is inserted.
+
+  Parameters
+  ----------
+    lines : list
+      List of the code lines
+
+    simple : dict
+      Lookup table of the lines given only by simple
+      statements, associated to their indentation level
+
+    header : str
+      Header statements joined by semicolons
+
+    after : int (default=0)
+      Line after which the header must be placed (e.g. the
+      last line of the __future__ imports). If it is 0 the
+      header is placed on the first line
+
+  Returns
+  -------
+    code : str
+      Code with the header
+  '''
+
+  # replace the marker of the compound statement
+  # with the header assignments (see mark_header)
+  for i, line in enumerate(lines):
+    if HEADER_MARKER in line:
+      lines = list(lines)
+      lines[i] = line.replace(HEADER_MARKER, _get_header_expression(header) if header else 'None', 1)
+      return '\n'.join(lines)
+
+  if not header:
+    return '\n'.join(lines)
+
+  lineno = max(after, 1)
+  lines = lines + [''] * (lineno - len(lines))
+
+  if not lines[lineno - 1]:
+    lines[lineno - 1] = header
+
+  elif simple.get(lineno) == 0:
+    lines[lineno - 1] = f'{lines[lineno - 1]}; {header}' if after else f'{header}; {lines[lineno - 1]}'
+
+  else:
+    lines.insert(lineno if after else lineno - 1, header)
+
+  return '\n'.join(lines)
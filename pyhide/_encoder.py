@@ -1,10 +1,16 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import re
 import ast
+import zlib
 import types
+import base64
 import builtins
 
+from ._emitter import fix_missing_locations
+from ._symbols import SymbolTable
+
 __author__  = ['Nico Curti']
 __email__ = ['nico.curti2@unibo.it']
 
@@ -37,6 +43,136 @@ op_lut = {
   ast.MatMult : '__matmul__'
 }
 
+# maximum nesting depth of the encoded operators.
+# NOTE: each encoded operator adds a level of parentheses
+# and python allows at most 200 nested parentheses
+MAX_OPERATOR_DEPTH = 50
+
+# regex of the aliases given by the symbol table,
+# i.e. the names made only by underscores
+ALIAS_REGEX = re.compile(r'(?<!\w)_{3,}(?!\w)')
+
+
+class _HexTable (dict):
+  '''
+  Translation table of the chars to their escape
+  sequences, filled on demand for the code points
+  outside the latin-1 range.
+  '''
+
+  def __missing__ (self, code : int) -> str:
+    if code < 0x100:
+      escape = f'\\x{code:02x}'
+    elif code < 0x10000:
+      escape = f'\\u{code:04x}'
+    else:
+      escape = f'\\U{code:08x}'
+
+    self[code] = escape
+    return escape
+
+# global table of the escaped chars
+HEX_TABLE = _HexTable()
+
+# maximum number of the encoded package lookups kept by
+# the global table, since the pairs are given by the user
+# codes (e.g. of a long-running service)
+MAX_LOOKUPS = 1024
+
+class _LookupTable (dict):
+  '''
+  Table of the encoded lookups of the package attributes,
+  given by (package, attribute) pairs and filled on demand,
+  so each pair is encoded once.
+
+  The table is emptied when it reaches its maximum size,
+  so its memory is bounded along several obfuscations.
+
+  Parameters
+  ----------
+    max_size : int
+      Maximum number of the stored lookups
+  '''
+
+  def __init__ (self, max_size : int):
+    super().__init__()
+    self.max_size = max_size
+
+  def __missing__ (self, key : tuple) -> str:
+    pkg, attr = key
+    lookup = f'getattr(__import__("{encodeHex(text=pkg)}"), "{encodeHex(text=attr)}")'
+
+    # NOTE: the clear is atomic, so the table
+    # could be shared by several threads
+    if len(self) >= self.max_size:
+      self.clear()
+
+    self[key] = lookup
+    return lookup
+
+# global table of the encoded package lookups
+LOOKUP_TABLE = _LookupTable(max_size=MAX_LOOKUPS)
+
+class _OperatorTable (dict):
+  '''
+  Table of the encoded names of the operator magic
+  functions, filled on demand.
+
+  The same subtree is shared by all the encoded operators,
+  since the generated nodes are not visited again by the
+  encryption and they are only unparsed.
+  '''
+
+  def __missing__ (self, operator : str) -> ast.Call:
+    node = ast.Call(
+      func=ast.Attribute(
+        value=ast.Constant(value=''),
+        attr='join',
+        ctx=ast.Load()
+      ),
+      args=[
+        ast.GeneratorExp(
+          elt=ast.Call(
+            func=ast.Name(
+              id='chr',
+              ctx=ast.Load()
+            ),
+            args=[ast.Name(
+              id='x',
+              ctx=ast.Load()
+              )
+            ],
+            keywords=[]
+          ),
+          generators=[
+            ast.comprehension(
+              target=ast.Name(
+                id='x',
+                ctx=ast.Store()
+              ),
+              # encode the operator string as char codes
+              iter=ast.List(
+                elts=[
+                  ast.Constant(value=ord(x))
+                    for x in operator
+                ],
+                ctx=ast.Load()
+              ),
+              ifs=[],
+              is_async=0
+            )
+          ]
+        )
+      ],
+      keywords=[]
+    )
+
+    self[operator] = node
+    return node
+
+# global table of the encoded operator names
+OPERATOR_TABLE = _OperatorTable()
+
 def get_all_list_of_variable_names (root : ast.Module) -> list :
   '''
   Get the list of all variable names defined in the
@@ -232,6 +368,40 @@ def get_dict_of_module_names (root : ast.Module) -> dict:
   # return the obtained lut
   return module_names
 
+def get_all_package_attributes (root : ast.Module) -> list:
+  '''
+  Get the list of all the package attributes used in
+  the provided code as (package, attribute) pairs.
+  This list could be used to build a lut of values
+  for the caching of the package lookups in the header.
+
+  Parameters
+  ----------
+    root: ast.Module
+      Ast node on which start the search
+
+  Returns
+  -------
+    attributes: list
+      Unique list of the (package, attribute) pairs found
+      in the code
+  '''
+
+  # get the lut of the imported modules
+  modules = get_dict_of_module_names(root)
+
+  # walk along the code tree and get the package attributes
+  # with the same naming used by the package encryption
+  attributes = sorted({(modules[node.value.id], modules.get(node.attr, node.attr))
+    for node in ast.walk(root)
+      if isinstance(node, ast.Attribute) and \
+         isinstance(node.value, ast.Name) and \
+         node.value.id in modules
+    }
+  )
+
+  return attributes
+
 def get_all_list_of_numbers (root : ast.Module) -> list:
   '''
   Get the list of all the numbers hard-coded in the
@@ -251,11 +421,14 @@ def get_all_list_of_numbers (root : ast.Module) -> list:
   '''
 
   # walk along the code tree and get the numbers
-  numeric_var = sorted({node.value
-    for node in ast.walk(root)
-      # filter only the numeric values
-      if isinstance(node, ast.Num)
-    }
+  # NOTE: the type is part of the key, since 1, 1.0
+  # and True are equal values
+  numeric_var = sorted({(type(node.value), node.value) : node.value
+      for node in ast.walk(root)
+        # filter only the numeric values
+        if isinstance(node, ast.Num)
+    }.values(),
+    key=lambda x : (type(x).__name__, repr(x))
   )
 
   return numeric_var
@@ -328,6 +501,52 @@ def get_all_strings (root : ast.Module) -> set:
   # return the obtained list
   return strings
 
+def get_all_bytes (root : ast.Module) -> list:
+  '''
+  Get the set of constant bytes, which could be
+  encoded as compressed blobs.
+
+  Parameters
+  ----------
+    root: ast.Module
+      Ast node on which start the search
+
+  Returns
+  -------
+    values: list
+      List of unique bytes found in the code tree
+  '''
+  values = { node.value
+    for node in ast.walk(root)
+      # if they are constant bytes
+      if isinstance(node, ast.Constant) and \
+         isinstance(node.value, bytes)
+  }
+  return sorted(values)
+
+def get_all_operators (root : ast.Module) -> list:
+  '''
+  Get the set of the magic function names of the binary
+  operators, which could be cached as functions of the
+  operator module.
+
+  Parameters
+  ----------
+    root: ast.Module
+      Ast node on which start the search
+
+  Returns
+  -------
+    operators: list
+      List of unique operator names found in the code tree
+  '''
+  operators = { op_lut[type(node.op)]
+    for node in ast.walk(root)
+      # if they are binary operators
+      if isinstance(node, ast.BinOp)
+  }
+  return sorted(operators)
+
 def encodeInteger (number : int) -> str:
   '''
   Encode integer numbers.
@@ -386,6 +605,80 @@ def encodeInteger (number : int) -> str:
 
   return obf_number
 
+def encodeHex (text : str) -> str:
+  '''
+  Encode a string as a sequence of escaped chars,
+  i.e. the content of a string literal.
+
+  The whole string is encoded at once: the latin-1
+  strings are converted using the hex representation
+  of their bytes, while the other ones are translated
+  char by char (using the \\u and \\U escapes for
+  the code points above 0xff).
+
+  Parameters
+  ----------
+    text : str
+      String to encode
+
+  Returns
+  -------
+    obf_text : str
+      Escaped string
+  '''
+
+  if not text:
+    return text
+
+  try:
+    data = text.encode('latin-1')
+  except UnicodeEncodeError:
+    return text.translate(HEX_TABLE)
+
+  # each byte is separated by a space, replaced by the escape
+  return '\\x' + data.hex(' ').replace(' ', '\\x')
+
+def encodeBlob (value : object) -> str:
+  '''
+  Encode a string (or bytes) literal as a compressed blob,
+  decoded lazily and only once.
+
+  The value is compressed with zlib, its bytes are rotated
+  by a shift given by the compressed data (so the blob is not
+  a plain zlib stream) and it is stored as base64 string. The
+  decoder is wrapped in a cached function without arguments,
+  so the blob is decompressed at its first call and the
+  following calls return the same object.
+
+  Parameters
+  ----------
+    value : str or bytes
+      Literal to encode
+
+  Returns
+  -------
+    obj_blob : str
+      Code of the cached decoder of the blob
+  '''
+
+  is_string = isinstance(value, str)
+  data = value.encode('utf-8', 'surrogatepass') if is_string else value
+  data = zlib.compress(data, 9)
+
+  # rotate the bytes of the compressed data
+  shift = 1 + data[-1] % 255
+  data = data.translate(bytes((x + shift) % 256 for x in range(256)))
+  blob = base64.b64encode(data).decode('ascii')
+
+  # the decoder rotates back the bytes before the decompression
+  obf_blob = (f'{LOOKUP_TABLE["zlib", "decompress"]}({LOOKUP_TABLE["base64", "b64decode"]}("{blob}")'
+              f'.translate(bytes((x+{256 - shift})%256 for x in range(256))))')
+
+  if is_string:
+    obf_blob += f'.decode("{encodeHex(text="utf-8")}", "{encodeHex(text="surrogatepass")}")'
+
+  return f'{LOOKUP_TABLE["functools", "lru_cache"]}(None)(lambda: {obf_blob})'
+
 def encodeFloat (number : float) -> str:
   '''
   Encode float numbers.
@@ -413,7 +706,7 @@ def encodeFloat (number : float) -> str:
   # convert the number to string
   obf_number = str(number)
   # replace it as an hex string
-  obf_number = ''.join(f"\\x{ord(c):02x}" for c in obf_number)
+  obf_number = encodeHex(text=obf_number)
   # create a function encoding with concatenated chars
   obf_number = f'float(str("".join(chr(x) if isinstance(x, int) else x for x in "{obf_number}")))'
   # return the obfuscated number
@@ -452,9 +745,87 @@ def insert_new_variable_in_header (root : ast.Module,
     value=ast.Constant(value=value))
   )
   # fix the code line numbers
-  ast.fix_missing_locations(root)
+  fix_missing_locations(root)
   return root
 
+def collect_symbols (root : ast.Module,
+                     rename_variable : bool = True,
+                     rename_function : bool = True,
+                     rename_class : bool = True,
+                     encode_pkg : bool = True,
+                     encode_number : bool = True,
+                     encode_string : bool = True,
+                     cache_pkg : bool = True,
+                     encode_operator : bool = True,
+                    ) -> dict:
+  '''
+  Collect all the values found in the code tree which
+  could be replaced by the code encryption.
+
+  The values are collected only for the enabled encodings,
+  so the same collection could be shared by several lookup
+  tables with a subset of them.
+
+  Parameters
+  ----------
+    root: ast.Module
+      Ast node on which start the search
+
+    rename_variable : bool (default=True)
+      Enable/Disable the collection of variable names
+
+    rename_function : bool (default=True)
+      Enable/Disable the collection of function names
+
+    rename_class : bool (default=True)
+      Enable/Disable the collection of class names
+
+    encode_pkg : bool (default=True)
+      Enable/Disable the collection of package names
+
+    encode_number : bool (default=True)
+      Enable/Disable the collection of number values
+
+    encode_string : bool (default=True)
+      Enable/Disable the collection of string values
+
+    cache_pkg : bool (default=True)
+      Enable/Disable the collection of the package
+      attributes to cache (it requires also encode_pkg)
+
+    encode_operator : bool (default=True)
+      Enable/Disable the collection of the operators
+
+  Returns
+  -------
+    symbols : dict
+      Lookup table of the values found in the code,
+      grouped by category
+  '''
+
+  return {
+    # get the unique set of all chars
+    'chars' : get_all_char_values(root) if encode_string else [],
+    # get the set of all strings
+    'strings' : get_all_strings(root) if encode_string else [],
+    # get the set of all bytes
+    'bytes' : get_all_bytes(root) if encode_string else [],
+    # get the set of numbers
+    'numbers' : get_all_list_of_numbers(root) if encode_number else [],
+    # get the set of all variable names
+    'var_names' : get_all_list_of_variable_names(root) if rename_variable else [],
+    # get the set of all function names
+    'fun_names' : get_all_list_of_function_names(root) if rename_function else [],
+    # get the set of all class names
+    'cls_names' : get_all_list_of_class_names(root) if rename_class else [],
+    # get the lut of imported modules
+    'mod_lut' : get_dict_of_module_names(root) if encode_pkg else {},
+    # get the set of package attributes to cache
+    'pkg_attrs' : get_all_package_attributes(root) if encode_pkg and cache_pkg else [],
+    # get the set of binary operators
+    'operators' : get_all_operators(root) if encode_operator else [],
+  }
+
 def create_encryption_lut (root : ast.Module,
                            rename_variable : bool,
                            rename_function : bool,
@@ -462,7 +833,12 @@ def create_encryption_lut (root : ast.Module,
                            encode_pkg : bool,
                            encode_number : bool,
                            encode_string : bool,
-                          ) -> dict:
+                           cache_pkg : bool = False,
+                           symbols : dict = None,
+                           blob_threshold : int = None,
+                           cache_operator : bool = False,
+                           scopes : dict = None,
+                          ) -> SymbolTable:
   '''
   Create the lut of values for the correct
   encryption of all the possible values found
@@ -491,50 +867,96 @@ def create_encryption_lut (root : ast.Module,
     encode_string : bool
       Enable/Disable the encoding of string values
 
+    cache_pkg : bool (default=False)
+      Enable/Disable the aliases for the cached package
+      attributes (it requires also encode_pkg)
+
+    symbols : dict (default=None)
+      Values already collected from the code tree (see
+      collect_symbols). If None they are collected from
+      the root according to the enabled encodings
+
+    blob_threshold : int (default=None)
+      Minimum length of the string and bytes literals
+      encoded as compressed blobs (None to disable them)
+
+    cache_operator : bool (default=False)
+      Enable/Disable the aliases for the operator functions
+      which replace the binary operators
+
+    scopes : dict (default=None)
+      Local variables renamed by scope (see resolve_scopes).
+      Their aliases are reserved before the names, setting
+      the length of the first one as start, and the names
+      removed from the code are skipped
 
   Returns
   -------
-    lut: dict
-      Lookup table of the aliases for the code
+    lut: SymbolTable
+      Symbol table of the aliases for the code
       encryption
   '''
 
-  # get the unique set of all chars
-  chars = get_all_char_values(root) if encode_string else []
-  # get the set of all strings
-  strings = get_all_strings(root) if encode_string else []
-  # get the set of numbers
-  numbers = get_all_list_of_numbers(root) if encode_number else []
-  # get the set of all variable names
-  var_names = get_all_list_of_variable_names(root) if rename_variable else []
-  # get the set of all function names
-  fun_names = get_all_list_of_function_names(root) if rename_function else []
-  # get the set of all class names
-  cls_names = get_all_list_of_class_names(root) if rename_class else []
-  # get the lut of imported modules
-  mod_lut = get_dict_of_module_names(root) if encode_pkg else {}
-
-  # remove possible duplicates from
-  # the whole list of values
-  alias = set(chars)
-  alias.update(set(strings))
-  alias.update(set(numbers))
-  alias.update(set(var_names))
-  alias.update(set(fun_names))
-  alias.update(set(cls_names))
-  alias.update(set(mod_lut.keys()))
-  # force the adding of bool vars
-  alias.update({'True', 'False'})
-
-  # create the lut of values
-  lut = {k : '_' * (i + 3)
-    for i, k in enumerate(alias)
-  }
+  if symbols is None:
+    symbols = collect_symbols(
+      root=root,
+      rename_variable=rename_variable,
+      rename_function=rename_function,
+      rename_class=rename_class,
+      encode_pkg=encode_pkg,
+      encode_number=encode_number,
+      encode_string=encode_string,
+      cache_pkg=cache_pkg,
+      encode_operator=cache_operator,
+    )
+
+  # keep only the values of the enabled encodings
+  chars = symbols['chars'] if encode_string else []
+  strings = symbols['strings'] if encode_string else []
+  numbers = symbols['numbers'] if encode_number else []
+  var_names = symbols['var_names'] if rename_variable else []
+  fun_names = symbols['fun_names'] if rename_function else []
+  cls_names = symbols['cls_names'] if rename_class else []
+  mod_lut = symbols['mod_lut'] if encode_pkg else {}
+  pkg_attrs = symbols['pkg_attrs'] if encode_pkg and cache_pkg else []
+  # the operators are cached as attributes of the operator module
+  operators = [('operator', op) for op in symbols['operators']] if cache_operator else []
+  # the large literals are encoded as blobs
+  blobs = [value
+    for value in symbols['strings'] + symbols['bytes']
+      if blob_threshold is not None and len(value) >= blob_threshold
+  ] if encode_string else []
+
+  # the local variables renamed by scope are not part of the lut
+  if scopes is not None:
+    var_names = [name for name in var_names if name not in scopes['excluded']]
+    fun_names = [name for name in fun_names if name not in scopes['excluded']]
+
+  # create the symbol table of values
+  # NOTE: each kind of value has its own namespace,
+  # while the aliases are unique along all of them
+  lut = SymbolTable()
+
+  for kind, values in (('char', chars),
+                       ('string', strings),
+                       # force the adding of bool values
+                       ('number', [False, True] + numbers),
+                       ('name', var_names + fun_names + cls_names + sorted(mod_lut)),
+                       ('attribute', pkg_attrs + operators),
+                       ('blob', blobs),
+                      ):
+    # the aliases of the local variables precede the names, so
+    # the literals (used also by the header) keep their aliases
+    if kind == 'name' and scopes is not None:
+      scopes['start'] = lut.reserve(size=scopes['reserved'])
+
+    for value in values:
+      lut.add(kind, value)
 
   return lut
 
 def encrypt_constant_strings (node: ast.Constant,
-                              lut: dict,
+                              lut: SymbolTable,
                               header: dict,
                               reduce_code_length: bool,
                              ) -> ast.Call:
@@ -553,8 +975,8 @@ def encrypt_constant_strings (node: ast.Constant,
     node: ast.Constant
       Ast string node to process
 
-    lut: dict
-      Lookup table for the code obfuscator
+    lut: SymbolTable
+      Symbol table of the aliases for the code obfuscator
 
     header: dict
       Lookup table of the header variables
@@ -575,6 +997,12 @@ def encrypt_constant_strings (node: ast.Constant,
       Updated header
   '''
 
+  # the chars are processed once (in order of appearance),
+  # so the cost of the long strings is given by their alphabet
+  chars = {x : lut.get('char', ord(x), x)
+    for x in dict.fromkeys(node.value)
+  }
+
   # first of all update the header using the
   # ord value of each char, aka the number
   # which represents the character
@@ -584,12 +1012,12 @@ def encrypt_constant_strings (node: ast.Constant,
       # to avoid possible overlapping with variable
       # names; the value is the string of the numeric
       # representation of the char
-      lut[ord(x)] : str(ord(x))
-        for x in node.value
+      alias : str(ord(x))
+        for x, alias in chars.items()
           # filter only the char in the lut
           # since some characters are escaped during
           # the loading
-          if ord(x) in lut
+          if lut.has('char', ord(x))
     })
   else:
     header.update({
@@ -597,18 +1025,17 @@ def encrypt_constant_strings (node: ast.Constant,
       # to avoid possible overlapping with variable
       # names; the value is the integer encoding of
       # the ord representation
-      lut[ord(x)] : str(encodeInteger(number=ord(x)))
-        for x in node.value
+      alias : str(encodeInteger(number=ord(x)))
+        for x, alias in chars.items()
           # filter only the char in the lut
           # since some characters are escaped during
-          # the loading
-          if ord(x) in lut
+          # the loading, and skip the ones already
+          # encoded by the previous strings
+          if alias not in header and lut.has('char', ord(x))
     })
 
   # get the aliases obtained by the lut
-  aliases = [ lut.get(ord(x), x)
-    for x in node.value
-  ]
+  aliases = list(map(chars.__getitem__, node.value))
   # create the encoded string
   enc = f"str(''.join(chr(x) if isinstance(x, int) else x for x in {aliases}))"
 
@@ -631,8 +1058,116 @@ def encrypt_constant_strings (node: ast.Constant,
 
   return obf_node, header
 
+def encrypt_cached_string (node: ast.Constant,
+                           lut: SymbolTable,
+                           header: dict,
+                          ) -> ast.Name:
+  '''
+  Cheap encryption of simple strings found in the code.
+
+  The string is encoded as hex string in a new variable of
+  the header, evaluated only once at the import of the
+  obfuscated code, and the node is replaced by the
+  variable name. In this way the encrypted string costs
+  just a name lookup at each evaluation.
+
+  Parameters
+  ----------
+    node: ast.Constant
+      Ast string node to process
+
+    lut: SymbolTable
+      Symbol table of the aliases for the code obfuscator
+
+    header: dict
+      Lookup table of the header variables
+      to add on the obfuscated code
+
+  Returns
+  -------
+    obf_node: ast.Name
+      The constant node is transformed into a Name
+      one given by the header variable.
+
+    header: dict
+      Updated header
+  '''
+
+  # the string must be in the lut
+  if not lut.has('string', node.value):
+    return node, header
+
+  # get the variable name from the lut
+  var_name = lut.get('string', node.value)
+  # get the encoded value of the string
+  obf_value = encodeHex(text=node.value)
+  # update the header according to this new variable
+  # NOTE: it is the same encoding of the f-string constants
+  header[var_name] = f'"".join(chr(x) if isinstance(x, int) else x for x in "{obf_value}")'
+
+  # create the new node using the name of the variable
+  obf_node = ast.Name(
+    id=var_name,
+    ctx=ast.Load()
+  )
+
+  return obf_node, header
+
+def encrypt_blob_literal (node: ast.Constant,
+                          lut: SymbolTable,
+                          header: dict,
+                         ) -> ast.Call:
+  '''
+  Encryption of the large string and bytes literals
+  found in the code.
+
+  The literal is encoded as compressed blob in a new
+  variable of the header (see encodeBlob), and the node
+  is replaced by the call of this variable. In this way
+  the blob is decompressed only at its first evaluation.
+
+  Parameters
+  ----------
+    node: ast.Constant
+      Ast string (or bytes) node to process
+
+    lut: SymbolTable
+      Symbol table of the aliases for the code obfuscator
+
+    header: dict
+      Lookup table of the header variables
+      to add on the obfuscated code
+
+  Returns
+  -------
+    obf_node: ast.Call
+      The constant node is transformed into a Call
+      one of the header variable.
+
+    header: dict
+      Updated header
+  '''
+
+  # get the variable name from the lut
+  var_name = lut.get('blob', node.value)
+  # update the header according to this new variable
+  if var_name not in header:
+    header[var_name] = encodeBlob(value=node.value)
+
+  # create the new node as call of the variable
+  obf_node = ast.Call(
+    func=ast.Name(
+      id=var_name,
+      ctx=ast.Load()
+    ),
+    args=[],
+    keywords=[]
+  )
+
+  return obf_node, header
+
 def encrypt_constant_bools (node: ast.Constant,
-                            lut: dict,
+                            lut: SymbolTable,
                             header: dict
                             ) -> ast.Constant:
   '''
@@ -647,8 +1182,8 @@ def encrypt_constant_bools (node: ast.Constant,
     node: ast.Constant
       Ast bool node to process
 
-    lut: dict
-      Lookup table for the code obfuscator
+    lut: SymbolTable
+      Symbol table of the aliases for the code obfuscator
 
     header: dict
       Lookup table of the header variables
@@ -667,7 +1202,7 @@ def encrypt_constant_bools (node: ast.Constant,
   value = int(node.value)
 
   # get the variable name by the lut
-  var_name = lut.get(str(node.value), str(node.value))
+  var_name = lut.get('number', node.value, str(node.value))
 
   obf_node = ast.Constant(
     **{**node.__dict__,
@@ -677,12 +1212,14 @@ def encrypt_constant_bools (node: ast.Constant,
        'value' : var_name
     }
   )
-  header[var_name] = NUMBERS_LUT[str(value)]
+  # compare the encoded number with the encoded 1
+  # to get a bool (and not an integer) value
+  header[var_name] = f"({NUMBERS_LUT[str(value)]}=={NUMBERS_LUT['1']})"
 
   return obf_node, header
 
 def encrypt_constant_integers (node: ast.Constant,
-                               lut: dict,
+                               lut: SymbolTable,
                                header: dict
                               ) -> ast.Constant:
   '''
@@ -698,8 +1235,8 @@ def encrypt_constant_integers (node: ast.Constant,
     node: ast.Constant
       Ast integer node to process
 
-    lut: dict
-      Lookup table for the code obfuscator
+    lut: SymbolTable
+      Symbol table of the aliases for the code obfuscator
 
     header: dict
       Lookup table of the header variables
@@ -722,7 +1259,7 @@ def encrypt_constant_integers (node: ast.Constant,
   # update the numbers lut
   NUMBERS_LUT[str(value)] = obf_value
   # get the alias of the variable from the lut
-  var_name = lut.get(value, value)
+  var_name = lut.get('number', value, value)
   # update the header using as key
   # the variable name and as value
   # the encrypted value
@@ -738,7 +1275,7 @@ def encrypt_constant_integers (node: ast.Constant,
   return obf_node, header
 
 def encrypt_constant_floats (node: ast.Constant,
-                             lut: dict,
+                             lut: SymbolTable,
                              header: dict
                             ) -> ast.Constant:
   '''
@@ -754,8 +1291,8 @@ def encrypt_constant_floats (node: ast.Constant,
     node: ast.Constant
       Ast float node to process
 
-    lut: dict
-      Lookup table for the code obfuscator
+    lut: SymbolTable
+      Symbol table of the aliases for the code obfuscator
 
     header: dict
       Lookup table of the header variables
@@ -775,7 +1312,7 @@ def encrypt_constant_floats (node: ast.Constant,
   # encrypt the float node
   obf_value = encodeFloat(number=value)
   # get the alias of the variable from the lut
-  var_name = lut.get(value, value)
+  var_name = lut.get('number', value, value)
   # update the header using as key
   # the variable name and as value
   # the encrypted value
@@ -791,7 +1328,7 @@ def encrypt_constant_floats (node: ast.Constant,
   return obf_node, header
 
 def encrypt_function_def (node: ast.Constant,
-                          lut: dict,
+                          lut: SymbolTable,
                           header: dict
                          ) -> ast.FunctionDef:
   '''
@@ -806,8 +1343,8 @@ def encrypt_function_def (node: ast.Constant,
     node: ast.FunctionDef
       Ast function definition node to process
 
-    lut: dict
-      Lookup table for the code obfuscator
+    lut: SymbolTable
+      Symbol table of the aliases for the code obfuscator
 
     header: dict
       Lookup table of the header variables
@@ -827,13 +1364,13 @@ def encrypt_function_def (node: ast.Constant,
   # of the name according to the global lut
   obf_node = ast.FunctionDef(
     **{**node.__dict__,
-       'name': lut.get(node.name, node.name)
+       'name': lut.get('name', node.name, node.name)
     }
   )
   return obf_node, header
 
 def encrypt_function_arg (node: ast.arg,
-                          lut: dict,
+                          lut: SymbolTable,
                           header: dict
                          ) -> ast.arg:
   '''
@@ -849,8 +1386,8 @@ def encrypt_function_arg (node: ast.arg,
     node: ast.arg
       Ast arg definition node to process
 
-    lut: dict
-      Lookup table for the code obfuscator
+    lut: SymbolTable
+      Symbol table of the aliases for the code obfuscator
 
     header: dict
       Lookup table of the header variables
@@ -870,13 +1407,13 @@ def encrypt_function_arg (node: ast.arg,
   # of the name according to the global lut
   obf_node = ast.arg(
     **{**node.__dict__,
-       'arg': lut.get(node.arg, node.arg)
+       'arg': lut.get('name', node.arg, node.arg)
     }
   )
   return obf_node, header
 
 def encrypt_function_arguments (node: ast.arg,
-                                lut: dict,
+                                lut: SymbolTable,
                                 header: dict
                                ) -> ast.arguments:
   '''
@@ -892,8 +1429,8 @@ def encrypt_function_arguments (node: ast.arg,
     node: ast.arguments
       Ast arguments definition node to process
 
-    lut: dict
-      Lookup table for the code obfuscator
+    lut: SymbolTable
+      Symbol table of the aliases for the code obfuscator
 
     header: dict
       Lookup table of the header variables
@@ -914,7 +1451,7 @@ def encrypt_function_arguments (node: ast.arg,
   obf_node = ast.arguments(
     **{**node.__dict__,
        'arguments': [
-          lut.get(n.arg, n.arg)
+          lut.get('name', n.arg, n.arg)
             for n in node.args
       ]
     }
@@ -922,7 +1459,7 @@ def encrypt_function_arguments (node: ast.arg,
   return obf_node, header
 
 def encrypt_function_keyword (node: ast.keyword,
-                              lut: dict,
+                              lut: SymbolTable,
                               header: dict
                              ) -> ast.keyword:
   '''
@@ -938,8 +1475,8 @@ def encrypt_function_keyword (node: ast.keyword,
     node: ast.keyword
       Ast keyword definition node to process
 
-    lut: dict
-      Lookup table for the code obfuscator
+    lut: SymbolTable
+      Symbol table of the aliases for the code obfuscator
 
     header: dict
       Lookup table of the header variables
@@ -959,13 +1496,52 @@ def encrypt_function_keyword (node: ast.keyword,
   # of the name according to the global lut
   obf_node = ast.keyword(
     **{**node.__dict__,
-       'arg': lut.get(node.arg, node.arg)
+       'arg': lut.get('name', node.arg, node.arg)
+    }
+  )
+  return obf_node, header
+
+def encrypt_global_names (node: ast.Global,
+                          lut: SymbolTable,
+                          header: dict
+                         ) -> ast.Global:
+  '''
+  Encryption of the names declared as global
+  (or nonlocal) by a function.
+
+  The encryption is made by simply replacing the
+  names according to the global lookup table of
+  aliases, as done for their assignments.
+
+  Parameters
+  ----------
+    node: ast.Global
+      Ast global (or nonlocal) statement to process
+
+    lut: SymbolTable
+      Symbol table of the aliases for the code obfuscator
+
+    header: dict
+      Lookup table of the header variables
+      to add on the obfuscated code
+
+  Returns
+  -------
+    obf_node: ast.Global
+      The statement node with the obfuscated names
+
+    header: dict
+      Updated header
+  '''
+  obf_node = node.__class__(
+    **{**node.__dict__,
+       'names': [lut.get('name', name, name) for name in node.names]
     }
   )
   return obf_node, header
 
 def encrypt_class_def (node: ast.ClassDef,
-                       lut: dict,
+                       lut: SymbolTable,
                        header: dict
                       ) -> ast.ClassDef:
   '''
@@ -980,8 +1556,8 @@ def encrypt_class_def (node: ast.ClassDef,
     node: ast.ClassDef
       Ast class definition node to process
 
-    lut: dict
-      Lookup table for the code obfuscator
+    lut: SymbolTable
+      Symbol table of the aliases for the code obfuscator
 
     header: dict
       Lookup table of the header variables
@@ -1001,13 +1577,13 @@ def encrypt_class_def (node: ast.ClassDef,
   # of the name according to the global lut
   obf_node = ast.ClassDef(
     **{**node.__dict__,
-       'name': lut.get(node.name, node.name)
+       'name': lut.get('name', node.name, node.name)
     }
   )
   return obf_node, header
 
 def encrypt_import_aliases (node: ast.Import,
-                            lut: dict,
+                            lut: SymbolTable,
                             header: dict
                             ) -> ast.Import:
   '''
@@ -1022,8 +1598,8 @@ def encrypt_import_aliases (node: ast.Import,
     node: ast.Import
       Ast import node to process
 
-    lut: dict
-      Lookup table for the code obfuscator
+    lut: SymbolTable
+      Symbol table of the aliases for the code obfuscator
 
     header: dict
       Lookup table of the header variables
@@ -1051,12 +1627,12 @@ def encrypt_import_aliases (node: ast.Import,
   # of aliases
   for n in obf_node.names:
     # replace the alias according to the lut
-    n.asname = lut.get(n.asname, n.asname)
+    n.asname = lut.get('name', n.asname, n.asname)
 
   return obf_node, header
 
 def encrypt_variable_name (node: ast.Name,
-                           lut: dict,
+                           lut: SymbolTable,
                            header: dict
                           ) -> ast.Name:
   '''
@@ -1071,8 +1647,8 @@ def encrypt_variable_name (node: ast.Name,
     node: ast.Name
       Ast name definition node to process
 
-    lut: dict
-      Lookup table for the code obfuscator
+    lut: SymbolTable
+      Symbol table of the aliases for the code obfuscator
 
     header: dict
       Lookup table of the header variables
@@ -1092,13 +1668,13 @@ def encrypt_variable_name (node: ast.Name,
   # of the name according to the global lut
   obf_node = ast.Name(
     **{**node.__dict__,
-       'id': lut.get(node.id, node.id)
+       'id': lut.get('name', node.id, node.id)
     }
   )
   return obf_node, header
 
 def encrypt_package_attribute (node: ast.Attribute,
-                               lut: dict,
+                               lut: SymbolTable,
                                header: dict,
                                module_lut: dict
                               ) -> ast.Name:
@@ -1118,8 +1694,8 @@ def encrypt_package_attribute (node: ast.Attribute,
     node: ast.Attribute
       Ast attribute definition node to process
 
-    lut: dict
-      Lookup table for the code obfuscator
+    lut: SymbolTable
+      Symbol table of the aliases for the code obfuscator
 
     header: dict
       Lookup table of the header variables
@@ -1141,22 +1717,19 @@ def encrypt_package_attribute (node: ast.Attribute,
   pkg = module_lut.get(node.value.id, node.value.id)
   # get the attribute full name
   attr = module_lut.get(node.attr, node.attr)
-  # encrypt the package name using hex string
-  pkg = ''.join(f"\\x{ord(c):02x}" for c in pkg)
-  # encrypt the package attribute using hex string
-  attr = ''.join(f"\\x{ord(c):02x}" for c in attr)
   # transform the node into a Name one
   # with the function call given by the
   # 'geattr' function using as much strings as possible ;)
+  # NOTE: the pair is encoded as hex strings once
   obf_node = ast.Name(
-    id = f'getattr(__import__("{pkg}"), "{attr}")',
+    id = LOOKUP_TABLE[pkg, attr],
     ctx = ast.Load()
   )
 
   return obf_node, header
 
 def encrypt_self_attribute (node: ast.Attribute,
-                            lut: dict,
+                            lut: SymbolTable,
                             header: dict
                            ) -> ast.Attribute:
   '''
@@ -1171,8 +1744,8 @@ def encrypt_self_attribute (node: ast.Attribute,
     node: ast.Attribute
       Ast attribute node to process
 
-    lut: dict
-      Lookup table for the code obfuscator
+    lut: SymbolTable
+      Symbol table of the aliases for the code obfuscator
 
     header: dict
       Lookup table of the header variables
@@ -1192,13 +1765,13 @@ def encrypt_self_attribute (node: ast.Attribute,
   # of the name according to the global lut
   obf_node = ast.Attribute(
     **{**node.__dict__,
-       'attr': lut.get(node.attr, node.attr)
+       'attr': lut.get('name', node.attr, node.attr)
     }
   )
   return obf_node, header
 
 def encrypt_generic_attribute (node: ast.Attribute,
-                               lut: dict,
+                               lut: SymbolTable,
                                header: dict
                               ) -> ast.Attribute:
   '''
@@ -1213,8 +1786,8 @@ def encrypt_generic_attribute (node: ast.Attribute,
     node: ast.Attribute
       Ast attribute node to process
 
-    lut: dict
-      Lookup table for the code obfuscator
+    lut: SymbolTable
+      Symbol table of the aliases for the code obfuscator
 
     header: dict
       Lookup table of the header variables
@@ -1235,16 +1808,16 @@ def encrypt_generic_attribute (node: ast.Attribute,
   obf_node = ast.Attribute(
     **{**node.__dict__,
        'value': ast.Name(
-          id = lut.get(node.value.id, node.value.id),
+          id = lut.get('name', node.value.id, node.value.id),
           ctx = ast.Load()
         ),
-       'attr': lut.get(node.attr, node.attr),
+       'attr': lut.get('name', node.attr, node.attr),
     }
   )
   return obf_node, header
 
 def encrypt_builtin_function (node: ast.Call,
-                              lut: dict,
+                              lut: SymbolTable,
                               header: dict
                              ) -> ast.Call:
   '''
@@ -1264,8 +1837,8 @@ def encrypt_builtin_function (node: ast.Call,
     node: ast.Attribute
       Ast attribute definition node to process
 
-    lut: dict
-      Lookup table for the code obfuscator
+    lut: SymbolTable
+      Symbol table of the aliases for the code obfuscator
 
     header: dict
       Lookup table of the header variables
@@ -1281,17 +1854,14 @@ def encrypt_builtin_function (node: ast.Call,
       Updated header
   '''
 
-  # encrypt the package name using hex string
-  pkg = ''.join(f"\\x{ord(c):02x}" for c in 'builtins')
-  # encrypt the package attribute using hex string
-  attr = ''.join(f"\\x{ord(c):02x}" for c in node.func.id)
   # transform the node into a Name one
   # with the function call given by the
   # 'geattr' function using as much strings as possible ;)
+  # NOTE: the pair is encoded as hex strings once
   obf_node = ast.Call(
     **{**node.__dict__,
        'func': ast.Name(
-          id = f'getattr(__import__("{pkg}"), "{attr}")',
+          id = LOOKUP_TABLE['builtins', node.func.id],
           ctx = ast.Load()
         )
     }
@@ -1299,8 +1869,115 @@ def encrypt_builtin_function (node: ast.Call,
 
   return obf_node, header
 
+def encrypt_cached_attribute (node: ast.Attribute,
+                              lut: SymbolTable,
+                              header: dict,
+                              module_lut: dict
+                             ) -> ast.Name:
+  '''
+  Cheap encryption of attributes belonging to external packages.
+
+  The attribute lookup given by the syntax:
+
+  getattr(__import__("pkg"), "attr")
+
+  is moved in a new variable of the header, evaluated
+  only once at the import of the obfuscated code, and
+  the node is replaced by the variable name.
+
+  Parameters
+  ----------
+    node: ast.Attribute
+      Ast attribute definition node to process
+
+    lut: SymbolTable
+      Symbol table of the aliases for the code obfuscator
+
+    header: dict
+      Lookup table of the header variables
+      to add on the obfuscated code
+
+    module_lut: dict
+      Lookup table of module aliases
+
+  Returns
+  -------
+    obf_node: ast.Name
+      The name node given by the header variable
+
+    header: dict
+      Updated header
+  '''
+  # get the package full name
+  pkg = module_lut.get(node.value.id, node.value.id)
+  # get the attribute full name
+  attr = module_lut.get(node.attr, node.attr)
+
+  # the pair must be in the lut
+  if not lut.has('attribute', (pkg, attr)):
+    return node, header
+
+  # get the variable name from the lut
+  var_name = lut.get('attribute', (pkg, attr))
+  # update the header with the package lookup
+  header[var_name] = LOOKUP_TABLE[pkg, attr]
+
+  # create the new node using the name of the variable
+  obf_node = ast.Name(
+    id=var_name,
+    ctx=ast.Load()
+  )
+
+  return obf_node, header
+
+def encrypt_cached_builtin (node: ast.Call,
+                            lut: SymbolTable,
+                            header: dict
+                           ) -> ast.Call:
+  '''
+  Cheap encryption of builtin function names.
+
+  The builtin function lookup is moved in the header as
+  a new variable, named as the function alias, given by the
+  syntax:
+
+  getattr(__import__("builtins"), "attr")
+
+  The node is left unchanged, since the function name
+  will be replaced by its alias as any other name.
+
+  Parameters
+  ----------
+    node: ast.Call
+      Ast call node to process
+
+    lut: SymbolTable
+      Symbol table of the aliases for the code obfuscator
+
+    header: dict
+      Lookup table of the header variables
+      to add on the obfuscated code
+
+  Returns
+  -------
+    obf_node: ast.Call
+      The unchanged call node
+
+    header: dict
+      Updated header
+  '''
+
+  # the function name must be in the lut
+  if not lut.has('name', node.func.id):
+    return node, header
+
+  # update the header with the builtin lookup
+  header[lut.get('name', node.func.id)] = LOOKUP_TABLE['builtins', node.func.id]
+
+  return node, header
+
 def encrypt_generic_function (node: ast.Call,
-                              lut: dict,
+                              lut: SymbolTable,
                               header: dict
                              ) -> ast.Call:
   '''
@@ -1315,8 +1992,8 @@ def encrypt_generic_function (node: ast.Call,
     node: ast.Call
       Ast callable node to process
 
-    lut: dict
-      Lookup table for the code obfuscator
+    lut: SymbolTable
+      Symbol table of the aliases for the code obfuscator
 
     header: dict
       Lookup table of the header variables
@@ -1337,7 +2014,7 @@ def encrypt_generic_function (node: ast.Call,
   obf_node = ast.Call(
     **{**node.__dict__,
      'func': ast.Name(
-        id = lut.get(node.func.id, node.func.id),
+        id = lut.get('name', node.func.id, node.func.id),
         ctx = ast.Load()
       ),
     }
@@ -1345,7 +2022,7 @@ def encrypt_generic_function (node: ast.Call,
   return obf_node, header
 
 def encrypt_fstring_constant (node: ast.Constant,
-                              lut: dict,
+                              lut: SymbolTable,
                               header: dict
                              ) -> ast.Constant:
   '''
@@ -1361,8 +2038,8 @@ def encrypt_fstring_constant (node: ast.Constant,
     node: ast.Constant
       Ast constant string node to process
 
-    lut: dict
-      Lookup table for the code obfuscator
+    lut: SymbolTable
+      Symbol table of the aliases for the code obfuscator
 
     header: dict
       Lookup table of the header variables
@@ -1379,9 +2056,9 @@ def encrypt_fstring_constant (node: ast.Constant,
   '''
 
   # get the variable name from the lut
-  var_name = lut.get(node.value, node.value)
+  var_name = lut.get('string', node.value, node.value)
   # get the encoded value of the string
-  obf_value = ''.join(f"\\x{ord(c):02x}" for c in node.value)
+  obf_value = encodeHex(text=node.value)
   # update the header according to this new variable
   header[var_name] = f'"".join(chr(x) if isinstance(x, int) else x for x in "{obf_value}")'
 
@@ -1391,11 +2068,14 @@ def encrypt_fstring_constant (node: ast.Constant,
        'value': '{' + var_name + '}'
     }
   )
+  # the header variable of the field is kept, so the
+  # f-string could be also emitted as a format call
+  obf_node.field = var_name
 
   return obf_node, header
 
 def encrypt_fstring_value (node: ast.FormattedValue,
-                           lut: dict,
+                           lut: SymbolTable,
                            header: dict
                           ) -> ast.FormattedValue:
   '''
@@ -1409,8 +2089,8 @@ def encrypt_fstring_value (node: ast.FormattedValue,
     node: ast.FormattedValue
       Ast string node to process
 
-    lut: dict
-      Lookup table for the code obfuscator
+    lut: SymbolTable
+      Symbol table of the aliases for the code obfuscator
 
     header: dict
       Lookup table of the header variables
@@ -1432,7 +2112,7 @@ def encrypt_fstring_value (node: ast.FormattedValue,
       **{**node.__dict__,
         'value':ast.Name(
           **{**node.value.__dict__,
-            'id': lut.get(node.value.id, node.value.id)
+            'id': lut.get('name', node.value.id, node.value.id)
           }
         )
       }
@@ -1444,7 +2124,7 @@ def encrypt_fstring_value (node: ast.FormattedValue,
     return node, header
 
 def encrypt_joined_string (node: ast.JoinedStr,
-                           lut: dict,
+                           lut: SymbolTable,
                            header: dict
                           ) -> ast.JoinedStr:
   '''
@@ -1458,8 +2138,8 @@ def encrypt_joined_string (node: ast.JoinedStr,
     node: ast.JoinedStr
       Ast string node to process
 
-    lut: dict
-      Lookup table for the code obfuscator
+    lut: SymbolTable
+      Symbol table of the aliases for the code obfuscator
 
     header: dict
       Lookup table of the header variables
@@ -1515,7 +2195,7 @@ def encrypt_joined_string (node: ast.JoinedStr,
   return obf_node, header
 
 def encrypt_binary_operator (node: ast.BinOp,
-                             lut: dict,
+                             lut: SymbolTable,
                              header: dict
                             ) -> ast.Call:
   '''
@@ -1530,8 +2210,8 @@ def encrypt_binary_operator (node: ast.BinOp,
     node: ast.BinOp
       Ast binary operator node to process
 
-    lut: dict
-      Lookup table for the code obfuscator
+    lut: SymbolTable
+      Symbol table of the aliases for the code obfuscator
 
     header: dict
       Lookup table of the header variables
@@ -1548,10 +2228,9 @@ def encrypt_binary_operator (node: ast.BinOp,
   '''
   # get the operator func from the global lut
   operator = op_lut[type(node.op)]
-  # encode the operator string as hex
-  enc_operator = [ord(x) for x in operator]
 
   # transform the node into a call
+  # NOTE: the encoded operator name is shared by all the nodes
   obf_node = ast.Call(
     func=ast.Call(
       func=ast.Name(
@@ -1560,50 +2239,7 @@ def encrypt_binary_operator (node: ast.BinOp,
       ),
       args=[
         node.left, # left member of operator
-        #ast.Constant(
-        #  value=enc_operator
-        #),
-        ast.Call(
-          func=ast.Attribute(
-            value=ast.Constant(value=''),
-            attr='join',
-            ctx=ast.Load()
-          ),
-          args=[
-            ast.GeneratorExp(
-              elt=ast.Call(
-                func=ast.Name(
-                  id='chr',
-                  ctx=ast.Load()
-                ),
-                args=[ast.Name(
-                  id='x',
-                  ctx=ast.Load()
-                  )
-                ],
-                keywords=[]
-              ),
-              generators=[
-                ast.comprehension(
-                  target=ast.Name(
-                    id='x',
-                    ctx=ast.Store()
-                  ),
-                  iter=ast.List(
-                    elts=[
-                      ast.Constant(value=x)
-                        for x in enc_operator
-                    ],
-                    ctx=ast.Load()
-                  ),
-                  ifs=[],
-                  is_async=0
-                )
-              ]
-            )
-          ],
-          keywords=[]
-        )
+        OPERATOR_TABLE[operator],
       ],
       keywords=[]
     ),
@@ -1613,8 +2249,173 @@ def encrypt_binary_operator (node: ast.BinOp,
 
   return obf_node, header
 
+def encrypt_cached_operator (node: ast.BinOp,
+                             lut: SymbolTable,
+                             header: dict
+                            ) -> ast.Call:
+  '''
+  Cheap encryption of binary operator nodes.
+
+  The operator is replaced by the call of the function
+  of the operator module, whose lookup is moved in the
+  header as a new variable given by the syntax:
+
+  getattr(__import__("operator"), "__add__")
+
+  The call of a cached builtin function is specialized
+  by the adaptive interpreter (python 3.11+), while the
+  lookup of the magic method is not.
+
+  Parameters
+  ----------
+    node: ast.BinOp
+      Ast binary operator node to process
+
+    lut: SymbolTable
+      Symbol table of the aliases for the code obfuscator
+
+    header: dict
+      Lookup table of the header variables
+      to add on the obfuscated code
+
+  Returns
+  -------
+    obf_node: ast.Call
+      The call of the operator function (or the unchanged
+      node if the operator is not in the lut)
+
+    header: dict
+      Updated header
+  '''
+  # get the operator func from the global lut
+  operator = op_lut[type(node.op)]
+
+  # the operator must be in the lut
+  if not lut.has('attribute', ('operator', operator)):
+    return node, header
+
+  # get the variable name from the lut
+  var_name = lut.get('attribute', ('operator', operator))
+  # update the header with the operator lookup
+  header[var_name] = LOOKUP_TABLE['operator', operator]
+
+  # create the new node as call of the variable
+  obf_node = ast.Call(
+    func=ast.Name(
+      id=var_name,
+      ctx=ast.Load()
+    ),
+    args=[node.left, node.right],
+    keywords=[]
+  )
+
+  return obf_node, header
+
+def prune_header_variables (header : dict,
+                            references : set
+                           ) -> tuple:
+  '''
+  Remove the header variables which are not referenced
+  by the obfuscated code and merge the variables with
+  the same value in a single binding.
+
+  Parameters
+  ----------
+    header: dict
+      Lookup table of the header variables
+      to add on the obfuscated code
+
+    references: set
+      Set of the aliases found in the obfuscated code
+      (see ALIAS_REGEX), including the ones inside the
+      evaluated strings
+
+  Returns
+  -------
+    header: dict
+      Lookup table of the remaining header variables
+
+    aliases: dict
+      Lookup table of the variables bound to the same
+      value of each remaining variable
+
+    report: dict
+      Number of removed and merged variables, and the
+      lines and bytes saved in the header
+  '''
+
+  # the variables which are not aliases are always kept
+  todo = [k for k in header
+    if k in references or not ALIAS_REGEX.fullmatch(k)
+  ]
+  live = set()
+
+  # the header values could refer to other variables
+  while todo:
+    k = todo.pop()
+    if k in live:
+      continue
+    live.add(k)
+    todo.extend(ref for ref in ALIAS_REGEX.findall(header[k]) if ref in header)
+
+  pruned = {}
+  aliases = {}
+  # first variable of each value
+  canonical = {}
+  saved = 0
+
+  for k, v in header.items():
+
+    # each removed line is given by 'k = v\n'
+    if k not in live:
+      saved += len(k) + len(v) + 4
+      continue
+
+    first = canonical.setdefault(v, k)
+
+    if first == k:
+      pruned[k] = v
+    else:
+      # the line is replaced by a new target 'k = '
+      # of the first binding of the value
+      aliases.setdefault(first, []).append(k)
+      saved += len(v) + 1
+
+  merged = sum(len(names) for names in aliases.values())
+
+  report = {
+    'dead' : len(header) - len(live),
+    'merged' : merged,
+    'lines' : len(header) - len(pruned),
+    'bytes' : saved,
+  }
+
+  return pruned, aliases, report
+
+def format_header_report (report : dict) -> str:
+  '''
+  Format the report of the header pruning as a
+  human readable line.
+
+  Parameters
+  ----------
+    report : dict
+      Report of the pruning as given by the header_report
+      attribute of the Obfuscator object
+
+  Returns
+  -------
+    text : str
+      Formatted report
+  '''
+  return (f'pyhide header report: {report["entries"]} variables '
+          f'({report["dead"]} removed, {report["merged"]} merged), '
+          f'{report["lines"]} lines and {report["bytes"]} bytes saved'
+  )
+
 def add_header_variables (root : ast.Module,
-                          header : dict
+                          header : dict,
+                          aliases : dict = None,
                          ) -> ast.Module:
   '''
   Add extra variable in the header of the obfuscated
@@ -1629,6 +2430,11 @@ def add_header_variables (root : ast.Module,
       Lookup table of the header variables
       to add on the obfuscated code
 
+    aliases: dict (default=None)
+      Lookup table of the variables bound to the same
+      value of each header variable (see
+      prune_header_variables)
+
   Returns
   -------
     root: ast.Module
@@ -1639,15 +2445,22 @@ def add_header_variables (root : ast.Module,
   # creation of new variables that must be put
   # as header of the obfuscated script
   # Now it is time to add them...
+  aliases = aliases or {}
 
-  # loop along the keys and values of the header
-  for k, v in header.items():
-    # add a new variable item
-    root = insert_new_variable_in_header(
-      root=root,
-      name=k, # variable name
-      value=v, # variable value (encoded)
-    )
+  # create all the new variables at once, in reversed
+  # order as for their insertion one by one on top
+  variables = [
+    ast.Assign(targets=[
+      ast.Name(id=name, ctx=ast.Store()) # variable names
+        for name in [k] + aliases.get(k, [])
+    ],
+    value=ast.Constant(value=v)) # variable value (encoded)
+    for k, v in reversed(header.items())
+  ]
+  root.body[:0] = variables
+
+  # fix the code line numbers only once
+  fix_missing_locations(root)
 
   return root
 
@@ -0,0 +1,1020 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import ast
+
+from ._encoder import NUMBERS_LUT
+from ._encoder import MAX_OPERATOR_DEPTH
+from ._encoder import _BUILT_IN
+from ._encoder import encodeBlob
+from ._encoder import op_lut
+from ._profile import LEVEL_OFF
+from ._profile import LEVEL_FULL
+from ._scopes import COMPREHENSION_NAMES
+from ._scopes import NAME_FIELDS
+from ._scopes import IDENTIFIER_FIELDS
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+# size of the encoded 0 and 1, i.e. the bits of
+# the integer encoding
+BIT_SIZE = len(NUMBERS_LUT['1'])
+
+# size of the hex encoding of each char, with the longer
+# escapes of the code points above 0xff and 0xffff
+HEX_SIZE = len('\\x00')
+UNICODE_SIZES = (len('\\u0000') - HEX_SIZE, len('\\U00000000') - HEX_SIZE)
+
+# templates of the emitted code, whose sizes are used
+# by the closed-form formulas of the encoders
+STRING_TEMPLATE = 'eval("str(\'\'.join(chr(x) if isinstance(x, int) else x for x in []))")'
+HEX_TEMPLATE = '"".join(chr(x) if isinstance(x, int) else x for x in "")'
+FLOAT_TEMPLATE = 'float(str("".join(chr(x) if isinstance(x, int) else x for x in "")))'
+LOOKUP_TEMPLATE = 'getattr(__import__(""), "")'
+OPERATOR_TEMPLATE = "getattr(, ''.join((chr(x) for x in [])))()"
+
+# size of the native binary operators, with their spaces
+OPERATOR_SIZES = {op : len(ast.unparse(ast.BinOp(left=ast.Name(id=''), op=op(), right=ast.Name(id=''))))
+  for op in op_lut
+}
+
+# indentation of the unparsed code
+INDENT_SIZE = 4
+
+# the comprehensions have their own scope up to python 3.11,
+# while they are inlined in the enclosing one by newer versions
+COMPREHENSION_SCOPES = sys.version_info < (3, 12)
+
+# node types without any value or name, which are
+# skipped by the walk (e.g. the expression contexts)
+LEAF_TYPES = frozenset(node_type
+  for base in (ast.expr_context, ast.boolop, ast.operator, ast.unaryop, ast.cmpop)
+    for node_type in base.__subclasses__()
+)
+
+# node types which open a scope or bind a name
+SCOPE_TYPES = frozenset((ast.Import, ast.ImportFrom, ast.Global, ast.Nonlocal, ast.arg, ast.arguments,
+                         ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda, ast.ClassDef) +
+                        tuple(NAME_FIELDS) + (tuple(COMPREHENSION_NAMES) if COMPREHENSION_SCOPES else ()))
+
+# node types handled by the renaming pass
+RENAME_TYPES = (ast.Name, ast.FunctionDef, ast.arg, ast.arguments, ast.keyword,
+                ast.ClassDef, ast.ImportFrom, ast.Global, ast.Nonlocal)
+
+
+def get_integer_size (number : int) -> int:
+  '''
+  Get the size of the encoded integer (see encodeInteger)
+  without encoding it.
+
+  Each set bit of the number is encoded as a term, joined
+  by '+' and wrapped in parentheses. The bit 0 is the encoded
+  1, the bit 1 is the shift of 1 by 1, while the bit k is the
+  shift by 1 of the encoded 2^(k-1), so the size of its term
+  grows linearly with k.
+
+  Parameters
+  ----------
+    number : int
+      Non-negative integer number
+
+  Returns
+  -------
+    size : int
+      Size of the encoded number
+
+  Notes
+  -----
+  The size is given for the initial lookup table of the
+  numbers, while the encoder could reuse the numbers already
+  encoded, so it is an upper bound of the emitted size.
+  '''
+
+  if number in (0, 1):
+    return BIT_SIZE
+
+  size = 0
+  n_bits = 0
+
+  for shift, bit in enumerate(reversed(bin(number)[2:])):
+    if bit == '0':
+      continue
+
+    if shift == 0:
+      size += BIT_SIZE
+    else:
+      # (1<<1) for the bit 1 and (2^(k-1)<<1) for the bit k
+      size += 2 * BIT_SIZE + 4 + (shift - 1) * (BIT_SIZE + 6)
+
+    n_bits += 1
+
+  return size + n_bits - 1 + 2
+
+def get_hex_size (text : str) -> int:
+  '''
+  Get the size of the escaped string (see encodeHex)
+  without encoding it.
+
+  Parameters
+  ----------
+    text : str
+      String to encode
+
+  Returns
+  -------
+    size : int
+      Size of the escaped string
+  '''
+
+  size = HEX_SIZE * len(text)
+
+  if not text.isascii():
+    size += sum(UNICODE_SIZES[c > '\uffff'] for c in text if c > '\xff')
+
+  return size
+
+def get_float_size (number : float) -> int:
+  '''
+  Get the size of the encoded float (see encodeFloat)
+  without encoding it.
+
+  Parameters
+  ----------
+    number : float
+      Float number
+
+  Returns
+  -------
+    size : int
+      Size of the encoded number
+  '''
+  return len(FLOAT_TEMPLATE) + get_hex_size(str(number))
+
+def get_lookup_size (pkg : str, attr : str) -> int:
+  '''
+  Get the size of the encoded attribute lookup of
+  a package (or of a builtin function).
+
+  Parameters
+  ----------
+    pkg : str
+      Name of the package
+
+    attr : str
+      Name of the attribute
+
+  Returns
+  -------
+    size : int
+      Size of the getattr expression
+  '''
+  return len(LOOKUP_TEMPLATE) + get_hex_size(pkg) + get_hex_size(attr)
+
+def iter_source_files (path : str) -> str:
+  '''
+  Get the python files of a directory tree, in
+  alphabetical order.
+
+  Parameters
+  ----------
+    path : str
+      Path of a python file or of a directory
+
+  Yields
+  ------
+    filename : str
+      Path of each python file
+  '''
+
+  if not os.path.isdir(path):
+    yield path
+    return
+
+  for root, dirs, files in os.walk(path):
+    # skip the hidden directories (e.g. .git) and the caches
+    dirs[:] = sorted(d for d in dirs if not d.startswith('.') and d != '__pycache__')
+
+    for filename in sorted(files):
+      if filename.endswith('.py'):
+        yield os.path.join(root, filename)
+
+def get_native_size (code : str) -> int:
+  '''
+  Get the size of the unparsed code from the source text,
+  without parsing and unparsing it.
+
+  The blank lines and the comments are dropped, the indentation
+  is replaced by the one of the unparser and the continuation
+  lines are joined to their statement, while the lines of the
+  multi-line strings are kept as they are.
+
+  Parameters
+  ----------
+    code : str
+      Source code
+
+  Returns
+  -------
+    size : int
+      Size of the native code
+  '''
+
+  size = 0
+  # widths of the open indentation levels
+  indents = [0]
+  # open brackets of the continuation lines
+  brackets = 0
+  continued = False
+  # quotes of the open multi-line string
+  quotes = None
+
+  for line in code.splitlines():
+
+    if quotes is not None:
+      size += len(line) + 1
+      if line.count(quotes) % 2:
+        quotes = None
+      continue
+
+    text = line.strip()
+
+    if not text or text[0] == '#':
+      continue
+
+    # the inline comments are dropped if they could not
+    # be part of a string
+    if '#' in text and '"' not in text and "'" not in text:
+      text = text[:text.index('#')].rstrip()
+
+    if brackets > 0 or continued:
+      # the line break is replaced by a space
+      size += len(text)
+
+    else:
+      width = len(line) - len(line.lstrip())
+      while width < indents[-1]:
+        indents.pop()
+      if width > indents[-1]:
+        indents.append(width)
+
+      size += INDENT_SIZE * (len(indents) - 1) + len(text) + 1
+
+    for delimiters in ('"""', "'''"):
+      if text.count(delimiters) % 2:
+        quotes = delimiters
+        break
+
+    brackets = max(brackets + text.count('(') + text.count('[') + text.count('{')
+                   - text.count(')') - text.count(']') - text.count('}'), 0)
+    continued = text.endswith('\\')
+
+  return size
+
+
+class _Frame (object):
+  '''
+  Scope of the code tree found by the walk of the estimate,
+  which approximates the symbol table of the compiler
+  (see resolve_scopes).
+
+  Parameters
+  ----------
+    kind : str
+      Kind of the scope (module, class, function)
+
+    parent : _Frame
+      Enclosing scope (None for the module)
+
+    qualname : str
+      Qualified name of the scope
+  '''
+
+  __slots__ = ('kind', 'parent', 'qualname', 'bound', 'params', 'imported', 'namespaces',
+               'declared', 'nonlocals', 'blocked', 'counts', 'aliases', 'size')
+
+  def __init__ (self, kind : str, parent : object, qualname : str):
+    self.kind = kind
+    self.parent = parent
+    self.qualname = qualname if parent is None or parent.kind == 'module' else f'{parent.qualname}.{qualname}'
+
+    # names bound by the scope
+    self.bound = set()
+    # parameters which could be passed by keyword
+    self.params = set()
+    # imported names and nested definitions
+    self.imported = set()
+    self.namespaces = set()
+    # names declared as global or nonlocal
+    self.declared = set()
+    self.nonlocals = set()
+    # names bound by the nested classes
+    self.blocked = set()
+    # number of uses and index of the alias of each renamed name
+    self.counts = {}
+    self.aliases = {}
+    # number of aliases taken by the enclosing functions
+    self.size = 0
+
+  def get_owner (self, name : str) -> object:
+    '''
+    Get the function scope in which the name is defined,
+    following the free names along the enclosing functions.
+    '''
+    scope = self
+
+    while scope is not None:
+
+      if scope.kind == 'module' or name in scope.declared:
+        return None
+
+      if name in scope.bound and name not in scope.nonlocals:
+        return scope if scope.kind == 'function' else None
+
+      # the free names are defined by the nearest
+      # enclosing function, skipping the classes
+      scope = scope.parent
+      while scope is not None and scope.kind == 'class':
+        scope = scope.parent
+
+    return None
+
+  def get_renamable (self) -> set:
+    '''
+    Get the local names of a function scope which
+    could be renamed.
+    '''
+    return {name
+      for name in self.bound - self.declared - self.nonlocals - self.imported - self.namespaces
+        if name.isidentifier() and name not in self.params and name not in self.blocked
+    }
+
+def scan_code (root : ast.Module, rename : bool = True) -> tuple:
+  '''
+  Collect the values, the local scopes and the nodes to
+  measure of the code tree by a single walk.
+
+  The walk replaces the collection of the symbols (see
+  collect_symbols), the resolution of the local scopes
+  by the symbol table of the compiler (see resolve_scopes)
+  and the traversal of the passes, so the scopes are an
+  approximation of the ones of the compiler (e.g. the
+  annotation scopes are not considered).
+
+  Parameters
+  ----------
+    root : ast.Module
+      Code tree to estimate
+
+    rename : bool (default=True)
+      Enable/Disable the renaming of the local variables.
+      The calls of the definitions named as the builtin
+      functions are found anyway
+
+  Returns
+  -------
+    symbols : dict
+      Lookup table of the values found in the code, as
+      given by collect_symbols with all the encodings
+
+    scopes : dict
+      Renamed local variables, as given by resolve_scopes
+
+    nodes : list
+      List of the (kind, node, depth) records of the nodes
+      which could be matched by the passes, in the order
+      of the traversal
+  '''
+
+  strings = set()
+  values = set()
+  numbers = {}
+  var_names = set()
+  fun_names = set()
+  called = set()
+  attributes = set()
+  cls_names = set()
+  mod_lut = {}
+  pairs = set()
+  operators = set()
+
+  nodes = []
+  sites = []
+  identifiers = set()
+
+  module = _Frame(kind='module', parent=None, qualname='<module>')
+  functions = []
+  classes = []
+
+  todo = [(root, 0, module)]
+
+  while todo:
+
+    node, depth, frame = todo.pop()
+    cls = node.__class__
+
+    if cls in LEAF_TYPES:
+      continue
+
+    child_depth = depth + isinstance(node, ast.expr)
+
+    # values and nodes to measure
+    if cls is ast.Constant:
+      value = node.value
+      if isinstance(value, str):
+        strings.add(value)
+      elif isinstance(value, bytes):
+        values.add(value)
+      elif isinstance(value, (int, float, complex)) and not isinstance(value, bool):
+        numbers[(type(value), value)] = value
+      nodes.append(('constant', node, depth))
+      continue
+
+    if cls is ast.Name:
+      if not isinstance(node.ctx, ast.Load):
+        var_names.add(node.id)
+        frame.bound.add(node.id)
+      sites.append((node, 'id', node.id, frame))
+      nodes.append(('rename', node, depth))
+      continue
+
+    if cls is ast.Attribute:
+      if isinstance(node.value, ast.Name):
+        var_names.add(node.attr)
+        attributes.add(node.attr)
+        pairs.add((node.value.id, node.attr))
+        nodes.append(('attribute', node, depth))
+    elif cls is ast.Call:
+      if isinstance(node.func, ast.Name):
+        called.add(node.func.id)
+        nodes.append(('call', node, depth))
+    elif cls is ast.BinOp:
+      operators.add(op_lut[type(node.op)])
+      nodes.append(('operator', node, depth))
+    elif cls is ast.JoinedStr:
+      nodes.append(('fstring', node, depth))
+    elif cls is ast.Import:
+      nodes.append(('import', node, depth))
+    elif cls in RENAME_TYPES:
+      nodes.append(('rename', node, depth))
+
+    for field in IDENTIFIER_FIELDS.get(cls, ()):
+      identifiers.add(getattr(node, field))
+
+    # the nodes which do not bind any name are walked as they are
+    # NOTE: the order of the siblings does not change the scopes
+    if cls not in SCOPE_TYPES:
+      todo.extend([(n, child_depth, frame) for n in ast.iter_child_nodes(node)])
+      continue
+
+    # scopes of the names
+    if cls in (ast.Import, ast.ImportFrom):
+      for mod in node.names:
+        identifiers.update((mod.name, mod.asname))
+        if mod.name == '*':
+          continue
+        if cls is ast.Import:
+          mod_lut[mod.asname or mod.name] = mod.name
+        elif mod.asname is None:
+          mod_lut[mod.name] = node.module
+        else:
+          mod_lut[mod.asname] = mod.name
+          mod_lut[mod.name] = node.module
+        name = mod.asname or mod.name.partition('.')[0]
+        frame.bound.add(name)
+        frame.imported.add(name)
+      continue
+
+    if cls in (ast.Global, ast.Nonlocal):
+      (frame.declared if cls is ast.Global else frame.nonlocals).update(node.names)
+      sites.extend((node, i, name, frame) for i, name in enumerate(node.names))
+      continue
+
+    if cls is ast.arg:
+      frame.bound.add(node.arg)
+      sites.append((node, 'arg', node.arg, frame))
+      # the annotations are evaluated by the enclosing scope
+      if node.annotation is not None:
+        todo.append((node.annotation, depth, frame.parent))
+      continue
+
+    field = NAME_FIELDS.get(cls)
+    if field is not None and getattr(node, field) is not None:
+      frame.bound.add(getattr(node, field))
+      sites.append((node, field, getattr(node, field), frame))
+
+    if cls in (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda):
+      args = node.args
+      child = _Frame(kind='function', parent=frame,
+        qualname='<lambda>' if cls is ast.Lambda else node.name
+      )
+      functions.append((child, node))
+      child.params.update(arg.arg for arg in args.args + args.kwonlyargs)
+
+      inner = [args]
+      outer = args.defaults + [default for default in args.kw_defaults if default is not None]
+
+      if cls is ast.Lambda:
+        inner.append(node.body)
+      else:
+        frame.bound.add(node.name)
+        frame.namespaces.add(node.name)
+        if cls is ast.FunctionDef:
+          var_names.update(arg.arg for arg in args.args)
+          if not node.name.startswith('__'):
+            fun_names.add(node.name)
+        outer += node.decorator_list + ([node.returns] if node.returns is not None else [])
+        inner += node.body
+
+      # NOTE: the nodes are popped in reverse order, so the
+      # enclosing nodes are visited before the body
+      todo.extend((n, child_depth, child) for n in reversed(inner))
+      todo.extend((n, child_depth, frame) for n in reversed(outer))
+      continue
+
+    if cls is ast.arguments:
+      # the defaults are visited by the function node
+      args = node.posonlyargs + node.args + [node.vararg] + node.kwonlyargs + [node.kwarg]
+      todo.extend((arg, depth, frame) for arg in reversed(args) if arg is not None)
+      continue
+
+    if cls is ast.ClassDef:
+      cls_names.add(node.name)
+      frame.bound.add(node.name)
+      frame.namespaces.add(node.name)
+      child = _Frame(kind='class', parent=frame, qualname=node.name)
+      classes.append(child)
+
+      outer = node.bases + node.keywords + node.decorator_list
+      todo.extend((n, depth, child) for n in reversed(node.body))
+      todo.extend((n, depth, frame) for n in reversed(outer))
+      continue
+
+    if COMPREHENSION_SCOPES and cls in COMPREHENSION_NAMES:
+      name = COMPREHENSION_NAMES[cls]
+      child = _Frame(kind='function', parent=frame, qualname=f'<{name}>')
+      functions.append((child, node))
+
+      # the first iterable is evaluated by the enclosing scope
+      first, *others = node.generators
+      inner = [first.target] + first.ifs + others
+      inner += [node.key, node.value] if cls is ast.DictComp else [node.elt]
+
+      todo.extend((n, child_depth, child) for n in reversed(inner))
+      todo.append((first.iter, child_depth, frame))
+      continue
+
+    todo.extend([(n, child_depth, frame) for n in ast.iter_child_nodes(node)])
+
+  # the class names are class attributes, so the
+  # enclosing functions could not rename them
+  for scope in classes:
+    parent = scope.parent
+    while parent is not None:
+      if parent.kind == 'function':
+        parent.blocked.update(scope.bound)
+      parent = parent.parent
+
+  renamable = {id(scope) : scope.get_renamable() for scope, _ in functions} if rename else {}
+  definitions = module.bound - module.imported
+
+  owners = []
+  bound = set()
+
+  for node, field, name, scope in sites:
+    owner = scope.get_owner(name)
+
+    # the calls of the user definitions named as builtin
+    # functions must not be replaced by the builtin lookups
+    if field == 'id' and name in _BUILT_IN and isinstance(node.ctx, ast.Load):
+      binding = owner or (scope if scope.kind == 'class' and name in scope.bound else None)
+      if binding is not None and name not in binding.imported or binding is None and name in definitions:
+        bound.add((node.lineno, node.col_offset))
+
+    if owner is None or name not in renamable.get(id(owner), ()):
+      owner = None
+    else:
+      owner.counts[name] = owner.counts.get(name, 0) + 1
+
+    owners.append(owner)
+
+  # give the aliases to the local names, sorted by number of
+  # uses, after the aliases of the enclosing functions
+  reserved = 0
+  local_names = []
+
+  for scope, _ in functions:
+    parent = scope.parent
+    while parent is not None and parent.kind != 'function':
+      parent = parent.parent
+    scope.size = 0 if parent is None else parent.size + len(parent.aliases)
+
+    names = sorted(scope.counts, key=lambda name : (-scope.counts[name], name))
+    scope.aliases = {name : scope.size + i for i, name in enumerate(names)}
+    reserved = max(reserved, scope.size + len(names))
+
+    local_names.extend((index, name, scope.qualname) for name, index in scope.aliases.items())
+
+  renamed = []
+
+  for (node, field, name, scope), owner in zip(sites, owners):
+    if owner is None:
+      identifiers.add(name)
+    else:
+      renamed.append((node, field, name, owner.aliases[name]))
+
+  names = {name for _, _, name, _ in renamed}
+
+  modules = set(mod_lut.values())
+
+  symbols = {
+    'chars' : [ord(c) for c in sorted(set(''.join(strings)) - {' '})],
+    'strings' : sorted(strings),
+    'bytes' : sorted(values),
+    'numbers' : sorted(numbers.values(), key=lambda x : (type(x).__name__, repr(x))),
+    'var_names' : sorted(var_names),
+    'fun_names' : sorted(fun_names) +
+                  sorted(name for name in called if name in _BUILT_IN or name in modules) +
+                  sorted(attributes),
+    'cls_names' : sorted(cls_names),
+    'mod_lut' : mod_lut,
+    'pkg_attrs' : sorted({(mod_lut[pkg], mod_lut.get(attr, attr)) for pkg, attr in pairs if pkg in mod_lut}),
+    'operators' : sorted(operators),
+  }
+
+  scopes = {
+    'reserved' : reserved,
+    'names' : names,
+    'kept' : identifiers,
+    'excluded' : names - identifiers,
+    'definitions' : definitions,
+    'bound' : bound,
+    'renamed' : renamed,
+    'locals' : local_names,
+  }
+
+  return symbols, scopes, nodes
+
+
+class SizeEstimator (object):
+  '''
+  Estimate of the obfuscated code size given by the
+  closed-form sizes of the encoders.
+
+  The estimator is called by the obfuscator traversal in
+  place of the passes (or it measures the nodes found by
+  the walk of the code), so each matched node is measured
+  with its encoding level but it is never transformed.
+  The header is measured after its pruning, i.e. only the
+  variables referenced by the code are counted.
+
+  Parameters
+  ----------
+    lut : SymbolTable
+      Symbol table of the aliases for the code obfuscator
+
+    module_lut : dict
+      Lookup table of module aliases
+
+    reduce_code_length : bool
+      Enable/Disable the integer encoding of the strings
+
+  Attributes
+  ----------
+    growth : int
+      Size added to the native code by the transformations
+
+    header : dict
+      Lookup table of the size of the header variables
+
+    nodes : dict
+      Number of transformed nodes of each pass
+  '''
+
+  def __init__ (self, lut : object, module_lut : dict, reduce_code_length : bool):
+
+    self.lut = lut
+    self.module_lut = module_lut
+    self.reduce_code_length = reduce_code_length
+
+    self.growth = 0
+    self.header = {}
+    self.nodes = {}
+
+    # nodes replaced with their parent, which are
+    # not emitted in the obfuscated code
+    self._replaced = set()
+    # size growth of the encoded strings and sizes
+    # of their encoded chars
+    self._strings = {}
+    self._chars = {}
+
+  def _encode_char (self, c : str) -> int:
+    # size of the char in the encoded string, adding
+    # its header variable
+    if not self.lut.has('char', ord(c)):
+      return len(repr(c))
+    alias = self.lut.get('char', ord(c))
+    self.header[alias] = len(str(ord(c))) if self.reduce_code_length else get_integer_size(ord(c))
+    return len(alias)
+
+  def _rename (self, name : str) -> int:
+    # size growth of a renamed identifier
+    if name is None or not self.lut.has('name', name):
+      return 0
+    return len(self.lut.get('name', name)) - len(name)
+
+  def _measure (self, name : str, node : ast.AST, level : int, context : dict) -> int:
+    '''
+    Get the size growth of a transformed node, updating
+    the header sizes.
+    '''
+    lut = self.lut
+
+    if name == 'string':
+      if level == LEVEL_FULL:
+        # the equal strings have the same size
+        growth = self._strings.get(node.value)
+        if growth is None:
+          items = 0
+          for c in node.value:
+            item = self._chars.get(c)
+            if item is None:
+              item = self._chars[c] = self._encode_char(c)
+            items += item
+          size = len(STRING_TEMPLATE) + items + 2 * max(len(node.value) - 1, 0)
+          growth = self._strings[node.value] = size - len(repr(node.value))
+        return growth
+
+      if not lut.has('string', node.value):
+        return 0
+      alias = lut.get('string', node.value)
+      self.header[alias] = len(HEX_TEMPLATE) + get_hex_size(node.value)
+      return len(alias) - len(repr(node.value))
+
+    if name == 'blob':
+      # the blob is compressed, since its size could not
+      # be given by a closed form
+      alias = lut.get('blob', node.value)
+      if alias not in self.header:
+        self.header[alias] = len(encodeBlob(value=node.value))
+      return len(alias) + 2 - len(repr(node.value))
+
+    if name == 'fstring':
+      growth = 0
+      for value in node.values:
+        if isinstance(value, ast.Constant):
+          # the constants are replaced by the header variables
+          self._replaced.add(id(value))
+          alias = lut.get('string', value.value, value.value)
+          self.header[alias] = len(HEX_TEMPLATE) + get_hex_size(value.value)
+          growth += len(alias) + 2 - len(value.value)
+      return growth
+
+    if name == 'number':
+      if not lut.has('number', node.value):
+        return 0
+      alias = lut.get('number', node.value)
+      if isinstance(node.value, bool):
+        self.header[alias] = 2 * BIT_SIZE + 4
+      elif isinstance(node.value, int):
+        self.header[alias] = get_integer_size(node.value)
+      else:
+        self.header[alias] = get_float_size(node.value)
+      return len(alias) - len(repr(node.value))
+
+    if name == 'pkg':
+      pkg = self.module_lut.get(node.value.id, node.value.id)
+      attr = self.module_lut.get(node.attr, node.attr)
+      size = len(node.value.id) + 1 + len(node.attr)
+
+      if level == LEVEL_FULL:
+        self._replaced.add(id(node.value))
+        return get_lookup_size(pkg, attr) - size
+
+      if not lut.has('attribute', (pkg, attr)):
+        return 0
+      self._replaced.add(id(node.value))
+      alias = lut.get('attribute', (pkg, attr))
+      self.header[alias] = get_lookup_size(pkg, attr)
+      return len(alias) - size
+
+    if name == 'import':
+      # the import statement is removed
+      if not context['encode_pkg']:
+        return 0
+      return -len('import ') - sum(len(alias.name) + (len(alias.asname) + 4 if alias.asname else 0) + 2
+        for alias in node.names
+      ) + 2
+
+    if name == 'builtin':
+      if level == LEVEL_FULL:
+        self._replaced.add(id(node.func))
+        return get_lookup_size('builtins', node.func.id) - len(node.func.id)
+
+      # the function name is renamed as the other names
+      if lut.has('name', node.func.id):
+        self.header[lut.get('name', node.func.id)] = get_lookup_size('builtins', node.func.id)
+      return 0
+
+    if name == 'operator':
+      operator = op_lut[type(node.op)]
+      if level == LEVEL_FULL:
+        digits = ', '.join(str(ord(c)) for c in operator)
+        return len(OPERATOR_TEMPLATE) + len(digits) - OPERATOR_SIZES[type(node.op)]
+
+      # the operator is replaced by the call of the cached function
+      if not lut.has('attribute', ('operator', operator)):
+        return 0
+      alias = lut.get('attribute', ('operator', operator))
+      self.header[alias] = get_lookup_size('operator', operator)
+      return len(alias) + len('(, )') - OPERATOR_SIZES[type(node.op)]
+
+    if name == 'rename':
+      # NOTE: the names of the calls and of the generic attribute
+      # values are measured by their own Name nodes
+      if isinstance(node, ast.Name):
+        return self._rename(node.id)
+      if isinstance(node, (ast.FunctionDef, ast.ClassDef)):
+        return self._rename(node.name)
+      if isinstance(node, ast.arg):
+        return self._rename(node.arg)
+      if isinstance(node, ast.keyword):
+        return self._rename(node.arg)
+      if isinstance(node, ast.Attribute):
+        return self._rename(node.attr)
+      if isinstance(node, ast.ImportFrom):
+        return sum(self._rename(alias.asname) for alias in node.names)
+      if isinstance(node, (ast.Global, ast.Nonlocal)):
+        return sum(self._rename(name) for name in node.names)
+
+    # the custom passes are not measured
+    return 0
+
+  def _add (self, name : str, node : ast.AST, level : int, context : dict) -> None:
+    # measure the node, unless it is replaced with its parent
+    if id(node) in self._replaced:
+      return
+
+    growth = self._measure(name, node, level, context)
+
+    self.growth += growth
+    self.nodes[name] = self.nodes.get(name, 0) + 1
+
+  def __call__ (self, obf_pass : object, node : ast.AST, level : int, context : dict) -> None:
+    '''
+    Measure a node matched by a pass.
+
+    Parameters
+    ----------
+      obf_pass : Pass
+        Pass which handles the node
+
+      node : ast.AST
+        Matched node
+
+      level : int
+        Encoding level of the node
+
+      context : dict
+        Metadata of the obfuscation
+    '''
+    self._add(obf_pass.name, node, level, context)
+
+  def measure (self, nodes : list, levels : dict, bound : set, encode_pkg : bool) -> None:
+    '''
+    Measure the nodes found by the walk of the code,
+    matching them as the built-in passes do.
+
+    Parameters
+    ----------
+      nodes : list
+        List of the (kind, node, depth) records of the
+        nodes, as given by scan_code
+
+      levels : dict
+        Lookup table of the encoding levels
+
+      bound : set
+        Set of the (line, column) positions of the calls
+        of the user definitions named as builtin functions
+
+      encode_pkg : bool
+        Enable/Disable the removal of the imports
+    '''
+    context = {'encode_pkg' : encode_pkg}
+
+    for kind, node, depth in nodes:
+
+      # the first pass which matches the node handles it,
+      # even if its encoding is disabled
+      if kind == 'constant':
+        value = node.value
+        if isinstance(value, (str, bytes)) and self.lut.has('blob', value):
+          name, level = 'blob', levels['string']
+        elif isinstance(value, str):
+          name, level = 'string', levels['string']
+        elif isinstance(value, (bool, int, float)):
+          name, level = 'number', levels['number']
+        else:
+          continue
+
+      elif kind == 'fstring':
+        name, level = 'fstring', levels['string']
+
+      elif kind == 'attribute':
+        if node.value.id in self.module_lut:
+          name, level = 'pkg', levels['pkg']
+        else:
+          name, level = 'rename', LEVEL_FULL
+
+      elif kind == 'call':
+        if node.func.id in _BUILT_IN and (node.func.lineno, node.func.col_offset) not in bound:
+          name, level = 'builtin', levels['builtin']
+        else:
+          name, level = 'rename', LEVEL_FULL
+
+      elif kind == 'operator':
+        # the deeply nested operators are left as native
+        name, level = 'operator', levels['operator'] if depth < MAX_OPERATOR_DEPTH else LEVEL_OFF
+
+      else:
+        name, level = kind, LEVEL_FULL
+
+      if level != LEVEL_OFF:
+        self._add(name, node, level, context)
+
+  def get_header_size (self) -> tuple:
+    '''
+    Get the size of the header of the obfuscated code.
+
+    Returns
+    -------
+      size : int
+        Size of the header in bytes
+
+      n_lines : int
+        Number of header lines
+    '''
+    # each variable is emitted as 'alias = value\n'
+    size = sum(len(alias) + 3 + value + 1 for alias, value in self.header.items())
+    return size, len(self.header)
+
+
+def format_estimate_report (estimates : dict) -> str:
+  '''
+  Format the estimates of the obfuscation of several
+  files as a human readable table, with their totals.
+
+  Parameters
+  ----------
+    estimates : dict
+      Lookup table of the estimates by filename, as given
+      by the estimate method of the Obfuscator object
+
+  Returns
+  -------
+    text : str
+      Formatted report
+  '''
+
+  def row (name, estimate):
+    nodes = sum(estimate['nodes'].values())
+    growth = estimate['size'] / max(estimate['source_size'], 1)
+    return (f'  {name:<40} {estimate["source_size"]:>10} {estimate["size"]:>12} {growth:>7.1f}x '
+            f'{estimate["header_size"]:>10} {estimate["alias_mean"]:>7.1f} {estimate["alias_max"]:>6} '
+            f'{nodes:>8} {estimate["elapsed"] * 1e3:>9.1f}')
+
+  lines = [
+    'pyhide estimate',
+    (f'  {"file":<40} {"source":>10} {"estimated":>12} {"growth":>8} {"header":>10} '
+     f'{"alias":>7} {"max":>6} {"nodes":>8} {"time [ms]":>9}'),
+  ]
+
+  total = {'source_size' : 0, 'size' : 0, 'header_size' : 0, 'alias_max' : 0,
+           'elapsed' : 0., 'nodes' : {}}
+  n_aliases = 0
+  alias_size = 0.
+
+  for filename, estimate in estimates.items():
+    lines.append(row(filename[-40:], estimate))
+
+    for key in ('source_size', 'size', 'header_size', 'elapsed'):
+      total[key] += estimate[key]
+    total['alias_max'] = max(total['alias_max'], estimate['alias_max'])
+    for name, count in estimate['nodes'].items():
+      total['nodes'][name] = total['nodes'].get(name, 0) + count
+
+    n_aliases += estimate['aliases']
+    alias_size += estimate['aliases'] * estimate['alias_mean']
+
+  total['alias_mean'] = alias_size / max(n_aliases, 1)
+
+  lines.append(row(f'total ({len(estimates)} files)', total))
+  lines.append('transformed nodes: ' + ', '.join(f'{name}: {count}'
+    for name, count in sorted(total['nodes'].items())
+  ))
+
+  return '\n'.join(lines)
@@ -0,0 +1,532 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import re
+import sys
+import copy
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+
+from .__version__ import __version__
+from ._estimate import iter_source_files
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+# runner of the scripts which dumps the repr of a global
+# variable, i.e. the return value of the script
+RESULT_RUNNER = '''
+import sys, runpy
+path, name, out = sys.argv[1:4]
+sys.argv = [path]
+scope = runpy.run_path(path, run_name='__main__')
+with open(out, 'w', encoding='utf-8') as fp:
+  fp.write(repr(scope.get(name)))
+'''
+
+# regex of the outcomes in the pytest summary line
+PYTEST_SUMMARY_REGEX = re.compile(r'(\d+) (passed|failed|errors?|skipped|xfailed|xpassed)\b')
+
+# floor of the run times (in seconds) used by the timing
+# ratios, so the noise of the tiny scripts is bounded
+MIN_ELAPSED = 1e-3
+
+# obfuscator and options of the worker processes,
+# set once by the initializer
+_WORKER_STATE = {}
+
+
+def is_test_file (filename : str) -> bool:
+  '''
+  Check if the file is a pytest suite, according to
+  the default pytest naming of the test files.
+
+  Parameters
+  ----------
+    filename : str
+      Path of the python file
+
+  Returns
+  -------
+    is_test : bool
+      True if the file is run by pytest
+  '''
+  name = os.path.basename(filename)
+  return name.startswith('test_') or name.endswith('_test.py')
+
+def get_check_key (source : bytes, config : dict) -> str:
+  '''
+  Get the cache key of a checked file, given by the
+  source code and by the configuration of the check.
+
+  Parameters
+  ----------
+    source : bytes
+      Source code of the file
+
+    config : dict
+      Obfuscation parameters and options of the check
+
+  Returns
+  -------
+    key : str
+      Hex digest of the pair
+  '''
+  digest = hashlib.sha256(source)
+  digest.update(json.dumps(config, sort_keys=True).encode('utf-8'))
+  return digest.hexdigest()
+
+def _get_result_alias (symbol_map : str, name : str) -> str:
+  # alias of a module variable in the symbol map (if any)
+  with open(symbol_map, 'r', encoding='utf-8') as fp:
+    for line in fp:
+      record = line.rstrip('\n').split('\t')
+      if len(record) == 4 and record[1] == name and record[3] in ('<module>', '-'):
+        return record[0]
+  return name
+
+def _copy_conftests (dirname : str, root : str, workdir : str) -> None:
+  # the conftest files from the root to the directory of the
+  # suite are copied unobfuscated in the same relative paths,
+  # so pytest finds their fixtures and hooks
+  while True:
+    conftest = os.path.join(dirname, 'conftest.py')
+
+    if os.path.isfile(conftest):
+      target = os.path.join(workdir, os.path.relpath(conftest, root))
+      os.makedirs(os.path.dirname(target), exist_ok=True)
+      shutil.copyfile(conftest, target)
+
+    if dirname == root or os.path.dirname(dirname) == dirname:
+      break
+
+    dirname = os.path.dirname(dirname)
+
+def _run (cmd : list, cwd : str, env : dict, timeout : float, repeat : int) -> dict:
+  '''
+  Run a command in a subprocess, keeping the outputs of the
+  first run and the best time of the repeated runs.
+  '''
+  best = None
+
+  for _ in range(repeat):
+    tic = time.perf_counter()
+    proc = subprocess.run(cmd, cwd=cwd, env=env, timeout=timeout,
+      stdin=subprocess.DEVNULL, capture_output=True, text=True, errors='replace'
+    )
+    elapsed = time.perf_counter() - tic
+
+    if best is None:
+      best = {'returncode' : proc.returncode, 'stdout' : proc.stdout, 'stderr' : proc.stderr,
+              'elapsed' : elapsed}
+    else:
+      best['elapsed'] = min(best['elapsed'], elapsed)
+
+  return best
+
+def _get_env (dirname : str) -> dict:
+  # the sibling modules are imported from the original tree,
+  # and the hash seed is fixed so the order of the sets
+  # is the same in both the runs
+  env = dict(os.environ)
+  env['PYTHONPATH'] = os.pathsep.join(p for p in (dirname, env.get('PYTHONPATH')) if p)
+  env.setdefault('PYTHONHASHSEED', '0')
+  return env
+
+def _compare (orig : dict, obf : dict, kind : str) -> str:
+  '''
+  Compare the outputs of the original and obfuscated runs,
+  returning the description of the first difference (None
+  if they match).
+  '''
+
+  if orig['returncode'] != obf['returncode']:
+    return f'exit code {orig["returncode"]} != {obf["returncode"]}'
+
+  if kind == 'pytest':
+    # the pytest outputs have paths and times, so
+    # only the outcomes are compared
+    orig_outcomes = sorted(PYTEST_SUMMARY_REGEX.findall(orig['stdout']))
+    obf_outcomes = sorted(PYTEST_SUMMARY_REGEX.findall(obf['stdout']))
+    if orig_outcomes != obf_outcomes:
+      return f'pytest outcomes {orig_outcomes} != {obf_outcomes}'
+    return None
+
+  if orig['stdout'] != obf['stdout']:
+    orig_lines = orig['stdout'].splitlines()
+    obf_lines = obf['stdout'].splitlines()
+    for lineno, (a, b) in enumerate(zip(orig_lines, obf_lines), start=1):
+      if a != b:
+        return f'stdout line {lineno}: {a[:40]!r} != {b[:40]!r}'
+    return f'stdout lines {len(orig_lines)} != {len(obf_lines)}'
+
+  if orig.get('result') != obf.get('result'):
+    return f'result {orig["result"][:40]} != {obf["result"][:40]}'
+
+  return None
+
+def _init_check_worker (obfuscator : object, options : dict) -> None:
+  '''
+  Initialize the worker process of the check with
+  the obfuscator and the options of the parent.
+
+  Parameters
+  ----------
+    obfuscator : Obfuscator
+      Obfuscator object
+
+    options : dict
+      Options of the runs (result, repeat, timeout)
+  '''
+  _WORKER_STATE['obfuscator'] = obfuscator
+  _WORKER_STATE['options'] = options
+
+def _check_file (filename : str) -> dict:
+  '''
+  Obfuscate a file and run the original and the obfuscated
+  versions in isolated subprocesses.
+
+  Parameters
+  ----------
+    filename : str
+      Path of the python file
+
+  Returns
+  -------
+    record : dict
+      Outcome of the pair, with the times of the runs
+  '''
+  options = _WORKER_STATE['options']
+  kind = 'pytest' if is_test_file(filename) else 'script'
+  record = {'file' : filename, 'kind' : kind, 'diff' : None, 'error' : None,
+            'orig_time' : None, 'obf_time' : None}
+
+  filename = os.path.abspath(filename)
+  dirname = os.path.dirname(filename)
+  env = _get_env(dirname)
+  # the obfuscated file has the same relative path of the
+  # original, so the module names and the pytest ids are preserved
+  workdir = tempfile.mkdtemp(prefix='pyhide-check-')
+  obf_filename = os.path.join(workdir, os.path.relpath(filename, options['root']))
+
+  try:
+    obfuscator = copy.copy(_WORKER_STATE['obfuscator'])
+    obfuscator.symbol_map = os.path.join(workdir, 'symbols.pyhide-map')
+
+    # pytest collects the tests and the fixtures by name,
+    # so the suites are obfuscated without renaming
+    if kind == 'pytest':
+      obfuscator.rename_variable = False
+      obfuscator.rename_function = False
+      obfuscator.rename_class = False
+
+    try:
+      with open(filename, 'r', encoding='utf-8') as fp:
+        code = fp.read()
+      obf_code = obfuscator(code)
+    except Exception as err:
+      record['error'] = f'obfuscation failed: {type(err).__name__}: {err}'
+      return record
+
+    os.makedirs(os.path.dirname(obf_filename), exist_ok=True)
+    with open(obf_filename, 'w', encoding='utf-8') as fp:
+      fp.write(obf_code)
+
+    if kind == 'pytest':
+      _copy_conftests(dirname=dirname, root=options['root'], workdir=workdir)
+
+    runs = {}
+
+    for version, path, root in (('orig', filename, options['root']), ('obf', obf_filename, workdir)):
+      if kind == 'pytest':
+        # neither run loads the conftest files
+        # above the checked tree
+        cmd = [sys.executable, '-m', 'pytest', '-q', '-p', 'no:cacheprovider', '--confcutdir', root, path]
+      elif options['result'] is not None:
+        # the result variable is renamed in the obfuscated code
+        name = options['result']
+        if version == 'obf':
+          name = _get_result_alias(symbol_map=obfuscator.symbol_map, name=name)
+        out = os.path.join(workdir, f'{version}.result')
+        cmd = [sys.executable, '-c', RESULT_RUNNER, path, name, out]
+      else:
+        cmd = [sys.executable, path]
+
+      try:
+        runs[version] = _run(cmd=cmd, cwd=dirname, env=env,
+          timeout=options['timeout'], repeat=options['repeat']
+        )
+      except subprocess.TimeoutExpired:
+        record['error'] = f'timeout of the {version} run'
+        return record
+
+      if kind == 'script' and options['result'] is not None:
+        result = None
+        if os.path.exists(out):
+          with open(out, 'r', encoding='utf-8') as fp:
+            result = fp.read()
+        runs[version]['result'] = result
+
+      record[f'{version}_time'] = runs[version]['elapsed']
+
+    record['diff'] = _compare(orig=runs['orig'], obf=runs['obf'], kind=kind)
+
+  finally:
+    shutil.rmtree(workdir, ignore_errors=True)
+
+  return record
+
+def get_startup_time (repeat : int = 3) -> float:
+  '''
+  Get the startup time of the interpreter, which is removed
+  from the run times of the timing ratios.
+
+  Parameters
+  ----------
+    repeat : int (default=3)
+      Number of runs
+
+  Returns
+  -------
+    elapsed : float
+      Best time of an empty run in seconds
+  '''
+  run = _run(cmd=[sys.executable, '-c', 'pass'], cwd=None, env=None, timeout=60., repeat=repeat)
+  return run['elapsed']
+
+def get_check_status (record : dict, startup : float, max_slowdown : float) -> str:
+  '''
+  Get the status of a checked pair, updating its
+  timing ratio.
+
+  Parameters
+  ----------
+    record : dict
+      Outcome of the pair
+
+    startup : float
+      Startup time of the interpreter in seconds
+
+    max_slowdown : float
+      Maximum ratio of the obfuscated and original run times
+
+  Returns
+  -------
+    status : str
+      One of 'ok', 'slow', 'mismatch' or 'error'
+  '''
+
+  record['ratio'] = None
+
+  if record['error'] is not None:
+    return 'error'
+
+  orig = max(record['orig_time'] - startup, MIN_ELAPSED)
+  obf = max(record['obf_time'] - startup, MIN_ELAPSED)
+  record['ratio'] = obf / orig
+
+  if record['diff'] is not None:
+    return 'mismatch'
+
+  if max_slowdown is not None and record['ratio'] > max_slowdown:
+    return 'slow'
+
+  return 'ok'
+
+def check_files (path : str,
+                 obfuscator : object,
+                 result : str = None,
+                 max_slowdown : float = None,
+                 repeat : int = 1,
+                 timeout : float = 60.,
+                 cache : str = None,
+                 n_jobs : int = 1,
+                 ) -> list:
+  '''
+  Differential check of the obfuscation of a directory of
+  scripts and pytest suites.
+
+  Each file is obfuscated and the original and obfuscated
+  versions are run in isolated subprocesses (in a pool of
+  n_jobs processes), comparing their exit codes
+  and their stdout (or the pytest outcomes for the test
+  files) and, optionally, the value of a global variable
+  at the end of the scripts. The timing ratio of each pair
+  is compared to the slowdown threshold. The pytest suites
+  are obfuscated without renaming, since the tests and the
+  fixtures are collected by name, and their conftest files
+  are copied unobfuscated.
+
+  Parameters
+  ----------
+    path : str
+      Path of a python file or of a directory
+
+    obfuscator : Obfuscator
+      Obfuscator object
+
+    result : str (default=None)
+      Name of the global variable compared as return value
+      of the scripts
+
+    max_slowdown : float (default=None)
+      Maximum ratio of the obfuscated and original run times,
+      above which the file is flagged as slow
+
+    repeat : int (default=1)
+      Number of runs of each version, whose best time is kept
+
+    timeout : float (default=60.)
+      Timeout of each run in seconds
+
+    cache : str (default=None)
+      Path of the json cache of the results; the pairs with
+      the same source and configuration are not run again
+
+    n_jobs : int (default=1)
+      Number of files checked in parallel (-1 for all the
+      cores); the files of a parallel check are obfuscated
+      serially, while the n_jobs of the obfuscator are used
+      by the serial check
+
+  Returns
+  -------
+    records : list
+      Outcome of each file, with its status, the description
+      of the difference (if any) and the timing ratio
+
+  Notes
+  -----
+  The obfuscated file is run from a temporary directory with
+  the same working directory of the original one, so its
+  sibling modules are imported from the original tree. The
+  cache key depends only on the file itself, so a change of
+  the imported modules (or of the conftest files) requires
+  to clear the cache.
+  '''
+
+  if repeat < 1:
+    raise ValueError(('Invalid number of runs. '
+      'The number of runs must be a positive integer. '
+      f'Given: {repeat}'
+    ))
+
+  n_jobs = os.cpu_count() if n_jobs == -1 else n_jobs
+
+  worker = copy.copy(obfuscator)
+  worker.symbol_map = None
+
+  # the files are the parallel units, so each of
+  # them is obfuscated serially
+  if n_jobs > 1:
+    worker.n_jobs = 1
+
+  root = os.path.abspath(path if os.path.isdir(path) else os.path.dirname(path))
+  options = {'result' : result, 'repeat' : repeat, 'timeout' : timeout, 'root' : root}
+  config = {
+    'params' : {k : v for k, v in vars(worker).items() if isinstance(v, (bool, int, float, str, type(None)))},
+    'result' : result,
+    'version' : __version__,
+    'python' : sys.version,
+  }
+
+  cached = {}
+  if cache is not None and os.path.exists(cache):
+    with open(cache, 'r', encoding='utf-8') as fp:
+      cached = json.load(fp)
+
+  keys = {}
+  todo = []
+
+  for filename in iter_source_files(path=path):
+    with open(filename, 'rb') as fp:
+      keys[filename] = get_check_key(source=fp.read(), config=config)
+
+    if keys[filename] not in cached:
+      todo.append(filename)
+
+  if n_jobs > 1 and len(todo) > 1:
+    with ProcessPoolExecutor(
+      max_workers=n_jobs,
+      initializer=_init_check_worker,
+      initargs=(worker, options),
+    ) as executor:
+      records = list(executor.map(_check_file, todo))
+  else:
+    _init_check_worker(worker, options)
+    records = [_check_file(filename) for filename in todo]
+
+  # the timeouts depend on the load of the machine,
+  # so they are not cached
+  for record in records:
+    if record['error'] is None or not record['error'].startswith('timeout'):
+      cached[keys[record['file']]] = record
+
+  if cache is not None:
+    with open(cache, 'w', encoding='utf-8') as fp:
+      json.dump(cached, fp, indent=1, sort_keys=True)
+
+  startup = get_startup_time()
+  records = {record['file'] : record for record in records}
+  results = []
+
+  for filename, key in keys.items():
+    record = dict(records[filename]) if filename in records else dict(cached[key], file=filename, cached=True)
+    record.setdefault('cached', False)
+    record['status'] = get_check_status(record=record, startup=startup, max_slowdown=max_slowdown)
+    results.append(record)
+
+  return results
+
+def format_check_report (records : list) -> str:
+  '''
+  Format the outcomes of the differential check as
+  a human readable table.
+
+  Parameters
+  ----------
+    records : list
+      Outcomes of the files, as given by check_files
+
+  Returns
+  -------
+    text : str
+      Formatted report
+  '''
+
+  lines = [
+    'pyhide check',
+    f'  {"file":<40} {"kind":<7} {"status":<9} {"original":>10} {"obfuscated":>11} {"ratio":>7}',
+  ]
+
+  counts = {}
+
+  for record in records:
+    status = record['status']
+    counts[status] = counts.get(status, 0) + 1
+
+    if record['ratio'] is None:
+      times = f'{"-":>10} {"-":>11} {"-":>7}'
+    else:
+      times = (f'{record["orig_time"] * 1e3:>8.1f}ms {record["obf_time"] * 1e3:>9.1f}ms '
+               f'{record["ratio"]:>6.2f}x')
+
+    cached = ' (cached)' if record['cached'] else ''
+    lines.append(f'  {record["file"][-40:]:<40} {record["kind"]:<7} {status:<9} {times}{cached}')
+
+    if record['error'] is not None:
+      lines.append(f'    {record["error"]}')
+    elif record['diff'] is not None:
+      lines.append(f'    {record["diff"]}')
+
+  lines.append(f'{len(records)} files: ' + ', '.join(f'{status}: {count}'
+    for status, count in sorted(counts.items())
+  ))
+
+  return '\n'.join(lines)
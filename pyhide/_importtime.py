@@ -0,0 +1,364 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import re
+import ast
+import sys
+import copy
+import json
+import shutil
+import tempfile
+import subprocess
+
+from ._encoder import ALIAS_REGEX
+from ._harness import _run
+from ._harness import _get_env
+from ._estimate import iter_source_files
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+# runner of the modules which times the compile of the
+# code, each header statement and the rest of the module
+# body, dumping the best times (in seconds) as json
+IMPORT_RUNNER = '''
+import io, sys, ast, json, time, contextlib
+path, name, out, repeat, n = sys.argv[1:6]
+repeat, n = int(repeat), int(n)
+with open(path, 'r', encoding='utf-8') as fp:
+  source = fp.read()
+compile_time = float('inf')
+for _ in range(repeat):
+  tic = time.perf_counter()
+  compile(source, path, 'exec')
+  compile_time = min(compile_time, time.perf_counter() - tic)
+tree = ast.parse(source)
+header = [compile(ast.Module(body=[stmt], type_ignores=[]), path, 'exec') for stmt in tree.body[:n]]
+body = compile(ast.Module(body=tree.body[n:], type_ignores=[]), path, 'exec')
+times = [float('inf')] * n
+body_time = float('inf')
+for _ in range(repeat):
+  scope = {'__name__' : name, '__file__' : path, '__builtins__' : __builtins__}
+  with contextlib.redirect_stdout(io.StringIO()):
+    for i, code in enumerate(header):
+      tic = time.perf_counter()
+      exec(code, scope)
+      times[i] = min(times[i], time.perf_counter() - tic)
+    tic = time.perf_counter()
+    exec(body, scope)
+    body_time = min(body_time, time.perf_counter() - tic)
+with open(out, 'w', encoding='utf-8') as fp:
+  json.dump({'compile' : compile_time, 'body' : body_time, 'header' : times}, fp)
+'''
+
+# regex of the import time of a module (cumulative, in us)
+IMPORTTIME_REGEX = re.compile(r'import time:\s+\d+ \|\s+(\d+) \|\s+(\S+)')
+
+# kinds of the header values, given by the
+# first matching pattern of their code
+HEADER_KINDS = (
+  ('alias', re.compile(r'_{3,}$')),
+  ('blob', re.compile(r'.*\blambda\b')),
+  ('package', re.compile(r'.*\b__import__\(')),
+  ('number', re.compile(r'(float\(|[\s()=\[\]+\-~<>*]*$)')),
+  ('string', re.compile(r'')),
+)
+
+
+def get_header_kind (value : str) -> str:
+  '''
+  Get the kind of a header value from its code, i.e.
+  'alias' (merged variables), 'blob' (compressed literals),
+  'package' (lookup of modules and attributes), 'number'
+  (integers and floats) or 'string' (char tables).
+
+  Parameters
+  ----------
+    value : str
+      Code of the header value
+
+  Returns
+  -------
+    kind : str
+      Kind of the value
+  '''
+  return next(kind for kind, regex in HEADER_KINDS if regex.match(value))
+
+def get_header_entries (code : str, variables : set) -> list:
+  '''
+  Get the header statements of an obfuscated code, i.e.
+  the leading assignments of the aliases which are not
+  variables of the original code.
+
+  Parameters
+  ----------
+    code : str
+      Obfuscated code
+
+    variables : set
+      Aliases of the variables of the original code
+
+  Returns
+  -------
+    entries : list
+      List of (line, value) of the header statements
+  '''
+
+  lines = code.splitlines()
+  entries = []
+
+  for stmt in ast.parse(code).body:
+    if not (isinstance(stmt, ast.Assign) and len(stmt.targets) == 1 and
+            isinstance(stmt.targets[0], ast.Name) and
+            ALIAS_REGEX.fullmatch(stmt.targets[0].id) and
+            stmt.targets[0].id not in variables):
+      break
+
+    # NOTE: the header statements are unparsed in a single line,
+    # and the value is taken with its enclosing parentheses
+    target = stmt.targets[0]
+    value = lines[stmt.lineno - 1][target.end_col_offset:stmt.end_col_offset]
+    entries.append((stmt.lineno, value.split('=', 1)[1].strip()))
+
+  return entries
+
+def _get_variables (symbol_map : str) -> set:
+  # aliases of the variables defined in the original code
+  with open(symbol_map, 'r', encoding='utf-8') as fp:
+    records = [line.rstrip('\n').split('\t') for line in fp]
+  return {record[0] for record in records if len(record) == 4 and record[2] != 'package'}
+
+def get_import_time (module : str, cwd : str, env : dict, timeout : float) -> float:
+  '''
+  Get the cumulative import time of a module, without
+  the cached bytecode, using the -X importtime option.
+
+  Parameters
+  ----------
+    module : str
+      Name of the module
+
+    cwd : str
+      Directory of the module
+
+    env : dict
+      Environment of the subprocess
+
+    timeout : float
+      Timeout of the run in seconds
+
+  Returns
+  -------
+    elapsed : float
+      Import time in seconds (None if the import fails)
+  '''
+
+  env = dict(env, PYTHONDONTWRITEBYTECODE='1')
+  run = _run(cmd=[sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+    cwd=cwd, env=env, timeout=timeout, repeat=1
+  )
+
+  for cumulative, name in IMPORTTIME_REGEX.findall(run['stderr']):
+    if name == module:
+      return int(cumulative) * 1e-6
+
+  return None
+
+def _bench_version (path : str, module : str, header : list, env : dict,
+                    workdir : str, repeat : int, timeout : float) -> dict:
+  '''
+  Time the import of a version (original or obfuscated)
+  of the module, with the breakdown of its header.
+  '''
+
+  record = {'compile' : None, 'header' : None, 'body' : None, 'import' : None,
+            'kinds' : {}, 'entries' : [], 'error' : None}
+
+  out = os.path.join(workdir, 'times.json')
+  dirname = os.path.dirname(path)
+
+  run = _run(cmd=[sys.executable, '-c', IMPORT_RUNNER, path, module, out, str(repeat), str(len(header))],
+    cwd=dirname, env=env, timeout=timeout, repeat=1
+  )
+
+  if run['returncode'] != 0 or not os.path.exists(out):
+    lines = run['stderr'].strip().splitlines()
+    record['error'] = lines[-1] if lines else f'exit code {run["returncode"]}'
+    return record
+
+  with open(out, 'r', encoding='utf-8') as fp:
+    times = json.load(fp)
+  os.remove(out)
+
+  for (lineno, value), elapsed in zip(header, times['header']):
+    kind = get_header_kind(value)
+
+    record['entries'].append({'line' : lineno, 'kind' : kind, 'size' : len(value), 'time' : elapsed})
+    total, count = record['kinds'].get(kind, (0., 0))
+    record['kinds'][kind] = (total + elapsed, count + 1)
+
+  record['compile'] = times['compile']
+  record['header'] = sum(times['header'])
+  record['body'] = times['body']
+  record['import'] = get_import_time(module=module, cwd=dirname, env=env, timeout=timeout)
+
+  return record
+
+def bench_import (path : str,
+                  obfuscator : object,
+                  top : int = 10,
+                  repeat : int = 3,
+                  timeout : float = 60.,
+                  ) -> list:
+  '''
+  Measure the import cost of the original and obfuscated
+  versions of the modules of a directory.
+
+  Each version is run in an isolated subprocess, which
+  times the compile of the code and the execution of each
+  header statement and of the rest of the module body. The
+  cumulative import time (without the cached bytecode) is
+  given by the -X importtime option of the interpreter.
+  The header entries are grouped by kind, so the startup
+  regressions could be attributed to the number encoding,
+  the string tables, the package lookups or the blobs.
+
+  Parameters
+  ----------
+    path : str
+      Python module or directory of modules
+
+    obfuscator : Obfuscator
+      Obfuscator object
+
+    top : int (default=10)
+      Number of the most expensive header entries kept
+
+    repeat : int (default=3)
+      Number of runs of each timing, whose best time is kept
+
+    timeout : float (default=60.)
+      Timeout of each subprocess in seconds
+
+  Returns
+  -------
+    records : list
+      Timings of each module, with the 'original' and
+      'obfuscated' versions and the 'error' of the obfuscation
+
+  Notes
+  -----
+  .. note::
+    The module bodies are executed with the module name,
+    so the code under the `__main__` guard is not run. The
+    separate execution of the header statements adds about
+    a microsecond to each of them.
+  '''
+
+  records = []
+
+  for filename in iter_source_files(path=path):
+    filename = os.path.abspath(filename)
+    module = os.path.splitext(os.path.basename(filename))[0]
+    record = {'file' : filename, 'original' : None, 'obfuscated' : None, 'error' : None}
+    records.append(record)
+
+    env = _get_env(os.path.dirname(filename))
+    # the obfuscated file has the same name of the original,
+    # so it is imported with the same module name
+    workdir = tempfile.mkdtemp(prefix='pyhide-import-')
+    obf_filename = os.path.join(workdir, os.path.basename(filename))
+
+    try:
+      obf = copy.copy(obfuscator)
+      obf.symbol_map = os.path.join(workdir, 'symbols.pyhide-map')
+
+      try:
+        with open(filename, 'r', encoding='utf-8') as fp:
+          code = fp.read()
+        obf_code = obf(code)
+        header = get_header_entries(code=obf_code, variables=_get_variables(obf.symbol_map))
+      except Exception as err:
+        record['error'] = f'obfuscation failed: {type(err).__name__}: {err}'
+        continue
+
+      with open(obf_filename, 'w', encoding='utf-8') as fp:
+        fp.write(obf_code)
+
+      for version, path, entries in (('original', filename, []),
+                                     ('obfuscated', obf_filename, header)):
+        try:
+          record[version] = _bench_version(path=path, module=module, header=entries, env=env,
+            workdir=workdir, repeat=repeat, timeout=timeout
+          )
+        except subprocess.TimeoutExpired:
+          record['error'] = f'timeout of the {version} run'
+          break
+
+        entries = record[version]['entries']
+        record[version]['entries'] = sorted(entries, key=lambda x : x['time'], reverse=True)[:top]
+
+    finally:
+      shutil.rmtree(workdir, ignore_errors=True)
+
+  return records
+
+def format_import_report (records : list) -> str:
+  '''
+  Format the import timings as a table, with the breakdown
+  of the obfuscated header by kind and its most expensive
+  entries.
+
+  Parameters
+  ----------
+    records : list
+      Timings of the modules given by bench_import
+
+  Returns
+  -------
+    report : str
+      Table of the timings (in ms)
+  '''
+
+  def _ms (value : float) -> str:
+    return f'{value * 1e3:.2f}' if value is not None else '-'
+
+  lines = [f'{"version":<11} {"compile":>9} {"header":>9} {"body":>9} {"import":>9}']
+
+  for record in records:
+    lines.append(record['file'])
+
+    if record['error'] is not None and record['original'] is None:
+      lines.append(f'  error: {record["error"]}')
+      continue
+
+    for version in ('original', 'obfuscated'):
+      times = record[version]
+      if times is None:
+        continue
+      if times['error'] is not None:
+        lines.append(f'{version:<11} error: {times["error"]}')
+        continue
+      lines.append(f'{version:<11} {_ms(times["compile"]):>9} {_ms(times["header"]):>9} '
+                   f'{_ms(times["body"]):>9} {_ms(times["import"]):>9}')
+
+    if record['error'] is not None:
+      lines.append(f'  error: {record["error"]}')
+
+    times = record['obfuscated']
+    if times is None or times['error'] is not None or not times['kinds']:
+      continue
+
+    kinds = sorted(times['kinds'].items(), key=lambda x : x[1][0], reverse=True)
+    lines.append('  header by kind: ' + ', '.join(f'{kind} {_ms(total)} ms ({count})'
+      for kind, (total, count) in kinds
+    ))
+    lines.append('  top header entries:')
+    lines.extend(f'    line {entry["line"]:<6} {entry["kind"]:<8} {_ms(entry["time"]):>8} ms {entry["size"]:>9} chars'
+      for entry in times['entries']
+    )
+
+  lines.append('times in ms; import is the cold import given by -X importtime')
+
+  return '\n'.join(lines)
@@ -0,0 +1,335 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import re
+import ast
+
+from ._encoder import ALIAS_REGEX
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+# compound statements whose bodies are executed in the
+# scope of their parent (e.g. the module or a class)
+SCOPE_STATEMENTS = (ast.If, ast.For, ast.AsyncFor, ast.While, ast.With, ast.AsyncWith, ast.Try)
+
+# runtime of the lazy header, whose names are replaced by
+# the aliases of the helpers:
+#   - TABLE : pairs of names and values (as code) of the lazy variables
+#   - GROUPS : indexes in the table of the variables required by each function
+#   - REGISTRY : functions waiting for their first call
+#   - MATERIALIZE : evaluation of the variables in the globals
+#   - REGISTER : decorator which replaces the function code with a trampoline
+#     with the same parameters (so the function signature is kept)
+#   - RUN : call of the trampoline, which restores the function code
+# NOTE: the registry entries are never removed, so the threads which
+# enter the trampoline together restore the same code
+LAZY_RUNTIME = '''
+REGISTRY = {}
+def MATERIALIZE(n, g=globals()):
+  for x in n:
+    k, v = TABLE[x]
+    if k not in g:
+      g[k] = eval(v, g)
+def REGISTER(i):
+  def d(f):
+    if f.__closure__:
+      MATERIALIZE(GROUPS[i])
+      return f
+    j = len(REGISTRY)
+    c = f.__code__
+    REGISTRY[j] = (f, c, GROUPS[i])
+    t = (lambda: RUN(-1, locals())).__code__
+    n = c.co_argcount + c.co_kwonlyargcount + (c.co_flags & 4 > 0) + (c.co_flags & 8 > 0)
+    f.__code__ = t.replace(co_consts=tuple(j if x == -1 else x for x in t.co_consts), co_name=c.co_name,
+      co_argcount=c.co_argcount, co_posonlyargcount=c.co_posonlyargcount, co_kwonlyargcount=c.co_kwonlyargcount,
+      co_varnames=c.co_varnames[:n], co_nlocals=n, co_flags=t.co_flags | c.co_flags & 12)
+    return f
+  return d
+def RUN(j, l):
+  f, c, n = REGISTRY[j]
+  MATERIALIZE(n)
+  f.__code__ = c
+  v = c.co_varnames
+  p = c.co_argcount
+  q = p + c.co_kwonlyargcount
+  a = [l[x] for x in v[:p]]
+  k = {x: l[x] for x in v[p:q]}
+  if c.co_flags & 4:
+    a += l[v[q]]
+    q += 1
+  if c.co_flags & 8:
+    k.update(l[v[q]])
+  return f(*a, **k)
+'''
+
+# names of the helpers of the lazy runtime
+LAZY_HELPERS = ('TABLE', 'GROUPS', 'REGISTRY', 'MATERIALIZE', 'REGISTER', 'RUN')
+
+# regex of the helper names in the lazy runtime
+HELPER_REGEX = re.compile(r'\b(' + '|'.join(LAZY_HELPERS) + r')\b')
+
+
+def get_lazy_functions (nodes : list) -> list:
+  '''
+  Get the functions whose bodies could be run after
+  the import, i.e. the ones defined in the module and
+  in the class scopes (but not inside other functions).
+
+  Parameters
+  ----------
+    nodes : list
+      List of statements of the module
+
+  Returns
+  -------
+    functions : list
+      List of the function definitions
+  '''
+
+  functions = []
+  todo = list(reversed(nodes))
+
+  while todo:
+    node = todo.pop()
+
+    if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+      functions.append(node)
+
+    elif isinstance(node, ast.ClassDef):
+      todo.extend(reversed(node.body))
+
+    elif isinstance(node, SCOPE_STATEMENTS):
+      stmts = node.body + node.orelse if hasattr(node, 'orelse') else list(node.body)
+      for handler in getattr(node, 'handlers', ()):
+        stmts.extend(handler.body)
+      stmts.extend(getattr(node, 'finalbody', ()))
+      todo.extend(reversed(stmts))
+
+  return functions
+
+def is_deferrable (function : ast.FunctionDef) -> bool:
+  '''
+  Check if the function code could be replaced by the
+  trampoline until its first call.
+
+  The decorated functions are excluded, since their decorators
+  could inspect the code, as the coroutines and the generators,
+  whose code flags could not be given to the trampoline.
+
+  Parameters
+  ----------
+    function : ast.FunctionDef
+      Function definition
+
+  Returns
+  -------
+    check : bool
+      True if the function could be deferred
+  '''
+
+  if isinstance(function, ast.AsyncFunctionDef) or function.decorator_list:
+    return False
+
+  # look for the yields of the function, but not
+  # in its nested functions and classes
+  todo = list(function.body)
+
+  while todo:
+    node = todo.pop()
+
+    if isinstance(node, (ast.Yield, ast.YieldFrom)):
+      return False
+
+    if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda, ast.ClassDef)):
+      todo.extend(ast.iter_child_nodes(node))
+
+  return True
+
+def _get_references (nodes : list, skip : set = ()) -> set:
+  # aliases used by the nodes (also inside the evaluated
+  # strings), without the statements to skip
+  refs = set()
+  todo = list(nodes)
+
+  while todo:
+    node = todo.pop()
+
+    if id(node) in skip:
+      continue
+
+    if isinstance(node, ast.Name):
+      refs.add(node.id)
+    elif isinstance(node, ast.Constant) and isinstance(node.value, str):
+      refs.update(ALIAS_REGEX.findall(node.value))
+
+    todo.extend(ast.iter_child_nodes(node))
+
+  return refs
+
+def _get_closure (names : set, values : dict) -> set:
+  # variables required to evaluate the given ones
+  closure = set()
+  todo = [name for name in names if name in values]
+
+  while todo:
+    name = todo.pop()
+    if name in closure:
+      continue
+    closure.add(name)
+    todo.extend(ref for ref in ALIAS_REGEX.findall(values[name]) if ref in values)
+
+  return closure
+
+def get_helper_aliases (code : str, header : dict, aliases : dict) -> list:
+  '''
+  Get the shortest aliases not used by the code and by
+  the header, which are given to the helpers of the lazy
+  runtime.
+
+  Parameters
+  ----------
+    code : str
+      Obfuscated code (without the header)
+
+    header : dict
+      Lookup table of the (pruned) header variables
+
+    aliases : dict
+      Lookup table of the variables merged in each
+      header variable
+
+  Returns
+  -------
+    helpers : list
+      Aliases of the helpers (see LAZY_HELPERS)
+  '''
+
+  used = set(ALIAS_REGEX.findall(code))
+  used.update(header, *aliases.values())
+  for value in header.values():
+    used.update(ALIAS_REGEX.findall(value))
+
+  used = {len(alias) for alias in used}
+  helpers = []
+  size = 3
+
+  # NOTE: the helpers are used by each decorated function,
+  # so their aliases are taken from the gaps of the used ones
+  while len(helpers) < len(LAZY_HELPERS):
+    if size not in used:
+      helpers.append('_' * size)
+    size += 1
+
+  return helpers
+
+def split_lazy_header (root : ast.Module,
+                       header : dict,
+                       aliases : dict,
+                       helpers : list,
+                      ) -> tuple:
+  '''
+  Split the header in the variables evaluated at the import
+  and the ones evaluated at the first call of the functions
+  which use them.
+
+  The variables used only inside the bodies of the module
+  functions and methods are moved in a table of their codes,
+  which are compiled and evaluated only when required, and
+  each of these functions is decorated by a helper which
+  replaces its code with a trampoline. At the
+  first call the trampoline evaluates the variables required by
+  the function, restores its code and calls it, so the following
+  calls have no overhead.
+
+  Parameters
+  ----------
+    root : ast.Module
+      Obfuscated code tree, whose functions are decorated
+      in place
+
+    header : dict
+      Lookup table of the (pruned) header variables
+
+    aliases : dict
+      Lookup table of the variables merged in each
+      header variable
+
+    helpers : list
+      Aliases of the helpers of the lazy runtime (see
+      LAZY_HELPERS), which must not be used by the code
+
+  Returns
+  -------
+    header : dict
+      Lookup table of the header variables evaluated
+      at the import
+
+    aliases : dict
+      Lookup table of the variables merged in each
+      of these header variables
+
+    runtime : str
+      Code of the lazy runtime (empty if all the
+      variables are evaluated at the import)
+  '''
+
+  # the merged variables are evaluated as their first binding
+  values = {}
+  for name, value in header.items():
+    values[name] = value
+    for alias in aliases.get(name, ()):
+      values[alias] = name
+
+  order = {name : i for i, name in enumerate(values)}
+
+  functions = [function for function in get_lazy_functions(nodes=root.body) if is_deferrable(function)]
+  bodies = {id(stmt) for function in functions for stmt in function.body}
+
+  # the variables used outside the function bodies (also in
+  # their decorators, defaults and annotations) are evaluated
+  # at the import, as their dependencies
+  eager = _get_closure(_get_references([root], skip=bodies), values)
+
+  groups = []
+
+  for function in functions:
+    names = _get_closure(_get_references(function.body), values) - eager
+    if names:
+      groups.append((function, sorted(names, key=order.get)))
+
+  if not groups:
+    return header, aliases, ''
+
+  names = dict(zip(LAZY_HELPERS, helpers))
+
+  for i, (function, _) in enumerate(groups):
+    function.decorator_list.append(ast.Call(
+      func=ast.Name(id=names['REGISTER'], ctx=ast.Load()),
+      args=[ast.Constant(value=i)],
+      keywords=[]
+    ))
+
+  lazy = [name for name in values if name not in eager]
+  index = {name : i for i, name in enumerate(lazy)}
+
+  # NOTE: the groups store the indexes of the variables,
+  # since the aliases could be very long
+  table = ''.join(f'({name!r}, {values[name]!r}), ' for name in lazy)
+  groups = ', '.join(f'{i}: ({"".join(f"{index[name]}, " for name in group)})'
+    for i, (_, group) in enumerate(groups)
+  )
+
+  # NOTE: the helper names are replaced only in the runtime,
+  # since the values could contain the same words
+  runtime = (f'{names["TABLE"]} = ({table})\n'
+             f'{names["GROUPS"]} = {{{groups}}}'
+             f'{HELPER_REGEX.sub(lambda m : names[m.group()], LAZY_RUNTIME)}')
+
+  header = {name : value for name, value in header.items() if name in eager}
+  aliases = {name : [alias for alias in merged if alias in eager]
+    for name, merged in aliases.items()
+      if name in eager
+  }
+
+  return header, aliases, runtime.rstrip('\n')
@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import sys
+import json
+
+# NOTE: the resource module is available only on unix
+try:
+  import resource
+except ImportError:
+  resource = None
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+
+def get_peak_rss () -> int:
+  '''
+  Get the peak resident memory of the process and of
+  its terminated children (e.g. the worker processes).
+
+  Returns
+  -------
+    peak_rss : int
+      Peak resident memory in bytes (None if it is not
+      available on the platform)
+  '''
+  if resource is None:
+    return None
+
+  peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+             resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+
+  # NOTE: the peak is given in bytes on macos and in kb otherwise
+  return peak if sys.platform == 'darwin' else peak * 1024
+
+def get_file_metrics (filename : str,
+                      input_bytes : int,
+                      output_bytes : int,
+                      metrics : dict,
+                      elapsed : float,
+                      build : str = None,
+                     ) -> dict:
+  '''
+  Get the metrics record of an obfuscated file.
+
+  Parameters
+  ----------
+    filename : str
+      Name of the file (or of the archive member)
+
+    input_bytes : int
+      Size of the source code in bytes
+
+    output_bytes : int
+      Size of the obfuscated code in bytes
+
+    metrics : dict
+      Metrics of the obfuscation, as given by the metrics
+      attribute of the Obfuscator object
+
+    elapsed : float
+      Elapsed time of the obfuscation in seconds
+
+    build : str (default=None)
+      Name of the build (if any)
+
+  Returns
+  -------
+    record : dict
+      Sizes, transformed nodes, aliases, header variables,
+      lines and bytes saved by the header pruning,
+      elapsed time of each phase, peak memory and cache
+      status of the obfuscation
+  '''
+  return {
+    'kind' : 'file',
+    'file' : filename,
+    'build' : build,
+    'input_bytes' : input_bytes,
+    'output_bytes' : output_bytes,
+    'nodes' : sum(metrics.get('nodes', {}).values()),
+    'pass_nodes' : metrics.get('nodes', {}),
+    'aliases' : metrics.get('aliases'),
+    'header_entries' : metrics.get('header'),
+    'header_saved' : metrics.get('header_saved', {}),
+    'phases' : metrics.get('phases', {}),
+    'elapsed' : elapsed,
+    'peak_rss' : get_peak_rss(),
+    'cache' : metrics.get('cache'),
+  }
+
+def get_summary_metrics (records : list, elapsed : float, version : str) -> dict:
+  '''
+  Get the summary record of the obfuscated files.
+
+  Parameters
+  ----------
+    records : list
+      Metrics records of the files
+
+    elapsed : float
+      Elapsed time of the whole run in seconds
+
+    version : str
+      Version of the package, so the metrics could be
+      compared along the releases
+
+  Returns
+  -------
+    summary : dict
+      Total sizes, nodes, aliases, header variables, lines
+      and bytes saved by the header pruning and elapsed time of each phase, with the throughput
+      and the size growth of the run
+  '''
+  input_bytes = sum(record['input_bytes'] for record in records)
+  output_bytes = sum(record['output_bytes'] for record in records)
+
+  phases = {}
+  cache = {}
+  saved = {'lines' : 0, 'bytes' : 0}
+
+  for record in records:
+    for k, v in record['phases'].items():
+      phases[k] = phases.get(k, 0.) + v
+    for k, v in record['header_saved'].items():
+      saved[k] += v
+    if record['cache'] is not None:
+      cache[record['cache']] = cache.get(record['cache'], 0) + 1
+
+  return {
+    'kind' : 'summary',
+    'version' : version,
+    'files' : len(records),
+    'input_bytes' : input_bytes,
+    'output_bytes' : output_bytes,
+    'growth' : output_bytes / input_bytes if input_bytes else None,
+    'nodes' : sum(record['nodes'] for record in records),
+    'aliases' : sum(record['aliases'] or 0 for record in records),
+    'header_entries' : sum(record['header_entries'] or 0 for record in records),
+    'header_saved' : saved,
+    'phases' : phases,
+    'elapsed' : elapsed,
+    'throughput' : input_bytes / elapsed if elapsed > 0. else None,
+    'peak_rss' : get_peak_rss(),
+    'cache' : cache,
+  }
+
+def dump_metrics (filename : str, records : list, elapsed : float, version : str) -> None:
+  '''
+  Write the metrics records of the files as json lines,
+  followed by their summary record.
+
+  Parameters
+  ----------
+    filename : str
+      Path of the output file
+
+    records : list
+      Metrics records of the files
+
+    elapsed : float
+      Elapsed time of the whole run in seconds
+
+    version : str
+      Version of the package
+  '''
+  summary = get_summary_metrics(records=records, elapsed=elapsed, version=version)
+
+  with open(filename, 'w', encoding='utf-8') as fp:
+    for record in records + [summary]:
+      fp.write(json.dumps(record, sort_keys=True) + '\n')
@@ -0,0 +1,611 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import ast
+
+from ._encoder import _BUILT_IN
+from ._encoder import MAX_OPERATOR_DEPTH
+from ._encoder import encrypt_constant_strings
+from ._encoder import encrypt_cached_string
+from ._encoder import encrypt_blob_literal
+from ._encoder import encrypt_joined_string
+from ._encoder import encrypt_constant_bools
+from ._encoder import encrypt_constant_integers
+from ._encoder import encrypt_constant_floats
+from ._encoder import encrypt_variable_name
+from ._encoder import encrypt_function_def
+from ._encoder import encrypt_function_arg
+from ._encoder import encrypt_function_arguments
+from ._encoder import encrypt_function_keyword
+from ._encoder import encrypt_global_names
+from ._encoder import encrypt_package_attribute
+from ._encoder import encrypt_self_attribute
+from ._encoder import encrypt_generic_attribute
+from ._encoder import encrypt_builtin_function
+from ._encoder import encrypt_cached_attribute
+from ._encoder import encrypt_cached_builtin
+from ._encoder import encrypt_generic_function
+from ._encoder import encrypt_class_def
+from ._encoder import encrypt_import_aliases
+from ._encoder import encrypt_binary_operator
+from ._encoder import encrypt_cached_operator
+from ._profile import LEVEL_OFF
+from ._profile import LEVEL_FULL
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+__all__ = ['Pass']
+
+# metadata provided by the obfuscator to the passes:
+#   - lut : symbol table of the aliases
+#   - module_lut : lookup table of the module aliases
+#   - header : lookup table of the header variables (filled by the passes)
+#   - reduce_code_length : enable/disable the integer encoding of the strings
+#   - encode_pkg : enable/disable the package encoding
+#   - bound : positions of the calls of the user definitions named as builtin functions
+PASS_METADATA = ('lut', 'module_lut', 'header', 'reduce_code_length', 'encode_pkg', 'bound')
+
+# node categories which could be found in the subtree of an
+# expression (e.g. the comprehensions and the lambda arguments)
+EXPRESSION_TYPES = (ast.expr, ast.expr_context, ast.boolop, ast.operator, ast.unaryop,
+                    ast.cmpop, ast.comprehension, ast.keyword, ast.arguments, ast.arg)
+
+# node categories which could be found in the subtree (node
+# included) of each category, according to the python grammar.
+# NOTE: the other categories (e.g. the statements) could
+# contain any node, so their subtrees are never skipped
+SUBTREE_TYPES = {
+  ast.expr_context : (ast.expr_context, ),
+  ast.boolop : (ast.boolop, ),
+  ast.operator : (ast.operator, ),
+  ast.unaryop : (ast.unaryop, ),
+  ast.cmpop : (ast.cmpop, ),
+  ast.alias : (ast.alias, ),
+  ast.expr : EXPRESSION_TYPES,
+  ast.comprehension : EXPRESSION_TYPES,
+  ast.keyword : EXPRESSION_TYPES,
+  ast.arguments : EXPRESSION_TYPES,
+  ast.arg : EXPRESSION_TYPES,
+  ast.withitem : EXPRESSION_TYPES + (ast.withitem, ),
+}
+if hasattr(ast, 'pattern'):
+  SUBTREE_TYPES[ast.pattern] = EXPRESSION_TYPES + (ast.pattern, )
+
+# node classes of the ast module (filled at the first use)
+NODE_TYPES = []
+
+# skipped node types of each set of handled node types, since
+# the same passes are dispatched at each obfuscation
+SKIPPED_TYPES = {}
+
+
+class Pass (object):
+  '''
+  Base class of the obfuscation passes.
+
+  Each pass declares the node types it handles and the
+  metadata it requires. The obfuscator fuses all the passes
+  in a single traversal of the code tree, in which each node
+  is given to the first pass (in the pass order) which
+  handles its type and matches it.
+
+  Attributes
+  ----------
+    name : str
+      Name of the pass, used as key of the timings
+
+    node_types : tuple
+      Node types handled by the pass (with their subclasses)
+
+    requires : tuple
+      Metadata required by the pass (see PASS_METADATA)
+
+    kind : str
+      Transformation of the encoding levels (string, number,
+      operator, pkg, builtin) which controls the pass. If None
+      the pass is always applied
+
+    tracked : bool
+      Enable/Disable the cost tracking of the hot functions
+
+  Examples
+  --------
+  >>> class UpperPass (Pass):
+  >>>   name = 'upper'
+  >>>   node_types = (ast.Constant, )
+  >>>
+  >>>   def match (self, node, context):
+  >>>     return isinstance(node.value, str)
+  >>>
+  >>>   def apply (self, node, level, context):
+  >>>     return ast.Constant(value=node.value.upper())
+  >>>
+  >>> obf_code = Obfuscator(passes=[UpperPass()])(code)
+  '''
+
+  name = None
+  node_types = ()
+  requires = ('lut', 'header')
+  kind = None
+  tracked = True
+
+  def match (self, node : ast.AST, context : dict) -> bool:
+    '''
+    Check if the node must be transformed by the pass.
+
+    Parameters
+    ----------
+      node : ast.AST
+        Node of one of the handled types
+
+      context : dict
+        Metadata of the obfuscation
+
+    Returns
+    -------
+      check : bool
+        True if the pass handles the node
+    '''
+    return True
+
+  def get_level (self, node : ast.AST, levels : dict, depth : int) -> int:
+    '''
+    Get the encoding level to apply to the node.
+
+    Parameters
+    ----------
+      node : ast.AST
+        Matched node
+
+      levels : dict
+        Lookup table of the current encoding levels
+
+      depth : int
+        Expression nesting depth of the node
+
+    Returns
+    -------
+      level : int
+        Encoding level
+    '''
+    return LEVEL_FULL if self.kind is None else levels.get(self.kind, LEVEL_FULL)
+
+  def apply (self, node : ast.AST, level : int, context : dict) -> ast.AST:
+    '''
+    Transform the node.
+
+    Parameters
+    ----------
+      node : ast.AST
+        Matched node
+
+      level : int
+        Encoding level (cheap or full)
+
+      context : dict
+        Metadata of the obfuscation. The header variables
+        must be stored in its header
+
+    Returns
+    -------
+      obf_node : ast.AST
+        Transformed node, which replaces the given one
+        in place (None to leave it unchanged)
+    '''
+    raise NotImplementedError
+
+
+class BlobPass (Pass):
+  '''
+  Encryption of the large string and bytes constants
+  as compressed blobs.
+  '''
+
+  name = 'blob'
+  node_types = (ast.Constant, )
+  kind = 'string'
+  # the blobs are decoded only once
+  tracked = False
+
+  def match (self, node, context):
+    return isinstance(node.value, (str, bytes)) and context['lut'].has('blob', node.value)
+
+  def apply (self, node, level, context):
+    obf_node, context['header'] = encrypt_blob_literal(
+      node=node,
+      lut=context['lut'],
+      header=context['header'],
+    )
+    return obf_node
+
+
+class StringPass (Pass):
+  '''
+  Encryption of the string constants.
+  '''
+
+  name = 'string'
+  node_types = (ast.Constant, )
+  requires = ('lut', 'header', 'reduce_code_length')
+  kind = 'string'
+
+  def match (self, node, context):
+    return isinstance(node.value, str)
+
+  def apply (self, node, level, context):
+
+    if level == LEVEL_FULL:
+      # obfuscate the value
+      obf_node, context['header'] = encrypt_constant_strings(
+        node=node,
+        lut=context['lut'],
+        header=context['header'],
+        reduce_code_length=context['reduce_code_length'],
+      )
+
+    else:
+      # move the value in the header
+      obf_node, context['header'] = encrypt_cached_string(
+        node=node,
+        lut=context['lut'],
+        header=context['header'],
+      )
+
+    return obf_node
+
+
+class FStringPass (Pass):
+  '''
+  Encryption of the f-string elements.
+  '''
+
+  name = 'fstring'
+  node_types = (ast.JoinedStr, )
+  kind = 'string'
+  tracked = False
+
+  def apply (self, node, level, context):
+    obf_node, context['header'] = encrypt_joined_string(
+      node=node,
+      lut=context['lut'],
+      header=context['header'],
+    )
+    return obf_node
+
+
+class NumberPass (Pass):
+  '''
+  Encryption of the bool, integer and float constants.
+  '''
+
+  name = 'number'
+  node_types = (ast.Constant, )
+  kind = 'number'
+
+  def match (self, node, context):
+    return isinstance(node.value, (bool, int, float))
+
+  def apply (self, node, level, context):
+
+    # NOTE: the bools must be checked before the
+    # integers, since they are a subclass of them
+    if isinstance(node.value, bool):
+      encrypt = encrypt_constant_bools
+    elif isinstance(node.value, int):
+      encrypt = encrypt_constant_integers
+    else:
+      encrypt = encrypt_constant_floats
+
+    obf_node, context['header'] = encrypt(
+      node=node,
+      lut=context['lut'],
+      header=context['header'],
+    )
+    return obf_node
+
+
+class PackagePass (Pass):
+  '''
+  Encryption of the package attributes.
+  '''
+
+  name = 'pkg'
+  node_types = (ast.Attribute, )
+  requires = ('lut', 'header', 'module_lut')
+  kind = 'pkg'
+
+  def match (self, node, context):
+    return isinstance(node.value, ast.Name) and node.value.id in context['module_lut']
+
+  def apply (self, node, level, context):
+
+    if level == LEVEL_FULL:
+      # obfuscate the package attribute
+      obf_node, context['header'] = encrypt_package_attribute(
+        node=node,
+        lut=context['lut'],
+        header=context['header'],
+        module_lut=context['module_lut'],
+      )
+
+    else:
+      # move the package attribute in the header
+      obf_node, context['header'] = encrypt_cached_attribute(
+        node=node,
+        lut=context['lut'],
+        header=context['header'],
+        module_lut=context['module_lut'],
+      )
+
+    return obf_node
+
+
+class ImportPass (Pass):
+  '''
+  Removal of the imported packages.
+  '''
+
+  name = 'import'
+  node_types = (ast.Import, )
+  requires = ('encode_pkg', )
+
+  def apply (self, node, level, context):
+    # we can directly remove the package
+    # since all the other functions will
+    # replaced
+    return ast.Del() if context['encode_pkg'] else None
+
+
+class BuiltinPass (Pass):
+  '''
+  Encryption of the builtin function calls.
+  '''
+
+  name = 'builtin'
+  node_types = (ast.Call, )
+  requires = ('lut', 'header', 'bound')
+  kind = 'builtin'
+
+  def match (self, node, context):
+    # the names shadowed by the user definitions are renamed
+    return isinstance(node.func, ast.Name) and node.func.id in _BUILT_IN and \
+      (node.func.lineno, node.func.col_offset) not in context['bound']
+
+  def apply (self, node, level, context):
+
+    if level == LEVEL_FULL:
+      # obfuscate the function name
+      obf_node, context['header'] = encrypt_builtin_function(
+        node=node,
+        lut=context['lut'],
+        header=context['header'],
+      )
+
+    else:
+      # move the function lookup in the header
+      obf_node, context['header'] = encrypt_cached_builtin(
+        node=node,
+        lut=context['lut'],
+        header=context['header'],
+      )
+
+    return obf_node
+
+
+class OperatorPass (Pass):
+  '''
+  Encryption of the binary operators.
+  '''
+
+  name = 'operator'
+  node_types = (ast.BinOp, )
+  kind = 'operator'
+
+  def get_level (self, node, levels, depth):
+    # the deeply nested operators are left as native
+    # to avoid too many nested parentheses
+    return super().get_level(node, levels, depth) if depth < MAX_OPERATOR_DEPTH else LEVEL_OFF
+
+  def apply (self, node, level, context):
+
+    if level == LEVEL_FULL:
+      # obfuscate the operator name
+      obf_node, context['header'] = encrypt_binary_operator(
+        node=node,
+        lut=context['lut'],
+        header=context['header'],
+      )
+
+    else:
+      # call the operator function cached in the header
+      # (the operator is left native if it is not cached)
+      obf_node, context['header'] = encrypt_cached_operator(
+        node=node,
+        lut=context['lut'],
+        header=context['header'],
+      )
+
+    return obf_node
+
+
+class RenamePass (Pass):
+  '''
+  Renaming of the identifiers (variables, functions,
+  arguments, classes, attributes, imported aliases and
+  global names).
+  '''
+
+  name = 'rename'
+  node_types = (ast.Name, ast.FunctionDef, ast.arg, ast.arguments, ast.keyword,
+                ast.Attribute, ast.Call, ast.ClassDef, ast.ImportFrom, ast.Global, ast.Nonlocal)
+
+  # encryption function of each node type
+  ENCRYPT = {
+    ast.Name : encrypt_variable_name,
+    ast.FunctionDef : encrypt_function_def,
+    ast.arg : encrypt_function_arg,
+    ast.arguments : encrypt_function_arguments,
+    ast.keyword : encrypt_function_keyword,
+    ast.Call : encrypt_generic_function,
+    ast.ClassDef : encrypt_class_def,
+    ast.ImportFrom : encrypt_import_aliases,
+    ast.Global : encrypt_global_names,
+    ast.Nonlocal : encrypt_global_names,
+  }
+
+  def match (self, node, context):
+    if isinstance(node, ast.Attribute):
+      return isinstance(node.value, ast.Name)
+    if isinstance(node, ast.Call):
+      return isinstance(node.func, ast.Name)
+    return True
+
+  def apply (self, node, level, context):
+
+    if isinstance(node, ast.Attribute):
+      encrypt = encrypt_self_attribute if node.value.id == 'self' else encrypt_generic_attribute
+    else:
+      encrypt = self.ENCRYPT[node.__class__]
+
+    obf_node, context['header'] = encrypt(
+      node=node,
+      lut=context['lut'],
+      header=context['header'],
+    )
+    return obf_node
+
+
+def get_default_passes () -> list:
+  '''
+  Get the built-in passes of the obfuscator.
+
+  The order of the passes sets their priority on the
+  shared node types, i.e. the package attributes and the
+  builtin calls are handled before the generic ones.
+  The passes are always enabled, since their encodings
+  are controlled by the encoding levels.
+
+  Returns
+  -------
+    passes : list
+      List of the built-in passes
+  '''
+  return [
+    BlobPass(),
+    StringPass(),
+    FStringPass(),
+    NumberPass(),
+    PackagePass(),
+    ImportPass(),
+    BuiltinPass(),
+    OperatorPass(),
+    RenamePass(),
+  ]
+
+def _get_subclasses (node_type : type) -> list:
+  # the node type and all its subclasses
+  node_types = []
+  todo = [node_type]
+
+  while todo:
+    node_type = todo.pop()
+    node_types.append(node_type)
+    todo.extend(node_type.__subclasses__())
+
+  return node_types
+
+def get_dispatch_table (passes : list, context : dict) -> dict:
+  '''
+  Get the lookup table of the passes by node type,
+  checking the metadata required by the passes.
+
+  The node types declared by the passes could be base
+  classes (e.g. ast.expr or ast.stmt), so the table is
+  expanded over all their subclasses, keeping the pass
+  order for each node type.
+
+  Parameters
+  ----------
+    passes : list
+      List of the passes, in priority order
+
+    context : dict
+      Metadata of the obfuscation
+
+  Returns
+  -------
+    table : dict
+      Lookup table of the list of passes of each node type
+  '''
+
+  for obf_pass in passes:
+
+    missing = [key for key in obf_pass.requires if key not in context]
+
+    if missing:
+      raise ValueError(('Invalid pass. '
+        f'The available metadata are {", ".join(PASS_METADATA)}. '
+        f'Given: {obf_pass.name} requires {", ".join(missing)}'
+      ))
+
+  table = {}
+
+  for obf_pass in passes:
+    for node_type in obf_pass.node_types:
+      for subclass in _get_subclasses(node_type):
+        node_passes = table.setdefault(subclass, [])
+        # NOTE: the declared types could overlap
+        if obf_pass not in node_passes:
+          node_passes.append(obf_pass)
+
+  return table
+
+def get_skipped_types (table : dict) -> frozenset:
+  '''
+  Get the node types whose subtrees could not contain any
+  node handled by the passes, so they are skipped by the
+  traversal of the code tree.
+
+  Parameters
+  ----------
+    table : dict
+      Lookup table of the list of passes of each node
+      type (see get_dispatch_table)
+
+  Returns
+  -------
+    skipped : frozenset
+      Set of the node types to skip
+  '''
+
+  key = frozenset(table)
+  if key in SKIPPED_TYPES:
+    return SKIPPED_TYPES[key]
+
+  # the node categories with some handled node
+  categories = {category for types in SUBTREE_TYPES.values() for category in types}
+  handled = {category
+    for category in categories
+      if any(issubclass(node_type, category) for node_type in table)
+  }
+
+  skipped = set()
+
+  if not NODE_TYPES:
+    NODE_TYPES.extend(_get_subclasses(ast.AST))
+
+  for node_type in NODE_TYPES:
+
+    if node_type in table:
+      continue
+
+    for category, types in SUBTREE_TYPES.items():
+      if issubclass(node_type, category):
+        if not handled.intersection(types):
+          skipped.add(node_type)
+        break
+
+  SKIPPED_TYPES[key] = frozenset(skipped)
+
+  return SKIPPED_TYPES[key]
@@ -0,0 +1,347 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import io
+import re
+import ast
+import tokenize
+import warnings
+
+from ._profile import LEVEL_OFF
+from ._profile import LEVEL_CHEAP
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+__all__ = ['keep']
+
+# regex of the pyhide comment pragmas
+PRAGMA_REGEX = re.compile(r'#\s*pyhide\s*:\s*(?P<directives>.+)$')
+
+# lookup table of the transformation names
+# used in the 'no-<name>-encode' directives
+PRAGMA_KINDS = {
+  'str' : 'string',
+  'num' : 'number',
+  'op' : 'operator',
+  'pkg' : 'pkg',
+  'builtin' : 'builtin',
+}
+
+
+def keep (obj : object) -> object:
+  '''
+  No-op decorator to keep a function or a class
+  at native speed.
+
+  The decorated function (or class) is obfuscated using
+  only the renaming, as with the '# pyhide: off' pragma,
+  and the decorator is removed from the obfuscated code.
+
+  Parameters
+  ----------
+    obj : object
+      Function or class to decorate
+
+  Returns
+  -------
+    obj : object
+      The same input object
+
+  Examples
+  --------
+  >>> import pyhide
+  >>>
+  >>> @pyhide.keep
+  >>> def kernel (x):
+  >>>   return x * 2
+  '''
+  return obj
+
+def parse_pragma (text : str, strict : bool = True) -> dict:
+  '''
+  Parse the directives of a pyhide pragma into the
+  maximum encoding levels of the transformations.
+
+  The available directives (comma separated) are:
+
+    - off : only the renaming is applied
+    - cheap : only the cheap encodings are applied
+    - no-<kind>-encode : the <kind> encoding is disabled,
+      where <kind> is one of str, num, op, pkg, builtin
+
+  Parameters
+  ----------
+    text : str
+      Directives of the pragma
+
+    strict : bool (default=True)
+      If False the unknown directives (e.g. free text after
+      the pyhide comment) are skipped with a warning,
+      otherwise they raise an error
+
+  Returns
+  -------
+    caps : dict
+      Lookup table of the maximum encoding level of
+      the transformations
+  '''
+
+  caps = {}
+
+  for directive in text.split(','):
+    directive = directive.strip()
+
+    if directive == 'off':
+      caps.update({k : LEVEL_OFF for k in PRAGMA_KINDS.values()})
+
+    elif directive == 'cheap':
+      caps.update({k : min(caps.get(k, LEVEL_CHEAP), LEVEL_CHEAP)
+        for k in PRAGMA_KINDS.values()
+      })
+
+    elif directive.startswith('no-') and directive.endswith('-encode') and \
+         directive[3:-7] in PRAGMA_KINDS:
+      caps[PRAGMA_KINDS[directive[3:-7]]] = LEVEL_OFF
+
+    elif strict:
+      raise ValueError(('Invalid pyhide pragma. '
+        'The available directives are off, cheap and no-<kind>-encode '
+        f'with kind in {", ".join(PRAGMA_KINDS)}. '
+        f'Given: {directive}'
+      ))
+
+    else:
+      warnings.warn(f'Unknown pyhide pragma directive skipped: {directive}')
+
+  return caps
+
+def get_pragmas (code : str) -> dict:
+  '''
+  Get the pyhide pragmas of the code.
+
+  A pragma is a comment like '# pyhide: off'. If it
+  follows a statement on the same line it is applied to
+  that statement, while if it is on its own line it is
+  applied to the next statement. In both cases the pragma
+  holds for the whole subtree of the statement (e.g. the
+  whole body of a function, class or loop).
+
+  The pragmas are found using only the tokens of the code,
+  so they do not require any walk along the code tree. The
+  unknown directives are skipped with a warning.
+
+  Parameters
+  ----------
+    code : str
+      Code to obfuscate
+
+  Returns
+  -------
+    pragmas : dict
+      Lookup table of the line numbers associated to the
+      maximum encoding levels of the transformations
+  '''
+
+  pragmas = {}
+
+  # avoid the tokenization if there are no pragmas
+  if 'pyhide' not in code:
+    return pragmas
+
+  # pragmas on their own line waiting for the next statement
+  pending = {}
+  # last line with a statement token
+  last = 0
+  # first line of the current logical line
+  start = 0
+  # check if the next token starts a new logical line
+  newline = True
+
+  tokens = tokenize.generate_tokens(io.StringIO(code).readline)
+
+  for tok in tokens:
+
+    if tok.type == tokenize.COMMENT:
+      match = PRAGMA_REGEX.match(tok.string)
+      if match is None:
+        continue
+
+      # NOTE: the comments could be free text (e.g. a note about
+      # the obfuscation), so their unknown directives are skipped
+      caps = parse_pragma(match.group('directives'), strict=False)
+      if not caps:
+        continue
+
+      # if the comment follows a statement token on the same
+      # line, apply it to the first line of the statement
+      if tok.start[0] == last:
+        pragmas.setdefault(start, {}).update(caps)
+      else:
+        pending.update(caps)
+
+    elif tok.type == tokenize.NEWLINE:
+      newline = True
+
+    elif tok.type not in (tokenize.NL, tokenize.INDENT, tokenize.DEDENT,
+                          tokenize.ENCODING, tokenize.ENDMARKER):
+      if newline:
+        start = tok.start[0]
+        newline = False
+
+      # the first token of the next statement
+      # takes the pending pragmas
+      if pending:
+        pragmas.setdefault(start, {}).update(pending)
+        pending = {}
+
+      last = tok.end[0]
+
+  return pragmas
+
+def get_keep_decorators (root : ast.Module) -> tuple:
+  '''
+  Get the names used to refer the pyhide package and
+  the keep decorator in the module.
+  Only the top level imports are considered, so no
+  walk along the code tree is required.
+
+  Parameters
+  ----------
+    root: ast.Module
+      Ast node on which start the search
+
+  Returns
+  -------
+    packages : set
+      Set of the aliases of the pyhide package
+
+    decorators : set
+      Set of the aliases of the keep decorator
+  '''
+
+  packages = set()
+  decorators = set()
+
+  for node in root.body:
+
+    if isinstance(node, ast.Import):
+      packages.update(mod.asname or mod.name
+        for mod in node.names
+          if mod.name == 'pyhide'
+      )
+
+    elif isinstance(node, ast.ImportFrom) and node.module == 'pyhide':
+      decorators.update(mod.asname or mod.name
+        for mod in node.names
+          if mod.name == 'keep'
+      )
+
+  return packages, decorators
+
+def count_package_uses (root : ast.AST, packages : set) -> int:
+  '''
+  Count the references to the pyhide package which are
+  not keep decorators, i.e. the ones which require the
+  package at runtime.
+
+  Parameters
+  ----------
+    root : ast.AST
+      Ast node on which start the search
+
+    packages : set
+      Set of the aliases of the pyhide package
+
+  Returns
+  -------
+    uses : int
+      Number of references to the package
+  '''
+
+  if not packages:
+    return 0
+
+  uses = 0
+
+  for node in ast.walk(root):
+
+    if isinstance(node, ast.Name) and node.id in packages:
+      uses += 1
+
+    # the keep decorators are removed by the obfuscation
+    elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+      uses -= sum(is_keep_decorator(node=d, packages=packages, decorators=())
+        for d in node.decorator_list
+      )
+
+  return uses
+
+def strip_keep_imports (root : ast.Module, packages : set) -> ast.Module:
+  '''
+  Remove the top level imports of the pyhide package,
+  when it is used only by the keep decorators, so the
+  obfuscated code does not require it at runtime.
+
+  Parameters
+  ----------
+    root : ast.Module
+      Code tree, edited in place
+
+    packages : set
+      Set of the aliases of the pyhide package
+
+  Returns
+  -------
+    root : ast.Module
+      The same (edited) node
+  '''
+
+  body = []
+
+  for node in root.body:
+
+    if isinstance(node, ast.Import):
+      node.names = [mod for mod in node.names
+        if not (mod.name == 'pyhide' and (mod.asname or mod.name) in packages)
+      ]
+      if not node.names:
+        continue
+
+    body.append(node)
+
+  root.body = body
+
+  return root
+
+def is_keep_decorator (node : ast.expr,
+                       packages : set,
+                       decorators : set
+                      ) -> bool:
+  '''
+  Check if the decorator node is the pyhide keep decorator.
+
+  Parameters
+  ----------
+    node : ast.expr
+      Decorator node to check
+
+    packages : set
+      Set of the aliases of the pyhide package
+
+    decorators : set
+      Set of the aliases of the keep decorator
+
+  Returns
+  -------
+    check : bool
+      True if it is the keep decorator
+  '''
+
+  if isinstance(node, ast.Name):
+    return node.id in decorators
+
+  return isinstance(node, ast.Attribute) and \
+         isinstance(node.value, ast.Name) and \
+         node.value.id in packages and \
+         node.attr == 'keep'
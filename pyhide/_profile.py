@@ -0,0 +1,236 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import ast
+import pstats
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+# encoding strength levels used to scope the transformations
+# NOTE: a lower level is always cheaper at runtime
+LEVEL_OFF = 0
+LEVEL_CHEAP = 1
+LEVEL_FULL = 2
+
+# rough per-evaluation overhead of each transformation, expressed
+# in units of the native node evaluation, for the (off, cheap, full)
+# levels.
+# NOTE: these are order-of-magnitude estimates used only to rank
+# the downgrades and to give a predicted overhead in the report
+ENCODING_COST = {
+  'string' : (0., 1., 40.),   # eval of a join expression
+  'number' : (0., 1., 1.),    # global name lookup of the header variable
+  'operator' : (0., 0., 6.),  # getattr of the magic method name built by join
+  'pkg' : (0., 1., 4.),       # getattr(__import__(...)) at each access
+  'builtin' : (0., 1., 4.),   # getattr(__import__('builtins')) at each call
+}
+
+
+def load_profile (filename : str) -> dict:
+  '''
+  Load a runtime profile of the code to obfuscate.
+
+  The profile could be a cProfile/pstats dump or a simple
+  line-count profile given as text file, where each line
+  is formatted as 'lineno count' or 'filename:lineno count'.
+  Empty lines and lines starting with '#' are ignored.
+
+  Parameters
+  ----------
+    filename : str
+      Path of the profile file
+
+  Returns
+  -------
+    profile : dict
+      Lookup table of the profile weights. The keys are given
+      by (filename, lineno, function name) for pstats dumps and
+      by (filename, lineno) for line-count profiles
+  '''
+
+  # first of all try to load it as a pstats dump
+  try:
+    stats = pstats.Stats(filename).stats
+  except (TypeError, ValueError, EOFError):
+    stats = None
+
+  if stats is not None:
+    # use the internal time of each function as weight
+    # since the encodings cost is spent in the function body
+    profile = {(fname, lineno, func) : tt
+      for (fname, lineno, func), (cc, nc, tt, ct, callers) in stats.items()
+    }
+    return profile
+
+  # otherwise parse it as a line-count profile
+  profile = {}
+
+  with open(filename, 'r', encoding='utf-8') as fp:
+    for row in fp:
+      row = row.strip()
+      # skip empty lines and comments
+      if not row or row.startswith('#'):
+        continue
+
+      location, count = row.split()
+      # get the optional filename
+      fname, _, lineno = location.rpartition(':')
+
+      key = (fname, int(lineno))
+      profile[key] = profile.get(key, 0.) + float(count)
+
+  return profile
+
+def get_hot_functions (root : ast.Module,
+                       profile : dict,
+                       threshold : float,
+                       filename : str = None,
+                      ) -> dict:
+  '''
+  Map the profile entries back to the function definitions
+  of the code tree and get the functions which take more
+  than the given share of the total runtime.
+
+  Function entries (pstats) are matched using the function
+  name and the definition line, while line entries are
+  attributed to the innermost function which contains them.
+
+  Parameters
+  ----------
+    root: ast.Module
+      Ast node on which start the search
+
+    profile : dict
+      Lookup table of the profile weights as given by
+      the 'load_profile' function
+
+    threshold : float
+      Minimum share of the total runtime (in [0, 1]) for
+      a function to be considered hot
+
+    filename : str (default=None)
+      Name of the profiled source file. If it is set, only
+      the profile entries with the same file basename are
+      considered; the total runtime is always computed
+      on the whole profile
+
+  Returns
+  -------
+    hot: dict
+      Lookup table of the hot function nodes associated
+      to the corresponding share of runtime
+  '''
+
+  # get the total weight of the whole profile
+  total = sum(profile.values())
+
+  if total <= 0.:
+    return {}
+
+  # get the list of function definitions as
+  # (first line, def line, last line, node)
+  # NOTE: the first line of a decorated function is
+  # the line of the first decorator in the pstats dumps
+  functions = [
+    (min([d.lineno for d in node.decorator_list] + [node.lineno]),
+     node.lineno,
+     node.end_lineno,
+     node
+    )
+    for node in ast.walk(root)
+      if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))
+  ]
+
+  # get the basename of the source file for the filtering
+  basename = os.path.basename(filename) if filename else None
+
+  shares = {}
+
+  # loop along the profile entries
+  for key, weight in profile.items():
+
+    fname, lineno = key[0], key[1]
+
+    # skip the entries of other files
+    if basename is not None and fname and \
+       os.path.basename(fname) != basename:
+      continue
+
+    # if it is a function entry
+    if len(key) == 3:
+      matches = [node
+        for first, line, last, node in functions
+          if node.name == key[2] and first <= lineno <= line
+      ]
+    # if it is a line entry get the innermost function
+    else:
+      matches = sorted([(first, node)
+          for first, line, last, node in functions
+            if first <= lineno <= last
+        ],
+        key=lambda x : x[0]
+      )
+      matches = [node for _, node in matches[-1:]]
+
+    for node in matches:
+      shares[node] = shares.get(node, 0.) + weight / total
+
+  # filter the hot functions only
+  hot = {node : share
+    for node, share in shares.items()
+      if share >= threshold
+  }
+
+  return hot
+
+def format_profile_report (report : list,
+                           threshold : float
+                          ) -> str:
+  '''
+  Format the report of the profile-guided obfuscation
+  as a human readable table.
+
+  Parameters
+  ----------
+    report : list
+      List of the hot function records as given by
+      the Obfuscator object
+
+    threshold : float
+      Minimum share of the total runtime used to select
+      the hot functions
+
+  Returns
+  -------
+    text : str
+      Formatted report
+  '''
+
+  lines = [
+    f'pyhide profile report (hot threshold: {threshold:.1%})',
+    f'  {"function":<30} {"line":>6} {"share":>7}  downgraded nodes',
+  ]
+
+  full_overhead = 0.
+  overhead = 0.
+
+  for record in report:
+    downgraded = ', '.join(f'{k}: {v}'
+      for k, v in sorted(record['downgraded'].items())
+    ) or '-'
+    lines.append(
+      f'  {record["name"]:<30} {record["lineno"]:>6} {record["share"]:>7.1%}  {downgraded}'
+    )
+    # the predicted slowdown of the function is given by the cost
+    # of the encodings normalized by the number of nodes in its body
+    nodes = max(record['nodes'], 1)
+    full_overhead += record['share'] * record['full_cost'] / nodes
+    overhead += record['share'] * record['cost'] / nodes
+
+  lines.append(
+    f'predicted overhead on the hot functions: {full_overhead:.1%} (full) -> {overhead:.1%} (downgraded)'
+  )
+
+  return '\n'.join(lines)
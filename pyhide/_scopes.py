@@ -0,0 +1,506 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import ast
+import symtable
+from collections import deque
+
+from ._encoder import _BUILT_IN
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+# names of the symbol tables of the comprehensions
+COMPREHENSION_NAMES = {
+  ast.ListComp : 'listcomp',
+  ast.SetComp : 'setcomp',
+  ast.DictComp : 'dictcomp',
+  ast.GeneratorExp : 'genexpr',
+}
+
+# fields of the nodes which bind or use a name
+# as plain string (i.e. not as Name node)
+NAME_FIELDS = {
+  ast.Name : 'id',
+  ast.arg : 'arg',
+  ast.ExceptHandler : 'name',
+}
+# the match patterns are given by python 3.10+
+if hasattr(ast, 'pattern'):
+  NAME_FIELDS.update({
+    ast.MatchAs : 'name',
+    ast.MatchStar : 'name',
+    ast.MatchMapping : 'rest',
+  })
+
+# fields of the identifiers which are not renamed
+# by scope, i.e. the ones left to the global lut
+IDENTIFIER_FIELDS = {
+  ast.keyword : ('arg', ),
+  ast.Attribute : ('attr', ),
+  ast.FunctionDef : ('name', ),
+  ast.AsyncFunctionDef : ('name', ),
+  ast.ClassDef : ('name', ),
+  ast.alias : ('name', 'asname'),
+}
+
+
+class _ScopeMismatch (Exception):
+  '''
+  The code tree does not match the symbol table, e.g. for
+  the scopes added by newer python versions.
+  '''
+  pass
+
+
+class _Scope (object):
+  '''
+  Scope of the code tree, given by its symbol table.
+
+  Parameters
+  ----------
+    table : symtable.SymbolTable
+      Symbol table of the scope
+
+    kind : str
+      Kind of the scope (module, class, function)
+
+    parent : _Scope
+      Enclosing scope (None for the module)
+
+    qualname : str
+      Qualified name of the scope, as used by the symbol map
+
+    offset : int
+      Number of lines before the code of the symbol table
+  '''
+
+  __slots__ = ('table', 'kind', 'parent', 'qualname', 'offset', 'children',
+               'blocked', 'counts', 'aliases', 'size')
+
+  def __init__ (self, table : object, kind : str, parent : object, qualname : str, offset : int):
+    self.table = table
+    self.kind = kind
+    self.parent = parent
+    self.qualname = qualname
+    self.offset = offset
+
+    # symbol tables of the nested scopes, in the
+    # order of definition
+    self.children = {}
+    for child in table.get_children():
+      key = (child.get_name(), child.get_lineno() + offset)
+      self.children.setdefault(key, deque()).append(child)
+
+    # names which could not be renamed
+    self.blocked = set()
+    # number of uses of each renamed name
+    self.counts = {}
+    # index of the alias of each renamed name
+    self.aliases = {}
+    # number of aliases taken by the enclosing functions
+    self.size = 0
+
+  def nest (self, name : str, lineno : int, kind : str, qualname : str) -> object:
+    '''
+    Get the scope of a nested node.
+
+    Parameters
+    ----------
+      name : str
+        Name of the nested symbol table
+
+      lineno : int
+        Line number of the nested node
+
+      kind : str
+        Kind of the nested scope
+
+      qualname : str
+        Name of the nested scope
+
+    Returns
+    -------
+      scope : _Scope
+        Nested scope (None if there is no symbol table)
+    '''
+    tables = self.children.get((name, lineno))
+    if not tables:
+      return None
+
+    scope = self.__class__(table=tables.popleft(), kind=kind, parent=self,
+      qualname=qualname if self.kind == 'module' else f'{self.qualname}.{qualname}',
+      offset=self.offset
+    )
+    return scope
+
+  def lookup (self, name : str) -> object:
+    try:
+      return self.table.lookup(name)
+    except KeyError:
+      return None
+
+  def get_owner (self, name : str) -> object:
+    '''
+    Get the function scope in which the name is defined,
+    following the free names along the enclosing functions.
+
+    Parameters
+    ----------
+      name : str
+        Name used in the scope
+
+    Returns
+    -------
+      owner : _Scope
+        Function scope of the name (None if it is a
+        global, builtin or class name)
+    '''
+    symbol = self.lookup(name)
+    scope = self
+
+    if symbol is None:
+      return None
+
+    # the free names are defined by the nearest
+    # enclosing function, skipping the classes
+    while symbol.is_free():
+      scope = scope.parent
+      while scope is not None and scope.kind == 'class':
+        scope = scope.parent
+      if scope is None or scope.kind != 'function':
+        return None
+      symbol = scope.lookup(name)
+      if symbol is None:
+        return None
+
+    if scope.kind == 'function' and symbol.is_local() and not symbol.is_global():
+      return scope
+
+    return None
+
+
+def get_scope_table (code : str) -> symtable.SymbolTable:
+  '''
+  Get the symbol table of the code, used to rename
+  the local variables by scope.
+
+  Parameters
+  ----------
+    code : str
+      Code to obfuscate
+
+  Returns
+  -------
+    table : symtable.SymbolTable
+      Symbol table of the module (None if the compiler
+      rejects the code, e.g. for a misplaced nonlocal)
+  '''
+  try:
+    return symtable.symtable(code, '<string>', 'exec')
+  except (SyntaxError, ValueError):
+    return None
+
+def _get_renamable (scope : _Scope, node : ast.AST) -> set:
+  '''
+  Get the local names of a function scope which could be
+  renamed, i.e. the names which could not be reached
+  from outside the function.
+
+  The parameters which could be passed by keyword, the
+  imported modules and the nested functions and classes
+  are left to the global lut.
+  '''
+  params = set()
+  if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda)):
+    params.update(arg.arg for arg in node.args.args + node.args.kwonlyargs)
+
+  return {symbol.get_name()
+    for symbol in scope.table.get_symbols()
+      if symbol.is_local() and not symbol.is_global() and
+         not symbol.is_imported() and not symbol.is_namespace() and
+         symbol.get_name().isidentifier() and
+         symbol.get_name() not in params and
+         symbol.get_name() not in scope.blocked
+  }
+
+def resolve_scopes (root : ast.Module,
+                    table : symtable.SymbolTable,
+                    rename : bool = True,
+                    offset : int = 0,
+                    definitions : set = frozenset(),
+                   ) -> dict:
+  '''
+  Find the local variables of the functions which could
+  be renamed by scope.
+
+  Each function gives to its local variables the first
+  aliases which are not used by the enclosing functions,
+  so the functions at the same nesting level reuse the
+  same aliases. The global names, the attributes and the
+  parameters which could be passed by keyword keep the
+  aliases of the global lut, which reserves a range of
+  aliases to the local ones (see rename_locals).
+
+  Parameters
+  ----------
+    root : ast.Module
+      Ast node of the code
+
+    table : symtable.SymbolTable
+      Symbol table of the code (see get_scope_table)
+
+    rename : bool (default=True)
+      Enable/Disable the renaming of the local variables.
+      The calls of the definitions named as the builtin
+      functions are found anyway
+
+    offset : int (default=0)
+      Number of lines before the code of the symbol table
+      (e.g. for a statement of a streamed file)
+
+    definitions : set (default=frozenset())
+      Names defined by the module outside the code of the
+      symbol table (e.g. by the other streamed statements)
+
+  Returns
+  -------
+    scopes : dict
+      Number of aliases to reserve to the local variables,
+      renamed names, names which are removed from the code,
+      names defined by the module, positions of the calls of
+      the definitions named as builtin functions, renamed nodes
+      and local variables of each scope (None if the code
+      tree does not match the symbol table)
+  '''
+  module = _Scope(table=table, kind='module', parent=None, qualname='<module>', offset=offset)
+
+  # the names defined by the module (except the imported
+  # ones, which are not renamed)
+  definitions = definitions | {symbol.get_name()
+    for symbol in table.get_symbols()
+      if symbol.is_local() and not symbol.is_imported()
+  }
+
+  # sites of the names with their scope
+  sites = []
+  # identifiers which are never renamed by scope
+  identifiers = set()
+  # functions with their scope, to get their parameters
+  functions = []
+
+  todo = [(root, module)]
+
+  try:
+
+    while todo:
+
+      node, scope = todo.pop()
+
+      for field in IDENTIFIER_FIELDS.get(node.__class__, ()):
+        identifiers.add(getattr(node, field))
+
+      # the type parameters and aliases have their own
+      # annotation scopes, which are not supported
+      if getattr(node, 'type_params', None) or node.__class__.__name__ == 'TypeAlias':
+        raise _ScopeMismatch
+
+      if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda)):
+        name = 'lambda' if isinstance(node, ast.Lambda) else node.name
+        child = scope.nest(name=name, lineno=node.lineno, kind='function',
+          qualname='<lambda>' if isinstance(node, ast.Lambda) else node.name
+        )
+        if child is None:
+          raise _ScopeMismatch
+
+        functions.append((child, node))
+        args = node.args
+
+        # the defaults, annotations and decorators are
+        # evaluated by the enclosing scope
+        outer = args.defaults + [default for default in args.kw_defaults if default is not None]
+        inner = [args.vararg, args.kwarg] + args.posonlyargs + args.args + args.kwonlyargs
+        inner = [arg for arg in inner if arg is not None]
+        outer += [arg.annotation for arg in inner if arg.annotation is not None]
+
+        if isinstance(node, ast.Lambda):
+          inner.append(node.body)
+        else:
+          outer += [node.returns] if node.returns is not None else []
+          outer += node.decorator_list
+          inner += node.body
+
+        # NOTE: the nodes are popped in reverse order, so the
+        # enclosing nodes are visited before the body, as done
+        # by the compiler
+        todo.extend((n, child) for n in reversed(inner))
+        todo.extend((n, scope) for n in reversed(outer))
+        continue
+
+      if isinstance(node, ast.ClassDef):
+        child = scope.nest(name=node.name, lineno=node.lineno, kind='class', qualname=node.name)
+        if child is None:
+          raise _ScopeMismatch
+
+        # the class names are class attributes, so the enclosing
+        # functions could not rename them
+        parent = scope
+        while parent is not None:
+          if parent.kind == 'function':
+            parent.blocked.update(symbol.get_name()
+              for symbol in child.table.get_symbols()
+                if symbol.is_local()
+            )
+          parent = parent.parent
+
+        outer = node.bases + node.keywords + node.decorator_list
+        todo.extend((n, child) for n in reversed(node.body))
+        todo.extend((n, scope) for n in reversed(outer))
+        continue
+
+      if isinstance(node, tuple(COMPREHENSION_NAMES)):
+        child = scope.nest(name=COMPREHENSION_NAMES[node.__class__], lineno=node.lineno,
+          kind='function', qualname=f'<{COMPREHENSION_NAMES[node.__class__]}>'
+        )
+        # NOTE: the comprehensions could be inlined in the
+        # enclosing scope by newer python versions
+        if child is None:
+          child = scope
+        else:
+          functions.append((child, node))
+
+        # the first iterable is evaluated by the enclosing scope
+        first, *others = node.generators
+        inner = [first.target] + first.ifs + others
+        inner += [node.key, node.value] if isinstance(node, ast.DictComp) else [node.elt]
+
+        todo.extend((n, child) for n in reversed(inner))
+        todo.append((first.iter, scope))
+        continue
+
+      if isinstance(node, (ast.Global, ast.Nonlocal)):
+        sites.extend((node, i, name, scope) for i, name in enumerate(node.names))
+
+      else:
+        field = NAME_FIELDS.get(node.__class__)
+        if field is not None and getattr(node, field) is not None:
+          sites.append((node, field, getattr(node, field), scope))
+
+      todo.extend((n, scope) for n in reversed(list(ast.iter_child_nodes(node))))
+
+  except _ScopeMismatch:
+    return None
+
+  # get the local names of each function
+  renamable = {}
+  for scope, node in functions:
+    renamable[id(scope)] = _get_renamable(scope=scope, node=node)
+
+  owners = []
+  bound = set()
+
+  for node, field, name, scope in sites:
+    owner = scope.get_owner(name)
+
+    # the calls of the user definitions named as builtin
+    # functions must not be replaced by the builtin lookups
+    if isinstance(node, ast.Name) and name in _BUILT_IN and isinstance(node.ctx, ast.Load):
+      # the name is bound by a function, by the class body
+      # or by the module
+      # NOTE: the imported names are left to the builtin lookups,
+      # since the imports are not renamed
+      binding = owner or (scope if scope.kind == 'class' else None)
+      symbol = binding.lookup(name) if binding is not None else None
+      local = symbol is not None and symbol.is_local()
+
+      if local and not symbol.is_imported() or not local and owner is None and name in definitions:
+        bound.add((node.lineno, node.col_offset))
+
+    if owner is None or not rename or name not in renamable.get(id(owner), ()):
+      owner = None
+    else:
+      owner.counts[name] = owner.counts.get(name, 0) + 1
+
+    owners.append(owner)
+
+  # give the aliases to the local names, sorted by number of
+  # uses, after the aliases of the enclosing functions.
+  # NOTE: the aliases are given as index in the range of
+  # aliases reserved by the lut
+  reserved = 0
+  local_names = []
+
+  for scope, _ in functions:
+    parent = scope.parent
+    while parent is not None and parent.kind != 'function':
+      parent = parent.parent
+    scope.size = 0 if parent is None else parent.size + len(parent.aliases)
+
+    names = sorted(scope.counts, key=lambda name : (-scope.counts[name], name))
+    scope.aliases = {name : scope.size + i for i, name in enumerate(names)}
+    reserved = max(reserved, scope.size + len(names))
+
+    local_names.extend((index, name, scope.qualname) for name, index in scope.aliases.items())
+
+  # the renamed names which are still used in the code
+  # (e.g. as global names or attributes) are kept in the lut
+  renamed = []
+
+  for (node, field, name, scope), owner in zip(sites, owners):
+    if owner is None:
+      identifiers.add(name)
+    else:
+      renamed.append((node, field, name, owner.aliases[name]))
+
+  names = {name for _, _, name, _ in renamed}
+
+  return {
+    'reserved' : reserved,
+    'names' : names,
+    'kept' : identifiers,
+    'excluded' : names - identifiers,
+    'definitions' : definitions,
+    'bound' : bound,
+    'renamed' : renamed,
+    'locals' : local_names,
+  }
+
+def rename_locals (scopes : dict, start : int) -> tuple:
+  '''
+  Rename the local variables with the aliases reserved
+  by the lut.
+
+  Parameters
+  ----------
+    scopes : dict
+      Local variables to rename, as given by resolve_scopes
+
+    start : int
+      Length of the first reserved alias
+
+  Returns
+  -------
+    records : list
+      List of the (alias, name, kind, scope) records of the
+      local variables for the symbol map
+
+    growth : int
+      Number of bytes added by the local aliases
+  '''
+  growth = 0
+
+  for node, field, name, index in scopes['renamed']:
+    alias = '_' * (start + index)
+
+    if isinstance(field, int):
+      node.names[field] = alias
+    else:
+      setattr(node, field, alias)
+
+    growth += len(alias) - len(name)
+
+  records = [('_' * (start + index), name, 'local', qualname)
+    for index, name, qualname in scopes['locals']
+  ]
+
+  return records, growth
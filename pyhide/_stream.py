@@ -0,0 +1,257 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import ast
+import tokenize
+
+from ._encoder import _BUILT_IN
+from ._encoder import collect_symbols
+from ._pragma import get_pragmas
+from ._scopes import get_scope_table
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+# keywords which continue the previous compound
+# statement at the top-level
+CONTINUATION_KEYWORDS = ('else', 'elif', 'except', 'finally')
+
+# tokens which do not start a logical line
+LAYOUT_TOKENS = (tokenize.NL, tokenize.COMMENT, tokenize.NEWLINE,
+                 tokenize.INDENT, tokenize.DEDENT, tokenize.ENDMARKER)
+
+
+def iter_statements (readline : object) -> tuple:
+  '''
+  Split the source code in its top-level statements
+  reading it line by line.
+
+  The statements are found using only the tokens of the
+  code, so at most one statement is kept in memory. The
+  comments and the blank lines between two statements
+  are given with the following one, so the pragmas on
+  their own line are applied to the right statement.
+
+  Parameters
+  ----------
+    readline : object
+      Function which returns the next line of the code
+      (e.g. the readline of a text file)
+
+  Yields
+  ------
+    lineno : int
+      First line of the statement in the code
+
+    code : str
+      Source code of the statement
+  '''
+
+  # lines of the current statement
+  lines = []
+  # first line of the current statement
+  first = 1
+
+  def reader ():
+    line = readline()
+    lines.append(line)
+    return line
+
+  # indentation level of the current logical line
+  depth = 0
+  # last line of the previous logical line
+  last = 0
+  # check if the next token starts a new logical line
+  newline = True
+  # check if the previous top-level line is a decorator
+  decorator = False
+
+  for tok in tokenize.generate_tokens(reader):
+
+    if tok.type == tokenize.INDENT:
+      depth += 1
+
+    elif tok.type == tokenize.DEDENT:
+      depth -= 1
+
+    elif tok.type == tokenize.NEWLINE:
+      newline = True
+      last = tok.end[0]
+
+    elif tok.type not in LAYOUT_TOKENS and newline:
+      newline = False
+
+      if depth > 0:
+        continue
+
+      # the statement continues if the line is a clause of
+      # the previous compound statement or the decorated one
+      if decorator or (tok.type == tokenize.NAME and tok.string in CONTINUATION_KEYWORDS):
+        decorator = tok.string == '@'
+        continue
+
+      decorator = tok.string == '@'
+
+      if last >= first:
+        # the statement ends at its last logical line, while
+        # the following lines belong to the next statement
+        n_lines = last - first + 1
+        yield first, ''.join(lines[:n_lines])
+        del lines[:n_lines]
+        first = last + 1
+
+  if lines:
+    yield first, ''.join(lines)
+
+def parse_statements (filename : str) -> tuple:
+  '''
+  Parse the top-level statements of a source file
+  one at a time.
+
+  Parameters
+  ----------
+    filename : str
+      Path of the source file
+
+  Yields
+  ------
+    root : ast.Module
+      Code tree of the statement, with the line numbers
+      of the source file
+
+    pragmas : dict
+      Lookup table of the pragmas of the statement by
+      line number of the source file
+
+    table : symtable.SymbolTable
+      Symbol table of the statement (see get_scope_table)
+
+    offset : int
+      Number of lines before the statement, i.e. the offset
+      of the line numbers of the symbol table
+  '''
+
+  # NOTE: the encoding is given by the coding cookie (if any)
+  with tokenize.open(filename) as fp:
+
+    for lineno, code in iter_statements(fp.readline):
+
+      root = ast.parse(code)
+      ast.increment_lineno(root, lineno - 1)
+
+      pragmas = {line + lineno - 1 : caps
+        for line, caps in get_pragmas(code).items()
+      }
+
+      yield root, pragmas, get_scope_table(code), lineno - 1
+
+def merge_symbols (symbols : dict, root : ast.Module) -> dict:
+  '''
+  Collect the values of a statement which could be replaced
+  by the code encryption, merging them with the ones of the
+  previous statements.
+
+  The function calls and the package attributes depend on
+  the modules imported by the whole code, so their candidates
+  are kept until the end (see resolve_symbols).
+
+  Parameters
+  ----------
+    symbols : dict
+      Values collected from the previous statements (None
+      for the first one)
+
+    root : ast.Module
+      Code tree of the statement
+
+  Returns
+  -------
+    symbols : dict
+      Merged values
+  '''
+
+  if symbols is None:
+    symbols = {
+      'chars' : set(),
+      'strings' : set(),
+      'bytes' : set(),
+      'numbers' : {},
+      'var_names' : set(),
+      'fun_names' : {},
+      'cls_names' : set(),
+      'mod_lut' : {},
+      'pkg_attrs' : set(),
+      'operators' : set(),
+      'calls' : set(),
+      'attrs' : set(),
+    }
+
+  part = collect_symbols(root=root)
+
+  symbols['chars'].update(part['chars'])
+  symbols['strings'].update(part['strings'])
+  symbols['bytes'].update(part['bytes'])
+  # NOTE: the type is part of the key, since 1, 1.0
+  # and True are equal values
+  symbols['numbers'].update(((type(x), x), x) for x in part['numbers'])
+  symbols['var_names'].update(part['var_names'])
+  symbols['fun_names'].update(dict.fromkeys(part['fun_names']))
+  symbols['cls_names'].update(part['cls_names'])
+  symbols['mod_lut'].update(part['mod_lut'])
+  symbols['pkg_attrs'].update(part['pkg_attrs'])
+  symbols['operators'].update(part['operators'])
+
+  for node in ast.walk(root):
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name):
+      symbols['calls'].add(node.func.id)
+    elif isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name):
+      symbols['attrs'].add((node.value.id, node.attr))
+
+  return symbols
+
+def resolve_symbols (symbols : dict) -> dict:
+  '''
+  Get the values collected from all the statements in the
+  format of the collect_symbols function.
+
+  Parameters
+  ----------
+    symbols : dict
+      Values merged by the merge_symbols function
+
+  Returns
+  -------
+    symbols : dict
+      Lookup table of the values found in the code,
+      grouped by category
+  '''
+
+  modules = symbols['mod_lut']
+
+  # the calls of the modules imported by other statements
+  fun_names = dict(symbols['fun_names'])
+  fun_names.update(dict.fromkeys(sorted(name
+    for name in symbols['calls']
+      if name in _BUILT_IN or name in modules.values()
+  )))
+
+  # the attributes of the modules imported by other statements
+  pkg_attrs = symbols['pkg_attrs'] | {(modules[name], modules.get(attr, attr))
+    for name, attr in symbols['attrs']
+      if name in modules
+  }
+
+  return {
+    'chars' : sorted(symbols['chars']),
+    'strings' : sorted(symbols['strings']),
+    'bytes' : sorted(symbols['bytes']),
+    'numbers' : sorted(symbols['numbers'].values(),
+      key=lambda x : (type(x).__name__, repr(x))
+    ),
+    'var_names' : sorted(symbols['var_names']),
+    'fun_names' : list(fun_names),
+    'cls_names' : sorted(symbols['cls_names']),
+    'mod_lut' : modules,
+    'pkg_attrs' : sorted(pkg_attrs),
+    'operators' : sorted(symbols['operators']),
+  }
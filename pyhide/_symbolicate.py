@@ -0,0 +1,365 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import io
+import re
+import ast
+import mmap
+import marshal
+
+from ._encoder import ALIAS_REGEX
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+# first line of the symbol map files
+SYMBOL_MAP_HEADER = '# pyhide symbol map v1\n'
+
+# regex of the frame lines of the tracebacks
+# NOTE: the frames give the function name, which is used
+# as scope of the local aliases in the following lines
+FRAME_REGEX = re.compile(r'^\s*File ".*", line \d+, in (\S+)')
+
+
+def get_symbol_records (root : ast.Module, lut : object) -> list:
+  '''
+  Get the records of the symbol map, i.e. the aliases
+  of the identifiers with their original name, the kind
+  of definition and the defining scope.
+
+  Parameters
+  ----------
+    root : ast.Module
+      Ast node of the code before the obfuscation
+
+    lut : SymbolTable
+      Symbol table of the aliases for the code obfuscator
+
+  Returns
+  -------
+    records : list
+      Sorted list of (alias, name, kind, scope) records
+  '''
+
+  # get the alias of each identifier
+  aliases = {symbol.key : symbol.alias
+    for symbol in lut
+      if symbol.kind == 'name'
+  }
+
+  records = set()
+  # identifiers without a definition in the code
+  undefined = set(aliases)
+
+  def add_record (name : str, kind : str, scope : str):
+    if name in aliases:
+      records.add((aliases[name], name, kind, scope))
+      undefined.discard(name)
+
+  # walk along the code tree keeping track of the scopes
+  todo = [(root, '<module>')]
+
+  while todo:
+
+    node, scope = todo.pop()
+    child_scope = scope
+
+    if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+      add_record(node.name, 'function', scope)
+      child_scope = node.name if scope == '<module>' else f'{scope}.{node.name}'
+
+    elif isinstance(node, ast.ClassDef):
+      add_record(node.name, 'class', scope)
+      child_scope = node.name if scope == '<module>' else f'{scope}.{node.name}'
+
+    elif isinstance(node, ast.arg):
+      add_record(node.arg, 'argument', scope)
+
+    elif isinstance(node, ast.Name) and isinstance(node.ctx, ast.Store):
+      add_record(node.id, 'variable', scope)
+
+    elif isinstance(node, ast.Attribute) and isinstance(node.ctx, ast.Store):
+      add_record(node.attr, 'attribute', scope)
+
+    elif isinstance(node, ast.alias):
+      add_record(node.asname or node.name, 'module', scope)
+
+    todo.extend((child, child_scope) for child in ast.iter_child_nodes(node))
+
+  # the remaining identifiers are only used in the code
+  # (e.g. builtin functions or external attributes)
+  records.update((aliases[name], name, 'name', '-') for name in undefined)
+
+  # add the cached package attributes
+  records.update((symbol.alias, '.'.join(symbol.key), 'package', '<module>')
+    for symbol in lut
+      if symbol.kind == 'attribute'
+  )
+
+  return sorted(records)
+
+def dump_symbol_map (records : list, filename : str) -> None:
+  '''
+  Dump the symbol map as a text file with a record per
+  line, sorted by alias, so it could be searched by
+  bisection without loading it in memory.
+
+  Parameters
+  ----------
+    records : list
+      Sorted list of (alias, name, kind, scope) records
+
+    filename : str
+      Path of the output file
+  '''
+
+  with open(filename, 'w', encoding='utf-8', newline='\n') as fp:
+    fp.write(SYMBOL_MAP_HEADER)
+    fp.writelines(f'{alias}\t{name}\t{kind}\t{scope}\n'
+      for alias, name, kind, scope in records
+    )
+
+
+class SymbolMap (object):
+  '''
+  Memory-mapped symbol map of an obfuscated code.
+
+  The aliases are searched by bisection on the sorted
+  lines of the file, and the results are cached.
+
+  Parameters
+  ----------
+    filename : str
+      Path of the symbol map file
+
+  Examples
+  --------
+  >>> with SymbolMap('app.pyhide-map') as symbols:
+  >>>   symbols.lookup('______')
+  'main'
+  '''
+
+  def __init__ (self, filename : str):
+
+    with open(filename, 'rb') as fp:
+      header = fp.readline()
+
+      if header.decode('utf-8', 'replace') != SYMBOL_MAP_HEADER:
+        raise ValueError(('Invalid symbol map file. '
+          f'The file must start with {SYMBOL_MAP_HEADER.strip()!r}. '
+          f'Given: {filename}'
+        ))
+
+      self._size = fp.seek(0, io.SEEK_END)
+      self._start = len(header)
+      # an empty map could not be memory-mapped
+      self._mm = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) if self._size > self._start else b''
+
+    self._cache = {}
+
+  def _find (self, alias : str) -> list:
+    '''
+    Get the records of the alias.
+
+    Parameters
+    ----------
+      alias : str
+        Alias to search
+
+    Returns
+    -------
+      records : list
+        List of the (name, kind, scope) records of the alias
+    '''
+
+    key = alias.encode('utf-8')
+    mm = self._mm
+    lo, hi = self._start, self._size
+
+    # bisection on the line starts
+    while lo < hi:
+      mid = (lo + hi) // 2
+      start = mm.rfind(b'\n', lo, mid) + 1 or lo
+      end = mm.find(b'\n', start)
+      end = self._size if end == -1 else end
+
+      if mm[start : mm.find(b'\t', start, end)] < key:
+        lo = end + 1
+      else:
+        hi = start
+
+    records = []
+
+    # the local aliases have a record for each scope
+    # on the following lines
+    while lo < self._size:
+      end = mm.find(b'\n', lo)
+      end = self._size if end == -1 else end
+      line = mm[lo : end].split(b'\t')
+
+      if line[0] != key:
+        break
+
+      records.append(tuple(field.decode('utf-8') for field in line[1:]))
+      lo = end + 1
+
+    return records
+
+  def lookup (self, alias : str, scope : str = None) -> str:
+    '''
+    Get the original name of the alias.
+
+    Parameters
+    ----------
+      alias : str
+        Alias to search
+
+      scope : str (default=None)
+        Qualified name (or name) of the function which
+        uses the alias, e.g. the function of a traceback
+        frame, used to resolve the local aliases
+
+    Returns
+    -------
+      name : str
+        Original name (None if it is not found or if the
+        alias maps different names in the given scope)
+    '''
+
+    if (alias, scope) in self._cache:
+      return self._cache[alias, scope]
+
+    records = self._find(alias)
+
+    if scope is not None:
+      # the frames report the name of the function
+      # instead of its qualified name
+      records = [record for record in records
+        if record[-1] == scope or record[-1].endswith(f'.{scope}')
+      ] or records
+
+    names = {record[0] for record in records}
+    name = names.pop() if len(names) == 1 else None
+
+    self._cache[alias, scope] = name
+
+    return name
+
+  def symbolicate (self, text : str, scope : str = None) -> str:
+    '''
+    Replace the aliases in the text with their original names.
+
+    Parameters
+    ----------
+      text : str
+        Text to process
+
+      scope : str (default=None)
+        Qualified name (or name) of the function which
+        uses the aliases of the text
+
+    Returns
+    -------
+      text : str
+        Processed text
+    '''
+    return ALIAS_REGEX.sub(lambda m : self.lookup(m.group(), scope=scope) or m.group(), text)
+
+  def close (self) -> None:
+    if isinstance(self._mm, mmap.mmap):
+      self._mm.close()
+
+  def __enter__ (self):
+    return self
+
+  def __exit__ (self, exc_type, exc_value, traceback):
+    self.close()
+
+def is_pstats_file (filename : str) -> bool:
+  '''
+  Check if the file is a cProfile/pstats dump.
+
+  Parameters
+  ----------
+    filename : str
+      Path of the file
+
+  Returns
+  -------
+    check : bool
+      True if it is a pstats dump
+  '''
+
+  with open(filename, 'rb') as fp:
+    # a marshal dump of a dict (with or without the ref flag)
+    return fp.read(1) in (b'{', b'\xfb')
+
+def symbolicate_pstats (inptfile : str,
+                        outfile : str,
+                        symbols : SymbolMap
+                       ) -> None:
+  '''
+  Replace the aliases of the function names in a
+  cProfile/pstats dump.
+
+  Parameters
+  ----------
+    inptfile : str
+      Path of the pstats dump
+
+    outfile : str
+      Path of the output pstats dump
+
+    symbols : SymbolMap
+      Symbol map of the obfuscated code
+  '''
+
+  # NOTE: the pstats dump is a single marshal object,
+  # so it could not be processed as a stream
+  with open(inptfile, 'rb') as fp:
+    stats = marshal.load(fp)
+
+  def rename (key : tuple) -> tuple:
+    filename, lineno, func = key
+    return (filename, lineno, symbols.symbolicate(func))
+
+  stats = {rename(key) : (cc, nc, tt, ct, {rename(k) : v for k, v in callers.items()})
+    for key, (cc, nc, tt, ct, callers) in stats.items()
+  }
+
+  with open(outfile, 'wb') as fp:
+    marshal.dump(stats, fp)
+
+def symbolicate_stream (inpt : io.TextIOBase,
+                        out : io.TextIOBase,
+                        symbols : SymbolMap
+                       ) -> None:
+  '''
+  Replace the aliases in a text stream line by line,
+  e.g. collapsed stacks for flame graphs, py-spy dumps
+  or tracebacks. The local aliases of the traceback lines
+  are resolved in the function of the last frame.
+
+  Parameters
+  ----------
+    inpt : io.TextIOBase
+      Input text stream
+
+    out : io.TextIOBase
+      Output text stream
+
+    symbols : SymbolMap
+      Symbol map of the obfuscated code
+  '''
+  # function of the last traceback frame
+  scope = None
+
+  for line in inpt:
+    frame = FRAME_REGEX.match(line)
+
+    if frame is not None:
+      scope = symbols.symbolicate(frame.group(1))
+    elif line.startswith('Traceback'):
+      scope = None
+
+    out.write(symbols.symbolicate(line, scope=scope))
@@ -0,0 +1,227 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import sys
+import hashlib
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+# namespaces of the symbol table:
+#   - char : code points of the string characters
+#   - string : whole string literals
+#   - number : numeric and bool literals
+#   - name : identifiers (variables, functions, classes, modules)
+#   - attribute : (package, attribute) pairs of the cached lookups
+#   - blob : large string and bytes literals encoded as compressed blobs
+SYMBOL_KINDS = ('char', 'string', 'number', 'name', 'attribute', 'blob')
+
+# string literals longer than this are stored by digest
+MAX_STRING_KEY = 64
+
+
+class Symbol (object):
+  '''
+  Entry of the symbol table.
+
+  Parameters
+  ----------
+    kind : str
+      Namespace of the symbol
+
+    key : object
+      Key of the symbol in its namespace
+
+    alias : str
+      Obfuscated name of the symbol
+  '''
+
+  __slots__ = ('kind', 'key', 'alias')
+
+  def __init__ (self, kind : str, key : object, alias : str):
+    self.kind = kind
+    self.key = key
+    self.alias = alias
+
+  def __repr__ (self) -> str:
+    class_name = self.__class__.__qualname__
+    return f'{class_name}(kind={self.kind!r}, key={self.key!r}, alias={self.alias!r})'
+
+
+class SymbolTable (object):
+  '''
+  Lookup table of the aliases used for the code obfuscation.
+
+  The symbols are stored in separated namespaces according to
+  their kind, so equal keys of different kinds (e.g. the char
+  code 65 and the integer 65, or the integer 1 and the float 1.0)
+  never share the same alias. The identifiers are interned and
+  the long string literals are stored by their digest.
+  The aliases are unique along all the namespaces, except
+  the reserved ones which are given outside the table (e.g.
+  to the local variables renamed by scope).
+
+  Examples
+  --------
+  >>> table = SymbolTable()
+  >>> table.add('number', 1)
+  '___'
+  >>> table.add('number', 1.)
+  '____'
+  >>> table.get('name', 'x', 'x')
+  'x'
+  '''
+
+  __slots__ = ('_namespaces', '_size', 'reserved')
+
+  def __init__ (self):
+    self._namespaces = {kind : {} for kind in SYMBOL_KINDS}
+    self._size = 0
+    # number of the reserved aliases
+    self.reserved = 0
+
+  @staticmethod
+  def _get_key (kind : str, value : object) -> object:
+    '''
+    Get the key of the value in the namespace.
+
+    Parameters
+    ----------
+      kind : str
+        Namespace of the value
+
+      value : object
+        Value to store
+
+    Returns
+    -------
+      key : object
+        Key of the value
+    '''
+
+    # the type is part of the number key, since
+    # 1, 1.0 and True have the same hash
+    if kind == 'number':
+      return (type(value), value)
+
+    # the blobs are stored by digest, and the type is part
+    # of the key since the strings and the bytes could have
+    # the same encoding
+    if kind == 'blob':
+      data = value.encode('utf-8', 'surrogatepass') if isinstance(value, str) else value
+      return (type(value), hashlib.blake2b(data, digest_size=16).digest())
+
+    if kind == 'string' and len(value) > MAX_STRING_KEY:
+      return hashlib.blake2b(
+        value.encode('utf-8', 'surrogatepass'),
+        digest_size=16
+      ).digest()
+
+    return value
+
+  def add (self, kind : str, value : object) -> str:
+    '''
+    Add a new symbol to the table.
+
+    Parameters
+    ----------
+      kind : str
+        Namespace of the symbol
+
+      value : object
+        Value of the symbol
+
+    Returns
+    -------
+      alias : str
+        Alias of the symbol
+    '''
+
+    if kind not in self._namespaces:
+      raise ValueError(('Invalid symbol kind. '
+        f'The available kinds are {", ".join(SYMBOL_KINDS)}. '
+        f'Given: {kind}'
+      ))
+
+    namespace = self._namespaces[kind]
+    key = self._get_key(kind, value)
+
+    if kind == 'name':
+      key = sys.intern(key)
+
+    symbol = namespace.get(key)
+
+    if symbol is None:
+      symbol = Symbol(kind=kind, key=key, alias='_' * (self._size + self.reserved + 3))
+      namespace[key] = symbol
+      self._size += 1
+
+    return symbol.alias
+
+  def reserve (self, size : int) -> int:
+    '''
+    Reserve a range of aliases, which are skipped by the
+    next symbols.
+
+    Parameters
+    ----------
+      size : int
+        Number of aliases to reserve
+
+    Returns
+    -------
+      start : int
+        Length of the first reserved alias
+    '''
+    start = self._size + self.reserved + 3
+    self.reserved += size
+    return start
+
+  def get (self, kind : str, value : object, default : object = None) -> object:
+    '''
+    Get the alias of the value.
+
+    Parameters
+    ----------
+      kind : str
+        Namespace of the value
+
+      value : object
+        Value to search
+
+      default : object (default=None)
+        Value to return if it is not in the table
+
+    Returns
+    -------
+      alias : str
+        Alias of the value (or the default one)
+    '''
+    symbol = self._namespaces[kind].get(self._get_key(kind, value))
+    return default if symbol is None else symbol.alias
+
+  def has (self, kind : str, value : object) -> bool:
+    '''
+    Check if the value is in the table.
+
+    Parameters
+    ----------
+      kind : str
+        Namespace of the value
+
+      value : object
+        Value to search
+
+    Returns
+    -------
+      check : bool
+        True if the value is in the table
+    '''
+    return self._get_key(kind, value) in self._namespaces[kind]
+
+  def __len__ (self) -> int:
+    return self._size
+
+  def __iter__ (self):
+    for namespace in self._namespaces.values():
+      yield from namespace.values()
@@ -1,36 +1,191 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import os
 import ast
+import time
+import shutil
+import tempfile
+import asyncio
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 
-from ._encoder import _BUILT_IN
+from ._encoder import NUMBERS_LUT
+from ._encoder import collect_symbols
 from ._encoder import create_encryption_lut
 from ._encoder import get_dict_of_module_names
-from ._encoder import encrypt_constant_strings
-from ._encoder import encrypt_joined_string
-from ._encoder import encrypt_constant_bools
-from ._encoder import encrypt_constant_integers
-from ._encoder import encrypt_constant_floats
-from ._encoder import encrypt_variable_name
-from ._encoder import encrypt_function_def
-from ._encoder import encrypt_function_arg
-from ._encoder import encrypt_function_arguments
-from ._encoder import encrypt_function_keyword
-from ._encoder import encrypt_package_attribute
-from ._encoder import encrypt_self_attribute
-from ._encoder import encrypt_generic_attribute
-from ._encoder import encrypt_builtin_function
-from ._encoder import encrypt_generic_function
-from ._encoder import encrypt_class_def
-from ._encoder import encrypt_import_aliases
-from ._encoder import encrypt_binary_operator
+from ._encoder import ALIAS_REGEX
+from ._encoder import prune_header_variables
 from ._encoder import add_header_variables
 from ._encoder import clean_header_issues
+from ._profile import LEVEL_OFF
+from ._profile import LEVEL_CHEAP
+from ._profile import LEVEL_FULL
+from ._profile import ENCODING_COST
+from ._profile import load_profile
+from ._profile import get_hot_functions
+from ._pragma import parse_pragma
+from ._pragma import get_pragmas
+from ._pragma import get_keep_decorators
+from ._pragma import is_keep_decorator
+from ._pragma import count_package_uses
+from ._pragma import strip_keep_imports
+from ._emitter import unparse
+from ._emitter import clone_tree
+from ._emitter import dump_tree
+from ._emitter import load_tree
+from ._emitter import unparse_lines
+from ._emitter import pack_header
+from ._emitter import mark_header
+from ._emitter import _get_first_line
+from ._emitter import _is_inert
+from ._symbols import SymbolTable
+from ._cost import get_cost_model
+from ._estimate import SizeEstimator
+from ._estimate import scan_code
+from ._estimate import get_native_size
+from ._cost import get_optimization_units
+from ._cost import count_unit_nodes
+from ._cost import get_rename_growth
+from ._cost import optimize_levels
+from ._passes import get_default_passes
+from ._passes import get_dispatch_table
+from ._passes import get_skipped_types
+from ._symbolicate import get_symbol_records
+from ._symbolicate import dump_symbol_map
+from ._async import AsyncPool
+from ._async import gather_or_cancel
+from ._async import _obfuscate_code
+from ._async import _read_file
+from ._async import _write_file
+from ._stream import parse_statements
+from ._stream import merge_symbols
+from ._stream import resolve_symbols
+from ._lazy import get_helper_aliases
+from ._lazy import split_lazy_header
+from ._cache import ResultCache
+from ._cache import ANALYSIS_SIZE_RATIO
+from ._cache import get_source_digest
+from ._cache import get_result_size
+from ._scopes import get_scope_table
+from ._scopes import resolve_scopes
+from ._scopes import rename_locals
 
 __author__  = ['Nico Curti']
 __email__ = ['nico.curti2@unibo.it']
 
-__all__ = ['Obfuscator']
+__all__ = ['Obfuscator', 'obfuscate_builds', 'aobfuscate']
+
+# state shared by the worker processes of the
+# parallel obfuscation, set once by the initializer
+_WORKER_STATE = {}
+
+def _init_shard_worker (state : dict) -> None:
+  '''
+  Initialize the worker process of the parallel
+  obfuscation with the frozen state of the parent.
+
+  Parameters
+  ----------
+    state : dict
+      Obfuscator object, encryption context and
+      numbers lookup table of the parent process
+  '''
+  _WORKER_STATE.update(state)
+
+def _encrypt_shard (table : list) -> tuple:
+  '''
+  Encrypt and unparse a shard of top-level statements
+  in a worker process.
+
+  Parameters
+  ----------
+    table : list
+      Flat table of the module of contiguous top-level
+      statements (see dump_tree)
+
+  Returns
+  -------
+    obf_code : str
+      Obfuscated code of the shard (without header)
+
+    header : dict
+      Lookup table of the header variables of the shard
+
+    report : list
+      List of the records of the downgraded hot functions
+
+    simple : dict
+      Lookup table of the lines given only by simple statements
+      (only if the line numbers are preserved)
+
+    timings : dict
+      Lookup table of the elapsed time of each pass
+
+    counts : dict
+      Lookup table of the number of nodes transformed by each pass
+  '''
+  # restore the numbers lookup table of the parent, so
+  # the encoding does not depend on the shard scheduling
+  NUMBERS_LUT.clear()
+  NUMBERS_LUT.update(_WORKER_STATE['numbers_lut'])
+
+  nodes = load_tree(table).body
+
+  obfuscator = _WORKER_STATE['obfuscator']
+  header, report, timings, counts = obfuscator._encrypt_nodes(nodes=nodes, **_WORKER_STATE['context'])
+
+  simple = {}
+
+  if obfuscator.preserve_lines:
+    if header:
+      mark_header(nodes=nodes)
+    lines, simple = unparse_lines(nodes=nodes)
+    obf_code = '\n'.join(lines)
+  else:
+    obf_code = unparse(ast.Module(body=nodes, type_ignores=[]))
+
+  obf_code = clean_header_issues(
+    code=obf_code,
+    header=header
+  )
+
+  return obf_code, header, report, simple, timings, counts
+
+def _split_shards (nodes : list, n_shards : int) -> list:
+  '''
+  Split the top-level statements in contiguous shards
+  with a balanced number of source lines.
+
+  Parameters
+  ----------
+    nodes : list
+      List of top-level statements
+
+    n_shards : int
+      Maximum number of shards
+
+  Returns
+  -------
+    shards : list
+      List of the shards of statements
+  '''
+  sizes = [node.end_lineno - node.lineno + 1 for node in nodes]
+  target = sum(sizes) / max(min(n_shards, len(nodes)), 1)
+
+  shards = [[]]
+  size = 0
+
+  for node, lines in zip(nodes, sizes):
+    # close the current shard when it reaches the target size
+    if shards[-1] and size + lines / 2 > target:
+      shards.append([])
+      size = 0
+
+    shards[-1].append(node)
+    size += lines
+
+  return shards
 
 
 class Obfuscator (object):
@@ -44,6 +199,23 @@ class Obfuscator (object):
     encode_string : bool = True,
     encode_operator : bool = True,
     reduce_code_length : bool = False,
+    profile : str = None,
+    profile_filename : str = None,
+    hot_threshold : float = 0.05,
+    hot_mode : str = 'cheap',
+    n_jobs : int = 1,
+    symbol_map : str = None,
+    preserve_lines : bool = False,
+    max_concurrency : int = 1,
+    passes : list = None,
+    prune_header : bool = True,
+    max_size_growth : float = None,
+    max_slowdown : float = None,
+    blob_threshold : int = None,
+    lazy_header : bool = False,
+    specialize : bool = False,
+    cache : object = None,
+    local_aliases : bool = True,
     ):
 
     self.rename_variable = rename_variable
@@ -55,300 +227,1934 @@ class Obfuscator (object):
     self.encode_operator = encode_operator
     self.reduce_code_length = reduce_code_length
 
-  def __call__ (self, code : str) -> str :
+    if hot_mode not in ('cheap', 'rename'):
+      raise ValueError(('Invalid hot mode. '
+        'The hot functions could be obfuscated only in cheap or rename mode. '
+        f'Given: {hot_mode}'
+      ))
+
+    # load the runtime profile if it is given as filename
+    if isinstance(profile, str):
+      profile = load_profile(filename=profile)
+
+    self.profile = profile
+    self.profile_filename = profile_filename
+    self.hot_threshold = hot_threshold
+    self.hot_mode = hot_mode
+
+    if n_jobs == 0 or n_jobs < -1:
+      raise ValueError(('Invalid number of jobs. '
+        'The number of jobs must be a positive integer or -1 (all the cpus). '
+        f'Given: {n_jobs}'
+      ))
+
+    self.n_jobs = n_jobs
+
+    # path of the symbol map to dump at each call
+    self.symbol_map = symbol_map
+    # keep the original line numbers of the statements
+    self.preserve_lines = preserve_lines
+
+    if max_concurrency == 0 or max_concurrency < -1:
+      raise ValueError(('Invalid concurrency limit. '
+        'The concurrency limit must be a positive integer or -1 (all the cpus). '
+        f'Given: {max_concurrency}'
+      ))
+
+    # bounded pool of processes of the async api
+    self.max_concurrency = os.cpu_count() if max_concurrency == -1 else max_concurrency
+    self._pool = AsyncPool(max_workers=self.max_concurrency)
+
+    # custom passes, applied before the built-in ones
+    self.passes = list(passes or [])
+    # remove the unused header variables and merge the
+    # ones with the same value
+    self.prune_header = prune_header
+
+    for name, budget in (('size growth', max_size_growth), ('slowdown', max_slowdown)):
+      if budget is not None and budget <= 0.:
+        raise ValueError(('Invalid budget. '
+          f'The maximum {name} must be a positive ratio. '
+          f'Given: {budget}'
+        ))
+
+    # budgets of the cost-model optimizer
+    self.max_size_growth = max_size_growth
+    self.max_slowdown = max_slowdown
+
+    if blob_threshold is not None and blob_threshold < 1:
+      raise ValueError(('Invalid blob threshold. '
+        'The minimum length of the blob literals must be a positive integer. '
+        f'Given: {blob_threshold}'
+      ))
+
+    # minimum length of the literals encoded as compressed blobs
+    self.blob_threshold = blob_threshold
+
+    if lazy_header and (preserve_lines or n_jobs != 1):
+      raise ValueError(('Invalid lazy header option. '
+        'The lazy header is supported only by the serial obfuscation without preserved lines. '
+        f'Given: preserve_lines={preserve_lines}, n_jobs={n_jobs}'
+      ))
+
+    # evaluate the header variables used only by the
+    # functions at their first call
+    self.lazy_header = lazy_header
+
+    if specialize and (max_size_growth is not None or max_slowdown is not None):
+      raise ValueError(('Invalid specialize option. '
+        'The specialization-friendly encodings could not be combined with the budgets. '
+        f'Given: max_size_growth={max_size_growth}, max_slowdown={max_slowdown}'
+      ))
+
+    # use only the encodings which keep the bytecode
+    # specializable by the adaptive interpreter
+    self.specialize = specialize
+
+    # create the result cache if it is given as size
+    if isinstance(cache, int):
+      cache = ResultCache(max_bytes=cache)
+
+    # in-process cache of the results, which could be
+    # shared by several obfuscators
+    self.cache = cache
+    # rename the local variables by scope, so the
+    # functions reuse the shortest aliases
+    self.local_aliases = local_aliases
+
+    # list of the downgraded hot functions
+    # filled at each call
+    self.report = []
+    # elapsed time of each pass
+    # filled at each call
+    self.timings = {}
+    # lines and bytes saved by the header pruning
+    # filled at each call
+    self.header_report = {}
+    # levels chosen by the budget optimizer
+    # filled at each call
+    self.plan = {}
+    # transformed nodes, aliases, header variables (and the
+    # lines and bytes saved by the header pruning),
+    # elapsed time of each phase and cache status
+    # filled at each call
+    self.metrics = {}
+
+  def _get_levels (self) -> dict:
     '''
-    Run the code obfuscation according
-    to the parameters set in the constructor.
+    Get the encoding level of each transformation
+    according to the parameters set in the constructor.
+
+    Returns
+    -------
+      levels : dict
+        Lookup table of the encoding levels
+    '''
+    levels = {
+      'string' : self.encode_string,
+      'number' : self.encode_number,
+      'operator' : self.encode_operator,
+      'pkg' : self.encode_pkg,
+      'builtin' : self.rename_function,
+    }
+    # the cheap encodings are the ones specialized by the
+    # adaptive interpreter, i.e. loads of the header variables
+    # and calls of the cached builtin functions
+    full = LEVEL_CHEAP if self.specialize else LEVEL_FULL
+
+    levels = {k : full if v else LEVEL_OFF
+      for k, v in levels.items()
+    }
+    return levels
+
+  @staticmethod
+  def _downgrade_levels (levels : dict, caps : dict) -> dict:
+    '''
+    Downgrade the encoding levels up to the given ones.
+
+    The package and builtin lookups could not be disabled
+    if they are enabled, since the imports are removed and
+    the function names are replaced by their aliases, so
+    their minimum level is the cheap one.
 
     Parameters
     ----------
-      code : str
-        Code to obfuscate and encrypt
+      levels : dict
+        Lookup table of the current encoding levels
+
+      caps : dict
+        Lookup table of the maximum encoding levels to apply
 
     Returns
     -------
-      obf_code : str
-        Obfuscated code
+      levels : dict
+        Lookup table of the downgraded encoding levels
     '''
+    downgraded = {k : min(v, caps.get(k, v))
+      for k, v in levels.items()
+    }
+    for k in ('pkg', 'builtin'):
+      if levels[k] != LEVEL_OFF:
+        downgraded[k] = max(downgraded[k], LEVEL_CHEAP)
 
-    # create the syntax tree of the code
-    root = ast.parse(code)
+    return downgraded
 
-    # get the lookup table of all the possible
-    # values that can be replaced in the code
-    lut = create_encryption_lut(
-      root=root,
-      rename_variable=self.rename_variable,
-      rename_function=self.rename_function,
-      rename_class=self.rename_class,
-      encode_pkg=self.encode_pkg,
-      encode_number=self.encode_number,
-      encode_string=self.encode_string,
-    )
+  @staticmethod
+  def _get_statement_caps (node : ast.stmt,
+                           pragmas : dict,
+                           packages : set,
+                           decorators : set
+                          ) -> dict:
+    '''
+    Get the maximum encoding levels required by the
+    pragmas and by the keep decorator of a statement.
+    The keep decorators are removed from the node.
 
-    # import module lookup table
-    module_lut = {}
+    Parameters
+    ----------
+      node : ast.stmt
+        Statement node to check
 
-    if self.encode_pkg:
-      # get the import module lookup table
-      # to discriminate between the attributes
-      module_lut = get_dict_of_module_names(root=root)
+      pragmas : dict
+        Lookup table of the pragmas by line number
 
-    # create an empty header dict in which store
-    # the variables created by the obfuscator
-    header = {}
+      packages : set
+        Set of the aliases of the pyhide package
+
+      decorators : set
+        Set of the aliases of the keep decorator
+
+    Returns
+    -------
+      caps : dict
+        Lookup table of the maximum encoding levels
+        (None if there are no restrictions)
+    '''
+    caps = {}
+
+    # the pragma could be set also on the decorator lines
+    lines = [node.lineno]
+
+    if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+      lines.extend(d.lineno for d in node.decorator_list)
+
+      # remove the keep decorator and disable the encodings
+      decorator_list = [d
+        for d in node.decorator_list
+          if not is_keep_decorator(node=d, packages=packages, decorators=decorators)
+      ]
+      if len(decorator_list) != len(node.decorator_list):
+        node.decorator_list = decorator_list
+        caps.update(parse_pragma('off'))
+
+    for line in lines:
+      caps.update(pragmas.get(line, {}))
+
+    return caps or None
+
+  @staticmethod
+  def _track_encoding (record : dict,
+                       kind : str,
+                       level : int,
+                       base : dict
+                      ):
+    '''
+    Update the record of a hot function with the cost
+    of the encoding applied to one of its nodes.
+
+    Parameters
+    ----------
+      record : dict
+        Record of the hot function (None for the cold code)
+
+      kind : str
+        Name of the transformation
+
+      level : int
+        Encoding level applied to the node
+
+      base : dict
+        Lookup table of the encoding levels of the module
+    '''
+    if record is None:
+      return
+
+    record['full_cost'] += ENCODING_COST[kind][base[kind]]
+    record['cost'] += ENCODING_COST[kind][level]
+
+    if level < base[kind]:
+      record['downgraded'][kind] = record['downgraded'].get(kind, 0) + 1
+
+  def _encrypt_nodes (self,
+                      nodes : list,
+                      lut : SymbolTable,
+                      module_lut : dict,
+                      hot : dict,
+                      pragmas : dict,
+                      packages : set,
+                      decorators : set,
+                      bound : set = frozenset(),
+                      estimator : object = None,
+                     ) -> tuple:
+    '''
+    Encrypt the given code trees in place according to
+    the parameters set in the constructor.
+
+    Parameters
+    ----------
+      nodes : list
+        List of ast nodes to encrypt (e.g. the module or
+        a subset of its statements)
+
+      lut : SymbolTable
+        Symbol table of the aliases for the code obfuscator
+
+      module_lut : dict
+        Lookup table of module aliases
+
+      hot : dict
+        Lookup table of the (line, column) positions of the
+        hot function definitions and their share of runtime
+
+      pragmas : dict
+        Lookup table of the pragmas by line number
+
+      packages : set
+        Set of the aliases of the pyhide package
+
+      decorators : set
+        Set of the aliases of the keep decorator
+
+      bound : set (default=frozenset())
+        Set of the (line, column) positions of the calls
+        of the user definitions named as builtin functions
+
+      estimator : SizeEstimator (default=None)
+        If given, the matched nodes are measured by the
+        estimator instead of being transformed
+
+    Returns
+    -------
+      header : dict
+        Lookup table of the header variables
+        to add on the obfuscated code
+
+      report : list
+        List of the records of the downgraded hot functions
+
+      timings : dict
+        Lookup table of the elapsed time of each pass
+
+      counts : dict
+        Lookup table of the number of nodes transformed
+        by each pass
+    '''
+
+    # metadata shared by the passes, with an empty header
+    # dict in which store the variables created by the obfuscator
+    metadata = {
+      'lut' : lut,
+      'module_lut' : module_lut,
+      'header' : {},
+      'reduce_code_length' : self.reduce_code_length,
+      'encode_pkg' : self.encode_pkg,
+      'bound' : bound,
+    }
+
+    # fuse the passes in a single traversal, using the
+    # lookup table of the passes of each node type
+    table = get_dispatch_table(passes=self.passes + get_default_passes(), context=metadata)
+    # the subtrees without any node handled by the passes
+    # (e.g. the expression contexts) are skipped
+    skip = get_skipped_types(table=table)
+
+    # elapsed time and transformed nodes of each pass
+    timings = {}
+    counts = {}
+
+    # get the encoding levels of the whole module
+    base = self._get_levels()
+    # get the encoding level of the hot functions
+    hot_level = LEVEL_CHEAP if self.hot_mode == 'cheap' else LEVEL_OFF
+    hot_caps = {k : hot_level for k in base}
+
+    report = []
 
     # start the code encrypting
 
-    # loop along the code tree
-    for node in ast.walk(root):
-
-      # if it is a Module instance
-      if isinstance(node, ast.Module):
-        continue
-
-      # if it is a simple string constant
-      elif isinstance(node, ast.Constant) and \
-           isinstance(node.value, str):
-        if self.encode_string:
-          # obfuscate the value
-          obf_node, header = encrypt_constant_strings(
-            node=node,
-            lut=lut,
-            header=header,
-            reduce_code_length=self.reduce_code_length,
-          )
-          node.__class__ = obf_node.__class__
-          node.__dict__.update(obf_node.__dict__)
-
-      # if it is an f-string constant
-      elif isinstance(node, ast.JoinedStr):
-        if self.encode_string:
-          # obfuscate the f-string elements
-          obf_node, header = encrypt_joined_string(
-            node=node,
-            lut=lut,
-            header=header,
-          )
-          node.__class__ = obf_node.__class__
-          node.__dict__.update(obf_node.__dict__)
-
-      # if it is a bool variable (aka True or False)
-      elif isinstance(node, ast.Constant) and \
-           isinstance(node.value, bool):
-        if self.encode_number:
-          # obfuscate the value
-          obf_node, header = encrypt_constant_bools(
-            node=node,
-            lut=lut,
-            header=header,
-          )
-          node.__class__ = obf_node.__class__
-          node.__dict__.update(obf_node.__dict__)
-
-      # if it is an integer variable
-      elif isinstance(node, ast.Constant) and \
-           isinstance(node.value, int):
-        if self.encode_number:
-          # obfuscate the value
-          obf_node, header = encrypt_constant_integers(
-            node=node,
-            lut=lut,
-            header=header,
-          )
-          node.__class__ = obf_node.__class__
-          node.__dict__.update(obf_node.__dict__)
-
-      # if it is an float variable
-      elif isinstance(node, ast.Constant) and \
-           isinstance(node.value, float):
-        if self.encode_number:
-          # obfuscate the value
-          obf_node, header = encrypt_constant_floats(
-            node=node,
-            lut=lut,
-            header=header,
-          )
-          node.__class__ = obf_node.__class__
-          node.__dict__.update(obf_node.__dict__)
+    # loop along the code tree keeping track of the
+    # encoding levels, of the hot function record and
+    # of the expression nesting depth of each node.
+    # NOTE: the children are taken before the node
+    # transformation, as in the ast.walk function
+    todo = deque((node, base, None, 0) for node in nodes)
 
-      # if it is just a name in the code
-      elif isinstance(node, ast.Name):
-        # obfuscate the variable name
-        obf_node, header = encrypt_variable_name(
-          node=node,
-          lut=lut,
-          header=header,
-        )
-        node.__class__ = obf_node.__class__
-        node.__dict__.update(obf_node.__dict__)
+    while todo:
 
-      # if it is a function definition
-      elif isinstance(node, ast.FunctionDef):
-        # obfuscate the function name
-        obf_node, header = encrypt_function_def(
-          node=node,
-          lut=lut,
-          header=header,
-        )
-        node.__class__ = obf_node.__class__
-        node.__dict__.update(obf_node.__dict__)
+      node, levels, record, depth = todo.popleft()
 
-      # if it is a function arg
-      elif isinstance(node, ast.arg):
-        # obfuscate the arg name
-        obf_node, header = encrypt_function_arg(
+      # if it is a statement with a pragma (or the keep decorator)
+      # all its nodes are encoded with the restricted levels
+      if isinstance(node, ast.stmt) and (pragmas or packages or decorators):
+        caps = self._get_statement_caps(
           node=node,
-          lut=lut,
-          header=header,
+          pragmas=pragmas,
+          packages=packages,
+          decorators=decorators
         )
-        node.__class__ = obf_node.__class__
-        node.__dict__.update(obf_node.__dict__)
+        if caps is not None:
+          levels = self._downgrade_levels(levels, caps)
 
-      # if it is a function arguments
-      elif isinstance(node, ast.arguments):
-        # obfuscate the arguments name
-        obf_node, header = encrypt_function_arguments(
-          node=node,
-          lut=lut,
-          header=header,
-        )
-        node.__class__ = obf_node.__class__
-        node.__dict__.update(obf_node.__dict__)
+      # remove the import of the keep decorator
+      if isinstance(node, ast.ImportFrom) and node.module == 'pyhide' and decorators:
+        node.names = [mod for mod in node.names if mod.name != 'keep']
+        if not node.names:
+          node.__class__ = ast.Del
 
-      # if it is a function keyword
-      elif isinstance(node, ast.keyword):
-        # obfuscate the keyword name
-        obf_node, header = encrypt_function_keyword(
-          node=node,
-          lut=lut,
-          header=header,
-        )
-        node.__class__ = obf_node.__class__
-        node.__dict__.update(obf_node.__dict__)
-
-      # if it is a package attribute
-      elif isinstance(node, ast.Attribute) and \
-           isinstance(node.value, ast.Name) and \
-           node.value.id in module_lut:
-        # obfuscate the package attribute
-        obf_node, header = encrypt_package_attribute(
-          node=node,
-          lut=lut,
-          header=header,
-          module_lut=module_lut
-        )
-        node.__class__ = obf_node.__class__
-        node.__dict__.update(obf_node.__dict__)
-
-      # if it is a self attribute
-      elif isinstance(node, ast.Attribute) and \
-           isinstance(node.value, ast.Name) and \
-           node.value.id == 'self':
-        # obfuscate the package attribute
-        obf_node, header = encrypt_self_attribute(
-          node=node,
-          lut=lut,
-          header=header,
-        )
-        node.__class__ = obf_node.__class__
-        node.__dict__.update(obf_node.__dict__)
-
-      # if it is a generic attribute
-      elif isinstance(node, ast.Attribute) and \
-           isinstance(node.value, ast.Name):
-        # obfuscate the package attribute
-        obf_node, header = encrypt_generic_attribute(
-          node=node,
-          lut=lut,
-          header=header,
+      children = list(ast.iter_child_nodes(node))
+      child_depth = depth + isinstance(node, ast.expr)
+
+      n_children = len(children)
+
+      if skip:
+        children = [child for child in children if child.__class__ not in skip]
+
+      # if it is a hot function all its nodes
+      # are encoded with the downgraded levels
+      if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and \
+         (node.lineno, node.col_offset) in hot:
+        record = {
+          'name' : node.name,
+          'lineno' : node.lineno,
+          'share' : hot[(node.lineno, node.col_offset)],
+          'nodes' : 0,
+          'full_cost' : 0.,
+          'cost' : 0.,
+          'downgraded' : {},
+        }
+        report.append(record)
+        todo.extend((child, self._downgrade_levels(levels, hot_caps), record, child_depth)
+          for child in children
         )
-        node.__class__ = obf_node.__class__
-        node.__dict__.update(obf_node.__dict__)
-
-      # if it is a builtin function
-      elif isinstance(node, ast.Call) and \
-           isinstance(node.func, ast.Name) and \
-           node.func.id in _BUILT_IN:
-        if self.rename_function:
-          # obfuscate the function name
-          obf_node, header = encrypt_builtin_function(
-            node=node,
-            lut=lut,
-            header=header,
-          )
-          node.__class__ = obf_node.__class__
-          node.__dict__.update(obf_node.__dict__)
-
-      # if it is a generic callable object
-      elif isinstance(node, ast.Call) and \
-           isinstance(node.func, ast.Name):
-        # obfuscate the function name
-        obf_node, header = encrypt_generic_function(
-          node=node,
-          lut=lut,
-          header=header,
+      else:
+        todo.extend((child, levels, record, child_depth)
+          for child in children
         )
-        node.__class__ = obf_node.__class__
-        node.__dict__.update(obf_node.__dict__)
 
-      # if it is a class definition
-      elif isinstance(node, ast.ClassDef):
-        # obfuscate the class name
-        obf_node, header = encrypt_class_def(
-          node=node,
-          lut=lut,
-          header=header,
-        )
-        node.__class__ = obf_node.__class__
-        node.__dict__.update(obf_node.__dict__)
-
-      # if it is an import package
-      elif isinstance(node, ast.Import):
-        # we can directly remove the package
-        # since all the other functions will
-        # replaced
-        if self.encode_pkg:
-          node.__class__ = ast.Del
+      # the skipped nodes are counted as part of the hot function
+      if record is not None:
+        record['nodes'] += 1 + n_children - len(children)
 
-      # if it is an import package
-      elif isinstance(node, ast.ImportFrom):
-        # obfuscate the imported aliases
-        obf_node, header = encrypt_import_aliases(
-          node=node,
-          lut=lut,
-          header=header,
-        )
-        node.__class__ = obf_node.__class__
-        node.__dict__.update(obf_node.__dict__)
-
-      # if it is an operator
-      elif isinstance(node, ast.BinOp):
-        # if the enable operator is required
-        if self.encode_operator:
-          obf_node, header = encrypt_binary_operator(
-            node=node,
-            lut=lut,
-            header=header,
-          )
-          node.__class__ = obf_node.__class__
-          node.__dict__.update(obf_node.__dict__)
+      # give the node to the first pass which handles it
+      for obf_pass in table.get(node.__class__, ()):
 
-    # at the end of the encoding we need
-    # to add the new extra-variables stored
-    # in the header
-    root = add_header_variables(
-      root=root,
-      header=header
+        if not obf_pass.match(node, metadata):
+          continue
+
+        level = obf_pass.get_level(node, levels, depth)
+
+        if obf_pass.tracked and obf_pass.kind in ENCODING_COST:
+          self._track_encoding(record, obf_pass.kind, level, base)
+
+        if level != LEVEL_OFF and estimator is not None:
+          estimator(obf_pass, node, level, metadata)
+
+        elif level != LEVEL_OFF:
+          tic = time.perf_counter()
+          obf_node = obf_pass.apply(node, level, metadata)
+          timings[obf_pass.name] = timings.get(obf_pass.name, 0.) + time.perf_counter() - tic
+          counts[obf_pass.name] = counts.get(obf_pass.name, 0) + 1
+
+          if obf_node is not None:
+            node.__class__ = obf_node.__class__
+            node.__dict__.update(obf_node.__dict__)
+
+        break
+
+    return metadata['header'], report, timings, counts
+
+  def _parallel_encrypt (self,
+                         root : ast.Module,
+                         context : dict,
+                         n_jobs : int,
+                         after : int = 0
+                        ) -> tuple:
+    '''
+    Encrypt and unparse the top-level statements of the
+    module in parallel using a pool of processes.
+
+    The lookup tables are computed once on the whole module
+    and shipped to each worker at its start, so the aliases
+    are the same of the serial run. The shard headers are
+    merged in the statement order and they are emitted
+    before the concatenated shard bodies.
+
+    Parameters
+    ----------
+      root : ast.Module
+        Code tree to obfuscate
+
+      context : dict
+        Lookup tables required by the encryption
+
+      n_jobs : int
+        Number of processes
+
+      after : int (default=0)
+        Line after which the header must be placed if
+        the line numbers are preserved
+
+    Returns
+    -------
+      obf_code : str
+        Obfuscated code
+
+      report : list
+        List of the records of the downgraded hot functions
+
+      timings : dict
+        Lookup table of the elapsed time of each pass
+
+      counts : dict
+        Lookup table of the number of nodes transformed
+        by each pass
+    '''
+
+    # use more shards than processes to balance the load
+    shards = _split_shards(nodes=root.body, n_shards=n_jobs * 4)
+
+    # the first shard must contain the place of the header,
+    # after the leading functions (see mark_header)
+    while self.preserve_lines and len(shards) > 1 and all(map(_is_inert, shards[0])):
+      shards[:2] = [shards[0] + shards[1]]
+
+    state = {
+      'obfuscator' : self,
+      'context' : context,
+      'numbers_lut' : dict(NUMBERS_LUT),
+    }
+
+    with ProcessPoolExecutor(max_workers=n_jobs,
+                             initializer=_init_shard_worker,
+                             initargs=(state, )
+                            ) as executor:
+      # NOTE: the map preserves the order of the shards and the
+      # shards are sent as flat tables, since the pickling of the
+      # deeply nested trees exceeds the recursion limit
+      results = list(executor.map(_encrypt_shard,
+        (dump_tree(ast.Module(body=shard, type_ignores=[])) for shard in shards)
+      ))
+
+    header = {}
+    report = []
+    timings = {}
+    counts = {}
+    bodies = []
+
+    for obf_code, shard_header, shard_report, _, shard_timings, shard_counts in results:
+      # the same alias is always bound to the same value
+      # so the first definition is kept
+      for k, v in shard_header.items():
+        header.setdefault(k, v)
+
+      report.extend(shard_report)
+
+      # the timings are summed along the workers
+      for k, v in shard_timings.items():
+        timings[k] = timings.get(k, 0.) + v
+      for k, v in shard_counts.items():
+        counts[k] = counts.get(k, 0) + v
+      bodies.append(obf_code)
+
+    # the aliases used by the shards, so the other
+    # variables are removed from the header
+    header, aliases, self.header_report = self._prune_header(
+      header=header,
+      references={ref for obf_code in bodies for ref in ALIAS_REGEX.findall(obf_code)}
     )
 
-    # now we can re-convert the code
-    obf_code = ast.unparse(root)
+    if self.preserve_lines:
+      lines = []
 
-    # and clean the code as post-processing step
-    obf_code = clean_header_issues(
-      code=obf_code,
+      for shard, obf_code in zip(shards, bodies):
+        # the lines of each shard start from the first line
+        # of the code, so they are moved after the lines of
+        # the previous shards
+        start = min(_get_first_line(node) for node in shard) - 1
+        lines.extend([''] * (start - len(lines)))
+        lines.extend(obf_code.split('\n')[start:])
+
+      # pack the merged header in a single line
+      obf_header = clean_header_issues(
+        code=self._get_header_line(header=header, aliases=aliases),
+        header=header
+      )
+      obf_code = pack_header(
+        lines=lines,
+        simple=results[0][3],
+        header=obf_header,
+        after=after
+      )
+      return obf_code, report, timings, counts
+
+    # emit the merged header on its own
+    obf_header = unparse(add_header_variables(
+      root=ast.Module(body=[], type_ignores=[]),
+      header=header,
+      aliases=aliases
+    ))
+    obf_header = clean_header_issues(
+      code=obf_header,
       header=header
     )
 
-    return obf_code
+    obf_code = '\n'.join(code for code in [obf_header] + bodies if code)
+
+    return obf_code, report, timings, counts
+
+  def _prune_header (self, header : dict, references : set) -> tuple:
+    '''
+    Remove the unused variables of the header and merge
+    the ones with the same value, if enabled.
+
+    Parameters
+    ----------
+      header : dict
+        Lookup table of the header variables
+
+      references : set
+        Set of the aliases found in the obfuscated code
+
+    Returns
+    -------
+      header : dict
+        Lookup table of the remaining header variables
+
+      aliases : dict
+        Lookup table of the variables merged in each
+        remaining variable
+
+      report : dict
+        Number of removed and merged variables, lines and
+        bytes saved in the header and number of the
+        remaining variables
+    '''
+
+    if not self.prune_header:
+      return header, {}, {'dead' : 0, 'merged' : 0, 'lines' : 0, 'bytes' : 0, 'entries' : len(header)}
+
+    header, aliases, report = prune_header_variables(header=header, references=references)
+    report['entries'] = len(header)
+
+    return header, aliases, report
+
+  @staticmethod
+  def _get_header_line (header : dict, aliases : dict = None) -> str:
+    '''
+    Get the header variables packed in a single line.
+
+    Parameters
+    ----------
+      header : dict
+        Lookup table of the header variables
+
+      aliases : dict (default=None)
+        Lookup table of the variables merged in each
+        header variable
+
+    Returns
+    -------
+      line : str
+        Header statements joined by semicolons
+    '''
+    root = add_header_variables(
+      root=ast.Module(body=[], type_ignores=[]),
+      header=header,
+      aliases=aliases
+    )
+    return '; '.join(unparse(node) for node in root.body)
+
+  def _get_hot_positions (self, root : ast.Module) -> dict:
+    '''
+    Get the hot functions of the code according to
+    the runtime profile.
+
+    Parameters
+    ----------
+      root : ast.Module
+        Code tree before the obfuscation
+
+    Returns
+    -------
+      hot : dict
+        Lookup table of the (line, column) positions of the
+        hot function definitions and their share of runtime
+    '''
+
+    if self.profile is None:
+      return {}
+
+    hot = get_hot_functions(
+      root=root,
+      profile=self.profile,
+      threshold=self.hot_threshold,
+      filename=self.profile_filename,
+    )
+    # use the positions of the nodes as keys
+    # since they are preserved by the pickling
+    # and by the copies of the tree
+    return {(node.lineno, node.col_offset) : share
+      for node, share in hot.items()
+    }
+
+  def _resolve_scopes (self,
+                       root : ast.Module,
+                       table : object,
+                       offset : int = 0,
+                       definitions : set = frozenset(),
+                      ) -> dict:
+    '''
+    Rename the local variables of the functions by scope,
+    so the functions reuse the shortest aliases.
+
+    Parameters
+    ----------
+      root : ast.Module
+        Code tree to obfuscate, modified in place
+
+      table : symtable.SymbolTable
+        Symbol table of the code given by the analysis
+
+      offset : int (default=0)
+        Number of lines before the code of the symbol table
+
+      definitions : set (default=frozenset())
+        Names defined by the module outside the code of
+        the symbol table
+
+    Returns
+    -------
+      scopes : dict
+        Renamed local variables, as given by resolve_scopes
+        (None if the symbol table is not available)
+    '''
+    if table is None:
+      return None
+
+    return resolve_scopes(
+      root=root,
+      table=table,
+      rename=self.rename_variable and self.local_aliases,
+      offset=offset,
+      definitions=definitions,
+    )
+
+  def _optimize_levels (self,
+                        root : ast.Module,
+                        lut : SymbolTable,
+                        module_lut : dict,
+                        pragmas : dict,
+                        source_size : int,
+                        bound : set = frozenset(),
+                        local_growth : int = 0,
+                       ) -> tuple:
+    '''
+    Choose the encoding levels of the statements which fit
+    the size and runtime budgets, according to the cost model.
+
+    Parameters
+    ----------
+      root : ast.Module
+        Code tree to obfuscate
+
+      lut : SymbolTable
+        Symbol table of the aliases for the code obfuscator
+
+      module_lut : dict
+        Lookup table of module aliases
+
+      pragmas : dict
+        Lookup table of the pragmas by line number
+
+      source_size : int
+        Size of the original code in bytes
+
+      bound : set (default=frozenset())
+        Set of the (line, column) positions of the calls
+        of the user definitions named as builtin functions
+
+      local_growth : int (default=0)
+        Size growth of the local variables renamed by scope
+
+    Returns
+    -------
+      pragmas : dict
+        Lookup table of the pragmas, with the levels chosen
+        by the optimizer
+
+      plan : dict
+        Report of the optimization
+    '''
+
+    metadata = {
+      'lut' : lut,
+      'module_lut' : module_lut,
+      'header' : {},
+      'reduce_code_length' : self.reduce_code_length,
+      'encode_pkg' : self.encode_pkg,
+      'bound' : bound,
+    }
+    table = get_dispatch_table(passes=self.passes + get_default_passes(), context=metadata)
+
+    units = []
+    matched = set()
+    lookups = {}
+    for node in get_optimization_units(root=root):
+      n_nodes, counts = count_unit_nodes(node=node, table=table, context=metadata,
+                                         matched=matched, lookups=lookups)
+      name = getattr(node, 'name', f'<{node.__class__.__name__.lower()}>')
+      units.append((name, node.lineno, n_nodes, counts))
+
+    # each unique value has a single header variable, so
+    # its cost is shared by the nodes of the same value
+    totals = {}
+    for _, _, _, counts in units:
+      for k, v in counts.items():
+        totals[k] = totals.get(k, 0) + v
+
+    values = {}
+    lengths = {}
+    for symbol in lut:
+      values[symbol.kind] = values.get(symbol.kind, 0) + 1
+      lengths[symbol.kind] = lengths.get(symbol.kind, 0) + len(symbol.alias)
+
+    # the aliases grow with the table, so their mean size depends
+    # on the kind of the values referenced by each transformation,
+    # while the new header variables take the longest ones
+    longest = len(lut) + lut.reserved + 3
+    alias_sizes = {key : lengths[kind] / values[kind] if kind in values else longest
+      for key, kind in (('string', 'char'), ('string_char', 'char'), ('number', 'number'),
+                        ('operator', None), ('pkg', None), ('builtin', None))
+    }
+
+    shares = {key : min(values.get(kind, 0) / max(totals.get(key, 0), 1), 1.)
+      for key, kind in (('string', 'string'), ('string_char', 'char'), ('number', 'number'))
+    }
+    shares.update({kind : len(keys) / max(totals.get(kind, 0), 1)
+      for kind, keys in lookups.items()
+    })
+
+    caps, plan = optimize_levels(
+      units=units,
+      levels=self._get_levels(),
+      model=get_cost_model(params={
+        'encode_string' : self.encode_string,
+        'encode_number' : self.encode_number,
+        'encode_operator' : self.encode_operator,
+        'encode_pkg' : self.encode_pkg,
+        'rename_function' : self.rename_function,
+      }),
+      source_size=source_size,
+      fixed_size=source_size + local_growth + get_rename_growth(root=root, lut=lut, matched=matched),
+      alias_sizes=alias_sizes,
+      shares=shares,
+      max_size_growth=self.max_size_growth,
+      max_slowdown=self.max_slowdown,
+    )
+
+    # the chosen levels are merged with the pragmas
+    # of the same statements
+    pragmas = dict(pragmas)
+
+    for line, line_caps in caps.items():
+      merged = dict(pragmas.get(line, {}))
+      for k, v in line_caps.items():
+        merged[k] = min(merged.get(k, v), v)
+      pragmas[line] = merged
+
+    return pragmas, plan
+
+  @staticmethod
+  def _analyze (code : str, symbols : bool = False) -> dict:
+    '''
+    Parse the code and get the information which does not
+    depend on the obfuscation parameters.
+
+    Parameters
+    ----------
+      code : str
+        Code to obfuscate and encrypt
+
+      symbols : bool (default=False)
+        Enable/Disable the collection of all the values which
+        could be encrypted, shared by several obfuscations
+
+    Returns
+    -------
+      analysis : dict
+        Code tree, pragmas, keep decorators, last line of
+        the __future__ imports, symbol table of the scopes
+        and collected values
+    '''
+
+    # create the syntax tree of the code
+    root = ast.parse(code)
+
+    # get the pragmas of the code and the names
+    # of the keep decorator
+    pragmas = get_pragmas(code)
+    packages, decorators = get_keep_decorators(root)
+
+    # the keep decorators are always removed, so the pyhide
+    # package is not required if it has no other uses
+    if packages and not count_package_uses(root=root, packages=packages):
+      strip_keep_imports(root=root, packages=packages)
+
+    # get the last line of the __future__ imports,
+    # since the header must follow them
+    after = max((node.end_lineno
+        for node in root.body
+          if isinstance(node, ast.ImportFrom) and node.module == '__future__'
+      ),
+      default=0
+    )
+
+    return {
+      'root' : root,
+      'pragmas' : pragmas,
+      'packages' : packages,
+      'decorators' : decorators,
+      'after' : after,
+      'size' : len(code),
+      'scopes' : get_scope_table(code),
+      'symbols' : collect_symbols(root=root) if symbols else None,
+    }
+
+  def _obfuscate (self, root : ast.Module, analysis : dict) -> str:
+    '''
+    Run the code obfuscation of a code tree according
+    to the parameters set in the constructor.
+
+    Parameters
+    ----------
+      root : ast.Module
+        Code tree to obfuscate, modified in place. It could
+        be the analyzed tree or a copy of it
+
+      analysis : dict
+        Information of the code given by the _analyze method.
+        The analyzed tree is not modified if root is a copy
+
+    Returns
+    -------
+      obf_code : str
+        Obfuscated code
+    '''
+
+    pragmas = analysis['pragmas']
+    packages = analysis['packages']
+    decorators = analysis['decorators']
+    symbols = analysis['symbols']
+    after = analysis['after']
+
+    # elapsed time of each phase, where the analysis
+    # is set by the caller (it could be shared)
+    phases = {'analyze' : 0.}
+    tic = time.perf_counter()
+
+    # get the functions which must be downgraded
+    # according to the runtime profile
+    hot = self._get_hot_positions(root=analysis['root'])
+
+    # the optimizer could choose the cheap levels
+    budget = self.max_size_growth is not None or self.max_slowdown is not None
+
+    # find the local variables renamed by scope, which
+    # are not collected as global names
+    scopes = self._resolve_scopes(root=root, table=analysis['scopes'])
+
+    # get the lookup table of all the possible
+    # values that can be replaced in the code
+    lut = create_encryption_lut(
+      root=root,
+      rename_variable=self.rename_variable,
+      rename_function=self.rename_function,
+      rename_class=self.rename_class,
+      encode_pkg=self.encode_pkg,
+      encode_number=self.encode_number,
+      encode_string=self.encode_string,
+      cache_pkg=budget or self.specialize or len(hot) > 0 or len(pragmas) > 0 or len(packages | decorators) > 0,
+      symbols=symbols,
+      blob_threshold=self.blob_threshold,
+      cache_operator=self.specialize and self.encode_operator,
+      scopes=scopes,
+    )
+
+    bound = set()
+    local_records = []
+    local_growth = 0
+
+    # rename the local variables with the aliases reserved by the lut
+    if scopes is not None:
+      bound = scopes['bound']
+      local_records, local_growth = rename_locals(scopes=scopes, start=scopes['start'])
+
+    # import module lookup table
+    module_lut = {}
+
+    if self.encode_pkg:
+      # get the import module lookup table
+      # to discriminate between the attributes
+      module_lut = get_dict_of_module_names(root=root) if symbols is None else symbols['mod_lut']
+
+    # dump the map of the aliases before the encryption,
+    # since it requires the original code tree
+    if self.symbol_map is not None:
+      # NOTE: the local aliases are reused by several functions,
+      # so their records are resolved by the scope
+      dump_symbol_map(
+        records=sorted(get_symbol_records(root=root, lut=lut) + local_records),
+        filename=self.symbol_map
+      )
+
+    phases['lut'] = time.perf_counter() - tic
+
+    self.plan = {}
+
+    # choose the encoding levels within the budgets
+    if budget:
+      tic = time.perf_counter()
+      pragmas, self.plan = self._optimize_levels(
+        root=root,
+        lut=lut,
+        module_lut=module_lut,
+        pragmas=pragmas,
+        source_size=analysis['size'],
+        bound=bound,
+        local_growth=local_growth
+      )
+      phases['optimize'] = time.perf_counter() - tic
+
+    # pack the information required by the encryption
+    context = {
+      'lut' : lut,
+      'module_lut' : module_lut,
+      'hot' : hot,
+      'pragmas' : pragmas,
+      'packages' : packages,
+      'decorators' : decorators,
+      'bound' : bound,
+    }
+
+    # get the number of processes to use
+    n_jobs = os.cpu_count() if self.n_jobs == -1 else self.n_jobs
+
+    self.metrics = {
+      'nodes' : {},
+      'aliases' : len(lut),
+      'header' : 0,
+      'phases' : phases,
+      'cache' : None,
+    }
+
+    if n_jobs > 1 and len(root.body) > 1:
+      # split the module in shards of statements and
+      # encrypt them using a pool of processes
+      # NOTE: the shards are unparsed by the workers, so the
+      # emission is timed as part of the encryption
+      tic = time.perf_counter()
+      obf_code, self.report, self.timings, self.metrics['nodes'] = self._parallel_encrypt(
+        root=root,
+        context=context,
+        n_jobs=n_jobs,
+        after=after
+      )
+      phases['encrypt'] = time.perf_counter() - tic
+      self.metrics['header'] = self.header_report['entries']
+      self.metrics['header_saved'] = {k : self.header_report[k] for k in ('lines', 'bytes')}
+      return obf_code
+
+    tic = time.perf_counter()
+    header, self.report, self.timings, self.metrics['nodes'] = self._encrypt_nodes(nodes=[root], **context)
+    phases['encrypt'] = time.perf_counter() - tic
+    tic = time.perf_counter()
+
+    if self.preserve_lines:
+      # keep the statements at their original lines
+      # and pack the header in a single line
+      if header:
+        mark_header(nodes=root.body)
+      lines, simple = unparse_lines(nodes=root.body)
+
+      # remove the header variables not used by the lines
+      pruned, aliases, self.header_report = self._prune_header(
+        header=header,
+        references={ref for line in lines for ref in ALIAS_REGEX.findall(line)}
+      )
+
+      # NOTE: the header is cleaned before its packing, since
+      # it could be rewritten in the first compound statement
+      obf_header = clean_header_issues(
+        code=self._get_header_line(header=pruned, aliases=aliases),
+        header=header
+      )
+      obf_code = pack_header(
+        lines=lines,
+        simple=simple,
+        header=obf_header,
+        after=after
+      )
+
+    else:
+      # now we can re-convert the code
+      obf_code = unparse(root)
+
+      # remove the header variables not used by the code
+      pruned, aliases, self.header_report = self._prune_header(
+        header=header,
+        references=set(ALIAS_REGEX.findall(obf_code))
+      )
+
+      runtime = ''
+
+      # move the variables used only by the functions
+      # in the lazy header, decorating the functions
+      if self.lazy_header:
+        pruned, aliases, runtime = split_lazy_header(
+          root=root,
+          header=pruned,
+          aliases=aliases,
+          helpers=get_helper_aliases(code=obf_code, header=pruned, aliases=aliases)
+        )
+        if runtime:
+          obf_code = unparse(root)
+
+      # at the end of the encoding we need
+      # to add the new extra-variables stored
+      # in the header
+      obf_header = unparse(add_header_variables(
+        root=ast.Module(body=[], type_ignores=[]),
+        header=pruned,
+        aliases=aliases
+      ))
+
+      # NOTE: the lazy runtime is emitted after the post-processing,
+      # since its values are already in their final form
+      if runtime:
+        obf_header = clean_header_issues(code=obf_header, header=header)
+        obf_code = clean_header_issues(code=obf_code, header=header)
+        obf_code = '\n'.join(code for code in (obf_header, runtime, obf_code) if code)
+
+        phases['emit'] = time.perf_counter() - tic
+        self.metrics['header'] = self.header_report['entries']
+        self.metrics['header_saved'] = {k : self.header_report[k] for k in ('lines', 'bytes')}
+        return obf_code
+
+      obf_code = '\n'.join(code for code in (obf_header, obf_code) if code)
+
+    # and clean the code as post-processing step
+    obf_code = clean_header_issues(
+      code=obf_code,
+      header=header
+    )
+
+    phases['emit'] = time.perf_counter() - tic
+    self.metrics['header'] = self.header_report['entries']
+    self.metrics['header_saved'] = {k : self.header_report[k] for k in ('lines', 'bytes')}
+
+    return obf_code
+
+  def __call__ (self, code : str) -> str :
+    '''
+    Run the code obfuscation according
+    to the parameters set in the constructor.
+
+    Parameters
+    ----------
+      code : str
+        Code to obfuscate and encrypt
+
+    Returns
+    -------
+      obf_code : str
+        Obfuscated code
+    '''
+    if self.cache is not None:
+      return self._cached_obfuscate(code=code)
+
+    tic = time.perf_counter()
+    analysis = self._analyze(code=code)
+    elapsed = time.perf_counter() - tic
+
+    obf_code = self._obfuscate(root=analysis['root'], analysis=analysis)
+    self.metrics['phases']['analyze'] = elapsed
+
+    return obf_code
+
+  def _get_options (self) -> tuple:
+    '''
+    Get the options which change the obfuscated code, used
+    as cache key of the results.
+
+    Returns
+    -------
+      options : tuple
+        Values of the options (None if the results could
+        not be cached, i.e. with custom passes)
+    '''
+    # NOTE: the custom passes could depend on an external
+    # state, so their results are never reused
+    if self.passes:
+      return None
+
+    profile = frozenset(self.profile.items()) if self.profile is not None else None
+
+    # NOTE: the results without the symbol map could not be
+    # restored when the map is requested, while its filename
+    # does not change the result
+    return (
+      self.rename_variable, self.rename_function, self.rename_class,
+      self.encode_pkg, self.encode_number, self.encode_string, self.encode_operator,
+      self.reduce_code_length, profile, self.profile_filename, self.hot_threshold,
+      self.hot_mode, self.n_jobs, self.preserve_lines, self.prune_header,
+      self.max_size_growth, self.max_slowdown, self.blob_threshold,
+      self.lazy_header, self.specialize, self.local_aliases,
+      self.symbol_map is not None,
+    )
+
+  def _get_cached_result (self, key : tuple) -> str:
+    '''
+    Get the obfuscated code of a cached result, restoring
+    its reports and its symbol map.
+
+    Parameters
+    ----------
+      key : tuple
+        Cache key of the result
+
+    Returns
+    -------
+      obf_code : str
+        Obfuscated code (None if it is not cached)
+    '''
+    result = self.cache.get(key)
+
+    if result is None:
+      return None
+
+    # the reports are copied, so they could be
+    # modified without changing the cached ones
+    self.report = list(result['report'])
+    self.timings = dict(result['timings'])
+    self.header_report = dict(result['header_report'])
+    self.plan = dict(result['plan'])
+    # no phase is run by a cache hit
+    self.metrics = dict(result['metrics'],
+      phases={k : 0. for k in result['metrics']['phases']},
+      cache='hit'
+    )
+
+    if self.symbol_map is not None and result['symbol_map'] is not None:
+      with open(self.symbol_map, 'w', encoding='utf-8') as fp:
+        fp.write(result['symbol_map'])
+
+    return result['code']
+
+  def _put_cached_result (self, key : tuple, obf_code : str) -> None:
+    '''
+    Store the obfuscated code and the reports of the
+    last call in the cache.
+
+    Parameters
+    ----------
+      key : tuple
+        Cache key of the result
+
+      obf_code : str
+        Obfuscated code
+    '''
+    symbol_map = None
+
+    if self.symbol_map is not None and os.path.exists(self.symbol_map):
+      with open(self.symbol_map, 'r', encoding='utf-8') as fp:
+        symbol_map = fp.read()
+
+    result = {
+      'code' : obf_code,
+      'report' : list(self.report),
+      'timings' : dict(self.timings),
+      'header_report' : dict(self.header_report),
+      'plan' : dict(self.plan),
+      'metrics' : dict(self.metrics),
+      'symbol_map' : symbol_map,
+    }
+    self.cache.put(key, result, size=get_result_size(result))
+
+  def _cached_obfuscate (self, code : str) -> str:
+    '''
+    Run the code obfuscation using the result cache.
+
+    The result of the same code and options is returned
+    as it is. Otherwise the cached analysis of the code is
+    reused, if any: its values are collected at the first
+    reuse, so a code obfuscated only once does not pay the
+    collection of the values of all the encodings.
+
+    Parameters
+    ----------
+      code : str
+        Code to obfuscate and encrypt
+
+    Returns
+    -------
+      obf_code : str
+        Obfuscated code
+    '''
+    digest = get_source_digest(code=code)
+    options = self._get_options()
+    key = ('result', digest, options)
+
+    if options is not None:
+      obf_code = self._get_cached_result(key=key)
+      if obf_code is not None:
+        return obf_code
+
+    analysis = self.cache.get(('analysis', digest))
+    status = 'miss' if analysis is None else 'analysis'
+
+    tic = time.perf_counter()
+
+    if analysis is None:
+      analysis = self._analyze(code=code)
+      self.cache.put(('analysis', digest), analysis, size=ANALYSIS_SIZE_RATIO * len(code))
+
+    elif analysis['symbols'] is None:
+      # NOTE: the analysis is replaced instead of updated,
+      # since it could be used by another thread
+      analysis = dict(analysis, symbols=collect_symbols(root=analysis['root']))
+      self.cache.put(('analysis', digest), analysis, size=ANALYSIS_SIZE_RATIO * len(code))
+
+    # the cached tree must be kept unchanged
+    root = clone_tree(analysis['root'])
+    elapsed = time.perf_counter() - tic
+
+    obf_code = self._obfuscate(root=root, analysis=analysis)
+    self.metrics['phases']['analyze'] = elapsed
+    self.metrics['cache'] = status
+
+    if options is not None:
+      self._put_cached_result(key=key, obf_code=obf_code)
+
+    return obf_code
+
+  def _trace_estimate (self, code : str) -> tuple:
+    '''
+    Estimate the size of the obfuscated code by the
+    traversal of the passes, which applies the pragmas,
+    the keep decorators, the runtime profile and the
+    budgets to each statement.
+
+    Parameters
+    ----------
+      code : str
+        Code to obfuscate
+
+    Returns
+    -------
+      lut : SymbolTable
+        Symbol table of the aliases for the code obfuscator
+
+      estimator : SizeEstimator
+        Estimator with the measured nodes
+
+      body_size : int
+        Estimated size of the obfuscated code without
+        its header
+    '''
+
+    analysis = self._analyze(code=code)
+    root = analysis['root']
+    pragmas = analysis['pragmas']
+    packages = analysis['packages']
+    decorators = analysis['decorators']
+
+    hot = self._get_hot_positions(root=root)
+    budget = self.max_size_growth is not None or self.max_slowdown is not None
+
+    scopes = self._resolve_scopes(root=root, table=analysis['scopes'])
+
+    cache_pkg = budget or self.specialize or len(hot) > 0 or len(pragmas) > 0 or len(packages | decorators) > 0
+    cache_operator = self.specialize and self.encode_operator
+
+    symbols = collect_symbols(
+      root=root,
+      rename_variable=self.rename_variable,
+      rename_function=self.rename_function,
+      rename_class=self.rename_class,
+      encode_pkg=self.encode_pkg,
+      encode_number=self.encode_number,
+      encode_string=self.encode_string,
+      cache_pkg=cache_pkg,
+      encode_operator=cache_operator,
+    )
+    lut = create_encryption_lut(
+      root=root,
+      rename_variable=self.rename_variable,
+      rename_function=self.rename_function,
+      rename_class=self.rename_class,
+      encode_pkg=self.encode_pkg,
+      encode_number=self.encode_number,
+      encode_string=self.encode_string,
+      cache_pkg=cache_pkg,
+      symbols=symbols,
+      blob_threshold=self.blob_threshold,
+      cache_operator=cache_operator,
+      scopes=scopes,
+    )
+    module_lut = symbols['mod_lut']
+
+    bound = set()
+    local_growth = 0
+
+    # the renamed local variables are measured by the
+    # unparsed code
+    if scopes is not None:
+      bound = scopes['bound']
+      _, local_growth = rename_locals(scopes=scopes, start=scopes['start'])
+
+    # the levels chosen within the budgets are estimated too
+    if budget:
+      pragmas, _ = self._optimize_levels(
+        root=root,
+        lut=lut,
+        module_lut=module_lut,
+        pragmas=pragmas,
+        source_size=analysis['size'],
+        bound=bound,
+        local_growth=local_growth
+      )
+
+    estimator = SizeEstimator(
+      lut=lut,
+      module_lut=module_lut,
+      reduce_code_length=self.reduce_code_length
+    )
+
+    self._encrypt_nodes(
+      nodes=[root],
+      lut=lut,
+      module_lut=module_lut,
+      hot=hot,
+      pragmas=pragmas,
+      packages=packages,
+      decorators=decorators,
+      bound=bound,
+      estimator=estimator,
+    )
+
+    # the native size is given by the unparsed code,
+    # since the comments and the formatting are not kept
+    body_size = len(unparse(root)) + estimator.growth
+
+    return lut, estimator, body_size
+
+  def estimate (self, code : str) -> dict:
+    '''
+    Estimate the size of the obfuscated code without
+    emitting it.
+
+    The values, the local scopes and the nodes to transform
+    are found by a single walk of the code tree, and the
+    nodes are measured using the closed-form sizes of the
+    encoders (e.g. the bit count of the encoded integers
+    and the per-char expansion of the strings), while the
+    native size is given by the source text, so the code
+    is neither transformed nor unparsed.
+    The code with pragmas or keep decorators and the
+    obfuscation with a runtime profile or with the budgets
+    are estimated by the traversal of the passes instead,
+    since they set the encoding levels of each statement.
+
+    Parameters
+    ----------
+      code : str
+        Code to obfuscate
+
+    Returns
+    -------
+      estimate : dict
+        Estimated sizes of the obfuscated code and of its
+        header, number and sizes of the aliases and number
+        of transformed nodes of each pass
+    '''
+
+    tic = time.perf_counter()
+
+    budget = self.max_size_growth is not None or self.max_slowdown is not None
+
+    root = ast.parse(code)
+    packages, decorators = get_keep_decorators(root)
+
+    # NOTE: the comments are tokenized only if they
+    # could contain a pragma
+    if budget or self.profile is not None or packages or decorators or \
+       'pyhide' in code and get_pragmas(code):
+      lut, estimator, body_size = self._trace_estimate(code=code)
+
+    else:
+      symbols, scopes, nodes = scan_code(
+        root=root,
+        rename=self.rename_variable and self.local_aliases
+      )
+      lut = create_encryption_lut(
+        root=root,
+        rename_variable=self.rename_variable,
+        rename_function=self.rename_function,
+        rename_class=self.rename_class,
+        encode_pkg=self.encode_pkg,
+        encode_number=self.encode_number,
+        encode_string=self.encode_string,
+        cache_pkg=self.specialize,
+        symbols=symbols,
+        blob_threshold=self.blob_threshold,
+        cache_operator=self.specialize and self.encode_operator,
+        scopes=scopes,
+      )
+      _, local_growth = rename_locals(scopes=scopes, start=scopes['start'])
+
+      estimator = SizeEstimator(
+        lut=lut,
+        module_lut=symbols['mod_lut'] if self.encode_pkg else {},
+        reduce_code_length=self.reduce_code_length
+      )
+      estimator.measure(
+        nodes=nodes,
+        levels=self._get_levels(),
+        bound=scopes['bound'],
+        encode_pkg=self.encode_pkg
+      )
+
+      body_size = get_native_size(code=code) + local_growth + estimator.growth
+
+    header_size, header_lines = estimator.get_header_size()
+    aliases = [len(symbol.alias) for symbol in lut]
+
+    return {
+      'source_size' : len(code),
+      'size' : header_size + body_size,
+      'header_size' : header_size,
+      'header_lines' : header_lines,
+      'aliases' : len(aliases),
+      'alias_mean' : sum(aliases) / max(len(aliases), 1),
+      'alias_max' : max(aliases, default=0),
+      'nodes' : estimator.nodes,
+      'elapsed' : time.perf_counter() - tic,
+    }
+
+  def obfuscate_stream (self, inptfile : str, outfile : str) -> None:
+    '''
+    Run the code obfuscation of a source file one top-level
+    statement at a time, so the memory is bounded by the
+    largest statement instead of the whole file.
+
+    The file is read twice: the first pass collects the values
+    to replace and the pragmas of the whole code, while the
+    second one parses, encrypts and unparses each statement,
+    spooling it to a temporary file. The header is written at
+    the end, followed by the spooled statements.
+
+    Parameters
+    ----------
+      inptfile : str
+        Path of the input source file
+
+      outfile : str
+        Path of the output file
+    '''
+
+    if self.preserve_lines:
+      raise ValueError(('Invalid streaming option. '
+        'The line numbers could not be preserved by the streaming obfuscation. '
+        f'Given: preserve_lines={self.preserve_lines}'
+      ))
+
+    if self.max_size_growth is not None or self.max_slowdown is not None:
+      raise ValueError(('Invalid streaming option. '
+        'The budgets are not supported by the streaming obfuscation. '
+        f'Given: max_size_growth={self.max_size_growth}, max_slowdown={self.max_slowdown}'
+      ))
+
+    if self.lazy_header:
+      raise ValueError(('Invalid streaming option. '
+        'The lazy header is not supported by the streaming obfuscation. '
+        f'Given: lazy_header={self.lazy_header}'
+      ))
+
+    symbols = None
+    pragmas = {}
+    packages = set()
+    decorators = set()
+    # references to the pyhide package, but the keep decorators
+    uses = 0
+    hot = {}
+    # local variables renamed by scope along the statements
+    scopes = {'reserved' : 0, 'names' : set(), 'kept' : set(), 'definitions' : set()}
+
+    # elapsed time of each phase, where the emission
+    # is timed as part of the encryption
+    phases = {}
+    tic = time.perf_counter()
+
+    # first pass: collect the information of the whole code
+    for root, stmt_pragmas, table, offset in parse_statements(filename=inptfile):
+      symbols = merge_symbols(symbols=symbols, root=root)
+      pragmas.update(stmt_pragmas)
+
+      # NOTE: the local variables are renamed only if all
+      # the statements match their symbol tables
+      if scopes is not None:
+        stmt_scopes = self._resolve_scopes(root=root, table=table, offset=offset)
+
+        if stmt_scopes is None:
+          scopes = None
+        else:
+          scopes['reserved'] = max(scopes['reserved'], stmt_scopes['reserved'])
+          for k in ('names', 'kept', 'definitions'):
+            scopes[k].update(stmt_scopes[k])
+
+      stmt_packages, stmt_decorators = get_keep_decorators(root)
+      packages.update(stmt_packages)
+      decorators.update(stmt_decorators)
+      uses += count_package_uses(root=root, packages=packages)
+
+      hot.update(self._get_hot_positions(root=root))
+
+    if symbols is None:
+      symbols = merge_symbols(symbols=None, root=ast.Module(body=[], type_ignores=[]))
+
+    symbols = resolve_symbols(symbols=symbols)
+
+    if scopes is not None:
+      scopes['excluded'] = scopes['names'] - scopes['kept']
+
+    phases['analyze'] = time.perf_counter() - tic
+    tic = time.perf_counter()
+
+    lut = create_encryption_lut(
+      root=None,
+      rename_variable=self.rename_variable,
+      rename_function=self.rename_function,
+      rename_class=self.rename_class,
+      encode_pkg=self.encode_pkg,
+      encode_number=self.encode_number,
+      encode_string=self.encode_string,
+      cache_pkg=self.specialize or len(hot) > 0 or len(pragmas) > 0 or len(packages | decorators) > 0,
+      symbols=symbols,
+      blob_threshold=self.blob_threshold,
+      cache_operator=self.specialize and self.encode_operator,
+      scopes=scopes,
+    )
+
+    context = {
+      'lut' : lut,
+      'module_lut' : symbols['mod_lut'] if self.encode_pkg else {},
+      'hot' : hot,
+      'pragmas' : pragmas,
+      'packages' : packages,
+      'decorators' : decorators,
+      'bound' : set(),
+    }
+
+    header = {}
+    report = []
+    timings = {}
+    counts = {}
+    records = set()
+    references = set()
+
+    phases['lut'] = time.perf_counter() - tic
+    tic = time.perf_counter()
+
+    # second pass: encrypt the statements one at a time
+    with tempfile.TemporaryFile('w+', encoding='utf-8') as spool:
+
+      for root, _, table, offset in parse_statements(filename=inptfile):
+
+        if packages and not uses:
+          strip_keep_imports(root=root, packages=packages)
+
+        # rename the local variables of the statement with the
+        # aliases reserved by the lut
+        if scopes is not None:
+          stmt_scopes = self._resolve_scopes(root=root, table=table, offset=offset,
+            definitions=scopes['definitions']
+          )
+          context['bound'] = stmt_scopes['bound']
+          stmt_records, _ = rename_locals(scopes=stmt_scopes, start=scopes['start'])
+          records.update(stmt_records if self.symbol_map is not None else ())
+
+        # the symbol map requires the original code tree
+        if self.symbol_map is not None:
+          records.update(get_symbol_records(root=root, lut=lut))
+
+        stmt_header, stmt_report, stmt_timings, stmt_counts = self._encrypt_nodes(nodes=[root], **context)
+
+        # the same alias is always bound to the same value
+        # so the first definition is kept
+        for k, v in stmt_header.items():
+          header.setdefault(k, v)
+
+        report.extend(stmt_report)
+
+        for k, v in stmt_timings.items():
+          timings[k] = timings.get(k, 0.) + v
+        for k, v in stmt_counts.items():
+          counts[k] = counts.get(k, 0) + v
+
+        obf_code = clean_header_issues(
+          code=unparse(root),
+          header=stmt_header
+        )
+
+        if obf_code:
+          spool.write(obf_code + '\n')
+
+        references.update(ALIAS_REGEX.findall(obf_code))
+
+      header, aliases, self.header_report = self._prune_header(
+        header=header,
+        references=references
+      )
+
+      obf_header = unparse(add_header_variables(
+        root=ast.Module(body=[], type_ignores=[]),
+        header=header,
+        aliases=aliases
+      ))
+      obf_header = clean_header_issues(
+        code=obf_header,
+        header=header
+      )
+
+      with open(outfile, 'w', encoding='utf-8') as fp:
+        if obf_header:
+          fp.write(obf_header + '\n')
+
+        spool.seek(0)
+        shutil.copyfileobj(spool, fp)
+
+    if self.symbol_map is not None:
+      # the identifiers defined in a statement are only
+      # used by the other ones
+      defined = {name for _, name, kind, _ in records if kind != 'name'}
+      records = {record for record in records
+        if record[2] != 'name' or record[1] not in defined
+      }
+      dump_symbol_map(records=sorted(records), filename=self.symbol_map)
+
+    phases['encrypt'] = time.perf_counter() - tic
+
+    self.report = report
+    self.timings = timings
+    self.metrics = {
+      'nodes' : counts,
+      'aliases' : len(lut),
+      'header' : self.header_report['entries'],
+      'header_saved' : {k : self.header_report[k] for k in ('lines', 'bytes')},
+      'phases' : phases,
+      'cache' : None,
+    }
+
+  async def aobfuscate (self, code : str) -> str:
+    '''
+    Run the code obfuscation in a worker process without
+    blocking the event loop.
+
+    At most max_concurrency obfuscations run at the same
+    time, while the other ones wait their turn. If the call
+    is cancelled while running, the worker processes are
+    terminated.
+
+    Parameters
+    ----------
+      code : str
+        Code to obfuscate and encrypt
+
+    Returns
+    -------
+      obf_code : str
+        Obfuscated code
+    '''
+    options = self._get_options() if self.cache is not None else None
+    key = ('result', get_source_digest(code=code), options)
+
+    # the result cache is checked before the submission,
+    # since the workers get an empty copy of it
+    if options is not None:
+      obf_code = self._get_cached_result(key=key)
+      if obf_code is not None:
+        return obf_code
+
+    obf_code, self.report, self.timings, self.metrics = await self._pool.submit(_obfuscate_code, self, code)
+
+    if options is not None:
+      self._put_cached_result(key=key, obf_code=obf_code)
+
+    return obf_code
+
+  async def aobfuscate_batch (self, codes : list) -> list:
+    '''
+    Run the obfuscation of a batch of codes concurrently.
+
+    If one of the obfuscations fails (or the call is
+    cancelled) the other ones are cancelled.
+
+    Parameters
+    ----------
+      codes : list
+        List of codes to obfuscate
+
+    Returns
+    -------
+      obf_codes : list
+        List of the obfuscated codes, in the same order
+    '''
+    return await gather_or_cancel(*(self.aobfuscate(code=code) for code in codes))
+
+  async def aobfuscate_files (self, files : list) -> None:
+    '''
+    Run the obfuscation of a list of files concurrently.
+
+    The files are read and written in background threads,
+    so the i/o overlaps with the obfuscation of the other
+    files. At most max_concurrency files are read ahead of
+    the obfuscation.
+
+    Parameters
+    ----------
+      files : list
+        List of the (input, output) filename pairs
+    '''
+
+    # the bounded queue stops the reading of the files
+    # when the obfuscation is slower than the i/o
+    queue = asyncio.Queue(maxsize=self.max_concurrency)
+
+    async def reader ():
+      for inptfile, outfile in files:
+        code = await asyncio.to_thread(_read_file, inptfile)
+        await queue.put((code, outfile))
+
+      # a stop signal for each writer
+      for _ in range(self.max_concurrency):
+        await queue.put(None)
+
+    async def writer ():
+      while (item := await queue.get()) is not None:
+        code, outfile = item
+        obf_code = await self.aobfuscate(code=code)
+        await asyncio.to_thread(_write_file, outfile, obf_code)
+
+    await gather_or_cancel(reader(), *(writer() for _ in range(self.max_concurrency)))
+
+  def close (self) -> None:
+    '''
+    Shutdown the worker processes of the async api.
+    '''
+    self._pool.close()
+
+  async def aclose (self) -> None:
+    '''
+    Shutdown the worker processes of the async api
+    without blocking the event loop.
+    '''
+    await asyncio.to_thread(self._pool.close)
+
+  async def __aenter__ (self):
+    return self
+
+  async def __aexit__ (self, exc_type, exc_value, traceback):
+    await self.aclose()
+
+
+def obfuscate_builds (code : str, builds : dict) -> dict:
+  '''
+  Run several code obfuscations of the same code, e.g.
+  a light build and a full build.
+
+  The code is parsed and its values are collected only
+  once, then each build encrypts its own copy of the
+  code tree (the last build takes the parsed tree).
+
+  Parameters
+  ----------
+    code : str
+      Code to obfuscate and encrypt
+
+    builds : dict
+      Lookup table of the Obfuscator objects of the builds
+
+  Returns
+  -------
+    obf_codes : dict
+      Lookup table of the obfuscated codes of the builds
+
+  Examples
+  --------
+  >>> import pyhide
+  >>>
+  >>> obf_codes = pyhide.obfuscate_builds(code, builds={
+  >>>   'light' : pyhide.Obfuscator(encode_pkg=False, encode_number=False, encode_string=False, encode_operator=False),
+  >>>   'full' : pyhide.Obfuscator(),
+  >>> })
+  '''
+
+  tic = time.perf_counter()
+  analysis = Obfuscator._analyze(code=code, symbols=len(builds) > 1)
+  root = analysis['root']
+  elapsed = time.perf_counter() - tic
+
+  obf_codes = {}
+
+  for i, (name, obfuscator) in enumerate(builds.items()):
+    # the analyzed tree must be kept unchanged
+    # until the last build
+    tic = time.perf_counter()
+    tree = root if i == len(builds) - 1 else clone_tree(root)
+    elapsed += time.perf_counter() - tic
+
+    obf_codes[name] = obfuscator._obfuscate(root=tree, analysis=analysis)
+
+    # the shared analysis is attributed to the first build
+    obfuscator.metrics['phases']['analyze'] = elapsed
+    elapsed = 0.
+
+  return obf_codes
+
+async def aobfuscate (code : str, **kwargs) -> str:
+  '''
+  Run the code obfuscation in a worker process without
+  blocking the event loop.
+
+  Parameters
+  ----------
+    code : str
+      Code to obfuscate and encrypt
+
+    **kwargs : dict
+      Parameters of the Obfuscator object
+
+  Returns
+  -------
+    obf_code : str
+      Obfuscated code
+
+  Examples
+  --------
+  >>> import asyncio
+  >>> import pyhide
+  >>>
+  >>> obf_code = asyncio.run(pyhide.aobfuscate('print("Hello world!")'))
+  '''
+  async with Obfuscator(**kwargs) as obfuscator:
+    return await obfuscator.aobfuscate(code=code)
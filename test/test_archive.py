@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import io
+import csv
+import zipfile
+from contextlib import redirect_stdout as rstdout
+
+from pyhide import Obfuscator
+from pyhide._archive import obfuscate_archive
+from pyhide._archive import get_record_hash
+
+import pytest
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+code = b"""
+def func (x, y):
+  z = x * 3 + y * 2
+  return 'value' + str(z)
+
+print(func(x=1, y=2), end='')
+"""
+
+def make_wheel (filename : str, files : dict) -> None:
+  '''
+  Create a wheel with the given files and its RECORD.
+  '''
+  record = ''.join(f'{name},{get_record_hash(data)},{len(data)}\n'
+    for name, data in files.items()
+  )
+  record += 'pkg-1.0.dist-info/RECORD,,\n'
+
+  with zipfile.ZipFile(filename, 'w', zipfile.ZIP_DEFLATED) as zout:
+    for name, data in files.items():
+      zout.writestr(name, data)
+    zout.writestr('pkg-1.0.dist-info/RECORD', record)
+
+
+class TestArchive:
+  '''
+  Tests:
+    - if the python members of a wheel are obfuscated
+    - if the other members are copied unchanged
+    - if the RECORD hashes match the new members
+    - if an invalid python member raises an error
+  '''
+
+  def test_wheel (self, tmp_path):
+
+    inptfile = str(tmp_path / 'pkg-1.0-py3-none-any.whl')
+    outfile = str(tmp_path / 'pkg_obf-1.0-py3-none-any.whl')
+
+    files = {
+      'pkg/__init__.py' : b'',
+      'pkg/module.py' : code,
+      'pkg/data.bin' : os.urandom(4096),
+      'pkg-1.0.dist-info/METADATA' : b'Metadata-Version: 2.1\nName: pkg\nVersion: 1.0\n',
+    }
+    make_wheel(filename=inptfile, files=files)
+
+    names = obfuscate_archive(inptfile=inptfile, outfile=outfile, obfuscator=Obfuscator())
+    assert names == ['pkg/__init__.py', 'pkg/module.py']
+
+    with zipfile.ZipFile(inptfile, 'r') as zin, zipfile.ZipFile(outfile, 'r') as zout:
+
+      assert zout.testzip() is None
+      assert zout.namelist() == zin.namelist()
+
+      # the raw compressed bytes are copied
+      for name in ('pkg/data.bin', 'pkg-1.0.dist-info/METADATA'):
+        assert zout.read(name) == zin.read(name)
+        assert zout.getinfo(name).compress_size == zin.getinfo(name).compress_size
+
+      obf_code = zout.read('pkg/module.py')
+      assert obf_code != code
+
+      stdout = io.StringIO()
+      with rstdout(stdout):
+        exec(obf_code, {})
+
+      assert stdout.getvalue() == 'value7'
+
+      record = csv.reader(io.StringIO(zout.read('pkg-1.0.dist-info/RECORD').decode('utf-8')))
+
+      for name, digest, size in record:
+        if digest:
+          data = zout.read(name)
+          assert digest == get_record_hash(data)
+          assert int(size) == len(data)
+
+  def test_invalid_member (self, tmp_path):
+
+    inptfile = str(tmp_path / 'pkg.zip')
+    make_wheel(filename=inptfile, files={'pkg/module.py' : b'def func (:\n'})
+
+    with pytest.raises(ValueError):
+      obfuscate_archive(inptfile=inptfile, outfile=str(tmp_path / 'obf.zip'), obfuscator=Obfuscator())
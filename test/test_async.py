@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import asyncio
+import multiprocessing
+from io import StringIO
+from contextlib import redirect_stdout as rstdout
+
+from pyhide import Obfuscator
+from pyhide import aobfuscate
+
+import pytest
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+code = """
+def func (x, y):
+  z = x * 3 + y * 2
+  return 'value' + str(z)
+
+print(func(x=1, y=2), end='')
+"""
+
+# long code to keep the worker busy
+long_code = '\n'.join(f'''
+def func_{i} (x):
+  y = x * {i} + 1.5
+  return 'value' + str(y)
+''' for i in range(3000))
+
+class TestAsync:
+  '''
+  Tests:
+    - if the async obfuscation gives the same results of the sync one
+    - if the batch obfuscation preserves the order of the codes
+    - if the files are obfuscated
+    - if the cancellation terminates the worker processes
+    - if an invalid concurrency limit raises an error
+  '''
+
+  def test_aobfuscate (self):
+
+    obf_code = asyncio.run(aobfuscate(code=code))
+    assert obf_code == Obfuscator()(code=code)
+
+    stdout = StringIO()
+    with rstdout(stdout):
+      exec(obf_code, {})
+
+    assert stdout.getvalue() == 'value7'
+
+  def test_batch (self):
+
+    codes = [code.replace('value', f'value_{i}') for i in range(5)]
+
+    async def run ():
+      async with Obfuscator(max_concurrency=2) as obfuscator:
+        return await obfuscator.aobfuscate_batch(codes=codes)
+
+    obf_codes = asyncio.run(run())
+
+    for i, obf_code in enumerate(obf_codes):
+      stdout = StringIO()
+      with rstdout(stdout):
+        exec(obf_code, {})
+
+      assert stdout.getvalue() == f'value_{i}7'
+
+  def test_files (self, tmp_path):
+
+    files = []
+
+    for i in range(4):
+      inptfile = tmp_path / f'code_{i}.py'
+      inptfile.write_text(code)
+      files.append((str(inptfile), str(tmp_path / f'obf_{i}.py')))
+
+    async def run ():
+      async with Obfuscator(max_concurrency=2) as obfuscator:
+        await obfuscator.aobfuscate_files(files=files)
+
+    asyncio.run(run())
+
+    for _, outfile in files:
+      with open(outfile, 'r') as fp:
+        assert fp.read() == Obfuscator()(code=code)
+
+  def test_cancellation (self):
+
+    async def run ():
+      async with Obfuscator() as obfuscator:
+        task = asyncio.ensure_future(obfuscator.aobfuscate(code=long_code))
+
+        # wait the start of the job
+        while obfuscator._pool._executor is None or not obfuscator._pool._executor._processes:
+          await asyncio.sleep(0.01)
+
+        task.cancel()
+
+        with pytest.raises(asyncio.CancelledError):
+          await task
+
+        # the pool is created again by the next call
+        return await obfuscator.aobfuscate(code=code)
+
+    obf_code = asyncio.run(run())
+    assert obf_code == Obfuscator()(code=code)
+    assert multiprocessing.active_children() == []
+
+  def test_invalid_concurrency (self):
+
+    with pytest.raises(ValueError):
+      Obfuscator(max_concurrency=0)
@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from io import StringIO
+from contextlib import redirect_stdout as rstdout
+
+from pyhide import Obfuscator
+from pyhide._encoder import encodeBlob
+
+import pytest
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+template = '{"name" : "value", "items" : [1, 2, 3], "text" : "àèì €"}\n' * 200
+blob = bytes(range(256)) * 8
+
+code = f"""
+TEMPLATE = {template!r}
+BLOB = {blob!r}
+
+def func (x):
+  return len(TEMPLATE) + len(BLOB) + x
+
+print(func(x=1), TEMPLATE[-8:], BLOB[:3], 'abc', end='')
+"""
+
+class TestBlob:
+  '''
+  Tests:
+    - if the blobs give the original literals only once
+    - if the large literals shrink the obfuscated code
+    - if the blobs could be disabled
+    - if the invalid thresholds raise an error
+  '''
+
+  @pytest.mark.parametrize('value', [template, blob, '\ud800 surrogate'])
+  def test_decode (self, value):
+
+    decoder = eval(encodeBlob(value=value))
+
+    assert decoder() == value
+    assert decoder() is decoder()
+
+  def test_obfuscation (self):
+
+    obf_code = Obfuscator(blob_threshold=1024)(code=code)
+
+    # the literals are compressed
+    assert len(obf_code) < len(code)
+
+    stdout = StringIO()
+    with rstdout(stdout):
+      exec(obf_code, {})
+
+    assert stdout.getvalue() == f'{len(template) + len(blob) + 1} {template[-8:]} {blob[:3]} abc'
+
+  def test_disabled (self):
+
+    obf_code = Obfuscator()(code=code)
+    assert repr(blob) in obf_code
+
+    # the blobs are a string encoding
+    obf_code = Obfuscator(blob_threshold=1024, encode_string=False)(code=code)
+    assert repr(blob) in obf_code
+
+  @pytest.mark.parametrize('threshold', [0, -1])
+  def test_invalid_threshold (self, threshold):
+
+    with pytest.raises(ValueError):
+      Obfuscator(blob_threshold=threshold)
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import ast
+from io import StringIO
+from contextlib import redirect_stdout as rstdout
+
+from pyhide import Obfuscator
+from pyhide import obfuscate_builds
+from pyhide._emitter import clone_tree
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+code = """
+import math
+
+def func (x, y):
+  z = x * 3 + y * 2
+  return 'value' + str(math.sqrt(z * z))
+
+class A:
+
+  def __init__ (self, x):
+    self.x = x
+
+a = A(x=2)
+print(func(x=1, y=a.x), end='')
+"""
+
+class TestBuilds:
+  '''
+  Tests:
+    - if the builds give the same results of the separated obfuscations
+    - if the copy of the code tree is equal to the original one
+  '''
+
+  def test_builds (self):
+
+    builds = {
+      'light' : Obfuscator(encode_number=False, encode_string=False, encode_operator=False),
+      'full' : Obfuscator(),
+      'lines' : Obfuscator(preserve_lines=True),
+    }
+
+    obf_codes = obfuscate_builds(code=code, builds=builds)
+
+    assert list(obf_codes) == list(builds)
+    assert obf_codes['light'] != obf_codes['full']
+
+    for name, obf_code in obf_codes.items():
+      stdout = StringIO()
+      with rstdout(stdout):
+        exec(obf_code, {})
+
+      assert stdout.getvalue() == 'value7.0'
+
+    # the light build does not encode the strings
+    assert "'value'" in obf_codes['light']
+    assert "'value'" not in obf_codes['full']
+    # the line-preserving build keeps the function line
+    assert 'def ' in obf_codes['lines'].split('\n')[3]
+
+  def test_clone_tree (self):
+
+    root = ast.parse(code)
+    clone = clone_tree(root)
+
+    assert ast.dump(clone, include_attributes=True) == ast.dump(root, include_attributes=True)
+    assert not any(node is copy
+      for node, copy in zip(ast.walk(root), ast.walk(clone))
+        if not isinstance(node, ast.expr_context)
+    )
@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import ast
+from io import StringIO
+from contextlib import redirect_stdout as rstdout
+from concurrent.futures import ThreadPoolExecutor
+
+from pyhide import Obfuscator
+from pyhide import ResultCache
+from pyhide import Pass
+
+import pytest
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+template = """
+def greet (name):
+  message = 'Hello {tenant}, ' + name
+  return message * 2
+
+print(greet('world'), {number}, end='')
+"""
+
+def _run (code : str) -> str:
+  with rstdout(StringIO()) as stdout:
+    exec(code, {})
+  return stdout.getvalue()
+
+class NoopPass (Pass):
+
+  name = 'noop'
+  node_types = (ast.Constant, )
+
+  def match (self, node, context):
+    return False
+
+  def apply (self, node, level, context):
+    return node
+
+class TestCache:
+  '''
+  Tests:
+    - if the same code and options return the cached result
+    - if the analysis is reused with other options
+    - if the least recently used entries are evicted
+    - if the cache is shared by several threads
+    - if the symbol map is restored at each hit
+    - if the symbol map is written when the cached result has none
+    - if the custom passes skip the result cache
+    - if an invalid size is rejected
+  '''
+
+  def test_hit (self):
+
+    code = template.format(tenant='A', number=42)
+    obfuscator = Obfuscator(cache=1 << 24)
+
+    obf_code = obfuscator(code)
+    assert obfuscator(code) == obf_code
+    assert _run(obf_code) == _run(code)
+
+    stats = obfuscator.cache.stats()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+    assert stats['entries'] == 2
+
+  def test_analysis (self):
+
+    code = template.format(tenant='B', number=3.5)
+    cache = ResultCache(max_bytes=1 << 24)
+
+    for params in ({}, {'encode_string' : False}, {'encode_number' : False}):
+      obf_code = Obfuscator(cache=cache, **params)(code)
+      assert _run(obf_code) == _run(code)
+
+    stats = cache.stats()
+    assert stats['hits'] == 0
+    assert stats['misses'] == 3
+    assert stats['analysis_hits'] == 2
+    assert stats['analysis_misses'] == 1
+
+  def test_eviction (self):
+
+    cache = ResultCache(max_bytes=8 * 1024)
+    obfuscator = Obfuscator(cache=cache)
+
+    codes = [template.format(tenant=i, number=i) for i in range(6)]
+    for code in codes:
+      obfuscator(code)
+
+    stats = cache.stats()
+    assert stats['evictions'] > 0
+    assert stats['size'] <= cache.max_bytes
+
+    # the most recent result is kept, the first one is evicted
+    obfuscator(codes[-1])
+    obfuscator(codes[0])
+    stats = cache.stats()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 7
+
+  def test_threads (self):
+
+    cache = ResultCache(max_bytes=1 << 24)
+    codes = [template.format(tenant=i % 3, number=i % 3) for i in range(12)]
+
+    def job (code : str) -> str:
+      # NOTE: the reports of an obfuscator are not thread-safe,
+      # so each thread uses its own obfuscator
+      return Obfuscator(cache=cache)(code)
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+      obf_codes = list(executor.map(job, codes))
+
+    for code, obf_code in zip(codes, obf_codes):
+      assert _run(obf_code) == _run(code)
+
+    stats = cache.stats()
+    assert stats['hits'] + stats['misses'] == len(codes)
+    assert stats['entries'] <= 6
+
+  def test_symbol_map (self, tmp_path):
+
+    code = template.format(tenant='C', number=7)
+    symbol_map = str(tmp_path / 'symbols.pyhide-map')
+    obfuscator = Obfuscator(cache=1 << 24, symbol_map=symbol_map)
+
+    obfuscator(code)
+    with open(symbol_map, 'r', encoding='utf-8') as fp:
+      records = fp.read()
+    os.remove(symbol_map)
+
+    obfuscator(code)
+    with open(symbol_map, 'r', encoding='utf-8') as fp:
+      assert fp.read() == records
+    assert obfuscator.cache.stats()['hits'] == 1
+
+  def test_symbol_map_key (self, tmp_path):
+
+    code = template.format(tenant='D', number=9)
+    symbol_map = str(tmp_path / 'symbols.pyhide-map')
+    cache = ResultCache(max_bytes=1 << 24)
+
+    # the result without the map is not reused when the map is requested
+    obf_code = Obfuscator(cache=cache)(code)
+    assert Obfuscator(cache=cache, symbol_map=symbol_map)(code) == obf_code
+    assert os.path.exists(symbol_map)
+
+    stats = cache.stats()
+    assert stats['hits'] == 0
+    assert stats['analysis_hits'] == 1
+
+  def test_passes (self):
+
+    code = template.format(tenant='D', number=1)
+    obfuscator = Obfuscator(cache=1 << 24, passes=[NoopPass()])
+
+    obfuscator(code)
+    obfuscator(code)
+
+    stats = obfuscator.cache.stats()
+    assert stats['hits'] == 0
+    assert stats['analysis_hits'] == 1
+
+  @pytest.mark.parametrize('max_bytes', [0, -1])
+  def test_invalid (self, max_bytes):
+
+    with pytest.raises(ValueError):
+      ResultCache(max_bytes=max_bytes)
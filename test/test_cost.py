@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from io import StringIO
+from contextlib import redirect_stdout as rstdout
+
+from pyhide import Obfuscator
+from pyhide._cost import LEVEL_OPTIONS
+from pyhide._cost import get_cost_model
+from pyhide._cost import format_budget_report
+from pyhide._profile import LEVEL_FULL
+
+import pytest
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+code = """
+import math
+
+def func (x, y):
+  z = x * 3 + y * 2
+  name = 'value' + str(z)
+  return math.sqrt(abs(z)) + len(name)
+
+def bar (x):
+  return 'bar' + str(x * 4 + 1)
+
+print(func(x=1, y=2), bar(x=2), end='')
+"""
+
+params = {
+  'encode_string' : True,
+  'encode_number' : True,
+  'encode_operator' : True,
+  'encode_pkg' : True,
+  'rename_function' : True,
+}
+
+class TestCost:
+  '''
+  Tests:
+    - if the cost model has all the transformations
+    - if the slowdown budget is satisfied by the chosen levels
+    - if the budget report lists the downgrades
+    - if the invalid budgets raise an error
+  '''
+
+  def test_model (self):
+
+    model = get_cost_model(params=params)
+
+    assert set(LEVEL_OPTIONS) | {'string_char'} == set(model)
+    # the full string encoding is slower than the native string
+    assert model['string'][LEVEL_FULL][0] > 0.
+
+  def test_slowdown (self):
+
+    obfuscator = Obfuscator(max_slowdown=1.5)
+    obf_code = obfuscator(code=code)
+
+    plan = obfuscator.plan
+    assert plan['initial'][1] > plan['final'][1]
+    assert plan['final'][1] <= 1.5
+    assert plan['steps']
+
+    stdout = StringIO()
+    with rstdout(stdout):
+      exec(obf_code, {})
+
+    assert stdout.getvalue() == '8.64575131106459 bar9'
+
+  def test_report (self):
+
+    obfuscator = Obfuscator(max_size_growth=1e6, max_slowdown=1.5)
+    obfuscator(code=code)
+
+    report = format_budget_report(plan=obfuscator.plan)
+    assert all(step['name'] in report for step in obfuscator.plan['steps'])
+    assert 'predicted slowdown' in report
+
+  @pytest.mark.parametrize('budget', [0., -1.])
+  def test_invalid_budget (self, budget):
+
+    with pytest.raises(ValueError):
+      Obfuscator(max_size_growth=budget)
+
+    with pytest.raises(ValueError):
+      Obfuscator(max_slowdown=budget)
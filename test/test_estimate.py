@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import time
+
+from pyhide import Obfuscator
+from pyhide._encoder import NUMBERS_LUT
+from pyhide._encoder import encodeInteger
+from pyhide._encoder import encodeFloat
+from pyhide._estimate import get_integer_size
+from pyhide._estimate import get_float_size
+from pyhide._estimate import iter_source_files
+
+import pytest
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+package_dir = os.path.join(
+  os.path.dirname(os.path.abspath(__file__)),
+  '..',
+  'pyhide'
+)
+
+code = """
+import math
+
+def func (x, y):
+  z = x * 3 + y * 2.5
+  name = f'value {z}'
+  return math.sqrt(abs(z)) + len(name) + 1024
+
+print(func(x=1, y=2), 'done', end='')
+"""
+
+class TestEstimate:
+  '''
+  Tests:
+    - if the closed-form sizes match the encoded numbers
+    - if the estimated size is close to the obfuscated one
+    - if the estimate is an order of magnitude faster than the obfuscation
+    - if the python files of a directory are found
+  '''
+
+  def test_numbers (self):
+
+    # the sizes are given for the initial lookup table
+    numbers_lut = dict(NUMBERS_LUT)
+    NUMBERS_LUT.clear()
+    NUMBERS_LUT.update({k : numbers_lut[k] for k in ('0', '1')})
+
+    try:
+      for number in list(range(300)) + [2**40 + 7, 10**12]:
+        assert get_integer_size(number) == len(encodeInteger(number=number))
+    finally:
+      NUMBERS_LUT.update(numbers_lut)
+
+    for number in (0.5, 3.14159, 1e-7):
+      assert get_float_size(number) == len(encodeFloat(number=number))
+
+  @pytest.mark.parametrize('encode_string', [False, True])
+  def test_estimate (self, encode_string):
+
+    obfuscator = Obfuscator(encode_string=encode_string)
+    estimate = obfuscator.estimate(code=code)
+    obf_code = obfuscator(code=code)
+
+    # the numbers already encoded make the code shorter
+    assert 0.9 < estimate['size'] / len(obf_code) < 1.1
+    assert estimate['header_size'] < estimate['size']
+    assert estimate['nodes']['operator'] == 5
+    assert ('string' in estimate['nodes']) == encode_string
+
+  def test_speed (self):
+
+    with open(os.path.join(package_dir, '_encoder.py'), 'r', encoding='utf-8') as fp:
+      source = fp.read()
+
+    def best (func, repeat):
+      elapsed = float('inf')
+      for _ in range(repeat):
+        tic = time.perf_counter()
+        result = func(source)
+        elapsed = min(elapsed, time.perf_counter() - tic)
+      return result, elapsed
+
+    obfuscator = Obfuscator()
+    estimate, estimate_time = best(obfuscator.estimate, repeat=5)
+    obf_code, obf_time = best(obfuscator, repeat=2)
+
+    assert 0.9 < estimate['size'] / len(obf_code) < 1.1
+    assert obf_time > 10 * estimate_time
+
+  def test_files (self, tmp_path):
+
+    (tmp_path / 'pkg' / '__pycache__').mkdir(parents=True)
+    for filename in ('pkg/b.py', 'pkg/a.py', 'pkg/__pycache__/c.py', 'main.py', 'notes.txt'):
+      (tmp_path / filename).write_text(code, encoding='utf-8')
+
+    files = [f.replace(str(tmp_path), '') for f in iter_source_files(path=str(tmp_path))]
+    assert [f.replace('\\', '/') for f in files] == ['/main.py', '/pkg/a.py', '/pkg/b.py']
@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from pyhide import Obfuscator
+from pyhide._harness import check_files
+from pyhide._harness import is_test_file
+from pyhide._harness import format_check_report
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+scripts = {
+  'func.py' : """
+def func (x, y):
+  return [i * x + y for i in range(4)]
+
+total = sum(func(x=2, y=1))
+print('total', total)
+""",
+  # the path of the obfuscated file is different
+  'path.py' : """
+print(__file__)
+""",
+  'test_func.py' : """
+def test_func ():
+  assert 'a' * 2 == 'aa'
+
+def test_sum ():
+  assert sum([1, 2, 3]) == 6
+""",
+}
+
+class TestHarness:
+  '''
+  Tests:
+    - if the pytest suites are detected by name
+    - if the matching and the different pairs are found
+    - if the return values of the scripts are compared
+    - if the slow files are flagged
+    - if the unchanged pairs are cached
+    - if the conftest fixtures are found by the obfuscated suites
+    - if the files are checked in parallel by their own jobs
+  '''
+
+  def test_kind (self):
+
+    assert is_test_file('pkg/test_func.py')
+    assert is_test_file('func_test.py')
+    assert not is_test_file('pkg/func.py')
+
+  def test_check (self, tmp_path):
+
+    for filename, code in scripts.items():
+      (tmp_path / filename).write_text(code, encoding='utf-8')
+
+    cache = str(tmp_path / 'cache.json')
+    records = check_files(path=str(tmp_path), obfuscator=Obfuscator(), result='total', cache=cache)
+    status = {record['file'].replace(str(tmp_path), '')[1:] : record for record in records}
+
+    assert status['func.py']['status'] == 'ok'
+    assert status['path.py']['status'] == 'mismatch'
+    assert 'stdout line 1' in status['path.py']['diff']
+    assert status['test_func.py']['kind'] == 'pytest'
+    assert status['test_func.py']['status'] == 'ok'
+    assert not any(record['cached'] for record in records)
+
+    # the results are taken from the cache, with the new threshold
+    records = check_files(path=str(tmp_path), obfuscator=Obfuscator(), result='total',
+      max_slowdown=1e-2, cache=cache
+    )
+
+    assert all(record['cached'] for record in records)
+    assert {record['status'] for record in records} == {'slow', 'mismatch'}
+
+    report = format_check_report(records=records)
+    assert '(cached)' in report
+    assert 'mismatch: 1' in report
+
+  def test_result (self, tmp_path):
+
+    # the stdout is the same, while the return value is different
+    (tmp_path / 'rand.py').write_text('import os\ntotal = os.urandom(8)\n', encoding='utf-8')
+
+    records = check_files(path=str(tmp_path / 'rand.py'), obfuscator=Obfuscator(), result='total')
+
+    assert records[0]['status'] == 'mismatch'
+    assert records[0]['diff'].startswith('result')
+
+  def test_conftest (self, tmp_path):
+
+    # the fixtures are given by the conftest files of the
+    # root and of the directory of the suite
+    (tmp_path / 'conftest.py').write_text(
+      'import pytest\n@pytest.fixture\ndef base ():\n  return 40\n', encoding='utf-8'
+    )
+    (tmp_path / 'suite').mkdir()
+    (tmp_path / 'suite' / 'conftest.py').write_text(
+      'import pytest\n@pytest.fixture\ndef shift ():\n  return 2\n', encoding='utf-8'
+    )
+    (tmp_path / 'suite' / 'test_fixture.py').write_text(
+      'def test_fixture (base, shift):\n  assert base + shift == 42\n', encoding='utf-8'
+    )
+    (tmp_path / 'suite' / 'test_shift.py').write_text(
+      'def test_shift (shift):\n  assert shift == 2\n', encoding='utf-8'
+    )
+
+    records = check_files(path=str(tmp_path), obfuscator=Obfuscator())
+    status = {record['file'].replace(str(tmp_path), '')[1:].replace('\\', '/') : record for record in records}
+
+    # a missing fixture gives an error only in the obfuscated run
+    assert status['suite/test_fixture.py']['status'] == 'ok'
+    assert status['suite/test_shift.py']['status'] == 'ok'
+
+  def test_jobs (self, tmp_path):
+
+    for filename, code in scripts.items():
+      (tmp_path / filename).write_text(code, encoding='utf-8')
+
+    # the jobs of the obfuscator do not parallelize the files
+    obfuscator = Obfuscator(n_jobs=2)
+    serial = check_files(path=str(tmp_path), obfuscator=obfuscator, result='total')
+    parallel = check_files(path=str(tmp_path), obfuscator=obfuscator, result='total', n_jobs=2)
+
+    assert obfuscator.n_jobs == 2
+    assert [(r['file'], r['status']) for r in serial] == [(r['file'], r['status']) for r in parallel]
+    assert {r['status'] for r in parallel} == {'ok', 'mismatch'}
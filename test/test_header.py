@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import re
+import sys
+from io import StringIO
+from subprocess import PIPE, run
+from contextlib import redirect_stdout as rstdout
+
+from pyhide import Obfuscator
+from pyhide._encoder import prune_header_variables
+from pyhide._encoder import format_header_report
+from pyhide.__main__ import parse_build
+
+import pytest
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+# the integer 97 has the same encoding of the char 'a'
+code = """
+def func (x):
+  return 'a' * x + str(97)
+
+print(func(x=2), end='')
+"""
+
+class TestHeader:
+  '''
+  Tests:
+    - if the unused header variables are removed
+    - if the variables with the same value are merged
+    - if the pruned code gives the same results
+    - if the pruning could be disabled
+    - if the command line reports the pruning of each build
+  '''
+
+  def test_prune (self):
+
+    header = {
+      '___' : '(1)',
+      '____' : '(2)',
+      '_____' : '(1)',
+      'True' : '(3)',
+    }
+
+    pruned, aliases, report = prune_header_variables(header=header, references={'___', '_____'})
+
+    # the names which are not aliases are always kept
+    assert pruned == {'___' : '(1)', 'True' : '(3)'}
+    assert aliases == {'___' : ['_____']}
+    assert report == {'dead' : 1, 'merged' : 1, 'lines' : 2, 'bytes' : len('____ = (2)\n') + len('(1)\n')}
+
+  @pytest.mark.parametrize('preserve_lines', [False, True])
+  def test_obfuscation (self, preserve_lines):
+
+    obfuscator = Obfuscator(preserve_lines=preserve_lines)
+    obf_code = obfuscator(code=code)
+
+    assert obfuscator.header_report['merged'] >= 1
+    assert obfuscator.header_report['bytes'] > 0
+
+    stdout = StringIO()
+    with rstdout(stdout):
+      exec(obf_code, {})
+
+    assert stdout.getvalue() == 'aa97'
+
+  def test_disabled (self):
+
+    obfuscator = Obfuscator(prune_header=False)
+    obf_code = obfuscator(code=code)
+
+    assert obfuscator.header_report['lines'] == 0
+
+    stdout = StringIO()
+    with rstdout(stdout):
+      exec(obf_code, {})
+
+    assert stdout.getvalue() == 'aa97'
+
+  def test_report (self, tmp_path):
+
+    inptfile = tmp_path / 'dummy.py'
+    inptfile.write_text(code, encoding='utf-8')
+
+    proc = run(
+      [sys.executable, '-m', 'pyhide', '--input', str(inptfile), '--build', 'light=xfc', '--build', 'full=xfcpns', '--header-report'],
+      stdout=PIPE, stderr=PIPE, universal_newlines=True
+    )
+    assert proc.returncode == 0
+
+    # the encodings depend on the process, so only
+    # the number of pruned variables is compared
+    reports = re.findall(r'Build (\w+):\n(pyhide header report: .*) \d+ bytes saved\n', proc.stdout)
+    assert [build for build, _ in reports] == ['light', 'full']
+
+    for (_, report), build in zip(reports, ('light=xfc', 'full=xfcpns')):
+      build, params = parse_build(build)
+      obfuscator = Obfuscator(**params)
+      obfuscator(code=code)
+      assert format_header_report(report=obfuscator.header_report).startswith(report)
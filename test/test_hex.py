@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from io import StringIO
+from contextlib import redirect_stdout as rstdout
+
+from pyhide import Obfuscator
+from pyhide._encoder import encodeHex
+from pyhide._estimate import get_hex_size
+
+import pytest
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+# the cheap encoding of the strings is given by their hex
+code = """
+def func (x):  # pyhide: cheap
+  return 'α€😀 ok' + f'{x} Ωmega'
+
+print(func(x=1), end='')
+"""
+
+class TestHex:
+  '''
+  Tests:
+    - if the escaped strings give the original ones
+    - if the latin-1 strings are escaped as single bytes
+    - if the non latin-1 strings are obfuscated correctly
+  '''
+
+  @pytest.mark.parametrize('text', ['', 'abc', 'h\xe9llo\n"\'\\', 'α€😀 ok', '\x00\xffĀ￿\U00010000'])
+  def test_roundtrip (self, text):
+
+    obf_text = encodeHex(text=text)
+
+    assert eval(f'"{obf_text}"') == text
+    assert get_hex_size(text) == len(obf_text)
+
+  def test_latin (self):
+
+    text = ''.join(map(chr, range(256))) * 3
+    assert encodeHex(text=text) == ''.join(f'\\x{ord(c):02x}' for c in text)
+
+  def test_obfuscation (self):
+
+    obf_code = Obfuscator()(code=code)
+
+    stdout = StringIO()
+    with rstdout(stdout):
+      exec(obf_code, {})
+
+    assert stdout.getvalue() == 'α€😀 ok1 Ωmega'
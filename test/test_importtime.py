@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from pyhide import Obfuscator
+from pyhide._importtime import bench_import
+from pyhide._importtime import get_header_kind
+from pyhide._importtime import get_header_entries
+from pyhide._importtime import format_import_report
+
+import pytest
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+code = """
+import math
+
+NAMES = ['alpha', 'beta']
+
+def func (x, y):
+  return math.sqrt(abs(x * 1234 + y * 98765))
+
+if __name__ == '__main__':
+  print(func(1, 2))
+"""
+
+class TestImportTime:
+  '''
+  Tests:
+    - if the header values are classified by kind
+    - if the header statements are split from the code
+    - if both the versions of the modules are timed
+  '''
+
+  @pytest.mark.parametrize('value, kind', [
+    ('___', 'alias'),
+    ('((()==[])+(()==()))', 'number'),
+    ('float(str("".join(chr(x) if isinstance(x, int) else x for x in "\\x33")))', 'number'),
+    ('getattr(__import__("\\x6d\\x61\\x74\\x68"), "\\x70\\x69")', 'package'),
+    ('getattr(__import__("\\x66"), "\\x6c")(None)(lambda: ___)', 'blob'),
+    ("eval(\"str(''.join(chr(x) for x in [___]))\")", 'string'),
+  ])
+  def test_kind (self, value, kind):
+
+    assert get_header_kind(value) == kind
+
+  def test_entries (self):
+
+    obf_code = '____ = (()==())\n_____ = ____\n______ = [____]\nprint(______)\n'
+
+    # the module variables are not part of the header
+    entries = get_header_entries(code=obf_code, variables={'______'})
+    assert entries == [(1, '(()==())'), (2, '____')]
+
+  def test_bench (self, tmp_path):
+
+    (tmp_path / 'mod.py').write_text(code, encoding='utf-8')
+    (tmp_path / 'broken.py').write_text('import not_a_module\n', encoding='utf-8')
+
+    records = bench_import(path=str(tmp_path), obfuscator=Obfuscator(), top=3, repeat=1)
+    status = {record['file'].replace(str(tmp_path), '')[1:] : record for record in records}
+
+    orig = status['mod.py']['original']
+    obf = status['mod.py']['obfuscated']
+
+    assert orig['error'] is None and obf['error'] is None
+    assert not orig['entries']
+    assert 0 < len(obf['entries']) <= 3
+    assert 'number' in obf['kinds']
+    assert obf['header'] > 0. and obf['import'] is not None
+    assert status['broken.py']['original']['error'].startswith('ModuleNotFoundError')
+
+    report = format_import_report(records=records)
+    assert 'header by kind' in report
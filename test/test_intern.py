@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import ast
+from io import StringIO
+from contextlib import redirect_stdout as rstdout
+
+from pyhide import Obfuscator
+from pyhide._encoder import LOOKUP_TABLE
+from pyhide._encoder import MAX_LOOKUPS
+from pyhide._encoder import encrypt_binary_operator
+
+import pytest
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+code = """
+import math
+
+def func (x, y):
+  return abs(x - y) * 3 + math.floor(x / 2) - len('abc' + 'cab')
+
+print(func(1, 2), func(5, 3), max(func(2, 2), 1), 'abc', 'bca', end='')
+"""
+
+class TestIntern:
+  '''
+  Tests:
+    - if the interned lookups give the package attributes
+    - if the table of the lookups is bounded
+    - if the encoded operator names are shared by the nodes
+    - if the code with the shared fragments is correct
+  '''
+
+  @pytest.mark.parametrize('pkg, attr', [('builtins', 'len'), ('math', 'floor'), ('os', 'sep')])
+  def test_lookup (self, pkg, attr):
+
+    lookup = LOOKUP_TABLE[pkg, attr]
+
+    assert LOOKUP_TABLE[pkg, attr] is lookup
+    assert eval(lookup) is getattr(__import__(pkg), attr)
+
+  def test_bound (self):
+
+    for i in range(2 * MAX_LOOKUPS):
+      lookup = LOOKUP_TABLE['os', f'attr_{i}']
+      assert len(LOOKUP_TABLE) <= MAX_LOOKUPS
+
+    assert LOOKUP_TABLE['os', f'attr_{i}'] is lookup
+
+  def test_operator (self):
+
+    nodes = [ast.parse(expr, mode='eval').body for expr in ('a + b', 'c + d', 'a - b')]
+    obf_nodes = [encrypt_binary_operator(node=node, lut=None, header={})[0] for node in nodes]
+    names = [node.func.args[1] for node in obf_nodes]
+
+    assert names[0] is names[1]
+    assert names[0] is not names[2]
+    assert eval(ast.unparse(obf_nodes[2]), {'a' : 5, 'b' : 2}) == 3
+
+  def test_obfuscation (self):
+
+    with rstdout(StringIO()) as stdout:
+      exec(code, {})
+    reference = stdout.getvalue()
+
+    with rstdout(StringIO()) as stdout:
+      exec(Obfuscator()(code), {})
+
+    assert stdout.getvalue() == reference
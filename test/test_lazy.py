@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import sys
+import inspect
+import threading
+from io import StringIO
+from contextlib import redirect_stdout
+
+from pyhide import Obfuscator
+
+import pytest
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+code = """
+import math
+
+SCALE = 3
+
+def used (x, y=7):
+  z = x * 1234 + y * 2
+  return math.sqrt(abs(z)) + len('used value')
+
+def unused (x):
+  return x * 98765 + len('never called')
+
+class Foo:
+  def method (self, k):
+    return k * 99 + len('method text')
+
+def gen (n):
+  for i in range(n):
+    yield i * 31337
+
+print(used(x=1), used(2, y=SCALE), Foo().method(k=2), list(gen(n=3)), end='')
+"""
+
+class TestLazy:
+  '''
+  Tests:
+    - if the lazy header gives the same results
+    - if the variables are evaluated at the first call
+    - if the invalid combinations are found
+    - if the functions keep their signature before the first call
+    - if the concurrent first calls are correctly run
+  '''
+
+  def test_lazy (self):
+
+    with redirect_stdout(StringIO()) as rstdout:
+      exec(code, {})
+    reference = rstdout.getvalue()
+
+    # NOTE: the method calls require the functions names
+    obf_code = Obfuscator(rename_function=False, lazy_header=True)(code)
+
+    with redirect_stdout(StringIO()) as rstdout:
+      exec(obf_code, {})
+
+    assert rstdout.getvalue() == reference
+
+  def test_first_call (self):
+
+    obf = Obfuscator(rename_function=False, lazy_header=True)
+    # nothing is called at the import
+    obf_code = obf(code[:code.index('print(')])
+    glob = {}
+    exec(obf_code, glob)
+
+    # the lookup table of the lazy variables
+    table, = [v for v in glob.values()
+      if isinstance(v, tuple) and v and all(isinstance(x, tuple) and len(x) == 2 for x in v)
+    ]
+    names = {name for name, _ in table}
+
+    assert not names & set(glob)
+
+    trampoline = glob['unused'].__code__
+    assert glob['unused'](2) == 2 * 98765 + len('never called')
+
+    # the original code is restored after the first call
+    assert glob['unused'].__code__ is not trampoline
+    assert names & set(glob)
+    assert glob['unused'](3) == 3 * 98765 + len('never called')
+
+  def test_signature (self):
+
+    source = """
+def handler (x, /, y=2, *args, z, w=5, **kwargs):
+  return (x * 1234, y, args, z, w, kwargs, len('handler text'))
+
+async def fetch (x):
+  return x * 4321
+
+def numbers (n):
+  for i in range(n):
+    yield i * 5678
+"""
+
+    obf = Obfuscator(rename_function=False, rename_variable=False, lazy_header=True)
+    glob = {}
+    exec(obf(source), glob)
+
+    handler = glob['handler']
+    trampoline = handler.__code__
+
+    assert str(inspect.signature(handler)) == '(x, /, y=2, *args, z, w=5, **kwargs)'
+    assert inspect.iscoroutinefunction(glob['fetch'])
+    assert inspect.isgeneratorfunction(glob['numbers'])
+
+    assert handler(1, 3, 4, z=9, q=1) == (1234, 3, (4, ), 9, 5, {'q' : 1}, len('handler text'))
+    assert handler.__code__ is not trampoline
+
+  def test_threads (self):
+
+    obf = Obfuscator(rename_function=False, lazy_header=True)
+    glob = {}
+    exec(obf(code[:code.index('print(')]), glob)
+
+    barrier = threading.Barrier(16)
+    results = []
+
+    def call ():
+      barrier.wait()
+      results.append(glob['unused'](2))
+
+    # switch the threads as often as possible
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+
+    try:
+      threads = [threading.Thread(target=call) for _ in range(16)]
+      for thread in threads:
+        thread.start()
+      for thread in threads:
+        thread.join()
+    finally:
+      sys.setswitchinterval(interval)
+
+    assert results == [2 * 98765 + len('never called')] * 16
+
+  @pytest.mark.parametrize('params', [{'preserve_lines' : True}, {'n_jobs' : 2}])
+  def test_invalid (self, params):
+
+    with pytest.raises(ValueError):
+      Obfuscator(lazy_header=True, **params)
+
+  def test_stream (self, tmp_path):
+
+    inptfile = tmp_path / 'code.py'
+    inptfile.write_text(code, encoding='utf-8')
+
+    with pytest.raises(ValueError):
+      Obfuscator(lazy_header=True).obfuscate_stream(inptfile=str(inptfile), outfile=str(tmp_path / 'obf.py'))
@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import sys
+import json
+import zipfile
+from subprocess import PIPE, run
+
+from pyhide import Obfuscator
+from pyhide._archive import obfuscate_archive
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+code = """
+import math
+
+def area (radius):
+  return math.pi * radius ** 2
+
+class Circle (object):
+
+  def __init__ (self, radius):
+    self.radius = radius
+
+values = [area(r) for r in range(3)]
+print('areas', len(values), end='')
+"""
+
+class TestMetrics:
+  '''
+  Tests:
+    - if the metrics of the obfuscation are filled
+    - if the parallel obfuscation transforms the same nodes
+    - if the metrics of the archive members are given
+    - if the command line writes the json lines
+  '''
+
+  def test_metrics (self):
+
+    obfuscator = Obfuscator()
+    obfuscator(code)
+    metrics = obfuscator.metrics
+
+    assert list(metrics['phases']) == ['analyze', 'lut', 'encrypt', 'emit']
+    assert all(elapsed >= 0. for elapsed in metrics['phases'].values())
+    assert metrics['nodes']['rename'] > 0
+    assert metrics['aliases'] > 0
+    assert metrics['header'] == obfuscator.header_report['entries']
+    assert metrics['cache'] is None
+
+  def test_parallel (self):
+
+    serial = Obfuscator()
+    serial(code)
+
+    parallel = Obfuscator(n_jobs=2)
+    parallel(code)
+
+    assert parallel.metrics['nodes'] == serial.metrics['nodes']
+    assert parallel.metrics['aliases'] == serial.metrics['aliases']
+
+  def test_archive (self, tmp_path):
+
+    inptfile = str(tmp_path / 'pkg.zip')
+    with zipfile.ZipFile(inptfile, 'w') as zf:
+      zf.writestr('pkg/a.py', code)
+      zf.writestr('pkg/b.py', code)
+      zf.writestr('pkg/data.txt', 'data')
+
+    records = []
+    obfuscate_archive(inptfile=inptfile, outfile=str(tmp_path / 'obf.zip'),
+      obfuscator=Obfuscator(cache=1 << 24),
+      callback=lambda name, data, obf_data, metrics, elapsed : records.append((name, metrics['cache']))
+    )
+
+    assert records == [('pkg/a.py', 'miss'), ('pkg/b.py', 'hit')]
+
+  def test_cli (self, tmp_path):
+
+    inptfile = tmp_path / 'dummy.py'
+    inptfile.write_text(code, encoding='utf-8')
+    metrics = tmp_path / 'metrics.jsonl'
+
+    proc = run(
+      [sys.executable, '-m', 'pyhide', '--input', str(inptfile), '--variable', '--function',
+       '--class', '--pkg', '--num', '--str', '--metrics-json', str(metrics), '--header-report'],
+      stdout=PIPE, stderr=PIPE, universal_newlines=True
+    )
+    assert proc.returncode == 0
+
+    with open(metrics, 'r', encoding='utf-8') as fp:
+      record, summary = [json.loads(line) for line in fp]
+
+    assert record['kind'] == 'file'
+    assert record['input_bytes'] == len(code.encode('utf-8'))
+    assert record['output_bytes'] == (tmp_path / 'dummy_obf.py').stat().st_size
+    assert record['nodes'] == sum(record['pass_nodes'].values())
+    assert set(record['phases']) == {'analyze', 'lut', 'encrypt', 'emit'}
+    assert set(record['header_saved']) == {'lines', 'bytes'}
+
+    assert summary['kind'] == 'summary'
+    assert summary['files'] == 1
+    assert summary['output_bytes'] == record['output_bytes']
+    assert summary['growth'] > 1.
+    assert summary['header_saved'] == record['header_saved']
+
+    # the header pruning is reported next to the file
+    assert f'{record["header_saved"]["lines"]} lines and {record["header_saved"]["bytes"]} bytes saved' in proc.stdout
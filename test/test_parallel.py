@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from io import StringIO
+from contextlib import redirect_stdout as rstdout
+
+from pyhide import Obfuscator
+
+import pytest
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+code = """
+import math
+
+def func_0 (x, y):
+  z = x * 3 + y / 3.5
+  name = 'value_0'
+  return math.sqrt(abs(z)) + len(name)
+
+def func_1 (x):
+  return [x * i for i in range(5)]
+
+class A:
+
+  def __init__ (self, x):
+    self.x = x
+
+  def norm (self):
+    return math.sqrt(self.x * self.x)
+
+a = A(x=func_0(x=1.5, y=2.5))
+print(round(a.norm(), 4), func_1(x=2), 'done', end='', flush=True)
+"""
+
+class TestParallel:
+  '''
+  Tests:
+    - if the parallel obfuscation gives the same results of the serial one
+    - if an invalid number of jobs raises an error
+  '''
+
+  def test_parallel_obfuscation (self):
+
+    stdout = StringIO()
+    with rstdout(stdout):
+      exec(code, {})
+
+    expected = stdout.getvalue()
+
+    serial = Obfuscator()(code=code)
+    parallel = Obfuscator(n_jobs=2)(code=code)
+
+    # each header variable is defined only once
+    targets = [line.split(' = ')[0]
+      for line in parallel.split('\n')
+        if ' = ' in line and not line.startswith(' ')
+    ]
+    assert len(targets) == len(set(targets))
+
+    for obf_code in (serial, parallel):
+      stdout = StringIO()
+      with rstdout(stdout):
+        exec(obf_code, {})
+
+      assert stdout.getvalue() == expected
+
+  def test_invalid_jobs (self):
+
+    with pytest.raises(ValueError):
+      Obfuscator(n_jobs=0)
@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import ast
+from io import StringIO
+from contextlib import redirect_stdout as rstdout
+
+from pyhide import Obfuscator
+from pyhide import Pass
+from pyhide._passes import get_dispatch_table
+from pyhide._passes import get_skipped_types
+
+import pytest
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+code = """
+def func (x, y):
+  z = x * 3 + y * 2
+  return 'value' + str(z)
+
+print(func(x=1, y=2), end='')
+"""
+
+class UpperPass (Pass):
+  '''
+  Replace the string constants with their upper case.
+  '''
+
+  name = 'upper'
+  node_types = (ast.Constant, )
+
+  def match (self, node, context):
+    return isinstance(node.value, str) and node.value.islower()
+
+  def apply (self, node, level, context):
+    return ast.Constant(value=node.value.upper())
+
+
+class TestPasses:
+  '''
+  Tests:
+    - if the custom passes are applied before the built-in ones
+    - if the timings of the passes are stored
+    - if a pass with missing metadata raises an error
+    - if the passes of a base node type receive its subclasses
+    - if only the subtrees without handled nodes are skipped
+  '''
+
+  def test_custom_pass (self):
+
+    obf_code = Obfuscator(passes=[UpperPass()])(code=code)
+
+    stdout = StringIO()
+    with rstdout(stdout):
+      exec(obf_code, {})
+
+    assert stdout.getvalue() == 'VALUE7'
+
+  def test_timings (self):
+
+    obfuscator = Obfuscator(passes=[UpperPass()])
+    obfuscator(code=code)
+
+    assert {'upper', 'rename', 'number', 'operator', 'builtin'} <= set(obfuscator.timings)
+    assert all(t >= 0. for t in obfuscator.timings.values())
+
+  def test_missing_metadata (self):
+
+    class ProfilePass (UpperPass):
+      requires = ('profile', )
+
+    with pytest.raises(ValueError):
+      Obfuscator(passes=[ProfilePass()])(code=code)
+
+  def test_base_types (self):
+
+    class CountPass (Pass):
+      name = 'count'
+      node_types = (ast.stmt, )
+      requires = ()
+
+      def __init__ (self):
+        self.seen = set()
+
+      def match (self, node, context):
+        self.seen.add(node.__class__)
+        return False
+
+    count = CountPass()
+    Obfuscator(passes=[count])(code=code)
+
+    assert count.seen == {ast.FunctionDef, ast.Assign, ast.Return, ast.Expr}
+
+    table = get_dispatch_table(passes=[count, UpperPass()], context={'lut' : None, 'header' : None})
+    assert table[ast.If] == [count]
+    assert table[ast.Constant] == [table[ast.Constant][0]]
+
+  def test_skipped_types (self):
+
+    def get_skipped (node_types):
+      obf_pass = UpperPass()
+      obf_pass.node_types = node_types
+      return get_skipped_types(table=get_dispatch_table(passes=[obf_pass], context={'lut' : None, 'header' : None}))
+
+    skipped = get_skipped((ast.Constant, ))
+    assert {ast.Load, ast.Add, ast.alias} <= skipped
+    assert not {ast.Call, ast.Lambda, ast.arguments, ast.If} & skipped
+
+    # the expressions could not contain any handler
+    skipped = get_skipped((ast.ExceptHandler, ))
+    assert {ast.Call, ast.Lambda, ast.arguments, ast.keyword} <= skipped
+    assert not {ast.Try, ast.FunctionDef, ast.Module} & skipped
+
+    skipped = get_skipped((ast.operator, ))
+    assert ast.Add not in skipped and ast.BinOp not in skipped
+    assert ast.Load in skipped
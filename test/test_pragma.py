@@ -0,0 +1,162 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from io import StringIO
+from contextlib import redirect_stdout as rstdout
+
+import pyhide
+from pyhide import Obfuscator
+from pyhide._pragma import get_pragmas
+from pyhide._pragma import parse_pragma
+
+import pytest
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+class TestPragma:
+  '''
+  Tests:
+    - if the pragmas are associated to the right statements
+    - if the operator encoding is disabled only in the pragma block
+    - if the keep decorator disables the encodings and it is removed
+    - if the unknown directives are skipped with a warning
+    - if the import of the keep decorator is removed without the package encoding
+  '''
+
+  def test_pragma_lines (self):
+
+    code = """
+x = 1 + 2  # pyhide: no-op-encode
+# pyhide: off
+def func (a):
+  return (a +
+    1)  # pyhide: no-str-encode, no-num-encode
+"""
+    pragmas = get_pragmas(code)
+
+    assert sorted(pragmas) == [2, 4, 5]
+    assert pragmas[2] == {'operator' : 0}
+    assert set(pragmas[4]) == {'string', 'number', 'operator', 'pkg', 'builtin'}
+    assert pragmas[5] == {'string' : 0, 'number' : 0}
+
+  def test_no_op_encode (self):
+
+    code = """
+def func (x, y):
+  a = x * y
+  for i in range(3):  # pyhide: no-op-encode
+    a = a + i * y
+  return a
+
+print(func(x=2, y=3), end='', flush=True)
+"""
+    stdout = StringIO()
+    with rstdout(stdout):
+      exec(code, {})
+
+    assert stdout.getvalue() == '15'
+
+    obf = Obfuscator()
+    obf_code = obf(code=code)
+
+    # only the operator outside the loop is encoded
+    assert obf_code.count('getattr(') == 2
+    assert ' + ' in obf_code and ' * ' in obf_code
+
+    stdout = StringIO()
+    with rstdout(stdout):
+      exec(obf_code, {})
+
+    assert stdout.getvalue() == '15'
+
+  def test_keep_decorator (self):
+
+    code = """
+import math
+import pyhide
+
+@pyhide.keep
+def kernel (n):
+  s = 0.5
+  for i in range(n):
+    s = s + math.sqrt(i) * 2
+  return s
+
+print(round(kernel(10), 2), end='', flush=True)
+"""
+    assert pyhide.keep(len) is len
+
+    stdout = StringIO()
+    with rstdout(stdout):
+      exec(code, {})
+
+    assert stdout.getvalue() == '39.11'
+
+    obf = Obfuscator()
+    obf_code = obf(code=code)
+
+    assert 'keep' not in obf_code
+    assert 'pyhide' not in obf_code
+    # the kernel body is not encoded
+    body = [line for line in obf_code.split('\n') if line.startswith(' ')]
+    assert len(body) == 4
+    assert all('eval(' not in line and 'getattr(' not in line for line in body)
+
+    stdout = StringIO()
+    with rstdout(stdout):
+      exec(obf_code, {})
+
+    assert stdout.getvalue() == '39.11'
+
+  def test_invalid_pragma (self):
+
+    code = """
+# pyhide: obfuscated with default settings
+x = 1  # pyhide: off, no-everything
+print(x, end='')
+"""
+    with pytest.raises(ValueError):
+      parse_pragma('no-everything')
+
+    with pytest.warns(UserWarning):
+      obf_code = Obfuscator()(code=code)
+
+    # the known directives are still applied
+    with pytest.warns(UserWarning):
+      assert get_pragmas(code) == {3 : parse_pragma('off')}
+
+    stdout = StringIO()
+    with rstdout(stdout):
+      exec(obf_code, {})
+
+    assert stdout.getvalue() == '1'
+
+  @pytest.mark.parametrize('used', [False, True])
+  def test_keep_import (self, used, tmp_path):
+
+    code = """
+import pyhide
+
+@pyhide.keep
+def kernel (n):
+  return n * 2
+"""
+    code += 'print(pyhide.__name__)\n' if used else 'print(kernel(3), end=\'\')\n'
+
+    obf_code = Obfuscator(encode_pkg=False)(code=code)
+    # the package is kept only if it is used by the code
+    assert ('import pyhide' in obf_code) == used
+
+    inptfile = tmp_path / 'code.py'
+    outfile = tmp_path / 'obf.py'
+    inptfile.write_text(code, encoding='utf-8')
+    Obfuscator(encode_pkg=False).obfuscate_stream(inptfile=str(inptfile), outfile=str(outfile))
+    assert ('import pyhide' in outfile.read_text(encoding='utf-8')) == used
+
+    if not used:
+      stdout = StringIO()
+      with rstdout(stdout):
+        exec(obf_code, {})
+
+      assert stdout.getvalue() == '6'
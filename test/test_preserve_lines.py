@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import ast
+import traceback
+from io import StringIO
+from contextlib import redirect_stdout as rstdout
+
+from pyhide import Obfuscator
+
+import pytest
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+code = """from __future__ import annotations
+import math
+
+def deco (func):
+  return func
+
+@deco
+def kernel (n : int) -> float:
+  s = 0.5; t = 1
+  for i in range(n):
+    if i % 2: s = s + math.sqrt(i)
+    elif i % 3:
+      s = s + 1
+    else:
+      t = t + 1
+  try:
+    import os
+  except ImportError:
+    pass
+  else:
+    s = s + t
+  finally:
+    t = 0
+  return s
+
+def fail (x):
+  y = x * 2
+  raise ValueError(f'{y}')
+
+print(round(kernel(10), 2), end='', flush=True)
+"""
+
+# codes starting with a compound statement
+compound_codes = {
+  'def' : """def fail (x, k=2):
+  y = x * k
+  raise ValueError(y)
+
+fail(3)
+""",
+  'function' : """def fail (x):
+  y = x * 2
+  raise ValueError(y)
+
+fail(3)
+""",
+  'class' : """class Fail (object):
+  k = 2
+def fail (x):
+  y = x * Fail.k
+  raise ValueError(y)
+fail(3)
+""",
+  'if' : """if True:
+  k = 2
+def fail (x):
+  y = x * k
+  raise ValueError(y)
+fail(3)
+""",
+}
+
+match_code = """def kind (x):
+  match x:
+    case 1 | 2:
+      return 'small'
+    case [a, b] if a > b:
+      return 'pair'
+    case {'k' : v}: return v
+    case _:
+      return 'other'
+print(kind(1), kind([3, 2]), kind({'k' : 'v'}), kind(5), end='')
+"""
+
+def get_lines (code : str) -> list:
+  return sorted(node.lineno
+    for node in ast.walk(ast.parse(code))
+      if isinstance(node, ast.stmt) and
+         not isinstance(node, (ast.Import, ast.ImportFrom))
+  )
+
+class TestPreserveLines:
+  '''
+  Tests:
+    - if the statements are kept at their original lines
+    - if the traceback lines match the original code
+    - if the parallel obfuscation keeps the original lines
+    - if the header does not shift the lines of a compound first statement
+    - if the match statements keep their lines
+  '''
+
+  def test_statement_lines (self):
+
+    stdout = StringIO()
+    with rstdout(stdout):
+      exec(code, {})
+
+    expected = stdout.getvalue()
+
+    obf = Obfuscator(preserve_lines=True)
+    obf_code = obf(code=code)
+
+    # the header is packed in the line of the __future__ import
+    assert obf_code.split('\n')[0].startswith('from __future__ import annotations; ')
+    assert set(get_lines(code)) <= set(get_lines(obf_code))
+
+    stdout = StringIO()
+    with rstdout(stdout):
+      exec(obf_code, {})
+
+    assert stdout.getvalue() == expected
+
+  def test_traceback_lines (self):
+
+    obf = Obfuscator(preserve_lines=True)
+    obf_code = obf(code=code + 'fail(3)\n')
+
+    with pytest.raises(ValueError) as error:
+      with rstdout(StringIO()):
+        exec(compile(obf_code, 'app.py', 'exec'), {})
+
+    lines = [frame.lineno for frame in traceback.extract_tb(error.tb)][1:]
+    assert lines == [31, 28]
+
+  def test_parallel_lines (self):
+
+    obf = Obfuscator(preserve_lines=True, n_jobs=2)
+    obf_code = obf(code=code)
+
+    assert set(get_lines(code)) <= set(get_lines(obf_code))
+
+  @pytest.mark.parametrize('name', list(compound_codes))
+  @pytest.mark.parametrize('n_jobs', [1, 2])
+  def test_compound_first_line (self, name, n_jobs):
+
+    code = compound_codes[name]
+    obf = Obfuscator(preserve_lines=True, n_jobs=n_jobs)
+    obf_code = obf(code=code)
+
+    assert len(obf_code.split('\n')) == len(code.rstrip('\n').split('\n'))
+
+    with pytest.raises(ValueError) as error:
+      exec(compile(obf_code, 'app.py', 'exec'), {})
+
+    lines = [frame.lineno for frame in traceback.extract_tb(error.tb)][1:]
+    expected = [len(code.split('\n')) - 1, code.split('\n').index('  raise ValueError(y)') + 1]
+    assert lines == expected
+
+  def test_match_lines (self):
+
+    stdout = StringIO()
+    with rstdout(stdout):
+      exec(match_code, {})
+
+    expected = stdout.getvalue()
+
+    # the cases are kept also without encodings
+    obf = Obfuscator(
+      rename_variable=False, rename_function=False, rename_class=False, encode_pkg=False,
+      encode_number=False, encode_string=False, encode_operator=False, preserve_lines=True
+    )
+    obf_code = obf(code=match_code)
+
+    assert set(get_lines(match_code)) <= set(get_lines(obf_code))
+
+    stdout = StringIO()
+    with rstdout(stdout):
+      exec(obf_code, {})
+
+    assert stdout.getvalue() == expected
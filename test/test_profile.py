@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import cProfile
+from io import StringIO
+from contextlib import redirect_stdout as rstdout
+
+from pyhide import Obfuscator
+from pyhide._profile import load_profile
+from pyhide._profile import format_profile_report
+
+import pytest
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+code = """
+import math
+
+def kernel (n):
+  s = 0.5
+  for i in range(n):
+    s = s + math.sqrt(i) * 2 + len('ab')
+  return s
+
+def setup ():
+  return 'hello ' + str(42)
+
+print(setup(), round(kernel(2000), 2), end='', flush=True)
+"""
+
+class TestProfile:
+  '''
+  Tests:
+    - if a pstats dump is correctly mapped on the hot functions
+    - if a line-count profile is correctly mapped on the hot functions
+    - if the hot functions are still correct in rename mode
+    - if an invalid hot mode raises an error
+  '''
+
+  def test_pstats_profile (self, tmp_path):
+
+    stdout = StringIO()
+    with rstdout(stdout):
+      exec(code, {})
+
+    expected = stdout.getvalue()
+
+    # profile the code as it was stored in hot.py
+    filename = os.path.join(tmp_path, 'hot.prof')
+    profiler = cProfile.Profile()
+    namespace = {}
+    with rstdout(StringIO()):
+      profiler.runctx(compile(code, 'hot.py', 'exec'), namespace, namespace)
+    profiler.dump_stats(filename)
+
+    profile = load_profile(filename=filename)
+    assert any(func == 'kernel' for _, _, func in profile)
+
+    obf = Obfuscator(profile=filename, profile_filename='hot.py')
+    obf_code = obf(code=code)
+
+    assert [record['name'] for record in obf.report] == ['kernel']
+    assert obf.report[0]['downgraded']['operator'] == 3
+
+    stdout = StringIO()
+    with rstdout(stdout):
+      exec(obf_code, {})
+
+    assert stdout.getvalue() == expected
+
+    report = format_profile_report(obf.report, obf.hot_threshold)
+    assert 'kernel' in report
+    assert 'predicted overhead' in report
+
+  def test_line_profile (self, tmp_path):
+
+    stdout = StringIO()
+    with rstdout(stdout):
+      exec(code, {})
+
+    expected = stdout.getvalue()
+
+    filename = os.path.join(tmp_path, 'hot.txt')
+    with open(filename, 'w', encoding='utf-8') as fp:
+      fp.write('# lineno count\n')
+      fp.write('hot.py:7 2000\n')
+      fp.write('11 1\n')
+
+    obf = Obfuscator(profile=filename, hot_threshold=0.5)
+    obf_code = obf(code=code)
+
+    assert [record['name'] for record in obf.report] == ['kernel']
+
+    stdout = StringIO()
+    with rstdout(stdout):
+      exec(obf_code, {})
+
+    assert stdout.getvalue() == expected
+
+  def test_rename_mode (self):
+
+    stdout = StringIO()
+    with rstdout(stdout):
+      exec(code, {})
+
+    expected = stdout.getvalue()
+
+    # attribute all the runtime to the kernel definition
+    profile = {('hot.py', 4, 'kernel') : 1.}
+
+    obf = Obfuscator(profile=profile, hot_mode='rename')
+    obf_code = obf(code=code)
+
+    # the kernel operators and strings are left as native
+    assert "'ab'" in obf_code
+    assert obf_code.count("eval(") == 2
+
+    stdout = StringIO()
+    with rstdout(stdout):
+      exec(obf_code, {})
+
+    assert stdout.getvalue() == expected
+
+  def test_invalid_hot_mode (self):
+
+    with pytest.raises(ValueError):
+      Obfuscator(hot_mode='fast')
@@ -0,0 +1,212 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import ast
+import sys
+from io import StringIO
+from subprocess import PIPE, run
+from contextlib import redirect_stdout as rstdout
+
+from pyhide import Obfuscator
+from pyhide._scopes import get_scope_table
+from pyhide._scopes import resolve_scopes
+from pyhide._symbolicate import SymbolMap
+from pyhide._symbolicate import symbolicate_stream
+
+import pytest
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+cases = {
+
+  'global' : """
+counter = 0
+def inc ():
+  global counter
+  counter += 1
+inc(); inc()
+print(counter, end='')
+""",
+
+  'nonlocal' : """
+def outer ():
+  total = 0
+  def add (value):
+    nonlocal total
+    total += value
+  add(2); add(3)
+  return total
+print(outer(), end='')
+""",
+
+  'builtin_local' : """
+def peak (values):
+  max = 0
+  for value in values:
+    if value > max:
+      max = value
+  return max
+print(peak([1, 5, 2]), max(3, 4), end='')
+""",
+
+  'builtin_def' : """
+def max (a, b):
+  return 'mine'
+def call ():
+  return max(1, 2)
+print(call(), end='')
+""",
+
+  'builtin_param' : """
+def apply (len):
+  return len(3)
+print(apply(lambda x : x * 2), end='')
+""",
+
+  'class_body' : """
+def make (base):
+  shift = base * 2
+  class Inner (object):
+    value = shift
+    def get (self):
+      return shift + self.value
+  instance = Inner()
+  return instance.get()
+print(make(4), end='')
+""",
+
+  'comprehension' : """
+def scale (items):
+  factor = 2
+  found = [last := item * factor for item in items if item > 1]
+  return found, last
+print(scale([1, 2, 3]), end='')
+""",
+}
+
+code = """
+def rectangle_area (rectangle_width, rectangle_height, /):
+  rectangle_size = rectangle_width * rectangle_height
+  return rectangle_size
+
+def rectangle_perimeter (rectangle_width, rectangle_height, /):
+  rectangle_half = rectangle_width + rectangle_height
+  return rectangle_half * 2
+
+def describe_polygon (*polygon_sides):
+  polygon_count = len(polygon_sides)
+  polygon_total = sum(polygon_sides)
+  return polygon_count, polygon_total
+
+print(rectangle_area(2, 3), rectangle_perimeter(2, 3), describe_polygon(1, 2, 3), end='')
+"""
+
+def _run (code : str) -> str:
+  with rstdout(StringIO()) as stdout:
+    exec(code, {})
+  return stdout.getvalue()
+
+class TestScopes:
+  '''
+  Tests:
+    - if the shadowed and the declared names are correctly obfuscated
+    - if the functions reuse the aliases of their local variables
+    - if the reused aliases are symbolicated by their scope
+    - if the local aliases reduce the size of the obfuscated code
+    - if the streamed obfuscation renames the local variables
+    - if the mismatched symbol table disables the renaming
+  '''
+
+  @pytest.mark.parametrize('name', list(cases))
+  @pytest.mark.parametrize('local_aliases', [True, False])
+  def test_shadowing (self, name, local_aliases):
+
+    obfuscator = Obfuscator(encode_operator=False, local_aliases=local_aliases)
+    obf_code = obfuscator(cases[name])
+
+    assert _run(obf_code) == _run(cases[name])
+
+  def test_reuse (self, tmp_path):
+
+    symbol_map = str(tmp_path / 'symbols.pyhide-map')
+    obf_code = Obfuscator(symbol_map=symbol_map)(code)
+    assert _run(obf_code) == _run(code)
+
+    with open(symbol_map, 'r', encoding='utf-8') as fp:
+      records = [line.rstrip('\n').split('\t') for line in fp.readlines()[1:]]
+
+    aliases = {}
+    for alias, name, kind, scope in records:
+      if kind == 'local':
+        aliases.setdefault(scope, {})[name] = alias
+
+    # the parameters which could not be passed by keyword
+    # are renamed as the local variables
+    assert aliases['rectangle_area']['rectangle_width'] == aliases['rectangle_perimeter']['rectangle_width']
+    assert set(aliases['rectangle_area'].values()) == set(aliases['rectangle_perimeter'].values())
+    assert len({alias for scope in aliases.values() for alias in scope.values()}) == 3
+
+    # the alias of the local variables is resolved by the scope
+    alias = aliases['rectangle_area']['rectangle_size']
+    names = {name for scope in aliases.values() for name, local in scope.items() if local == alias}
+    assert len(names) > 1
+
+    with SymbolMap(symbol_map) as symbols:
+      for scope, locals_ in aliases.items():
+        for name, local in locals_.items():
+          assert symbols.lookup(local, scope=scope) == name
+
+      assert symbols.lookup(alias) is None
+
+  def test_traceback (self, tmp_path):
+
+    symbol_map = str(tmp_path / 'symbols.pyhide-map')
+    obf_code = Obfuscator(encode_operator=False, symbol_map=symbol_map)(
+      code.replace('return rectangle_half * 2', 'return rectangle_half * 2 // 0')
+    )
+
+    # the source lines are printed only by the tracebacks of a file
+    outfile = tmp_path / 'app_obf.py'
+    outfile.write_text(obf_code, encoding='utf-8')
+    proc = run([sys.executable, str(outfile)], stdout=PIPE, stderr=PIPE, universal_newlines=True)
+    assert 'ZeroDivisionError' in proc.stderr
+
+    out = StringIO()
+    with SymbolMap(symbol_map) as symbols:
+      symbolicate_stream(inpt=StringIO(proc.stderr), out=out, symbols=symbols)
+
+    assert 'in rectangle_perimeter' in out.getvalue()
+    # the numbers are header variables, without symbols
+    assert 'return rectangle_half * ' in out.getvalue()
+    assert 'rectangle_size' not in out.getvalue()
+
+  def test_size (self):
+
+    local_code = Obfuscator(encode_operator=False)(code)
+    global_code = Obfuscator(encode_operator=False, local_aliases=False)(code)
+
+    assert len(local_code) < len(global_code)
+    assert _run(local_code) == _run(global_code)
+
+  def test_stream (self, tmp_path):
+
+    inptfile = tmp_path / 'dummy.py'
+    outfile = tmp_path / 'dummy_obf.py'
+    inptfile.write_text(code + cases['builtin_def'] + cases['nonlocal'], encoding='utf-8')
+
+    obfuscator = Obfuscator(encode_operator=False)
+    obfuscator.obfuscate_stream(inptfile=str(inptfile), outfile=str(outfile))
+
+    obf_code = outfile.read_text(encoding='utf-8')
+    assert _run(obf_code) == _run(inptfile.read_text(encoding='utf-8'))
+    assert 'rectangle_size' not in obf_code
+    assert 'total' not in obf_code
+
+  def test_mismatch (self):
+
+    root = ast.parse(code)
+    table = get_scope_table(cases['nonlocal'])
+
+    assert resolve_scopes(root=root, table=table) is None
+    assert get_scope_table('def f ():\n  nonlocal x\n') is None
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import sys
+import dis
+from io import StringIO
+from contextlib import redirect_stdout as rstdout
+
+from pyhide import Obfuscator
+
+import pytest
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+code = """
+import math
+
+def bench (n):
+  total = 0
+  for i in range(n):
+    total = total + i * 3 % 7 - abs(i) // 2 + len('abc') + math.pi
+  return total
+
+BENCH = bench
+print(bench(50), 1 + 2.5, 2 ** 10, end='')
+"""
+
+class TestSpecialize:
+  '''
+  Tests:
+    - if the specialized obfuscation is correct
+    - if the operators are replaced by the cached functions
+    - if the bytecode of the hot loop is specialized
+    - if the budgets are rejected
+  '''
+
+  def test_specialize (self):
+
+    with rstdout(StringIO()) as stdout:
+      exec(code, {})
+    reference = stdout.getvalue()
+
+    obfuscator = Obfuscator(specialize=True)
+    obf_code = obfuscator(code)
+
+    with rstdout(StringIO()) as stdout:
+      exec(obf_code, {})
+
+    assert stdout.getvalue() == reference
+    # neither the operator names nor the strings are built at runtime
+    assert 'join' not in obf_code.split('\ndef ')[1]
+    assert 'eval' not in obf_code
+    assert 0.9 < obfuscator.estimate(code=code)['size'] / len(obf_code) < 1.1
+
+  @pytest.mark.skipif(sys.version_info < (3, 11), reason='adaptive interpreter required')
+  def test_quickened (self):
+
+    namespace = {}
+    with rstdout(StringIO()):
+      exec(Obfuscator(rename_variable=False, specialize=True)(code), namespace)
+    bench = namespace['BENCH']
+
+    for _ in range(5):
+      bench(100)
+
+    # the specialized instructions are not in the opcode map
+    instructions = list(dis.get_instructions(bench, adaptive=True))
+    specialized = [instr for instr in instructions if instr.opname not in dis.opmap]
+
+    assert len(specialized) > len(instructions) // 2
+
+  def test_budget (self):
+
+    with pytest.raises(ValueError):
+      Obfuscator(specialize=True, max_slowdown=2.)
@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import io
+import ast
+from io import StringIO
+from contextlib import redirect_stdout as rstdout
+
+from pyhide import Obfuscator
+from pyhide._stream import iter_statements
+
+import pytest
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+code = """
+import math
+
+# pyhide: off
+def scale (x):
+  return x * 2
+
+def identity (f):
+  return f
+
+@identity
+def func (x, y):
+  z = x * 3 + y * 2
+# comment at column zero
+  return 'value' + str(z + int(math.sqrt(4)))
+
+if scale(1) > 5:
+  res = 'a'
+elif scale(1) > 1:
+  res = 'b'
+else:
+  res = 'c'
+
+text = '''
+multi
+line'''
+print(func(x=1, y=2), res, len(text), end='')
+"""
+
+class TestStream:
+  '''
+  Tests:
+    - if the code is split in its top-level statements
+    - if the streamed obfuscation gives the same results
+    - if the line preservation raises an error
+  '''
+
+  def test_statements (self):
+
+    statements = list(iter_statements(io.StringIO(code).readline))
+
+    # the statements have the same content and lines of the whole code
+    assert ''.join(stmt for _, stmt in statements) == code
+
+    nodes = []
+    for lineno, stmt in statements:
+      root = ast.parse(stmt)
+      ast.increment_lineno(root, lineno - 1)
+      nodes.extend(root.body)
+
+    assert [ast.dump(node, include_attributes=True) for node in nodes] == \
+           [ast.dump(node, include_attributes=True) for node in ast.parse(code).body]
+
+    # the pragma comment is given with the following statement
+    assert any(stmt.startswith('\n# pyhide: off\ndef scale') for _, stmt in statements)
+
+  def test_stream (self, tmp_path):
+
+    inptfile = tmp_path / 'code.py'
+    outfile = tmp_path / 'code_obf.py'
+    inptfile.write_text(code, encoding='utf-8')
+
+    Obfuscator().obfuscate_stream(inptfile=str(inptfile), outfile=str(outfile))
+
+    obf_code = outfile.read_text(encoding='utf-8')
+    assert obf_code != code
+
+    stdout = StringIO()
+    with rstdout(stdout):
+      exec(obf_code, {})
+
+    assert stdout.getvalue() == 'value9 b 11'
+
+  def test_preserve_lines (self, tmp_path):
+
+    inptfile = tmp_path / 'code.py'
+    inptfile.write_text(code, encoding='utf-8')
+
+    with pytest.raises(ValueError):
+      Obfuscator(preserve_lines=True).obfuscate_stream(inptfile=str(inptfile), outfile=str(tmp_path / 'obf.py'))
@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import ast
+import pickle
+from io import StringIO
+from contextlib import redirect_stdout as rstdout
+
+from pyhide import Obfuscator
+from pyhide._emitter import unparse
+from pyhide._emitter import get_format_call
+from pyhide._emitter import fix_missing_locations
+from pyhide._emitter import dump_tree
+from pyhide._emitter import load_tree
+
+import pytest
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+package_dir = os.path.join(
+  os.path.dirname(os.path.abspath(__file__)),
+  '..',
+  'pyhide'
+)
+
+# pathological inputs with deeply nested code trees
+codes = {
+  'sum' : 'a = 1\nx = ' + ' + '.join(['a'] * 2500) + '\nprint(x, end="")',
+  'string_sum' : 'x = ' + ' + '.join(["'ab'"] * 2500) + '\nprint(len(x), end="")',
+  'unary' : 'x = ' + '-' * 500 + '1\nprint(x, end="")',
+  'nested_calls' : 'x = ' + 'abs(' * 150 + '-1' + ')' * 150 + '\nprint(x, end="")',
+  'fstring_sum' : 'a = 1\nprint(f"{' + '+'.join(['a'] * 1000) + '}", end="")',
+  'fstring_spec' : 'a = 1\nw = 8\nprint(f"{{a}} {' + '+'.join(['a'] * 1000) + '!r:>{w}} {a:.{' + '+'.join(['a'] * 1000) + '}f}", end="")',
+  'elif' : 'v = 3\nw = 3\nif v == 0:\n  r = 0\n' + 'elif v == w + w:\n  r = 1\n' * 1000 + 'elif v == w:\n  r = 5\nprint(r, end="")',
+}
+
+class TestStress:
+  '''
+  Tests:
+    - if the deeply nested codes are correctly obfuscated (also in parallel)
+    - if the iterative unparsing gives the same code of the standard one
+    - if the deep f-strings are unparsed as equivalent format calls
+    - if the iterative location fix works on deeply nested trees
+    - if the deeply nested trees could be pickled as flat tables
+  '''
+
+  @pytest.mark.parametrize('name', list(codes))
+  @pytest.mark.parametrize('n_jobs', [1, 2])
+  def test_deep_code (self, name, n_jobs):
+
+    code = codes[name]
+
+    # skip the codes which could not be compiled by
+    # the current python version
+    try:
+      compile(code, name, 'exec')
+    except (RecursionError, SyntaxError, MemoryError):
+      pytest.skip(f'{name} code could not be compiled')
+
+    stdout = StringIO()
+    with rstdout(stdout):
+      exec(code, {})
+
+    expected = stdout.getvalue()
+
+    obf = Obfuscator(n_jobs=n_jobs)
+    obf_code = obf(code=code)
+
+    stdout = StringIO()
+    with rstdout(stdout):
+      exec(obf_code, {})
+
+    assert stdout.getvalue() == expected
+
+  def test_dump_tree (self):
+
+    root = ast.parse(codes['sum'])
+    table = pickle.loads(pickle.dumps(dump_tree(root)))
+
+    assert unparse(load_tree(table)) == unparse(root)
+
+  def test_unparse (self):
+
+    for filename in sorted(os.listdir(package_dir)):
+      if not filename.endswith('.py'):
+        continue
+
+      with open(os.path.join(package_dir, filename), 'r', encoding='utf-8') as fp:
+        root = ast.parse(fp.read())
+
+      # cut the tree at each level
+      assert unparse(root, max_depth=1) == ast.unparse(root)
+
+  def test_format_call (self):
+
+    code = 'f"{{x}} {x!r:>{w}} {y:.{p}f} {x=}"'
+    root = ast.parse(code, mode='eval')
+    scope = {'x' : 'a', 'w' : 5, 'y' : 2.25, 'p' : 3}
+
+    # the f-strings are kept until they exceed the default depth
+    assert unparse(root, max_depth=1) == ast.unparse(root)
+    assert eval(ast.unparse(get_format_call(root.body)), scope) == eval(code, scope)
+
+  def test_fix_missing_locations (self):
+
+    root = ast.parse(codes['sum'])
+    # remove the locations of the operators
+    for node in ast.walk(root):
+      if isinstance(node, ast.BinOp):
+        del node.lineno, node.col_offset, node.end_lineno, node.end_col_offset
+
+    root = fix_missing_locations(root)
+
+    assert all(node.lineno == 2
+      for node in ast.walk(root)
+        if isinstance(node, ast.BinOp)
+    )
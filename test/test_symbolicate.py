@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import io
+import pstats
+import cProfile
+import traceback
+from contextlib import redirect_stdout as rstdout
+
+from pyhide import Obfuscator
+from pyhide._symbolicate import SymbolMap
+from pyhide._symbolicate import symbolicate_pstats
+from pyhide._symbolicate import symbolicate_stream
+
+import pytest
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+code = """
+class Solver:
+
+  def solve (self, value):
+    return helper(value)
+
+def helper (x):
+  if x > 3:
+    raise ValueError('boom')
+  return x * 2
+
+solver = Solver()
+for i in range(5):
+  solver.solve(i)
+"""
+
+class TestSymbolicate:
+  '''
+  Tests:
+    - if the symbol map stores all the aliases with their scope
+    - if a traceback is correctly symbolicated
+    - if a pstats dump is correctly symbolicated
+    - if an invalid symbol map raises an error
+  '''
+
+  def test_symbol_map (self, tmp_path):
+
+    filename = os.path.join(tmp_path, 'app.map')
+    obf = Obfuscator(symbol_map=filename)
+    obf(code=code)
+
+    with open(filename, 'r', encoding='utf-8') as fp:
+      records = [line.rstrip('\n').split('\t') for line in fp][1:]
+
+    # the records are sorted by alias
+    assert records == sorted(records)
+    assert ['solve', 'function', 'Solver'] in [r[1:] for r in records]
+    assert ['x', 'argument', 'helper'] in [r[1:] for r in records]
+
+    with SymbolMap(filename) as symbols:
+      for alias, name, kind, scope in records:
+        assert symbols.lookup(alias, scope=scope) == name
+
+      assert symbols.lookup('_' * 1000) is None
+
+  def test_traceback (self, tmp_path):
+
+    filename = os.path.join(tmp_path, 'app.map')
+    obf = Obfuscator(symbol_map=filename)
+    obf_code = obf(code=code)
+
+    with pytest.raises(ValueError) as error:
+      exec(compile(obf_code, 'app.py', 'exec'), {})
+
+    text = ''.join(traceback.format_tb(error.tb))
+    assert 'in helper' not in text
+
+    out = io.StringIO()
+    with SymbolMap(filename) as symbols:
+      symbolicate_stream(inpt=io.StringIO(text), out=out, symbols=symbols)
+
+    assert 'in solve' in out.getvalue()
+    assert 'in helper' in out.getvalue()
+
+  def test_pstats (self, tmp_path):
+
+    filename = os.path.join(tmp_path, 'app.map')
+    obf = Obfuscator(symbol_map=filename)
+    # avoid the exception of the last call
+    obf_code = obf(code=code.replace('range(5)', 'range(3)'))
+
+    profile = os.path.join(tmp_path, 'app.prof')
+    profiler = cProfile.Profile()
+    namespace = {}
+    profiler.runctx(compile(obf_code, 'app.py', 'exec'), namespace, namespace)
+    profiler.dump_stats(profile)
+
+    output = os.path.join(tmp_path, 'app_sym.prof')
+    with SymbolMap(filename) as symbols:
+      symbolicate_pstats(inptfile=profile, outfile=output, symbols=symbols)
+
+    functions = {func for _, _, func in pstats.Stats(output).stats}
+    assert {'solve', 'helper'} <= functions
+
+  def test_invalid_symbol_map (self, tmp_path):
+
+    filename = os.path.join(tmp_path, 'app.map')
+    with open(filename, 'w', encoding='utf-8') as fp:
+      fp.write('alias\tname\n')
+
+    with pytest.raises(ValueError):
+      SymbolMap(filename)
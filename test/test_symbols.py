@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pickle
+from io import StringIO
+from contextlib import redirect_stdout as rstdout
+
+from pyhide import Obfuscator
+from pyhide._symbols import SymbolTable
+from pyhide._symbols import MAX_STRING_KEY
+
+import pytest
+
+__author__  = ['Nico Curti']
+__email__ = ['nico.curti2@unibo.it']
+
+class TestSymbols:
+  '''
+  Tests:
+    - if the namespaces of the symbol table are separated
+    - if the long strings are stored by digest
+    - if equal values of different types are correctly obfuscated
+    - if an invalid kind raises an error
+    - if the reserved aliases are skipped by the table
+  '''
+
+  def test_namespaces (self):
+
+    table = SymbolTable()
+
+    aliases = {
+      table.add('char', 65),
+      table.add('number', 65),
+      table.add('number', 1),
+      table.add('number', 1.),
+      table.add('number', True),
+      table.add('string', 'x'),
+      table.add('name', 'x'),
+    }
+
+    assert len(aliases) == len(table) == 7
+    assert table.add('name', 'x') == table.get('name', 'x')
+    assert table.get('name', 'y', 'y') == 'y'
+    assert not table.has('string', 'y')
+
+    # the table could be sent to the worker processes
+    table = pickle.loads(pickle.dumps(table))
+    assert len(table) == 7
+    assert table.has('number', 1.)
+
+  def test_reserve (self):
+
+    table = SymbolTable()
+    first = table.add('name', 'x')
+    start = table.reserve(size=2)
+
+    assert start == len(first) + 1
+    assert len(table.add('name', 'y')) == start + 2
+    # the reserved aliases are not symbols of the table
+    assert len(table) == 2
+    assert table.reserved == 2
+
+  def test_long_strings (self):
+
+    table = SymbolTable()
+    value = 'a' * (MAX_STRING_KEY + 1)
+    alias = table.add('string', value)
+
+    assert table.get('string', 'a' * (MAX_STRING_KEY + 1)) == alias
+    assert table.get('string', 'a' * MAX_STRING_KEY) is None
+    # the string is not stored in the table
+    assert all(symbol.key != value for symbol in table)
+
+  def test_number_collisions (self):
+
+    code = """
+print(1, 1.0, True, 0, 0.0, False, 65, chr(65), end='', flush=True)
+"""
+
+    stdout = StringIO()
+    with rstdout(stdout):
+      exec(code, {})
+
+    assert stdout.getvalue() == '1 1.0 True 0 0.0 False 65 A'
+
+    obf = Obfuscator()
+    obf_code = obf(code=code)
+
+    stdout = StringIO()
+    with rstdout(stdout):
+      exec(obf_code, {})
+
+    assert stdout.getvalue() == '1 1.0 True 0 0.0 False 65 A'
+
+  def test_invalid_kind (self):
+
+    with pytest.raises(ValueError):
+      SymbolTable().add('float', 1.)